@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Controle de Admissão - Backpressure para o endpoint síncrono /classify
+
+Cada worker aceita no máximo ADMISSION_MAX_IN_FLIGHT classificações simultâneas
+e mantém uma fila limitada (ADMISSION_MAX_QUEUE). O custo estimado de CPU
+(segundos) de cada requisição também é limitado (ADMISSION_MAX_COST), para que
+poucos documentos gigantes não ocupem o worker inteiro. Acima da capacidade a
+requisição é rejeitada imediatamente com um Retry-After estimado, em vez de
+ficar pendurada até o timeout do gunicorn.
+"""
+
+import math
+import os
+import threading
+import time
+
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', '2'))
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', '4'))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '10'))
+ADMISSION_MAX_COST = float(os.environ.get('ADMISSION_MAX_COST', '60'))
+# Desviar para /classify/async quando lotado (se houver workers Celery)
+ADMISSION_DIVERT_ASYNC = os.environ.get('ADMISSION_DIVERT_ASYNC', '1') == '1'
+
+
+class AdmissionRejected(Exception):
+    """Requisição recusada por falta de capacidade"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Capacidade esgotada ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """Vaga concedida pelo controlador (liberar com release ou via with)"""
+
+    def __init__(self, controller, cost, queue_wait):
+        self.controller = controller
+        self.cost = cost
+        self.queue_wait = queue_wait
+        self.started_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.controller._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class AdmissionController:
+    """Limita requisições em voo, tamanho da fila e custo estimado por worker"""
+
+    def __init__(self, max_in_flight=ADMISSION_MAX_IN_FLIGHT, max_queue=ADMISSION_MAX_QUEUE,
+                 queue_timeout=ADMISSION_QUEUE_TIMEOUT, max_cost=ADMISSION_MAX_COST):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_cost = max_cost
+
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.cost_in_flight = 0.0
+        self.cost_queued = 0.0
+        self.stats = {'admitted': 0, 'rejected': 0, 'diverted': 0, 'queue_timeouts': 0}
+
+        # Tempo médio de serviço (EWMA) para estimar o Retry-After
+        self.avg_service_time = 1.0
+
+    def _has_slot(self, cost):
+        if self.in_flight >= self.max_in_flight:
+            return False
+        # Uma requisição sozinha sempre pode rodar, mesmo acima do custo máximo
+        return self.in_flight == 0 or self.cost_in_flight + cost <= self.max_cost
+
+    def retry_after(self):
+        """Segundos estimados até uma vaga abrir"""
+        waves = (self.queued + self.in_flight) / max(self.max_in_flight, 1)
+        return max(1, int(math.ceil(waves * self.avg_service_time)))
+
+    def _reject(self, reason):
+        self.stats['rejected'] += 1
+        if reason == 'queue_timeout':
+            self.stats['queue_timeouts'] += 1
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def acquire(self, cost=0.0, timeout=None):
+        """
+        Reserva uma vaga para uma requisição de custo estimado `cost` (s de CPU).
+        Retorna AdmissionTicket ou levanta AdmissionRejected.
+        """
+        if timeout is None:
+            timeout = self.queue_timeout
+
+        with self._cond:
+            enqueued_at = time.monotonic()
+
+            if not self._has_slot(cost):
+                if self.queued >= self.max_queue:
+                    self._reject('queue_full')
+                if self.cost_in_flight + self.cost_queued + cost > self.max_cost and self.in_flight > 0:
+                    self._reject('cost_limit')
+
+                self.queued += 1
+                self.cost_queued += cost
+                try:
+                    admitted = self._cond.wait_for(lambda: self._has_slot(cost), timeout=timeout)
+                finally:
+                    self.queued -= 1
+                    self.cost_queued -= cost
+                if not admitted:
+                    self._reject('queue_timeout')
+
+            self.in_flight += 1
+            self.cost_in_flight += cost
+            self.stats['admitted'] += 1
+            return AdmissionTicket(self, cost, time.monotonic() - enqueued_at)
+
+    def _release(self, ticket):
+        with self._cond:
+            self.in_flight -= 1
+            self.cost_in_flight -= ticket.cost
+            elapsed = time.monotonic() - ticket.started_at
+            self.avg_service_time += 0.2 * (elapsed - self.avg_service_time)
+            self._cond.notify_all()
+
+    def record_diverted(self, reason):
+        """
+        Contabiliza uma requisição desviada para o modo assíncrono: a recusa
+        do acquire() (motivo `reason`) deixa de contar como rejected e como
+        queue_timeout (nenhum 503 foi respondido)
+        """
+        with self._cond:
+            self.stats['rejected'] -= 1
+            if reason == 'queue_timeout':
+                self.stats['queue_timeouts'] -= 1
+            self.stats['diverted'] += 1
+
+    def snapshot(self):
+        """Estado atual (profundidade da fila, vagas e contadores)"""
+        with self._cond:
+            return {
+                'in_flight': self.in_flight,
+                'queue_depth': self.queued,
+                'max_in_flight': self.max_in_flight,
+                'max_queue': self.max_queue,
+                'cost_in_flight': round(self.cost_in_flight, 3),
+                'max_cost': self.max_cost,
+                'avg_service_time': round(self.avg_service_time, 3),
+                **self.stats
+            }
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Artefatos de Análise - o que a re-pontuação precisa, sem os pixels
+
+Mudar limiares ou regras de conformidade exigia decodificar e processar de
+novo o arquivo inteiro. Com ANALYSIS_ARTIFACTS=1 cada página classificada
+grava um .npz sem compressão, chaveado pelo SHA-256 do documento
+(<hash>.npz; páginas de TIFF multipágina em <hash>_p<NNN>.npz), com:
+
+- components: estatísticas dos componentes conectados (int32, N x 5)
+- row_counts / row_left / row_right / col_counts: perfis da binária (LayoutProfile)
+- lines: linhas de texto com as margens (y_start, y_end, left, right)
+- token_words / token_counts: contagens de palavras do OCR (TokenStats)
+- meta: JSON com escala, estratégia de decode, features e o resultado original
+
+ArtifactStore.load() mapeia os arrays direto do arquivo (np.memmap sobre os
+membros do zip): só as páginas e colunas usadas são lidas do disco.
+ClassificadorFinal.rescore() recalcula features, score, parágrafos e
+conformidade a partir dos artefatos, sem decodificar a imagem.
+
+Uso (re-pontuar todos os artefatos do diretório):
+    python analysis_artifacts.py [diretório] [--min-words 2000] [--min-paragraphs 8] [--output resultados.jsonl]
+
+Configuração (variáveis de ambiente):
+    ANALYSIS_ARTIFACTS       0 (padrão) ou 1: gravar um artefato por página classificada
+    ANALYSIS_ARTIFACTS_DIR   diretório dos artefatos (padrão .analysis_artifacts)
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import zipfile
+from collections import Counter
+
+import numpy as np
+
+from layout_profile import LayoutProfile
+from request_recorder import file_sha256
+from structured_logging import get_logger
+from token_stats import TokenStats
+
+logger = get_logger(__name__)
+
+ANALYSIS_ARTIFACTS = os.environ.get('ANALYSIS_ARTIFACTS', '0') == '1'
+ANALYSIS_ARTIFACTS_DIR = os.environ.get('ANALYSIS_ARTIFACTS_DIR', '.analysis_artifacts')
+
+ARTIFACT_VERSION = 1
+
+# Campos do resultado original guardados no meta
+RESULT_KEYS = ('classification', 'score', 'features', 'extra_features', 'num_lines', 'num_paragraphs',
+               'word_count', 'word_count_estimated', 'orientation', 'degradations', 'ocr_profile')
+
+# Cabeçalho local de um membro do zip: 30 bytes, tamanhos do nome e do extra nos bytes 26-30
+ZIP_LOCAL_HEADER = 30
+
+
+def document_hash(path):
+    """Chave do documento: SHA-256 do arquivo"""
+    return file_sha256(path)
+
+
+def page_key(document, page):
+    """Chave de uma página de TIFF multipágina"""
+    return f"{document}_p{page:03d}"
+
+
+def _json_default(value):
+    """Escalares numpy no meta (features vindas de arrays)"""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Valor não serializável no artefato: {value!r}")
+
+
+def _text_array(text):
+    return np.frombuffer(text.encode('utf-8'), np.uint8)
+
+
+def build(layout, plan, result, lines=None, token_stats=None):
+    """
+    Arrays do artefato de uma página: perfil/componentes do layout (na escala
+    do decode), linhas detectadas (None = detectar de novo na re-pontuação),
+    contagens do OCR (None = OCR não rodou) e o resultado da classificação
+    """
+    components = getattr(layout, 'components', None)
+    meta = {
+        'version': ARTIFACT_VERSION,
+        'scale': plan.scale,
+        'strategy': plan.strategy,
+        'width': layout.width,
+        'height': layout.height,
+        'page_width': plan.width,
+        'page_height': plan.height,
+        'has_components': components is not None,
+        'has_lines': lines is not None,
+        'token_total': token_stats.total if token_stats is not None else None,
+    }
+    meta.update({key: result[key] for key in RESULT_KEYS if key in result})
+    words = list(token_stats.counts) if token_stats is not None else []
+    return {
+        'meta': _text_array(json.dumps(meta, ensure_ascii=False, default=_json_default)),
+        'components': np.zeros((0, 5), np.int32) if components is None else np.asarray(components, np.int32),
+        'row_counts': np.asarray(layout.row_counts, np.int32),
+        'row_left': np.asarray(layout.row_left, np.int32),
+        'row_right': np.asarray(layout.row_right, np.int32),
+        'col_counts': np.asarray(layout.col_counts, np.int32),
+        'lines': np.array([(line['y_start'], line['y_end'], line['left'], line.get('right', -1))
+                           for line in lines or []], np.int32).reshape(-1, 4),
+        # Palavras separadas por \n (só letras, nunca contêm \n) e contagens na mesma ordem
+        'token_words': _text_array('\n'.join(words)),
+        'token_counts': np.array([token_stats.counts[word] for word in words], np.int64),
+    }
+
+
+def load_npz_mmap(path):
+    """
+    Arrays de um .npz sem compressão (np.savez) mapeados em memória, somente
+    leitura: cada membro é um .npy guardado sem compressão, então os dados
+    começam logo após o cabeçalho .npy dentro do zip
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Membro comprimido no artefato: {info.filename}")
+            f.seek(info.header_offset)
+            name_length, extra_length = struct.unpack('<HH', f.read(ZIP_LOCAL_HEADER)[26:30])
+            f.seek(info.header_offset + ZIP_LOCAL_HEADER + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                         order='F' if fortran_order else 'C')
+    return arrays
+
+
+class PageArtifact:
+    """Artefato de uma página carregado (arrays mapeados em memória + meta)"""
+
+    def __init__(self, key, arrays):
+        self.key = key
+        self.arrays = arrays
+        self.meta = json.loads(bytes(arrays['meta']).decode('utf-8'))
+        if self.meta.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Versão de artefato não suportada: {self.meta.get('version')} ({key})")
+
+    @property
+    def page(self):
+        """Índice da página no TIFF multipágina (None em documentos de uma página)"""
+        _, sep, page = self.key.rpartition('_p')
+        return int(page) if sep else None
+
+    def layout_profile(self):
+        """LayoutProfile com os perfis e componentes guardados (views sem cópia)"""
+        profile = LayoutProfile(
+            self.meta['width'], self.meta['height'],
+            np.asarray(self.arrays['row_counts']), np.asarray(self.arrays['row_left']),
+            np.asarray(self.arrays['row_right']), np.asarray(self.arrays['col_counts'])
+        )
+        if self.meta['has_components']:
+            profile.components = np.asarray(self.arrays['components'])
+        return profile
+
+    def lines(self):
+        """Linhas no formato do ParagraphDetector (None se não foram guardadas)"""
+        if not self.meta['has_lines']:
+            return None
+        return [{'y_start': y_start, 'y_end': y_end, 'height': y_end - y_start, 'left': left, 'right': right}
+                for y_start, y_end, left, right in self.arrays['lines'].tolist()]
+
+    def token_stats(self):
+        """Contagens de palavras do OCR (None se o OCR não rodou na página)"""
+        if self.meta['token_total'] is None:
+            return None
+        text = bytes(self.arrays['token_words']).decode('utf-8')
+        words = text.split('\n') if text else []
+        return TokenStats(self.meta['token_total'], dict(zip(words, self.arrays['token_counts'].tolist())))
+
+
+class ArtifactStore:
+    """Artefatos em <diretório>/<2 primeiros caracteres do hash>/<chave>.npz"""
+
+    def __init__(self, directory=ANALYSIS_ARTIFACTS_DIR):
+        self.directory = directory
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.npz")
+
+    def save(self, key, arrays):
+        """Grava o artefato (arquivo temporário + rename: leitores nunca veem um .npz pela metade)"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, key):
+        return PageArtifact(key, load_npz_mmap(self.path(key)))
+
+    def document(self, document):
+        """Artefatos do documento (uma página ou as páginas em ordem); [] se não houver"""
+        if os.path.exists(self.path(document)):
+            return [self.load(document)]
+        directory = os.path.dirname(self.path(document))
+        if not os.path.isdir(directory):
+            return []
+        keys = sorted(name[:-4] for name in os.listdir(directory)
+                      if name.startswith(f"{document}_p") and name.endswith('.npz'))
+        return [self.load(key) for key in keys]
+
+    def documents(self):
+        """Hashes dos documentos com artefatos"""
+        documents = set()
+        if os.path.isdir(self.directory):
+            for shard in os.listdir(self.directory):
+                shard_dir = os.path.join(self.directory, shard)
+                if os.path.isdir(shard_dir):
+                    documents.update(name[:-4].split('_p')[0] for name in os.listdir(shard_dir)
+                                     if name.endswith('.npz'))
+        return sorted(documents)
+
+
+def rescore_all(classifier, store, min_words=2000, min_paragraphs=8, language='pt'):
+    """(hash, resultado) de cada documento re-pontuado a partir dos artefatos"""
+    for document in store.documents():
+        yield document, classifier.rescore(store.document(document), min_words=min_words,
+                                           min_paragraphs=min_paragraphs, language=language)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-pontua documentos a partir dos artefatos de análise')
+    parser.add_argument('directory', nargs='?', default=ANALYSIS_ARTIFACTS_DIR)
+    parser.add_argument('--min-words', type=int, default=2000)
+    parser.add_argument('--min-paragraphs', type=int, default=8)
+    parser.add_argument('--language', default='pt', choices=('pt', 'en'))
+    parser.add_argument('--output', help='Grava um JSON por documento (hash + resultado)')
+    args = parser.parse_args(argv)
+
+    from classificador_final import ClassificadorFinal
+    classifier = ClassificadorFinal()
+    store = ArtifactStore(args.directory)
+
+    start = time.perf_counter()
+    classifications = Counter()
+    compliant = 0
+    output = open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        for document, result in rescore_all(classifier, store, args.min_words, args.min_paragraphs, args.language):
+            classifications[result['classification']] += 1
+            compliant += bool(result.get('is_compliant'))
+            if output:
+                output.write(json.dumps({'document': document, **result}, ensure_ascii=False,
+                                        default=_json_default) + '\n')
+    finally:
+        if output:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    documents = sum(classifications.values())
+    print(json.dumps({
+        'documents': documents,
+        'classifications': dict(classifications),
+        'compliant': compliant,
+        'seconds': round(elapsed, 3),
+        'documents_per_second': round(documents / elapsed, 1) if elapsed and documents else None,
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,21 +3,37 @@
 API REST para Classificação de Documentos - COM FEEDBACK
 """
 
-import sys
-sys.stdout = sys.stderr  # Força prints irem para stderr (que o Flask mostra)
+from structured_logging import configure_logging, get_logger, begin_request, end_request
+configure_logging()
+logger = get_logger('api')
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, g, Response, stream_with_context
 from flask_cors import CORS
 from flasgger import Swagger, swag_from
 from swagger_docs import *
 from classificador_final import ClassificadorFinal
+from memory_budget import MemoryBudgetExceeded
+from tiff_header import TiffRejected
+import tiff_header
+import ocr_profiles
+import multipage
+from admission import AdmissionController, AdmissionRejected, ADMISSION_DIVERT_ASYNC
+from request_recorder import RequestRecorder
+from tracing import Tracer, load_trace, parse_traceparent
+from profiling import (RequestProfiler, SamplingProfiler, format_collapsed, function_summary,
+                       is_authorized, is_truthy, load_collapsed)
+import metrics
 from pathlib import Path
 import tempfile
+import uuid
 import os
+import re
 import traceback
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
 import numpy as np
 import csv
+import json
 import time
 
 # Celery (opcional - funciona sem Redis também)
@@ -32,14 +48,14 @@ try:
         active_workers = inspect.active()
         if active_workers and len(active_workers) > 0:
             CELERY_AVAILABLE = True
-            print(f"✅ Celery disponível - {len(active_workers)} worker(s) ativo(s) - modo assíncrono ativado")
+            logger.info("✅ Celery disponível - %d worker(s) ativo(s) - modo assíncrono ativado", len(active_workers))
         else:
-            print("⚠️ Celery instalado mas SEM WORKERS ativos - usando modo síncrono")
-            print("   (Para ativar async: inicie um worker ou use Render Standard plan)")
+            logger.warning("⚠️ Celery instalado mas SEM WORKERS ativos - usando modo síncrono "
+                           "(para ativar async: inicie um worker ou use Render Standard plan)")
     except Exception as e:
-        print(f"⚠️ Celery instalado mas não conectável: {e} - usando modo síncrono")
+        logger.warning("⚠️ Celery instalado mas não conectável: %s - usando modo síncrono", e)
 except ImportError:
-    print("⚠️ Celery não disponível - usando modo síncrono")
+    logger.warning("⚠️ Celery não disponível - usando modo síncrono")
 
 app = Flask(__name__)
 # Configurar CORS para permitir GitHub Pages e localhost (todas as portas)
@@ -113,14 +129,94 @@ swagger_template = {
 swagger = Swagger(app, config=swagger_config, template=swagger_template)
 
 # Inicializar classificador
-print("🔄 Carregando classificador...")
+logger.info("🔄 Carregando classificador...")
 classifier = ClassificadorFinal()
-print("✅ Classificador carregado!")
+logger.info("✅ Classificador carregado!")
+
+# Controle de admissão do /classify síncrono (por processo/worker)
+admission_controller = AdmissionController()
+
+# Gravação opcional das requisições para replay (REQUEST_RECORDER_ENABLED=1)
+request_recorder = RequestRecorder()
+
+# Profiling sob demanda (profile=1 com ADMIN_TOKEN)
+request_profiler = RequestProfiler()
+
+# Profiler de amostragem contínuo (iniciado na primeira requisição de cada processo)
+sampling_profiler = SamplingProfiler(role='api')
+
+# Tracing: span raiz por requisição (continua o traceparent recebido)
+tracer = Tracer(service='api')
+
+# Métricas HTTP e do controle de admissão (exportadas em GET /metrics)
+HTTP_DURATION = metrics.REGISTRY.histogram(
+    'http_request_duration_seconds', 'Latência das requisições HTTP', ('endpoint', 'status')
+)
+ADMISSION_EVENTS = metrics.REGISTRY.counter(
+    'admission_requests_total', 'Decisões do controle de admissão', ('decision',)
+)
+metrics.REGISTRY.gauge('admission_queue_depth', 'Requisições aguardando vaga no worker',
+                       callback=lambda: admission_controller.snapshot()['queue_depth'])
+metrics.REGISTRY.gauge('admission_in_flight', 'Classificações síncronas em andamento no worker',
+                       callback=lambda: admission_controller.snapshot()['in_flight'])
+metrics.REGISTRY.gauge('speculative_ocr_wasted_ratio', 'Fração do OCR especulativo descartada',
+                       callback=lambda: classifier.speculative_ocr_stats['wasted'] / max(classifier.speculative_ocr_stats['started'], 1))
+
+@app.before_request
+def start_request_timing():
+    """Inicia a coleta de timings por etapa, o correlation id e o span raiz da requisição"""
+    g.request_start = time.perf_counter()
+    g.timings_token = metrics.start_timings()
+    g.request_id = begin_request(request.headers.get('X-Request-ID'))
+    sampling_profiler.ensure_started()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.trace = tracer.begin(f"{request.method} {route}", request.headers.get('traceparent'),
+                           {'http.method': request.method, 'http.route': route, 'request_id': g.request_id})
+
+def finish_request(status_code, failed=False):
+    """
+    Fecha a requisição: timings por etapa, latência, gravação para replay,
+    span raiz e correlation id. Retorna os timings (None se já foi fechada)
+    """
+    token = g.pop('timings_token', None)
+    if token is None:
+        return None
+    timings = metrics.finish_timings(token)
+    elapsed = time.perf_counter() - g.pop('request_start', time.perf_counter())
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_DURATION.observe(elapsed, endpoint=endpoint, status=status_code)
+    timings['total'] = elapsed
+    request_recorder.finish(g.pop('recording', None), status_code, timings,
+                            g.pop('recording_result', None), g.get('request_id'))
+    tracer.finish(g.pop('trace', None), status='error' if failed or status_code >= 500 else 'ok',
+                  attributes={'http.status_code': status_code})
+    end_request()
+    return timings
+
+@app.after_request
+def add_server_timing(response):
+    """Registra a latência e anexa o header Server-Timing com as etapas medidas"""
+    response.headers['X-Request-ID'] = g.get('request_id', '')
+    trace = g.get('trace')
+    if trace is not None:
+        response.headers['X-Trace-Id'] = trace[0].context.trace_id
+    # NDJSON (stream=1): o corpo ainda não foi gerado; o gerador fecha a
+    # requisição ao terminar (sem Server-Timing: os headers já foram enviados)
+    if g.get('streaming'):
+        return response
+    timings = finish_request(response.status_code)
+    if timings is not None:
+        response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+    return response
 
 # Configurações
 ALLOWED_EXTENSIONS = {'tif', 'tiff'}  # Apenas TIF
-MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB
+MAX_FILE_SIZE = int(float(os.environ.get('MAX_UPLOAD_MB', '16')) * 1024 * 1024)  # 16MB
+# Limite aplicado pelo Werkzeug enquanto lê o corpo (folga para os campos do multipart)
+app.config['MAX_CONTENT_LENGTH'] = MAX_FILE_SIZE + 64 * 1024
 FEEDBACK_FILE = 'feedback_data.csv'
+# Orçamento de latência padrão (ms) quando o cliente não envia deadline_ms
+DEFAULT_DEADLINE_MS = os.environ.get('DEFAULT_DEADLINE_MS')
 
 def convert_numpy_types(obj):
     """Converte tipos numpy para tipos nativos do Python"""
@@ -136,10 +232,247 @@ def convert_numpy_types(obj):
         return [convert_numpy_types(item) for item in obj]
     return obj
 
+def build_classification_response(result, filename):
+    """Corpo JSON de /classify a partir do resultado do classificador (documento ou página)"""
+    response = {
+        'success': True,
+        'filename': filename,
+        'classification': str(result['classification']),
+        'score': float(result['score']),
+        'confidence': float(round(result['confidence'], 3)),
+        'features': {
+            'text_density': float(round(result['features']['text_density'], 3)),
+            'num_text_components': int(result['features']['num_text_components']),
+            'layout_transitions': int(result['features']['layout_transitions'])
+        },
+        'extra_features': {
+            'avg_component_height': float(round(result['extra_features']['avg_component_height'], 2)),
+            'avg_component_width': float(round(result['extra_features']['avg_component_width'], 2)),
+            'height_std': float(round(result['extra_features']['height_std'], 2)),
+            'avg_aspect_ratio': float(round(result['extra_features']['avg_aspect_ratio'], 2)),
+            'num_columns_detected': int(result['extra_features']['num_columns_detected'])
+        }
+    }
+    
+    # Calhas entre colunas de texto (x inicial e final, px)
+    if 'column_gutters' in result['extra_features']:
+        response['column_gutters'] = result['extra_features']['column_gutters']
+    
+    # Rotação/inclinação estimadas pelo layout
+    if 'orientation' in result:
+        response['orientation'] = result['orientation']
+    
+    # Perfil usado no OCR (speed, balanced ou accurate)
+    if 'ocr_profile' in result:
+        response['ocr_profile'] = result['ocr_profile']
+    
+    # Adicionar número de linhas e parágrafos se disponível
+    if 'num_lines' in result:
+        response['num_lines'] = int(result['num_lines'])
+    if 'num_paragraphs' in result:
+        response['num_paragraphs'] = int(result['num_paragraphs'])
+    
+    # Adicionar explicação textual
+    # Adicionar análise de texto (se artigo científico)
+    if 'word_count' in result:
+        response['word_count'] = int(result['word_count'])
+    if 'is_compliant' in result:
+        response['is_compliant'] = bool(result['is_compliant'])
+    if 'frequent_words' in result:
+        # frequent_words já vem como lista de dicionários do classificador
+        freq_words = result['frequent_words']
+        if freq_words and isinstance(freq_words[0], dict):
+            # Já está no formato correto {'word': ..., 'count': ...}
+            response['frequent_words'] = freq_words
+        else:
+            # Fallback: converter tuplas para dicionários
+            response['frequent_words'] = [
+                {'word': word, 'count': int(count)} 
+                for word, count in freq_words
+            ]
+    
+    # Degradações aplicadas para cumprir o deadline
+    if 'degradations' in result:
+        response['degradations'] = list(result['degradations'])
+    if result.get('word_count_estimated'):
+        response['word_count_estimated'] = True
+    
+    # Adicionar explicação textual
+    if 'explanation' in result:
+        response['explanation'] = str(result['explanation'])
+    
+    # Estratégia de decode e pico de memória por etapa
+    if 'memory' in result:
+        response['memory'] = result['memory']
+    
+    # Metadados do cabeçalho TIFF (pré-verificação)
+    if 'image' in result:
+        response['image'] = result['image']
+    
+    # TIFF multipágina: resumo de cada página
+    if 'pages' in result:
+        response['page_count'] = int(result['page_count'])
+        response['pages'] = result['pages']
+    if 'page' in result:
+        response['page'] = int(result['page'])
+    
+    return convert_numpy_types(response)
+
+def parse_compliance_params(form):
+    """Lê min_words/min_paragraphs do formulário (valores padrão se inválidos)"""
+    try:
+        return int(form.get('min_words', '2000')), int(form.get('min_paragraphs', '8'))
+    except (TypeError, ValueError):
+        return 2000, 8
+
+def parse_deadline_ms(value):
+    """Converte o parâmetro deadline_ms (ms > 0) ou retorna None"""
+    if value in (None, ''):
+        value = DEFAULT_DEADLINE_MS
+    try:
+        deadline_ms = int(value)
+    except (TypeError, ValueError):
+        return None
+    return deadline_ms if deadline_ms > 0 else None
+
+def parse_layout_scale(value):
+    """layout_scale=1/2/4 (decode reduzido do layout) ou None"""
+    try:
+        scale = int(value)
+    except (TypeError, ValueError):
+        return None
+    return scale if scale in (1, 2, 4) else None
+
+def parse_ocr_profile(value):
+    """ocr_profile=speed/balanced/accurate ou None (auto: escolhido pelo layout)"""
+    return value if value in ocr_profiles.PROFILE_NAMES else None
+
+def stream_requested(form):
+    """stream=1 no formulário ou na query string: resultados por página em NDJSON (TIFF multipágina)"""
+    return is_truthy(form.get('stream', request.args.get('stream', '')))
+
+def stream_classification(temp_path, filename, ticket, classify_kwargs):
+    """
+    Resposta NDJSON: uma linha por página na ordem em que terminam e, por
+    último, a linha do documento. O arquivo temporário e a vaga da admissão
+    são liberados quando o gerador termina (ou o cliente desconecta), junto
+    com os timings, o span raiz, a gravação e o correlation id da requisição.
+    """
+    def generate():
+        failed = False
+        try:
+            with metrics.stage('classify'):
+                for _, result in classifier.iter_classify(temp_path, **classify_kwargs):
+                    g.recording_result = result
+                    yield json.dumps(build_classification_response(result, filename), ensure_ascii=False) + '\n'
+        except Exception as e:
+            failed = True
+            logger.exception("❌ Erro ao processar páginas: %s", e)
+            yield json.dumps({'success': False, 'error': 'Erro ao processar imagem', 'message': str(e)},
+                             ensure_ascii=False) + '\n'
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            ticket.release()
+            finish_request(200, failed=failed)
+    
+    g.streaming = True
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 def allowed_file(filename):
     """Verifica se a extensão do arquivo é permitida"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def preflight_upload(file):
+    """Metadados do TIFF enviado, lidos só do cabeçalho/IFDs (levanta TiffRejected)"""
+    with metrics.stage('preflight'):
+        return tiff_header.validate(tiff_header.inspect(file.stream))
+
+def tiff_rejected_response(rejection):
+    logger.warning("⚠️ Upload recusado na pré-verificação (%s): %s", rejection.reason, rejection)
+    return jsonify({
+        'error': 'Imagem recusada',
+        'reason': rejection.reason,
+        'message': str(rejection)
+    }), rejection.status
+
+def estimate_upload_cost(image_info):
+    """
+    Custo estimado de CPU (s) do upload, pelas dimensões do cabeçalho da imagem:
+    todas as páginas com MULTIPAGE_MODE=all, só a primeira no modo first
+    """
+    if multipage.MULTIPAGE_MODE == 'all':
+        return classifier.estimate_cost(image_info.total_megapixels)
+    return classifier.estimate_cost(image_info.megapixels)
+
+def profile_requested(form):
+    """profile=1 no formulário ou na query string"""
+    return is_truthy(form.get('profile', request.args.get('profile', '')))
+
+def forbidden_profile():
+    return jsonify({
+        'error': 'Acesso negado',
+        'message': 'profile=1 exige o token de administrador (header X-Admin-Token)'
+    }), 403
+
+def submit_classification_task(file_bytes, filename, form, profile=False):
+    """Submete a classificação para o Celery (bytes em base64 via Redis)"""
+    import base64
+    file_base64 = base64.b64encode(file_bytes).decode('utf-8')
+    
+    # Parâmetros opcionais
+    min_words, min_paragraphs = parse_compliance_params(form)
+    language = form.get('language', 'pt')
+    deadline_ms = parse_deadline_ms(form.get('deadline_ms'))
+    layout_scale = parse_layout_scale(form.get('layout_scale'))
+    ocr_profile = parse_ocr_profile(form.get('ocr_profile'))
+    
+    # Submeter tarefa assíncrona (enviando bytes, não caminho!)
+    # enqueued_at permite ao worker medir o tempo de espera na fila
+    # request_id (header da mensagem) mantém o correlation id nos logs do worker
+    with metrics.stage('enqueue'):
+        return classify_document.apply_async(
+            args=[file_base64, filename, min_words, min_paragraphs, language],
+            kwargs={'deadline_ms': deadline_ms, 'enqueued_at': time.time(), 'profile': profile,
+                    'layout_scale': layout_scale, 'ocr_profile': ocr_profile},
+            headers=tracer.inject({'request_id': g.get('request_id')})
+        )
+
+def divert_or_reject(file, filename, rejection):
+    """Worker lotado: desvia para o modo assíncrono ou responde 503 + Retry-After"""
+    if CELERY_AVAILABLE and ADMISSION_DIVERT_ASYNC:
+        task = submit_classification_task(file.read(), filename, request.form)
+        admission_controller.record_diverted(rejection.reason)
+        logger.info("↪️ Worker lotado (%s) - desviado para async: %s", rejection.reason, task.id)
+        return jsonify({
+            'success': True,
+            'diverted': True,
+            'task_id': task.id,
+            'status': 'PENDING',
+            'message': 'Servidor ocupado - tarefa submetida para processamento assíncrono',
+            'check_status_url': f'/task/{task.id}',
+            'filename': filename,
+            'trace_id': tracer.current_trace_id()
+        }), 202
+    
+    response = jsonify({
+        'error': 'Servidor sobrecarregado',
+        'message': 'Tente novamente mais tarde ou use /classify/async',
+        'reason': rejection.reason,
+        'retry_after': rejection.retry_after
+    })
+    response.headers['Retry-After'] = str(rejection.retry_after)
+    return response, 503
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    """Upload acima de MAX_UPLOAD_MB (interrompido durante a leitura do corpo)"""
+    return jsonify({
+        'error': 'Arquivo muito grande',
+        'reason': 'upload_too_large',
+        'message': f'O limite de upload é {MAX_FILE_SIZE // (1024 * 1024)} MB'
+    }), 413
+
 @app.route('/', methods=['GET'])
 def home():
     """Página inicial - Interface Web"""
@@ -192,9 +525,17 @@ def health():
     """Verifica se a API está funcionando"""
     return jsonify({
         'status': 'healthy',
-        'message': 'API está funcionando corretamente'
+        'message': 'API está funcionando corretamente',
+        'admission': admission_controller.snapshot()
     })
 
+@app.route('/metrics', methods=['GET'])
+@swag_from(metrics_docs)
+def metrics_endpoint():
+    """Métricas do processo no formato texto do Prometheus"""
+    return Response(metrics.REGISTRY.render_prometheus(),
+                    mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/stats', methods=['GET'])
 @swag_from(stats_docs)
 def stats():
@@ -227,6 +568,12 @@ def classify():
     """Classifica uma imagem"""
     
     temp_path = None
+    ticket = None
+    
+    # Profiling só com o token de administrador
+    profile = profile_requested(request.form)
+    if profile and not is_authorized(request.headers):
+        return forbidden_profile()
     
     try:
         # Verificar se há arquivo na requisição
@@ -252,13 +599,30 @@ def classify():
                 'supported_formats': ['tif', 'tiff']
             }), 400
         
-        # Salvar arquivo temporariamente
         filename = secure_filename(file.filename)
+        
+        # Pré-verificação: cabeçalho TIFF (dimensões, compressão, páginas) sem decodificar
+        image_info = preflight_upload(file)
+        
+        # Controle de admissão: recusar rápido quando o worker está lotado
+        try:
+            ticket = admission_controller.acquire(estimate_upload_cost(image_info))
+        except AdmissionRejected as rejection:
+            ADMISSION_EVENTS.inc(decision='diverted' if CELERY_AVAILABLE and ADMISSION_DIVERT_ASYNC else 'rejected')
+            return divert_or_reject(file, filename, rejection)
+        ADMISSION_EVENTS.inc(decision='admitted')
+        metrics.QUEUE_WAIT.observe(ticket.queue_wait, queue='admission')
+        metrics.record_stage('admission_wait', ticket.queue_wait)
+        
+        # Salvar arquivo temporariamente (nome único: requisições simultâneas
+        # com o mesmo filename no mesmo worker não podem compartilhar o arquivo)
         temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, f"classify_{os.getpid()}_{filename}")
+        temp_path = os.path.join(temp_dir, f"classify_{os.getpid()}_{uuid.uuid4().hex}_{filename}")
         
-        print(f"📥 Salvando arquivo: {temp_path}")
-        file.save(temp_path)
+        logger.debug("📥 Salvando arquivo: %s", temp_path)
+        with metrics.stage('upload_save'):
+            file.save(temp_path)
+        metrics.UPLOAD_BYTES.observe(os.path.getsize(temp_path))
         
         # Verificar se arquivo foi salvo
         if not os.path.exists(temp_path):
@@ -266,87 +630,89 @@ def classify():
                 'error': 'Erro ao salvar arquivo temporário'
             }), 500
         
-        print(f"🔍 Classificando: {filename}")
+        logger.debug("🔍 Classificando: %s", filename)
 
         # Obter parâmetros de conformidade (opcionais)
-        min_words = request.form.get('min_words', '2000')
-        min_paragraphs = request.form.get('min_paragraphs', '8')
-        try:
-            min_words = int(min_words)
-            min_paragraphs = int(min_paragraphs)
-        except:
-            min_words = 2000
-            min_paragraphs = 8
+        min_words, min_paragraphs = parse_compliance_params(request.form)
 
-        print(f"📊 Regras: >={min_words} palavras e >={min_paragraphs} parágrafos")
+        logger.debug("📊 Regras: >=%d palavras e >=%d parágrafos", min_words, min_paragraphs)
 
         # Obter idioma (opcional)
         language = request.form.get('language', 'pt')
-        print(f"🌐 Idioma: {language}")
+        
+        # Orçamento de latência (opcional)
+        deadline_ms = parse_deadline_ms(request.form.get('deadline_ms'))
+        
+        # Caminho rápido: layout em 1/2 ou 1/4 da resolução (opcional)
+        layout_scale = parse_layout_scale(request.form.get('layout_scale'))
+        
+        # Perfil do OCR (opcional; padrão: escolhido pelo layout e pelo idioma)
+        ocr_profile = parse_ocr_profile(request.form.get('ocr_profile'))
+        
+        # Gravação para replay (completada no after_request com os timings)
+        if request_recorder.enabled:
+            with metrics.stage('record'):
+                g.recording = request_recorder.capture(temp_path, 'classify', {
+                    'min_words': min_words, 'min_paragraphs': min_paragraphs,
+                    'language': language, 'deadline_ms': deadline_ms, 'layout_scale': layout_scale,
+                    'ocr_profile': ocr_profile
+                }, filename=filename)
         
         # Classificar imagem
-        result = classifier.classify(temp_path, min_words=min_words, min_paragraphs=min_paragraphs, language=language)
+        classify_kwargs = dict(min_words=min_words, min_paragraphs=min_paragraphs,
+                               language=language, deadline_ms=deadline_ms, image_info=image_info,
+                               layout_scale=layout_scale, ocr_profile=ocr_profile)
+        # TIFF multipágina com stream=1: cada página é enviada assim que termina
+        if stream_requested(request.form) and not profile and image_info is not None and image_info.page_count > 1:
+            response = stream_classification(temp_path, filename, ticket, classify_kwargs)
+            temp_path = ticket = None  # liberados pelo gerador
+            return response
+        
+        profile_report = None
+        with metrics.stage('classify'):
+            if profile:
+                result, profile_report = request_profiler.run(classifier.classify, temp_path, **classify_kwargs)
+            else:
+                result = classifier.classify(temp_path, **classify_kwargs)
+        g.recording_result = result
         
-        print(f"✅ Classificado como: {result['classification']}")
+        logger.info("✅ Classificado como: %s", result['classification'],
+                    extra={'document': filename, 'classification': result['classification'],
+                           'degradations': result.get('degradations', [])})
         
         # Remover arquivo temporário
         if os.path.exists(temp_path):
             os.remove(temp_path)
         
         # Preparar resposta (convertendo tipos numpy)
-        response = {
-            'success': True,
-            'filename': filename,
-            'classification': str(result['classification']),
-            'score': float(result['score']),
-            'confidence': float(round(result['confidence'], 3)),
-            'features': {
-                'text_density': float(round(result['features']['text_density'], 3)),
-                'num_text_components': int(result['features']['num_text_components']),
-                'layout_transitions': int(result['features']['layout_transitions'])
-            },
-            'extra_features': {
-                'avg_component_height': float(round(result['extra_features']['avg_component_height'], 2)),
-                'avg_component_width': float(round(result['extra_features']['avg_component_width'], 2)),
-                'height_std': float(round(result['extra_features']['height_std'], 2)),
-                'avg_aspect_ratio': float(round(result['extra_features']['avg_aspect_ratio'], 2)),
-                'num_columns_detected': int(result['extra_features']['num_columns_detected'])
-            }
-        }
+        serialization_start = time.perf_counter()
+        response = build_classification_response(result, filename)
         
-        # Adicionar número de linhas e parágrafos se disponível
-        if 'num_lines' in result:
-            response['num_lines'] = int(result['num_lines'])
-        if 'num_paragraphs' in result:
-            response['num_paragraphs'] = int(result['num_paragraphs'])
-        
-        # Adicionar explicação textual
-        # Adicionar análise de texto (se artigo científico)
-        if 'word_count' in result:
-            response['word_count'] = int(result['word_count'])
-        if 'is_compliant' in result:
-            response['is_compliant'] = bool(result['is_compliant'])
-        if 'frequent_words' in result:
-            # frequent_words já vem como lista de dicionários do classificador
-            freq_words = result['frequent_words']
-            if freq_words and isinstance(freq_words[0], dict):
-                # Já está no formato correto {'word': ..., 'count': ...}
-                response['frequent_words'] = freq_words
-            else:
-                # Fallback: converter tuplas para dicionários
-                response['frequent_words'] = [
-                    {'word': word, 'count': int(count)} 
-                    for word, count in freq_words
-                ]
+        # Hotspots e memória por etapa (profile=1)
+        if profile_report is not None:
+            response['profile'] = dict(profile_report, download_url=f"/profile/{profile_report['id']}")
+        
+        json_response = jsonify(response)
+        metrics.record_stage('serialization', time.perf_counter() - serialization_start)
+        return json_response, 200
         
-        # Adicionar explicação textual
-        if 'explanation' in result:
-            response['explanation'] = str(result['explanation'])
+    except TiffRejected as e:
+        return tiff_rejected_response(e)
         
-        # Garantir que tudo é serializável
-        response = convert_numpy_types(response)
+    except HTTPException:
+        # Ex.: 413 do limite de upload durante a leitura do corpo
+        raise
         
-        return jsonify(response), 200
+    except MemoryBudgetExceeded as e:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+        logger.warning("⚠️ Imagem acima do orçamento de memória: %s", e)
+        return jsonify({
+            'error': 'Imagem grande demais',
+            'message': str(e),
+            'estimated_peak_bytes': int(e.estimated_bytes),
+            'budget_bytes': int(e.budget_bytes)
+        }), 413
         
     except Exception as e:
         # Limpar arquivo temporário em caso de erro
@@ -355,13 +721,16 @@ def classify():
         
         # Log detalhado do erro
         error_details = traceback.format_exc()
-        print(f"❌ ERRO: {error_details}")
+        logger.exception("❌ Erro ao processar imagem: %s", e)
         
         return jsonify({
             'error': 'Erro ao processar imagem',
             'message': str(e),
             'details': error_details if app.debug else 'Veja os logs do servidor'
         }), 500
+    finally:
+        if ticket is not None:
+            ticket.release()
 
 @app.route('/classify/async', methods=['POST'])
 @swag_from(classify_async_docs)
@@ -376,6 +745,10 @@ def classify_async():
             'message': 'Use /classify para processamento síncrono'
         }), 503
     
+    profile = profile_requested(request.form)
+    if profile and not is_authorized(request.headers):
+        return forbidden_profile()
+    
     try:
         # Verificar se há arquivo na requisição
         if 'image' not in request.files:
@@ -399,23 +772,12 @@ def classify_async():
                 'supported_formats': ['tif', 'tiff']
             }), 400
         
+        # Pré-verificação: cabeçalho TIFF antes de enfileirar
+        preflight_upload(file)
+        
         # Ler arquivo como bytes (Web e Worker são containers separados!)
         filename = secure_filename(file.filename)
-        file_bytes = file.read()
-        
-        # Converter para base64 para enviar via Redis
-        import base64
-        file_base64 = base64.b64encode(file_bytes).decode('utf-8')
-        
-        # Parâmetros opcionais
-        min_words = int(request.form.get('min_words', '2000'))
-        min_paragraphs = int(request.form.get('min_paragraphs', '8'))
-        language = request.form.get('language', 'pt')
-        
-        # Submeter tarefa assíncrona (enviando bytes, não caminho!)
-        task = classify_document.apply_async(
-            args=[file_base64, filename, min_words, min_paragraphs, language]
-        )
+        task = submit_classification_task(file.read(), filename, request.form, profile=profile)
         
         return jsonify({
             'success': True,
@@ -423,13 +785,18 @@ def classify_async():
             'status': 'PENDING',
             'message': 'Tarefa submetida com sucesso',
             'check_status_url': f'/task/{task.id}',
-            'filename': filename
+            'filename': filename,
+            'trace_id': tracer.current_trace_id()
         }), 202  # 202 Accepted
         
+    except TiffRejected as e:
+        return tiff_rejected_response(e)
+        
+    except HTTPException:
+        raise
+        
     except Exception as e:
-        error_details = traceback.format_exc()
-        print(f"❌ Erro ao submeter tarefa: {e}")
-        print(error_details)
+        logger.exception("❌ Erro ao submeter tarefa: %s", e)
         
         return jsonify({
             'error': 'Erro ao submeter tarefa',
@@ -449,6 +816,7 @@ def get_task_status(task_id):
         }), 503
     
     try:
+        fetch_start = time.time()
         task = classify_document.AsyncResult(task_id)
         
         if task.state == 'PENDING':
@@ -465,6 +833,9 @@ def get_task_status(task_id):
                 'status': task.info.get('status', 'Processando...'),
                 'progress': task.info.get('progress', 0)
             }
+            # TIFF multipágina: páginas já concluídas
+            if 'pages' in task.info:
+                response['pages'] = task.info['pages']
         elif task.state == 'SUCCESS':
             response = {
                 'task_id': task_id,
@@ -473,6 +844,11 @@ def get_task_status(task_id):
                 'progress': 100,
                 'result': task.result
             }
+            # Busca do resultado registrada no trace do documento (traceparent do worker)
+            parent = parse_traceparent(task.result.get('traceparent')) if isinstance(task.result, dict) else None
+            if parent is not None:
+                tracer.record_span('result_fetch', fetch_start, time.time(), parent=parent,
+                                   attributes={'task_id': task_id})
         elif task.state == 'FAILURE':
             response = {
                 'task_id': task_id,
@@ -496,6 +872,75 @@ def get_task_status(task_id):
         }), 500
 
 
+@app.route('/trace/<trace_id>', methods=['GET'])
+@swag_from(trace_docs)
+def get_trace(trace_id):
+    """Spans de um trace gravados pelo exportador JSONL (API e workers)"""
+    if not is_authorized(request.headers):
+        return jsonify({'error': 'Acesso negado'}), 403
+    if not re.match(r'^[0-9a-f]{32}$', trace_id):
+        return jsonify({'error': f'Id de trace inválido: {trace_id}'}), 400
+    
+    exporter = tracer.exporter
+    if not hasattr(exporter, 'path'):
+        return jsonify({'error': 'Exportador de traces sem leitura local', 'exporter': type(exporter).__name__}), 404
+    
+    spans = load_trace(trace_id, exporter.path)
+    if not spans:
+        return jsonify({'error': 'Trace não encontrado'}), 404
+    return jsonify({
+        'trace_id': trace_id,
+        'duration_ms': round((max(s['end'] for s in spans) - min(s['start'] for s in spans)) * 1000, 3),
+        'spans': spans
+    })
+
+
+@app.route('/profile/sampling', methods=['GET'])
+@swag_from(sampling_profile_docs)
+def get_sampling_profile():
+    """Pilhas colapsadas do profiler contínuo (flamegraph) ou resumo por função"""
+    if not is_authorized(request.headers):
+        return jsonify({'error': 'Acesso negado'}), 403
+    
+    scope = request.args.get('scope', 'current')
+    if scope not in ('current', 'all'):
+        return jsonify({'error': "scope deve ser 'current' ou 'all'"}), 400
+    
+    counts = sampling_profiler.snapshot()
+    if scope == 'all':
+        # Janelas gravadas por todos os processos (API e workers) + a janela atual deste
+        counts.update(load_collapsed(sampling_profiler.directory, role=request.args.get('role')))
+    
+    if request.args.get('format') == 'json':
+        summary = function_summary(counts, top_n=request.args.get('top', 30, type=int))
+        return jsonify({'profiler': sampling_profiler.stats(), 'scope': scope, **summary})
+    return Response(format_collapsed(counts), mimetype='text/plain')
+
+
+@app.route('/profile/<profile_id>', methods=['GET'])
+@swag_from(profile_docs)
+def get_profile(profile_id):
+    """Dump do profiling (.prof/pstats) ou resumo JSON (?format=json)"""
+    if not is_authorized(request.headers):
+        return jsonify({'error': 'Acesso negado'}), 403
+    
+    try:
+        if request.args.get('format') == 'json':
+            summary = request_profiler.load_summary(profile_id)
+            if summary is None:
+                return jsonify({'error': 'Profile não encontrado'}), 404
+            return jsonify(summary)
+        
+        dump_path = request_profiler.dump_path(profile_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not os.path.exists(dump_path):
+        return jsonify({'error': 'Profile não encontrado'}), 404
+    return send_file(os.path.abspath(dump_path), mimetype='application/octet-stream',
+                     as_attachment=True, download_name=f"{profile_id}.prof")
+
+
 @app.route('/feedback', methods=['POST'])
 @swag_from(feedback_post_docs)
 def feedback():
@@ -529,7 +974,7 @@ def feedback():
             
             writer.writerow([timestamp, image_name, predicted_class, is_correct, correct_class])
         
-        print(f"📝 Feedback salvo: {image_name} - {'✅ Correto' if is_correct == 'true' else '❌ Incorreto'}")
+        logger.info("📝 Feedback salvo: %s - %s", image_name, '✅ Correto' if is_correct == 'true' else '❌ Incorreto')
         
         # Count total feedbacks
         feedback_count = 0
@@ -544,7 +989,7 @@ def feedback():
         })
         
     except Exception as e:
-        print(f"❌ Erro ao salvar feedback: {str(e)}")
+        logger.exception("❌ Erro ao salvar feedback: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -625,7 +1070,7 @@ def feedback_stats():
         })
         
     except Exception as e:
-        print(f"❌ Erro ao buscar estatísticas: {str(e)}")
+        logger.exception("❌ Erro ao buscar estatísticas: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
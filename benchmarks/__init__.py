@@ -0,0 +1,12 @@
+"""
+Benchmarks de Performance do Classificador
+
+- corpus: páginas sintéticas em várias resoluções/densidades
+- run: mede cada etapa (features, parágrafos, OCR cold/warm, classify),
+  gera JSON com throughput, p50/p95/p99 e pico de RSS e compara com o
+  baseline local gravado com --save-baseline (benchmarks/baseline.json, não versionado)
+
+Uso:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --save-baseline
+"""
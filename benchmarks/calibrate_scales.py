@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Calibração dos Limiares por Escala de Decode (1/2 e 1/4)
+
+Os limiares do ClassificadorFinal foram otimizados com features medidas na
+resolução nativa. No decode reduzido as features já vêm em unidades nativas
+(alturas x escala, área mínima / escala²), mas letras vizinhas se fundem,
+componentes pequenos somem e a binarização da imagem média muda a densidade.
+Este script mede as features nas três escalas num corpus sintético
+(benchmarks.synthetic, anúncios e artigos em vários dpi/densidades) e, para
+cada regra, escolhe o limiar da escala reduzida que mais concorda com a
+decisão da regra na resolução nativa. Reporta:
+
+- concordância de cada regra e da classificação de layout (regras 1-5) com a escala 1
+- acurácia contra o tipo da página (ground truth), com e sem recalibração
+- latência p50 das features + parágrafos em cada escala
+
+O resultado (limiares) vai para SCALE_THRESHOLDS em classificador_final.py.
+
+Uso:
+    python -m benchmarks.calibrate_scales [--pages 36] [--output calibracao.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+
+SCALES = (2, 4)
+
+# limiar -> (feature medida, regra dispara quando feature <op> limiar)
+RULES = {
+    'altura_max': ('avg_component_height', '>'),
+    'altura_min': ('avg_component_height', '<'),
+    'desvio_altura': ('height_std', '>'),
+    'densidade_texto': ('text_density', '>'),
+    'num_componentes': ('num_text_components', '<'),
+    'num_linhas': ('num_lines', '<'),
+}
+
+
+def corpus_specs(pages, seed=0):
+    """Anúncios e artigos alternados, variando dpi, densidade, colunas e ruído"""
+    dpis = (150, 200, 300)
+    fills = (0.3, 0.6, 0.95)
+    specs = []
+    for index in range(pages):
+        kind = synthetic.PAGE_KINDS[index % 2]
+        specs.append({
+            'name': f"{kind}_{index:03d}",
+            'kind': kind,
+            'dpi': dpis[(index // 2) % len(dpis)],
+            'fill': fills[(index // 6) % len(fills)],
+            'noise': 0.002 if index % 5 == 0 else 0.0,
+            'seed': seed + index,
+        })
+    return specs
+
+
+def measure(classifier, path, scale):
+    """Features de layout (regras 1-5) e tempo de features + parágrafos na escala"""
+    start = time.perf_counter()
+    features, extra = classifier.extract_features(path, scale=scale)
+    paragraphs = classifier.paragraph_detector.analyze(path, scale=scale)
+    elapsed = time.perf_counter() - start
+    return {**features, **extra, 'num_lines': paragraphs['num_lines'], 'elapsed': elapsed}
+
+
+def _fires(values, threshold, op):
+    return values > threshold if op == '>' else values < threshold
+
+
+def calibrate_threshold(native_values, native_threshold, reduced_values, op):
+    """Limiar na escala reduzida que maximiza a concordância com a regra nativa"""
+    native_values = np.asarray(native_values, dtype=np.float64)
+    reduced_values = np.asarray(reduced_values, dtype=np.float64)
+    target = _fires(native_values, native_threshold, op)
+
+    points = np.unique(reduced_values)
+    candidates = np.concatenate([[native_threshold], (points[:-1] + points[1:]) / 2,
+                                 [points[0] - 1, points[-1] + 1]])
+    best, best_agreement = native_threshold, -1.0
+    for candidate in candidates:
+        agreement = float(np.mean(_fires(reduced_values, candidate, op) == target))
+        # Empate: o mais próximo do limiar nativo
+        if agreement > best_agreement or (agreement == best_agreement
+                                          and abs(candidate - native_threshold) < abs(best - native_threshold)):
+            best, best_agreement = float(candidate), agreement
+    return best, best_agreement
+
+
+def layout_label(classifier, measured, thresholds):
+    """Classificação só pelo layout (regras 1-5) com os limiares dados"""
+    features = {key: measured[key] for key in ('text_density', 'num_text_components', 'layout_transitions')}
+    score = classifier.calculate_score(features, measured, thresholds=thresholds)
+    score += classifier.line_rule_score(measured['num_lines'], thresholds=thresholds)
+    return 'advertisement' if score > 0 else 'scientific_article'
+
+
+def run_calibration(classifier, pages):
+    """pages: [(caminho, tipo)] -> relatório com limiares calibrados, concordância, acurácia e latência"""
+    kinds = {'ad': 'advertisement', 'article': 'scientific_article'}
+    measured = {scale: [measure(classifier, path, scale) for path, _ in pages] for scale in (1,) + SCALES}
+    truth = [kinds.get(kind, kind) for _, kind in pages]
+    native = classifier.thresholds
+
+    def accuracy(labels):
+        return round(float(np.mean([a == b for a, b in zip(labels, truth)])), 4)
+
+    native_labels = [layout_label(classifier, m, native) for m in measured[1]]
+    report = {
+        'pages': len(pages),
+        'native': {
+            'accuracy': accuracy(native_labels),
+            'latency_p50_ms': round(float(np.median([m['elapsed'] for m in measured[1]])) * 1000, 2),
+        },
+        'scales': {},
+    }
+
+    for scale in SCALES:
+        calibrated, agreements = dict(native), {}
+        for key, (feature, op) in RULES.items():
+            calibrated[key], agreements[key] = calibrate_threshold(
+                [m[feature] for m in measured[1]], native[key], [m[feature] for m in measured[scale]], op)
+        raw_labels = [layout_label(classifier, m, native) for m in measured[scale]]
+        labels = [layout_label(classifier, m, calibrated) for m in measured[scale]]
+        latency = float(np.median([m['elapsed'] for m in measured[scale]]))
+        report['scales'][str(scale)] = {
+            'thresholds': {key: round(value, 4) for key, value in calibrated.items()},
+            'rule_agreement': agreements,
+            'agreement_uncalibrated': round(float(np.mean([a == b for a, b in zip(raw_labels, native_labels)])), 4),
+            'agreement': round(float(np.mean([a == b for a, b in zip(labels, native_labels)])), 4),
+            'accuracy_uncalibrated': accuracy(raw_labels),
+            'accuracy': accuracy(labels),
+            'latency_p50_ms': round(latency * 1000, 2),
+            'speedup': round(report['native']['latency_p50_ms'] / (latency * 1000), 2) if latency else None,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Calibra os limiares do classificador por escala de decode')
+    parser.add_argument('--pages', type=int, default=36, help='Páginas sintéticas (metade anúncios)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--images-dir', default=os.path.join(ROOT_DIR, 'test_images'),
+                        help='advertisement.tif / scientific.tif incluídos se existirem')
+    parser.add_argument('--output', help='Grava o relatório JSON')
+    args = parser.parse_args(argv)
+
+    from classificador_final import ClassificadorFinal
+    classifier = ClassificadorFinal()
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        manifest = synthetic.generate_corpus(corpus_dir, corpus_specs(args.pages, args.seed))
+        pages = [(os.path.join(corpus_dir, page['file']), page['kind']) for page in manifest]
+        for name, kind in (('advertisement.tif', 'ad'), ('scientific.tif', 'article')):
+            path = os.path.join(args.images_dir, name)
+            if os.path.exists(path):
+                pages.append((path, kind))
+        report = run_calibration(classifier, pages)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Corpus Sintético para Benchmarks
+
+Grade resolução x densidade de páginas tipo artigo geradas por
+benchmarks.synthetic (determinísticas a partir de uma seed), para medir o
+custo do pipeline em tamanhos que as duas imagens de test_images/ não cobrem.
+O ground truth de cada página fica em manifest.json no mesmo diretório.
+"""
+
+import os
+
+from benchmarks import synthetic
+
+# Página A4 em 100, 150 e 200 dpi
+RESOLUTIONS = {
+    '100dpi': 100,
+    '150dpi': 150,
+    '200dpi': 200,
+}
+
+# Fração da altura útil preenchida com texto
+DENSITIES = {
+    'sparse': 0.25,
+    'medium': 0.55,
+    'dense': 0.9,
+}
+
+
+def build_corpus(output_dir, resolutions=None, densities=None, seed=0, kind='article'):
+    """
+    Gera um TIFF por combinação resolução x densidade em `output_dir`.
+    Retorna {nome_do_conjunto: caminho}.
+    """
+    resolutions = resolutions or list(RESOLUTIONS)
+    densities = densities or list(DENSITIES)
+
+    specs = [
+        {
+            'name': f"synthetic_{resolution}_{density}",
+            'kind': kind,
+            'dpi': RESOLUTIONS[resolution],
+            'fill': DENSITIES[density],
+            'seed': seed,
+        }
+        for resolution in resolutions
+        for density in densities
+    ]
+    manifest = synthetic.generate_corpus(output_dir, specs)
+    return {page['name']: os.path.join(output_dir, page['file']) for page in manifest}
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Passadas sobre a Imagem: Pipeline Anterior x Perfis Compartilhados
+
+Antes do layout_profile, extract_features e ParagraphDetector.analyze
+decodificavam e binarizavam a página cada um, e os perfis eram calculados
+com np.sum (acumulador de 64 bits) e uma cópia booleana da binária. Agora a
+extração de features calcula os perfis uma vez (cv2.reduce) e os parágrafos
+usam o mesmo LayoutProfile.
+
+Este script executa as duas sequências passo a passo na mesma página
+(cada passo percorre a imagem inteira uma vez) e reporta, por pipeline, o
+número de passadas, o tempo de cada passo (mediana) e o total.
+
+Uso:
+    python -m benchmarks.layout_passes [--dpi 300] [--repeat 5] [--output passadas.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+from layout_profile import last_ink_column  # noqa: E402
+
+
+def _otsu(img):
+    return cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+
+
+def legacy_steps(path):
+    """Passos da versão anterior: features e parágrafos com decode/Otsu/perfis próprios"""
+    state = {}
+    return [
+        ('features.decode', lambda: state.update(img=cv2.imread(path, cv2.IMREAD_GRAYSCALE))),
+        ('features.otsu', lambda: state.update(binary=_otsu(state['img']))),
+        ('features.connected_components', lambda: cv2.connectedComponentsWithStats(state['binary'], connectivity=8)),
+        ('features.row_sum', lambda: np.sum(state['binary'], axis=1)),
+        ('features.col_count', lambda: np.count_nonzero(state['binary'], axis=0)),
+        ('paragraphs.decode', lambda: state.update(img=cv2.imread(path, cv2.IMREAD_GRAYSCALE))),
+        ('paragraphs.otsu', lambda: state.update(binary=_otsu(state['img']))),
+        ('paragraphs.ink_bool', lambda: state.update(ink=state['binary'] > 0)),
+        ('paragraphs.row_sum', lambda: np.sum(state['ink'], axis=1)),
+        ('paragraphs.row_left', lambda: np.argmax(state['ink'], axis=1)),
+    ]
+
+
+def shared_steps(path):
+    """Passos atuais: um decode/Otsu e os perfis do LayoutProfile para features e parágrafos"""
+    state = {}
+    return [
+        ('decode', lambda: state.update(img=cv2.imread(path, cv2.IMREAD_GRAYSCALE))),
+        ('otsu', lambda: state.update(binary=_otsu(state['img']))),
+        ('profile.row_reduce', lambda: cv2.reduce(state['binary'], 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S)),
+        ('profile.col_reduce', lambda: cv2.reduce(state['binary'], 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S)),
+        ('profile.row_left', lambda: np.argmax(state['binary'], axis=1)),
+        ('profile.row_right', lambda: last_ink_column(state['binary'])),
+        ('connected_components', lambda: cv2.connectedComponentsWithStats(state['binary'], connectivity=8)),
+    ]
+
+
+def measure(steps, repeat):
+    """Mediana (ms) de cada passo, executando a sequência inteira `repeat` vezes"""
+    samples = {}
+    for _ in range(repeat):
+        for name, step in steps:
+            start = time.perf_counter()
+            step()
+            samples.setdefault(name, []).append(time.perf_counter() - start)
+    timings = {name: round(float(np.median(values)) * 1000, 3) for name, values in samples.items()}
+    return {'passes': len(steps), 'steps_ms': timings, 'total_ms': round(sum(timings.values()), 3)}
+
+
+def run_comparison(path, repeat=5):
+    """Relatório das duas sequências para a página em `path`"""
+    legacy = measure(legacy_steps(path), repeat)
+    shared = measure(shared_steps(path), repeat)
+    return {
+        'legacy': legacy,
+        'shared': shared,
+        'passes_saved': legacy['passes'] - shared['passes'],
+        'speedup': round(legacy['total_ms'] / shared['total_ms'], 2) if shared['total_ms'] else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compara as passadas sobre a imagem (anterior x perfis compartilhados)')
+    parser.add_argument('--dpi', type=int, default=300, help='Resolução do artigo sintético')
+    parser.add_argument('--image', help='Usar esta imagem em vez da página sintética')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Grava o relatório JSON')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.image
+        if path is None:
+            image, _ = synthetic.generate_page('article', dpi=args.dpi, columns=2, seed=0)
+            path = os.path.join(tmp_dir, 'article.tif')
+            image.save(path)
+        report = run_comparison(path, args.repeat)
+        report['image'] = os.path.basename(args.image) if args.image else f"article_{args.dpi}dpi"
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
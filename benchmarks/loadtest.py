@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Teste de Carga HTTP da API - Throughput, Erros e Percentis por Endpoint
+
+Gera carga em /classify, /classify/async (+ polling de /task/<id>) e
+/feedback com uma mistura de endpoints e de documentos:
+
+- modo fechado (--concurrency N): N clientes em loop, cada um dispara a
+  próxima requisição quando a anterior termina
+- modo aberto (--rate R): chegadas a R req/s (Poisson com seed) independentes
+  das respostas; a latência conta a partir do horário agendado, então a fila
+  do lado do cliente não esconde a saturação do servidor
+
+Alvo: uma URL (ex.: stack do docker-compose em http://localhost:5000) ou a
+app Flask no próprio processo (--in-process, servidor werkzeug em thread).
+O relatório JSON traz a configuração da carga e o /health do servidor
+(admissão, Celery), para comparar execuções com diferentes workers/modos.
+
+Uso:
+    python -m benchmarks.loadtest --url http://localhost:5000 --concurrency 8 --duration 60
+    python -m benchmarks.loadtest --in-process --rate 5 --duration 30 --mix classify=0.8,feedback=0.2
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.run import percentile  # noqa: E402
+
+ENDPOINTS = ('classify', 'async', 'feedback')
+DEFAULT_MIX = {'classify': 1.0}
+POLL_INTERVAL = 0.5
+ASYNC_TIMEOUT = 300
+
+
+def parse_mix(text):
+    """'classify=0.7,async=0.2,feedback=0.1' -> {endpoint: peso}"""
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, weight = item.partition('=')
+        if name not in ENDPOINTS:
+            raise ValueError(f"Endpoint desconhecido no mix: {name} (use {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Mix vazio")
+    return mix
+
+
+class HttpClient:
+    """Cliente HTTP mínimo (stdlib) com uma conexão keep-alive por thread"""
+
+    def __init__(self, base_url, timeout=120):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def request(self, method, path, body=None, headers=None, with_headers=False):
+        """Retorna (status, corpo JSON ou None) ou, com with_headers, (status, headers, corpo)"""
+        conn = self._connection()
+        try:
+            conn.request(method, self.prefix + path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+        try:
+            payload = json.loads(data) if data else None
+        except ValueError:
+            payload = None
+        if with_headers:
+            return response.status, dict(response.getheaders()), payload
+        return response.status, payload
+
+    def post_multipart(self, path, fields, file_field, filename, content, with_headers=False):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in fields.items():
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f'Content-Type: image/tiff\r\n\r\n'.encode() + content + b'\r\n'
+        )
+        parts.append(f'--{boundary}--\r\n'.encode())
+        return self.request('POST', path, b''.join(parts),
+                            {'Content-Type': f'multipart/form-data; boundary={boundary}'}, with_headers)
+
+    def post_json(self, path, payload):
+        return self.request('POST', path, json.dumps(payload).encode(), {'Content-Type': 'application/json'})
+
+    def get(self, path):
+        return self.request('GET', path)
+
+
+def load_documents(paths=None, synthetic_pages=0, seed=0):
+    """Lista de (nome, bytes) dos TIFFs informados + páginas sintéticas (anúncio/artigo)"""
+    documents = []
+    for path in paths or []:
+        with open(path, 'rb') as f:
+            documents.append((os.path.basename(path), f.read()))
+    if synthetic_pages:
+        with tempfile.TemporaryDirectory(prefix='loadtest_') as directory:
+            kinds = [synthetic.PAGE_KINDS[i % len(synthetic.PAGE_KINDS)] for i in range(synthetic_pages)]
+            specs = [{'kind': kind, 'dpi': 150, 'seed': seed + i} for i, kind in enumerate(kinds)]
+            for page in synthetic.generate_corpus(directory, specs):
+                with open(os.path.join(directory, page['file']), 'rb') as f:
+                    documents.append((page['file'], f.read()))
+    if not documents:
+        raise ValueError("Nenhum documento para a carga (use --docs e/ou --synthetic)")
+    return documents
+
+
+class LoadTest:
+    """Executa a carga e acumula as amostras (endpoint, status, latência)"""
+
+    def __init__(self, client, documents, mix=None, params=None, seed=0,
+                 poll_interval=POLL_INTERVAL, async_timeout=ASYNC_TIMEOUT):
+        self.client = client
+        self.documents = documents
+        self.mix = mix or DEFAULT_MIX
+        self.params = params or {}
+        self.poll_interval = poll_interval
+        self.async_timeout = async_timeout
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._samples_lock = threading.Lock()
+        self.samples = []
+
+    def _choose(self):
+        with self._rng_lock:
+            endpoint = self._rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+            document = self._rng.choice(self.documents)
+        return endpoint, document
+
+    def _record(self, endpoint, status, latency):
+        with self._samples_lock:
+            self.samples.append((endpoint, status, latency))
+
+    def _timed(self, endpoint, fn, started=None):
+        """Executa fn() -> (status, payload); status 0 = erro de conexão"""
+        started = time.perf_counter() if started is None else started
+        try:
+            status, payload = fn()
+        except Exception:
+            status, payload = 0, None
+        self._record(endpoint, status, time.perf_counter() - started)
+        return status, payload
+
+    def run_one(self, scheduled=None):
+        """Uma operação do mix; `scheduled` (perf_counter) é o horário de chegada no modo aberto"""
+        endpoint, (filename, content) = self._choose()
+
+        if endpoint == 'classify':
+            self._timed('classify', lambda: self.client.post_multipart(
+                '/classify', self.params, 'image', filename, content), scheduled)
+
+        elif endpoint == 'async':
+            started = time.perf_counter() if scheduled is None else scheduled
+            status, payload = self._timed('classify_async', lambda: self.client.post_multipart(
+                '/classify/async', self.params, 'image', filename, content), scheduled)
+            if status != 202 or not payload or 'task_id' not in payload:
+                return
+            task_path = f"/task/{payload['task_id']}"
+            deadline = time.perf_counter() + self.async_timeout
+            state = None
+            while time.perf_counter() < deadline:
+                status, payload = self._timed('task_poll', lambda: self.client.get(task_path))
+                state = (payload or {}).get('state')
+                if status != 200 or state in ('SUCCESS', 'FAILURE'):
+                    break
+                time.sleep(self.poll_interval)
+            # Latência de ponta a ponta: submissão até o resultado disponível
+            self._record('async_end_to_end', 200 if state == 'SUCCESS' else 500, time.perf_counter() - started)
+
+        else:
+            self._timed('feedback', lambda: self.client.post_json('/feedback', {
+                'image_name': filename,
+                'predicted_class': 'advertisement',
+                'is_correct': 'true',
+            }), scheduled)
+
+    def run_closed(self, concurrency, duration):
+        """Modo fechado: `concurrency` clientes em loop por `duration` segundos"""
+        stop_at = time.perf_counter() + duration
+
+        def worker():
+            while time.perf_counter() < stop_at:
+                self.run_one()
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open(self, rate, duration, max_outstanding=256):
+        """Modo aberto: chegadas Poisson a `rate` req/s por `duration` segundos"""
+        start = time.perf_counter()
+        next_arrival = start
+        with ThreadPoolExecutor(max_workers=max_outstanding) as executor:
+            while True:
+                with self._rng_lock:
+                    next_arrival += self._rng.expovariate(rate)
+                if next_arrival - start >= duration:
+                    break
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self.run_one, next_arrival)
+
+    def report(self, elapsed):
+        """Resumo por endpoint: throughput, taxa de erro/rejeição e percentis"""
+        by_endpoint = {}
+        for endpoint, status, latency in self.samples:
+            by_endpoint.setdefault(endpoint, []).append((status, latency))
+
+        endpoints = {}
+        for endpoint, samples in sorted(by_endpoint.items()):
+            latencies = [latency for _, latency in samples]
+            statuses = {}
+            for status, _ in samples:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            # 429/503 são rejeições de capacidade (backpressure), contadas à parte
+            errors = sum(1 for status, _ in samples if status == 0 or (status >= 400 and status not in (429, 503)))
+            rejected = sum(1 for status, _ in samples if status in (429, 503))
+            endpoints[endpoint] = {
+                'requests': len(samples),
+                'throughput_per_s': round(len(samples) / elapsed, 3) if elapsed > 0 else 0.0,
+                'error_rate': round(errors / len(samples), 4),
+                'rejected_rate': round(rejected / len(samples), 4),
+                'status_codes': statuses,
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                'p90_ms': round(percentile(latencies, 90) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+                'max_ms': round(max(latencies) * 1000, 1),
+            }
+        return endpoints
+
+
+class InProcessServer:
+    """App Flask (api.py) servida por werkzeug numa thread, em porta livre"""
+
+    def __init__(self, host='127.0.0.1'):
+        from werkzeug.serving import make_server
+        import api
+
+        # Log de acesso por requisição distorce a medição
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        # Feedback da carga não vai para o CSV real
+        self._api = api
+        self._feedback_file = api.FEEDBACK_FILE
+        self._feedback_dir = tempfile.mkdtemp(prefix='loadtest_feedback_')
+        api.FEEDBACK_FILE = os.path.join(self._feedback_dir, 'feedback_data.csv')
+        self.server = make_server(host, 0, api.app, threaded=True)
+        self.url = f"http://{host}:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, name='loadtest-server', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.server.shutdown()
+        self.thread.join()
+        self._api.FEEDBACK_FILE = self._feedback_file
+        import shutil
+        shutil.rmtree(self._feedback_dir, ignore_errors=True)
+        return False
+
+
+def run_load(url, documents, mix=None, concurrency=None, rate=None, duration=30, params=None, seed=0,
+             label=None, poll_interval=POLL_INTERVAL):
+    """Executa a carga contra `url` e retorna o relatório (dict)"""
+    if (concurrency is None) == (rate is None):
+        raise ValueError("Informe exatamente um entre concurrency e rate")
+
+    client = HttpClient(url)
+    try:
+        _, server_health = client.get('/health')
+    except Exception:
+        server_health = None
+
+    test = LoadTest(client, documents, mix, params, seed=seed, poll_interval=poll_interval)
+    start = time.perf_counter()
+    if concurrency is not None:
+        test.run_closed(concurrency, duration)
+    else:
+        test.run_open(rate, duration)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'meta': {
+            'label': label,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'target': url,
+            'model': 'closed' if concurrency is not None else 'open',
+            'concurrency': concurrency,
+            'rate': rate,
+            'duration_s': round(elapsed, 3),
+            'mix': mix or DEFAULT_MIX,
+            'documents': len(documents),
+            'params': params or {},
+            'seed': seed,
+        },
+        'server': server_health,
+        'endpoints': test.report(elapsed),
+    }
+
+
+def print_table(report):
+    print(f"{'endpoint':<18} {'req':>6} {'req/s':>8} {'erro':>7} {'503':>7} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}", file=sys.stderr)
+    for endpoint, stats in report['endpoints'].items():
+        print(f"{endpoint:<18} {stats['requests']:>6} {stats['throughput_per_s']:>8.2f} "
+              f"{stats['error_rate']:>7.1%} {stats['rejected_rate']:>7.1%} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Teste de carga HTTP da API')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='URL base da API (ex.: http://localhost:5000)')
+    target.add_argument('--in-process', action='store_true', help='Sobe a app Flask neste processo')
+    load = parser.add_mutually_exclusive_group(required=True)
+    load.add_argument('--concurrency', type=int, help='Modo fechado: clientes simultâneos')
+    load.add_argument('--rate', type=float, help='Modo aberto: chegadas por segundo')
+    parser.add_argument('--duration', type=float, default=30, help='Duração (s)')
+    parser.add_argument('--mix', default='classify=1', help='Pesos por endpoint: classify=0.7,async=0.2,feedback=0.1')
+    parser.add_argument('--docs', nargs='*', help='TIFFs a enviar (padrão: test_images/*.tif)')
+    parser.add_argument('--synthetic', type=int, default=0, help='Páginas sintéticas adicionais (anúncio/artigo)')
+    parser.add_argument('--min-words', type=int, help='Parâmetro min_words enviado')
+    parser.add_argument('--min-paragraphs', type=int, help='Parâmetro min_paragraphs enviado')
+    parser.add_argument('--deadline-ms', type=int, help='Parâmetro deadline_ms enviado')
+    parser.add_argument('--poll-interval', type=float, default=POLL_INTERVAL)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--label', help='Rótulo da execução (ex.: "gunicorn -w 2 --threads 6")')
+    parser.add_argument('--output', help='Arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args(argv)
+
+    docs = args.docs
+    if docs is None:
+        import glob
+        docs = sorted(glob.glob(os.path.join(ROOT_DIR, 'test_images', '*.tif')))
+    documents = load_documents(docs, args.synthetic, seed=args.seed)
+
+    params = {}
+    for key in ('min_words', 'min_paragraphs', 'deadline_ms'):
+        if getattr(args, key) is not None:
+            params[key] = str(getattr(args, key))
+
+    kwargs = dict(mix=parse_mix(args.mix), concurrency=args.concurrency, rate=args.rate,
+                  duration=args.duration, params=params, seed=args.seed, label=args.label,
+                  poll_interval=args.poll_interval)
+    if args.in_process:
+        with InProcessServer() as server:
+            report = run_load(server.url, documents, **kwargs)
+    else:
+        report = run_load(args.url, documents, **kwargs)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    print_table(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
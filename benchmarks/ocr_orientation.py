@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Orientação pelo Layout x OSD do Tesseract (--psm 1)
+
+Gera páginas sintéticas (benchmarks.synthetic) inclinadas e giradas com
+valores conhecidos e mede:
+
+- estimador (page_orientation): acerto da rotação, erro médio da inclinação
+  e latência sobre os componentes já calculados
+- OCR (só com o Tesseract instalado): tempo do caminho anterior (decode +
+  pré-processamento + --psm 1 na página) x caminho atual (estimativa +
+  correção quando necessária + --psm sem OSD), com o cache vazio
+
+Uso:
+    python -m benchmarks.ocr_orientation [--pages 24] [--dpi 200] [--output orientacao.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.run import tesseract_version  # noqa: E402
+
+# A maioria das páginas chega em pé e quase reta, como em produção
+SKEW_CHOICES = (0.0, 0.0, 0.0, 0.2, -0.4, 1.5, -3.0, 6.0)
+ROTATION_CHOICES = (0, 0, 0, 0, 0, 0, 90, 180, 270)
+
+LEGACY_CONFIG = '--oem 3 --psm 1'
+
+
+def corpus_specs(pages, dpi=200, seed=0):
+    """Artigos com inclinação e rotação sorteadas (seed)"""
+    rng = random.Random(seed)
+    return [{
+        'name': f"page_{index:03d}",
+        'dpi': dpi,
+        'seed': seed + index,
+        'skew': rng.choice(SKEW_CHOICES),
+        'rotation': rng.choice(ROTATION_CHOICES),
+    } for index in range(pages)]
+
+
+def make_page(spec, directory):
+    """
+    Grava a página inclinada/girada e retorna (caminho, verdade), com a verdade
+    no formato do estimador (rotação horária para endireitar, inclinação
+    positiva = linhas descendo para a direita)
+    """
+    image, _ = synthetic.generate_page('article', dpi=spec['dpi'], seed=spec['seed'])
+    # PIL: ângulo positivo gira no sentido anti-horário (linhas sobem para a direita)
+    image = image.rotate(spec['skew'], resample=Image.BILINEAR, fillcolor=255)
+    pixels = np.rot90(np.array(image), k=spec['rotation'] // 90)
+    path = os.path.join(directory, f"{spec['name']}.tif")
+    Image.fromarray(np.ascontiguousarray(pixels)).save(path)
+    return path, {'rotation': spec['rotation'], 'skew_angle': -spec['skew']}
+
+
+def run_estimator(classifier, pages):
+    """Acerto da rotação, erro da inclinação e latência do estimador"""
+    rotation_hits = 0
+    skew_errors = []
+    latencies = []
+    estimates = []
+    for path, truth in pages:
+        _, _, layout = classifier.analyze_layout(path)
+        start = time.perf_counter()
+        orientation = classifier.estimate_orientation(layout)
+        latencies.append(time.perf_counter() - start)
+        estimates.append(orientation)
+        if orientation and orientation['rotation'] == truth['rotation']:
+            rotation_hits += 1
+            skew_errors.append(abs(orientation['skew_angle'] - truth['skew_angle']))
+    return {
+        'rotation_accuracy': round(rotation_hits / len(pages), 4) if pages else None,
+        'skew_mean_abs_error': round(float(np.mean(skew_errors)), 3) if skew_errors else None,
+        'skew_max_abs_error': round(float(np.max(skew_errors)), 3) if skew_errors else None,
+        'corrected_pages': sum(1 for o in estimates if o and o['needs_correction']),
+        'latency_p50_ms': round(float(np.median(latencies)) * 1000, 3) if latencies else None,
+    }, estimates
+
+
+def run_ocr(classifier, analyzer, pages, estimates, timeout=60):
+    """Tempo de OCR por página: --psm 1 na página inteira x orientação pelo layout"""
+    import image_io
+    pytesseract = analyzer._get_pytesseract()
+    legacy, current = [], []
+    for (path, _), orientation in zip(pages, estimates):
+        start = time.perf_counter()
+        processed = analyzer._preprocess_image(image_io.decode_grayscale(path))
+        pytesseract.image_to_string(processed, lang='eng', config=LEGACY_CONFIG, timeout=timeout)
+        legacy.append(time.perf_counter() - start)
+
+        analyzer.clear_cache()
+        _, _, layout = classifier.analyze_layout(path)
+        start = time.perf_counter()
+        orientation = classifier.estimate_orientation(layout)
+        analyzer.extract_text_fast(path, timeout=timeout, **classifier.ocr_layout_hints(layout, orientation))
+        current.append(time.perf_counter() - start)
+    legacy_p50 = float(np.median(legacy)) * 1000
+    current_p50 = float(np.median(current)) * 1000
+    return {
+        'legacy_psm1_p50_ms': round(legacy_p50, 1),
+        'layout_orientation_p50_ms': round(current_p50, 1),
+        'saved_p50_ms': round(legacy_p50 - current_p50, 1),
+        'speedup': round(legacy_p50 / current_p50, 2) if current_p50 else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Orientação pelo layout x OSD do Tesseract')
+    parser.add_argument('--pages', type=int, default=24)
+    parser.add_argument('--dpi', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Grava o relatório JSON')
+    args = parser.parse_args(argv)
+
+    from classificador_final import ClassificadorFinal
+    from text_analyzer_optimized import TextAnalyzerOptimized
+    classifier = ClassificadorFinal()
+
+    work_dir = tempfile.mkdtemp(prefix='orientation_')
+    try:
+        pages = [make_page(spec, work_dir) for spec in corpus_specs(args.pages, args.dpi, args.seed)]
+        estimator, estimates = run_estimator(classifier, pages)
+        report = {'pages': len(pages), 'dpi': args.dpi, 'estimator': estimator, 'tesseract': tesseract_version()}
+        if report['tesseract']:
+            analyzer = TextAnalyzerOptimized(cache_dir=os.path.join(work_dir, 'cache'))
+            report['ocr'] = run_ocr(classifier, analyzer, pages, estimates)
+        else:
+            report['ocr'] = 'skipped (Tesseract não instalado)'
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Perfis de OCR: palavras/s e concordância com o perfil accurate
+
+Gera artigos sintéticos (benchmarks.synthetic) com tamanhos de fonte e
+resoluções variados e mede:
+
+- escolha automática (ocr_profiles.choose_profile): perfil escolhido por página
+- OCR (só com o Tesseract instalado): para cada perfil, palavras/s (palavras
+  reconhecidas / tempo de OCR, cache vazio) e concordância com o accurate
+  (palavras em comum, com repetição, / palavras do accurate)
+
+Uso:
+    python -m benchmarks.ocr_profiles [--pages 12] [--language pt] [--output perfis.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.run import tesseract_version  # noqa: E402
+import ocr_profiles  # noqa: E402
+
+# Texto pequeno em baixa resolução até títulos grandes em alta
+FONT_SIZES = (7, 10, 14)
+DPIS = (150, 300)
+
+REFERENCE_PROFILE = 'accurate'
+WORD_PATTERN = re.compile(r'\b[a-zA-ZáéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ]+\b')
+
+
+def corpus_specs(pages, seed=0):
+    """Artigos alternando tamanho de fonte e resolução"""
+    combos = [(font, dpi) for dpi in DPIS for font in FONT_SIZES]
+    return [{
+        'name': f"page_{index:03d}",
+        'font_size': combos[index % len(combos)][0],
+        'dpi': combos[index % len(combos)][1],
+        'seed': seed + index,
+    } for index in range(pages)]
+
+
+def make_page(spec, directory):
+    """Grava o artigo e retorna o caminho"""
+    image, _ = synthetic.generate_page('article', dpi=spec['dpi'], font_size=spec['font_size'], seed=spec['seed'])
+    path = os.path.join(directory, f"{spec['name']}.tif")
+    synthetic.save_page(image, path)
+    return path
+
+
+def words(text):
+    """Palavras do texto (mesmo padrão de TextAnalyzerOptimized.count_words)"""
+    return WORD_PATTERN.findall(text.lower())
+
+
+def agreement(text, reference):
+    """Fração das palavras da referência reconhecidas também em `text` (com repetição)"""
+    reference_words = Counter(words(reference))
+    total = sum(reference_words.values())
+    if not total:
+        return None
+    return round(sum((Counter(words(text)) & reference_words).values()) / total, 4)
+
+
+def run_choices(classifier, pages, language='pt'):
+    """Perfil escolhido automaticamente para cada página (pelo layout e pelo idioma)"""
+    from image_io import image_size
+    choices = []
+    for path in pages:
+        features, extra_features, _ = classifier.analyze_layout(path)
+        width, _ = image_size(path)
+        choices.append(ocr_profiles.choose_profile(features, extra_features, width, language))
+    return choices
+
+
+def run_profiles(analyzer, pages, language='pt', timeout=120):
+    """Palavras/s por perfil e concordância com o perfil accurate"""
+    texts = {}
+    report = {}
+    for name in ocr_profiles.PROFILE_NAMES:
+        analyzer.clear_cache()
+        elapsed = 0.0
+        texts[name] = []
+        for path in pages:
+            start = time.perf_counter()
+            texts[name].append(analyzer.extract_text_fast(path, timeout=timeout, profile=name, language=language))
+            elapsed += time.perf_counter() - start
+        total_words = sum(len(words(text)) for text in texts[name])
+        report[name] = {
+            'words': total_words,
+            'seconds': round(elapsed, 3),
+            'words_per_second': round(total_words / elapsed, 1) if elapsed else None,
+        }
+    reference = texts[REFERENCE_PROFILE]
+    for name in ocr_profiles.PROFILE_NAMES:
+        scores = [agreement(text, ref) for text, ref in zip(texts[name], reference)]
+        scores = [score for score in scores if score is not None]
+        report[name]['agreement'] = round(sum(scores) / len(scores), 4) if scores else None
+    return report
+
+
+def format_table(profiles):
+    """Tabela markdown (perfil, palavras/s, concordância) para o README"""
+    lines = ['| Perfil | Palavras/s | Concordância com accurate |', '|---|---|---|']
+    for name, row in profiles.items():
+        score = f"{row['agreement']:.1%}" if row['agreement'] is not None else '-'
+        lines.append(f"| {name} | {row['words_per_second']} | {score} |")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Perfis de OCR: palavras/s e concordância com accurate')
+    parser.add_argument('--pages', type=int, default=12)
+    parser.add_argument('--language', default='pt', choices=('pt', 'en'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Grava o relatório JSON')
+    args = parser.parse_args(argv)
+
+    from classificador_final import ClassificadorFinal
+    from text_analyzer_optimized import TextAnalyzerOptimized
+
+    work_dir = tempfile.mkdtemp(prefix='ocr_profiles_')
+    try:
+        pages = [make_page(spec, work_dir) for spec in corpus_specs(args.pages, args.seed)]
+        choices = run_choices(ClassificadorFinal(), pages, args.language)
+        report = {
+            'pages': len(pages), 'language': args.language,
+            'auto_choice': dict(Counter(choices)), 'tesseract': tesseract_version(),
+        }
+        if report['tesseract']:
+            analyzer = TextAnalyzerOptimized(cache_dir=os.path.join(work_dir, 'cache'))
+            report['profiles'] = run_profiles(analyzer, pages, args.language)
+        else:
+            report['profiles'] = 'skipped (Tesseract não instalado)'
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+    if isinstance(report['profiles'], dict):
+        print(format_table(report['profiles']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Replay de Requisições Gravadas - Diff de Timings por Etapa
+
+Reenvia as requisições gravadas pelo RequestRecorder (api.py com
+REQUEST_RECORDER_ENABLED=1 e REQUEST_RECORDER_STORE_BYTES=1) com os mesmos
+parâmetros e compara os timings por etapa com os gravados:
+
+- em processo (padrão): ClassificadorFinal.classify desta versão do código
+- --url: contra uma API rodando; os timings vêm do header Server-Timing
+
+Registros sem os bytes guardados são contados em `skipped`. O relatório
+também lista as classificações que mudaram em relação à gravação.
+
+Uso:
+    python -m benchmarks.replay --log-dir .request_log --output diff.json
+    python -m benchmarks.replay --log-dir prod_log/ --url http://localhost:5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import metrics  # noqa: E402
+from request_recorder import REQUEST_RECORDER_DIR, RequestRecorder, load_records  # noqa: E402
+from benchmarks.run import percentile  # noqa: E402
+
+
+def parse_server_timing(header):
+    """'otsu;dur=12.5, total;dur=40.0' -> {'otsu': 0.0125, 'total': 0.04}"""
+    timings = {}
+    for item in filter(None, (part.strip() for part in (header or '').split(','))):
+        name, _, params = item.partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'dur':
+                try:
+                    timings[name.strip()] = float(value) / 1000
+                except ValueError:
+                    pass
+    return timings
+
+
+class InProcessTarget:
+    """Classificador desta versão do código, no próprio processo"""
+
+    def __init__(self):
+        from classificador_final import ClassificadorFinal
+        self.classifier = ClassificadorFinal()
+
+    def replay(self, path, params, filename):
+        token = metrics.start_timings()
+        start = time.perf_counter()
+        try:
+            result = self.classifier.classify(path, **params)
+        finally:
+            elapsed = time.perf_counter() - start
+            timings = metrics.finish_timings(token)
+        # Mesmo nome da etapa medida em api.py ao redor de classifier.classify
+        timings['classify'] = elapsed
+        return 200, timings, result.get('classification')
+
+
+class HttpTarget:
+    """API remota; timings lidos do header Server-Timing"""
+
+    def __init__(self, url):
+        from benchmarks.loadtest import HttpClient
+        self.client = HttpClient(url)
+
+    def replay(self, path, params, filename):
+        with open(path, 'rb') as f:
+            content = f.read()
+        fields = {key: str(value) for key, value in params.items() if value is not None}
+        status, headers, payload = self.client.post_multipart(
+            '/classify', fields, 'image', filename or os.path.basename(path), content, with_headers=True
+        )
+        timings = parse_server_timing(headers.get('Server-Timing'))
+        return status, timings, (payload or {}).get('classification')
+
+
+def _stage_summary(values):
+    return {
+        'n': len(values),
+        'mean_ms': round(sum(values) / len(values) * 1000, 3),
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+    }
+
+
+def _delta(current, baseline):
+    return round((current - baseline) / baseline * 100, 1) if baseline else None
+
+
+def timing_diff(recorded, replayed):
+    """
+    Compara {etapa: [segundos]} gravados e reexecutados.
+    Só etapas presentes nos dois lados entram no diff.
+    """
+    stages = {}
+    for stage in sorted(set(recorded) & set(replayed)):
+        before = _stage_summary(recorded[stage])
+        after = _stage_summary(replayed[stage])
+        stages[stage] = {
+            'recorded': before,
+            'replay': after,
+            'delta_p50_pct': _delta(after['p50_ms'], before['p50_ms']),
+            'delta_mean_pct': _delta(after['mean_ms'], before['mean_ms']),
+        }
+    return stages
+
+
+def replay_records(records, recorder, target, repeat=1, limit=None):
+    """Reexecuta os registros com bytes guardados e retorna o relatório"""
+    recorded, replayed = {}, {}
+    changed, statuses = [], {}
+    skipped = replayed_count = 0
+
+    candidates = [r for r in records if r.get('endpoint') == 'classify' and r.get('status') == 200]
+    if limit:
+        candidates = candidates[:limit]
+
+    for record in candidates:
+        path = recorder.blob_path(record['content_hash'])
+        if not record.get('stored') or not os.path.exists(path):
+            skipped += 1
+            continue
+        for stage, seconds in record.get('timings', {}).items():
+            recorded.setdefault(stage, []).append(seconds)
+
+        params = {key: value for key, value in record.get('params', {}).items() if value is not None}
+        for _ in range(repeat):
+            status, timings, classification = target.replay(path, params, record.get('filename'))
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            for stage, seconds in timings.items():
+                replayed.setdefault(stage, []).append(seconds)
+        replayed_count += 1
+
+        if classification != record.get('classification'):
+            changed.append({
+                'content_hash': record['content_hash'],
+                'recorded': record.get('classification'),
+                'replay': classification,
+            })
+
+    return {
+        'records': len(candidates),
+        'replayed': replayed_count,
+        'skipped': skipped,
+        'repeat': repeat,
+        'status_codes': statuses,
+        'classification_changes': changed,
+        'stages': timing_diff(recorded, replayed),
+    }
+
+
+def print_table(report):
+    print(f"{'etapa':<24} {'gravado p50':>12} {'replay p50':>12} {'Δ p50':>8}", file=sys.stderr)
+    for stage, diff in report['stages'].items():
+        delta = diff['delta_p50_pct']
+        delta = f"{delta:+.1f}%" if delta is not None else '-'
+        print(f"{stage:<24} {diff['recorded']['p50_ms']:>12.1f} {diff['replay']['p50_ms']:>12.1f} {delta:>8}",
+              file=sys.stderr)
+    print(f"Reexecutados: {report['replayed']}  sem bytes: {report['skipped']}  "
+          f"classificações alteradas: {len(report['classification_changes'])}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay de requisições gravadas com diff de timings')
+    parser.add_argument('--log-dir', default=REQUEST_RECORDER_DIR, help='Diretório do RequestRecorder')
+    parser.add_argument('--url', help='API alvo (padrão: classificador no próprio processo)')
+    parser.add_argument('--repeat', type=int, default=1, help='Execuções por registro')
+    parser.add_argument('--limit', type=int, help='Máximo de registros')
+    parser.add_argument('--output', help='Arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args(argv)
+
+    recorder = RequestRecorder(directory=args.log_dir)
+    records = load_records(args.log_dir)
+    target = HttpTarget(args.url) if args.url else InProcessTarget()
+    report = replay_records(records, recorder, target, repeat=args.repeat, limit=args.limit)
+    report['target'] = args.url or 'in-process'
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    print_table(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Re-pontuação pelos Artefatos x Classificação Completa
+
+Classifica páginas sintéticas (benchmarks.synthetic) com o armazenamento de
+artefatos ativo e depois re-pontua todas a partir dos .npz, medindo:
+
+- documentos/s da classificação completa (decode, binarização, componentes,
+  parágrafos) e da re-pontuação (artefatos mapeados em memória, sem pixels)
+- concordância: mesma classificação, score, parágrafos e conformidade
+- tamanho médio do artefato e tempo projetado para 100 mil documentos
+
+O OCR é substituído pelo texto de referência das páginas (o Tesseract não
+entra na conta): o ganho real, com OCR, é maior que o medido aqui.
+
+Uso:
+    python -m benchmarks.rescore [--pages 40] [--dpi 200] [--output rescore.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+from text_analyzer_optimized import TextAnalyzerOptimized  # noqa: E402
+
+# Campos que a re-pontuação precisa reproduzir
+COMPARED_KEYS = ('classification', 'score', 'num_lines', 'num_paragraphs', 'word_count', 'is_compliant')
+PROJECTED_DOCUMENTS = 100000
+
+
+class TruthTextAnalyzer(TextAnalyzerOptimized):
+    """Analisador com o texto de referência da página no lugar do Tesseract"""
+
+    def __init__(self, texts, cache_dir):
+        super().__init__(cache_dir=cache_dir)
+        self.texts = texts
+
+    def extract_text_fast(self, image_path, *args, **kwargs):
+        return self.texts.get(image_path, '')
+
+
+def make_pages(pages, directory, dpi=200, seed=0):
+    """Artigos e anúncios alternados; retorna {caminho: texto de referência}"""
+    texts = {}
+    for index in range(pages):
+        kind = 'article' if index % 2 == 0 else 'ad'
+        image, truth = synthetic.generate_page(kind, dpi=dpi, seed=seed + index)
+        path = os.path.join(directory, f"page_{index:03d}.tif")
+        synthetic.save_page(image, path)
+        texts[path] = truth['text']
+    return texts
+
+
+def run_comparison(texts, work_dir):
+    """Classificação completa com artefatos x re-pontuação de todos os artefatos"""
+    import analysis_artifacts
+    from classificador_final import ClassificadorFinal
+    classifier = ClassificadorFinal()
+    classifier.text_analyzer = TruthTextAnalyzer(texts, os.path.join(work_dir, 'cache'))
+    classifier.speculative_ocr_enabled = False
+    store = analysis_artifacts.ArtifactStore(os.path.join(work_dir, 'artifacts'))
+    classifier.artifact_store = store
+
+    originals = {}
+    start = time.perf_counter()
+    for path in texts:
+        result = classifier.classify(path)
+        originals[analysis_artifacts.document_hash(path)] = result
+    classify_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rescored = dict(analysis_artifacts.rescore_all(classifier, store))
+    rescore_seconds = time.perf_counter() - start
+
+    agree = sum(all(rescored[doc].get(key) == originals[doc].get(key) for key in COMPARED_KEYS)
+                for doc in originals)
+    sizes = [os.path.getsize(store.path(doc)) for doc in store.documents()]
+    documents = len(texts)
+    rescore_rate = documents / rescore_seconds if rescore_seconds else None
+    return {
+        'documents': documents,
+        'classify_docs_per_second': round(documents / classify_seconds, 1),
+        'rescore_docs_per_second': round(rescore_rate, 1) if rescore_rate else None,
+        'speedup': round(classify_seconds / rescore_seconds, 1) if rescore_seconds else None,
+        'agreement': round(agree / documents, 4) if documents else None,
+        'artifact_kb_mean': round(sum(sizes) / len(sizes) / 1024, 1) if sizes else None,
+        'projected_100k_rescore_minutes': round(PROJECTED_DOCUMENTS / rescore_rate / 60, 1) if rescore_rate else None,
+        'projected_100k_classify_minutes': round(PROJECTED_DOCUMENTS * classify_seconds / documents / 60, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Re-pontuação pelos artefatos x classificação completa')
+    parser.add_argument('--pages', type=int, default=40)
+    parser.add_argument('--dpi', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Grava o relatório JSON')
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix='rescore_')
+    try:
+        texts = make_pages(args.pages, work_dir, args.dpi, args.seed)
+        report = dict(run_comparison(texts, work_dir), dpi=args.dpi)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Ponta a Ponta - Etapas do Pipeline de Classificação
+
+Para cada imagem (test_images/*.tif + corpus sintético) mede:
+- features:    ClassificadorFinal.extract_features
+- paragraphs:  ParagraphDetector.analyze
+- ocr_cold:    TextAnalyzerOptimized.analyze_fast com cache vazio
+- ocr_warm:    analyze_fast com o resultado já em cache
+- classify:    ClassificadorFinal.classify completo (cache de OCR vazio)
+
+e reporta throughput, p50/p95/p99 e pico de RSS em JSON (com o ground truth
+das páginas sintéticas, para curvas de latência x tamanho/densidade). Com --baseline,
+compara o p50 de cada etapa com o baseline e sinaliza regressões acima da tolerância.
+
+O baseline não é versionado: números só são comparáveis na mesma máquina, então
+cada máquina grava o seu (benchmarks/baseline.json, no .gitignore) com
+--save-baseline, de preferência com o Tesseract instalado (sem ele as etapas de
+OCR ficam de fora). Com --fail-on-regression, baseline ausente ou sem alguma
+etapa medida agora também falha (código 2): regrave o baseline.
+
+Uso:
+    python -m benchmarks.run [--repeat 5] [--output bench.json]
+    python -m benchmarks.run --save-baseline                 # grava o baseline local
+    python -m benchmarks.run --fail-on-regression
+    python -m benchmarks.run --corpus-dir corpus/ --no-synthetic   # corpus de benchmarks.synthetic
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import corpus  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+STAGES = ('features', 'paragraphs', 'ocr_cold', 'ocr_warm', 'classify')
+OCR_STAGES = ('ocr_cold', 'ocr_warm')
+
+
+def percentile(values, q):
+    """Percentil q (0-100) com interpolação linear"""
+    if not values:
+        return 0.0
+    return float(np.percentile(np.asarray(values, dtype=np.float64), q))
+
+
+def summarize(durations):
+    """Resumo de uma lista de durações (s): média, p50/p95/p99 e throughput"""
+    total = sum(durations)
+    return {
+        'n': len(durations),
+        'mean_ms': round(total / len(durations) * 1000, 3) if durations else 0.0,
+        'p50_ms': round(percentile(durations, 50) * 1000, 3),
+        'p95_ms': round(percentile(durations, 95) * 1000, 3),
+        'p99_ms': round(percentile(durations, 99) * 1000, 3),
+        'throughput_per_s': round(len(durations) / total, 3) if total > 0 else 0.0,
+    }
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def tesseract_version():
+    """Versão do Tesseract instalada ou None"""
+    try:
+        import pytesseract
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return None
+
+
+def cpu_model():
+    """Modelo da CPU (/proc/cpuinfo no Linux; platform.processor() fora dele)"""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def time_call(fn, repeat, warmup=1, before=None):
+    """Executa fn (warmup + repeat vezes) e retorna as durações medidas (s)"""
+    durations = []
+    for i in range(warmup + repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            durations.append(elapsed)
+    return durations
+
+
+def collect_images(images_dir, synthetic_dir=None, resolutions=None, densities=None, seed=0):
+    """{nome: caminho} das imagens reais (*.tif) e do corpus sintético"""
+    images = {}
+    if images_dir:
+        for path in sorted(glob.glob(os.path.join(images_dir, '*.tif'))):
+            images[os.path.splitext(os.path.basename(path))[0]] = path
+    if synthetic_dir:
+        images.update(corpus.build_corpus(synthetic_dir, resolutions, densities, seed=seed))
+    return images
+
+
+def load_ground_truth(*directories):
+    """{nome: ground truth} dos manifest.json gerados por benchmarks.synthetic"""
+    truth = {}
+    for directory in directories:
+        manifest_path = os.path.join(directory, 'manifest.json') if directory else None
+        if manifest_path and os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                for page in json.load(f):
+                    truth[page['name']] = {
+                        key: page[key] for key in ('kind', 'dpi', 'num_lines', 'paragraphs', 'words')
+                    }
+    return truth
+
+
+def benchmark_image(path, classifier, paragraph_detector, text_analyzer, repeat, warmup, stages, truth=None):
+    """Mede as etapas pedidas para uma imagem"""
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    result = {
+        'width': int(img.shape[1]),
+        'height': int(img.shape[0]),
+        'megapixels': round(img.shape[0] * img.shape[1] / 1e6, 3),
+        'stages': {},
+    }
+    if truth:
+        result['ground_truth'] = truth
+    del img
+
+    def run(stage, fn, before=None):
+        if stage not in stages:
+            return
+        result['stages'][stage] = summarize(time_call(fn, repeat, warmup, before))
+        result['stages'][stage]['peak_rss_mb'] = peak_rss_mb()
+
+    run('features', lambda: classifier.extract_features(path))
+    if paragraph_detector is not None:
+        run('paragraphs', lambda: paragraph_detector.analyze(path))
+    if text_analyzer is not None:
+        run('ocr_cold', lambda: text_analyzer.analyze_fast(path), before=text_analyzer.clear_cache)
+        text_analyzer.analyze_fast(path)
+        run('ocr_warm', lambda: text_analyzer.analyze_fast(path))
+    clear_cache = text_analyzer.clear_cache if text_analyzer is not None else None
+    run('classify', lambda: classifier.classify(path), before=clear_cache)
+    return result
+
+
+def run_benchmarks(images, repeat=5, warmup=1, stages=STAGES, ground_truth=None):
+    """Roda o benchmark em todas as imagens e retorna o relatório (dict)"""
+    from classificador_final import ClassificadorFinal
+    from paragraph_detector import ParagraphDetector
+    from text_analyzer_optimized import TextAnalyzerOptimized
+
+    ground_truth = ground_truth or {}
+    tesseract = tesseract_version()
+    cache_dir = tempfile.mkdtemp(prefix='bench_ocr_')
+    try:
+        classifier = ClassificadorFinal()
+        # Cache de OCR isolado: o benchmark não lê nem polui o .cache_ocr real
+        text_analyzer = TextAnalyzerOptimized(cache_dir=cache_dir) if tesseract else None
+        if classifier.text_analyzer is not None:
+            classifier.text_analyzer = TextAnalyzerOptimized(cache_dir=cache_dir)
+        skipped = [] if tesseract else list(OCR_STAGES)
+
+        results = {}
+        for name, path in images.items():
+            results[name] = benchmark_image(
+                path, classifier, ParagraphDetector(), text_analyzer, repeat, warmup, stages,
+                truth=ground_truth.get(name)
+            )
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu': cpu_model(),
+            'cpu_count': os.cpu_count(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'tesseract': tesseract,
+            'repeat': repeat,
+            'warmup': warmup,
+            'skipped_stages': skipped,
+        },
+        'images': results,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE, metric='p50_ms'):
+    """
+    Compara `metric` de cada etapa/imagem com o baseline.
+    Retorna a lista de regressões (mais lentas que baseline * (1 + tolerance)).
+    """
+    regressions = []
+    for name, image in report['images'].items():
+        base_image = baseline.get('images', {}).get(name)
+        if not base_image:
+            continue
+        for stage, summary in image['stages'].items():
+            base_summary = base_image['stages'].get(stage)
+            if not base_summary or not base_summary.get(metric):
+                continue
+            ratio = summary[metric] / base_summary[metric]
+            if ratio > 1 + tolerance:
+                regressions.append({
+                    'image': name,
+                    'stage': stage,
+                    'metric': metric,
+                    'baseline': base_summary[metric],
+                    'current': summary[metric],
+                    'ratio': round(ratio, 3),
+                })
+    return regressions
+
+
+def uncompared(report, baseline):
+    """
+    Etapas/imagens medidas no relatório que não existem no baseline (ex.: baseline
+    gravado sem Tesseract não tem ocr_cold/ocr_warm) - nenhuma regressão delas é detectada
+    """
+    missing = []
+    for name, image in report['images'].items():
+        base_stages = baseline.get('images', {}).get(name, {}).get('stages', {})
+        missing.extend({'image': name, 'stage': stage} for stage in image['stages'] if stage not in base_stages)
+    return missing
+
+
+def print_table(report, regressions=()):
+    """Tabela resumida (p50/p95 por etapa) no stderr"""
+    slow = {(r['image'], r['stage']) for r in regressions}
+    print(f"{'imagem':<32} {'MP':>6} {'etapa':<11} {'p50 ms':>10} {'p95 ms':>10} {'img/s':>8}", file=sys.stderr)
+    for name, image in report['images'].items():
+        for stage, summary in image['stages'].items():
+            flag = '  ⚠️ regressão' if (name, stage) in slow else ''
+            print(f"{name:<32} {image['megapixels']:>6.2f} {stage:<11} {summary['p50_ms']:>10.1f} "
+                  f"{summary['p95_ms']:>10.1f} {summary['throughput_per_s']:>8.2f}{flag}", file=sys.stderr)
+    print(f"Pico de RSS: {report['peak_rss_mb']} MB", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark das etapas do classificador')
+    parser.add_argument('--images', default=os.path.join(ROOT_DIR, 'test_images'),
+                        help='Diretório com TIFFs reais (padrão: test_images/)')
+    parser.add_argument('--no-synthetic', action='store_true', help='Não gerar o corpus sintético')
+    parser.add_argument('--corpus-dir', help='Corpus já gerado por benchmarks.synthetic (com manifest.json)')
+    parser.add_argument('--resolutions', nargs='+', choices=list(corpus.RESOLUTIONS), default=None)
+    parser.add_argument('--densities', nargs='+', choices=list(corpus.DENSITIES), default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--output', help='Arquivo JSON de saída (padrão: stdout)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline para comparação')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Regressão tolerada no p50 (fração, padrão 0.25)')
+    parser.add_argument('--save-baseline', action='store_true', help='Grava o resultado como novo baseline')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Sai com código 1 se houver regressão')
+    args = parser.parse_args(argv)
+
+    synthetic_dir = None if args.no_synthetic else tempfile.mkdtemp(prefix='bench_corpus_')
+    try:
+        images = collect_images(args.images, synthetic_dir, args.resolutions, args.densities, args.seed)
+        if args.corpus_dir:
+            images.update(collect_images(args.corpus_dir))
+        report = run_benchmarks(images, repeat=args.repeat, warmup=args.warmup, stages=args.stages,
+                                ground_truth=load_ground_truth(synthetic_dir, args.corpus_dir))
+    finally:
+        if synthetic_dir:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+
+    regressions = []
+    missing = []
+    if not args.save_baseline and args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        missing = uncompared(report, baseline)
+        report['regressions'] = regressions
+        report['uncompared'] = missing
+    elif not args.save_baseline and args.fail_on_regression:
+        missing = [{'image': name, 'stage': stage} for name, image in report['images'].items()
+                   for stage in image['stages']]
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            f.write(output + '\n')
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    elif not args.save_baseline:
+        print(output)
+
+    print_table(report, regressions)
+    if missing:
+        print(f"⚠️  {len(missing)} etapa(s) sem baseline para comparar "
+              f"(grave um com: python -m benchmarks.run --save-baseline)", file=sys.stderr)
+    if regressions and args.fail_on_regression:
+        return 1
+    if missing and args.fail_on_regression:
+        return 2
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
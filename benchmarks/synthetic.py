@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Gerador de Páginas Sintéticas (anúncio / artigo) com Ground Truth
+
+Renderiza páginas determinísticas a partir de uma seed, controlando tamanho
+da fonte, colunas, parágrafos, palavras, ruído, resolução (dpi) e compressão
+do TIFF. Cada página vem com o ground truth do que foi efetivamente
+desenhado (linhas com bounding box, parágrafos e palavras), para gerar curvas
+de latência x tamanho da página / densidade de texto sem dataset externo.
+
+A fonte padrão é a embutida no Pillow (ImageFont.load_default(size)), então o
+resultado não depende das fontes instaladas na máquina.
+
+Uso:
+    python -m benchmarks.synthetic --output corpus/ --kind article --dpi 100 150 200 --fill 0.3 1.0
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+PAGE_KINDS = ('article', 'ad')
+
+# Tamanho A4 em polegadas
+A4_INCHES = (8.27, 11.69)
+
+# Compressões TIFF suportadas pelo Pillow (group4 exige imagem 1-bit)
+COMPRESSIONS = {
+    'none': None,
+    'lzw': 'tiff_lzw',
+    'deflate': 'tiff_adobe_deflate',
+    'packbits': 'packbits',
+    'group4': 'group4',
+    'jpeg': 'jpeg',
+}
+
+# Vocabulário misto pt/en (palavras curtas e longas, como em artigos reais).
+# Sem acentos: a fonte embutida do Pillow não tem esses glifos
+VOCABULARY = (
+    'the of and to in is for that with on as by this are from results method data analysis '
+    'model study table figure section measured sample values between using which these were '
+    'de da do que em para com uma os as no na dos das por mais resultados analise metodo '
+    'amostra valores tabela figura estudo modelo entre foram sobre pela pelo tambem '
+    'experimental distribution classification document paragraph structure performance '
+    'temperature concentration significant approximately observations correlation '
+    'desenvolvimento processamento classificacao documento paragrafo estrutura desempenho'
+).split()
+
+AD_VOCABULARY = (
+    'new free sale now only best offer call today save more buy get limited time quality '
+    'novo gratis oferta agora melhor ligue hoje economize compre promocao qualidade'
+).split()
+
+
+def _font(size, font_path=None):
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.load_default(size=size)
+
+
+def _text_width(draw, text, font):
+    left, _, right, _ = draw.textbbox((0, 0), text, font=font)
+    return right - left
+
+
+def _paragraph_sizes(rng, paragraphs, words):
+    """Divide `words` em `paragraphs` parágrafos de tamanhos variados (>= 1 palavra)"""
+    weights = [rng.uniform(0.5, 1.5) for _ in range(paragraphs)]
+    total = sum(weights)
+    sizes = [max(1, int(words * w / total)) for w in weights]
+    sizes[-1] = max(1, words - sum(sizes[:-1]))
+    return sizes
+
+
+class _Layout:
+    """Fluxo de texto em colunas: avança linha a linha e troca de coluna no fim"""
+
+    def __init__(self, width, height, margin, columns, gutter, line_height, max_y=None):
+        self.margin = margin
+        self.columns = columns
+        self.line_height = line_height
+        self.column_width = (width - 2 * margin - (columns - 1) * gutter) // columns
+        self.gutter = gutter
+        self.top = margin
+        self.bottom = min(height - margin, max_y or height)
+        self.column = 0
+        self.y = self.top
+
+    def column_x(self):
+        return self.margin + self.column * (self.column_width + self.gutter)
+
+    def next_line(self, extra=0):
+        """Avança para a próxima linha; False quando a página acabou"""
+        self.y += self.line_height + extra
+        if self.y + self.line_height > self.bottom:
+            self.column += 1
+            self.y = self.top
+        return self.column < self.columns
+
+    def has_room(self):
+        return self.column < self.columns and self.y + self.line_height <= self.bottom
+
+
+def _render_paragraphs(draw, rng, layout, font, sizes, vocabulary, truth, paragraph_offset=0, indent=True):
+    """Desenha os parágrafos no layout e registra linhas/palavras no ground truth"""
+    space = _text_width(draw, 'n n', font) - _text_width(draw, 'nn', font)
+    indent_width = 4 * space if indent else 0
+
+    for p_index, size in enumerate(sizes):
+        if not layout.has_room():
+            break
+        paragraph_id = paragraph_offset + p_index
+        words = [rng.choice(vocabulary) for _ in range(size)]
+        drawn_in_paragraph = 0
+        line_words = []
+        x = layout.column_x() + indent_width
+
+        def flush():
+            if not line_words:
+                return
+            x0 = line_words[0][1]
+            x1 = line_words[-1][1] + line_words[-1][2]
+            truth['lines'].append({
+                'bbox': [int(x0), int(layout.y), int(x1), int(layout.y + layout.line_height)],
+                'paragraph': paragraph_id,
+                'column': layout.column,
+                'words': len(line_words),
+            })
+            truth['text'].append(' '.join(w for w, _, _ in line_words))
+
+        for word in words:
+            width = _text_width(draw, word, font)
+            line_end = layout.column_x() + layout.column_width
+            if line_words and x + width > line_end:
+                flush()
+                line_words = []
+                if not layout.next_line():
+                    break
+                x = layout.column_x()
+            draw.text((x, layout.y), word, fill=0, font=font)
+            line_words.append((word, x, width))
+            drawn_in_paragraph += 1
+            x += width + space
+        else:
+            flush()
+            truth['words'] += drawn_in_paragraph
+            truth['paragraphs'] += 1
+            # Espaço extra entre parágrafos (0.8 linha)
+            layout.next_line(extra=int(layout.line_height * 0.8))
+            continue
+
+        # Página acabou no meio do parágrafo: conta só o que foi desenhado
+        truth['words'] += drawn_in_paragraph
+        if drawn_in_paragraph:
+            truth['paragraphs'] += 1
+        break
+
+
+def _add_noise(pixels, rng_np, noise):
+    """Ruído sal-e-pimenta: `noise` é a probabilidade de inverter cada pixel"""
+    if noise <= 0:
+        return pixels
+    mask = rng_np.random(pixels.shape) < noise
+    pixels[mask] = 255 - pixels[mask]
+    return pixels
+
+
+def generate_page(kind='article', dpi=150, page_inches=A4_INCHES, font_size=None, columns=None,
+                  paragraphs=None, words=None, fill=1.0, noise=0.0, seed=0, font_path=None):
+    """
+    Gera uma página sintética em tons de cinza.
+
+    - font_size: pontos (padrão: 10pt em artigos, 18pt em anúncios)
+    - columns/paragraphs/words: None escolhe valores típicos do tipo de página
+    - fill: fração da altura útil disponível para o texto (densidade)
+    - noise: probabilidade de inversão por pixel (ruído de digitalização)
+
+    Retorna (PIL.Image modo 'L', ground_truth).
+    """
+    if kind not in PAGE_KINDS:
+        raise ValueError(f"Tipo de página inválido: {kind} (use {', '.join(PAGE_KINDS)})")
+
+    rng = random.Random(seed)
+    width = int(round(page_inches[0] * dpi))
+    height = int(round(page_inches[1] * dpi))
+    image = Image.new('L', (width, height), color=255)
+    draw = ImageDraw.Draw(image)
+    margin = int(0.8 * dpi)
+
+    truth = {
+        'kind': kind, 'seed': seed, 'dpi': dpi, 'width': width, 'height': height,
+        'font_size': None, 'columns': None, 'lines': [], 'paragraphs': 0, 'words': 0, 'text': [],
+    }
+
+    if kind == 'article':
+        font_size = font_size or 10
+        columns = columns or rng.choice((1, 2))
+        paragraphs = paragraphs or rng.randint(8, 14)
+        px = max(6, int(round(font_size * dpi / 72)))
+        font = _font(px, font_path)
+        line_height = int(px * 1.35)
+        usable = height - 2 * margin
+        layout = _Layout(width, height, margin, columns, gutter=int(0.3 * dpi),
+                         line_height=line_height, max_y=margin + int(usable * fill))
+        if words is None:
+            # Preenche o espaço disponível: ~ linhas x palavras por linha
+            lines = columns * max(1, (layout.bottom - layout.top) // line_height)
+            words_per_line = max(1, layout.column_width // (px * 4))
+            words = lines * words_per_line
+        sizes = _paragraph_sizes(rng, paragraphs, words)
+        _render_paragraphs(draw, rng, layout, font, sizes, VOCABULARY, truth)
+    else:
+        font_size = font_size or 18
+        columns = columns or 1
+        paragraphs = paragraphs or rng.randint(1, 3)
+        words = words or rng.randint(10, 40)
+
+        # Título grande
+        headline_px = max(10, int(round(font_size * 2.5 * dpi / 72)))
+        headline_font = _font(headline_px, font_path)
+        headline = ' '.join(rng.choice(AD_VOCABULARY) for _ in range(rng.randint(2, 4))).upper()
+        draw.text((margin, margin), headline, fill=0, font=headline_font)
+        headline_right = margin + _text_width(draw, headline, headline_font)
+        truth['lines'].append({
+            'bbox': [margin, margin, int(headline_right), margin + int(headline_px * 1.2)],
+            'paragraph': 0, 'column': 0, 'words': len(headline.split()),
+        })
+        truth['text'].append(headline)
+        truth['words'] += len(headline.split())
+        truth['paragraphs'] += 1
+
+        # Bloco de "imagem" (foto/logo) ocupando parte da página
+        top = margin + int(headline_px * 1.8)
+        block_bottom = top + int((height - 2 * margin) * rng.uniform(0.3, 0.45))
+        shade = rng.randint(40, 180)
+        if rng.random() < 0.5:
+            draw.rectangle([margin, top, width - margin, block_bottom], fill=shade)
+        else:
+            draw.ellipse([margin, top, width - margin, block_bottom], fill=shade)
+
+        px = max(8, int(round(font_size * dpi / 72)))
+        font = _font(px, font_path)
+        layout = _Layout(width, height, margin, columns, gutter=int(0.3 * dpi), line_height=int(px * 1.4))
+        layout.top = layout.y = block_bottom + int(0.3 * dpi)
+        bottom = margin + int((height - 2 * margin) * fill)
+        layout.bottom = max(layout.top + layout.line_height, min(layout.bottom, bottom))
+        sizes = _paragraph_sizes(rng, paragraphs, words)
+        _render_paragraphs(draw, rng, layout, font, sizes, AD_VOCABULARY, truth,
+                           paragraph_offset=1, indent=False)
+
+    truth['font_size'] = font_size
+    truth['columns'] = columns
+    truth['num_lines'] = len(truth['lines'])
+    truth['text'] = '\n'.join(truth['text'])
+
+    if noise > 0:
+        pixels = _add_noise(np.array(image), np.random.default_rng(seed), noise)
+        image = Image.fromarray(pixels)
+
+    return image, truth
+
+
+def save_page(image, path, compression='lzw', dpi=None):
+    """Salva a página como TIFF com a compressão pedida (group4 binariza em 1-bit)"""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compressão inválida: {compression} (use {', '.join(COMPRESSIONS)})")
+    if compression == 'group4':
+        image = image.point(lambda v: 255 if v >= 128 else 0).convert('1')
+    kwargs = {}
+    if COMPRESSIONS[compression]:
+        kwargs['compression'] = COMPRESSIONS[compression]
+    if dpi:
+        kwargs['dpi'] = (dpi, dpi)
+    image.save(path, format='TIFF', **kwargs)
+    return path
+
+
+def generate_corpus(output_dir, specs, compression='lzw'):
+    """
+    Gera uma página por spec (kwargs de generate_page + 'name' opcional) em
+    `output_dir` e grava manifest.json com o ground truth de cada arquivo.
+    Retorna o manifest (lista de dicts).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = []
+    for index, spec in enumerate(specs):
+        spec = dict(spec)
+        name = spec.pop('name', None) or f"{spec.get('kind', 'article')}_{index:04d}"
+        page_compression = spec.pop('compression', compression)
+        image, truth = generate_page(**spec)
+        path = os.path.join(output_dir, f"{name}.tif")
+        save_page(image, path, page_compression, dpi=truth['dpi'])
+        truth.pop('text')
+        manifest.append({'name': name, 'file': os.path.basename(path), 'compression': page_compression,
+                         'megapixels': round(truth['width'] * truth['height'] / 1e6, 3), **truth})
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def scaling_specs(kinds=('article',), dpis=(100, 150, 200), fills=(0.25, 0.55, 0.9), seed=0, **overrides):
+    """Grade tipo x dpi x densidade para curvas de escalabilidade"""
+    specs = []
+    for kind in kinds:
+        for dpi in dpis:
+            for fill in fills:
+                specs.append({
+                    'name': f"{kind}_{dpi}dpi_fill{int(fill * 100):03d}",
+                    'kind': kind, 'dpi': dpi, 'fill': fill, 'seed': seed, **overrides,
+                })
+    return specs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera páginas sintéticas com ground truth')
+    parser.add_argument('--output', required=True, help='Diretório de saída')
+    parser.add_argument('--kind', nargs='+', choices=PAGE_KINDS, default=['article', 'ad'])
+    parser.add_argument('--dpi', nargs='+', type=int, default=[100, 150, 200])
+    parser.add_argument('--fill', nargs='+', type=float, default=[0.25, 0.55, 0.9])
+    parser.add_argument('--font-size', type=float, help='Tamanho da fonte (pt)')
+    parser.add_argument('--columns', type=int)
+    parser.add_argument('--paragraphs', type=int)
+    parser.add_argument('--words', type=int)
+    parser.add_argument('--noise', type=float, default=0.0, help='Probabilidade de inversão por pixel')
+    parser.add_argument('--compression', choices=list(COMPRESSIONS), default='lzw')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    overrides = {'noise': args.noise}
+    for key in ('font_size', 'columns', 'paragraphs', 'words'):
+        if getattr(args, key) is not None:
+            overrides[key] = getattr(args, key)
+
+    specs = scaling_specs(args.kind, args.dpi, args.fill, seed=args.seed, **overrides)
+    manifest = generate_corpus(args.output, specs, compression=args.compression)
+    for page in manifest:
+        print(f"{page['file']:<36} {page['megapixels']:>6.2f} MP  linhas={page['num_lines']:<4} "
+              f"parágrafos={page['paragraphs']:<3} palavras={page['words']}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
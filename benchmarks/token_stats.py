@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Estatísticas de Palavras: duas passadas com re.findall x TokenStats
+
+Usa o texto das páginas sintéticas (ground truth de benchmarks.synthetic,
+como se fosse a saída do OCR) e mede por documento:
+
+- anterior: count_words + get_most_frequent_words (dois re.findall sobre o
+  texto inteiro, lista filtrada e Counter)
+- atual: TokenStats (uma tokenização com padrão pré-compilado)
+- shards: TokenStats por página somadas com merge(), sem concatenar o texto
+
+e confere que total e palavras frequentes são idênticos nos três caminhos.
+
+Uso:
+    python -m benchmarks.token_stats [--pages 20] [--repeat 20] [--output palavras.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+from token_stats import STOPWORDS, TokenStats  # noqa: E402
+
+# O analisador anterior montava o set uma vez por instância
+LEGACY_STOPWORDS = set(STOPWORDS)
+
+
+def page_texts(pages, seed=0):
+    """Texto de artigos sintéticos (um por página)"""
+    return [synthetic.generate_page('article', dpi=72, seed=seed + index)[1]['text'] for index in range(pages)]
+
+
+def legacy_stats(text, top_n=10):
+    """Caminho anterior de TextAnalyzerOptimized (count_words + get_most_frequent_words)"""
+    words = re.findall(r'\b[a-zA-ZáéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ]+\b', text.lower())
+    frequent = re.findall(r'\b[a-zA-ZáéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ]{3,}\b', text.lower())
+    filtered = [w for w in frequent if w not in LEGACY_STOPWORDS]
+    return len(words), Counter(filtered).most_common(top_n)
+
+
+def engine_stats(text, top_n=10):
+    stats = TokenStats.from_text(text)
+    return stats.total, stats.most_common(top_n)
+
+
+def sharded_stats(texts, top_n=10):
+    stats = TokenStats.merged(TokenStats.from_text(text) for text in texts)
+    return stats.total, stats.most_common(top_n)
+
+
+def _best_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def run_comparison(texts, repeat=20):
+    """Tempo (melhor de `repeat`, ms) de cada caminho sobre o documento"""
+    document = '\n'.join(texts)
+    legacy = legacy_stats(document)
+    legacy_ms = _best_ms(lambda: legacy_stats(document), repeat)
+    engine_ms = _best_ms(lambda: engine_stats(document), repeat)
+    shards_ms = _best_ms(lambda: sharded_stats(texts), repeat)
+    return {
+        'pages': len(texts),
+        'characters': len(document),
+        'words': legacy[0],
+        'legacy_ms': round(legacy_ms, 3),
+        'token_stats_ms': round(engine_ms, 3),
+        'sharded_ms': round(shards_ms, 3),
+        'speedup': round(legacy_ms / engine_ms, 2) if engine_ms else None,
+        'identical': engine_stats(document) == legacy and sharded_stats(texts) == legacy,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Estatísticas de palavras: re.findall x TokenStats')
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Grava o relatório JSON')
+    args = parser.parse_args(argv)
+
+    report = run_comparison(page_texts(args.pages, args.seed), args.repeat)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,8 +4,11 @@ Configuração do Celery para Processamento Assíncrono
 """
 
 from celery import Celery
+from structured_logging import configure_logging, get_logger
 import os
 
+logger = get_logger('celery_config')
+
 # URL do Redis (variável de ambiente ou local)
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 
@@ -43,15 +46,35 @@ celery_app.conf.update(
     # Monitoramento
     worker_send_task_events=True,
     task_send_sent_event=True,
+    
+    # Logging: mantém o logger raiz configurado por structured_logging
+    worker_hijack_root_logger=False,
 )
 
+configure_logging()
+
+# Métricas do worker: sem HTTP próprio, exporta em WORKER_METRICS_PORT (opcional)
+WORKER_METRICS_PORT = os.environ.get('WORKER_METRICS_PORT')
+
+if WORKER_METRICS_PORT:
+    from celery.signals import worker_process_init
+
+    @worker_process_init.connect
+    def start_worker_metrics_server(**kwargs):
+        import metrics
+        port = metrics.start_http_server(int(WORKER_METRICS_PORT))
+        if port:
+            logger.info("📈 Métricas do worker em :%d/metrics", port)
+        else:
+            logger.warning("⚠️ Porta de métricas indisponível")
+
 # Importar tasks explicitamente para registrá-las
 # IMPORTANTE: Isso deve ser feito DEPOIS de criar celery_app
 try:
     import tasks  # Isso registra as tasks via decorador @celery_app.task
-    print(f"✅ Tasks importadas: {list(celery_app.tasks.keys())}")
+    logger.debug("✅ Tasks importadas: %s", list(celery_app.tasks.keys()))
 except ImportError as e:
-    print(f"⚠️ Erro ao importar tasks: {e}")
+    logger.warning("⚠️ Erro ao importar tasks: %s", e)
 
 if __name__ == '__main__':
     celery_app.start()
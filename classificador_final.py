@@ -10,6 +10,64 @@ import cv2
 import numpy as np
 import os
 import sys
+import threading
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import analysis_artifacts
+import image_io
+from column_detector import ColumnDetector
+from layout_profile import LayoutProfile
+import memory_budget
+import multipage
+import ocr_profiles
+import page_orientation
+import striped_layout
+import text_regions
+from token_stats import TokenStats
+import tiff_header
+import metrics
+from structured_logging import get_logger
+
+# OCR especulativo: inicia o OCR em paralelo com a detecção de parágrafos
+# quando o score parcial (regras 1-4) já aponta fortemente para artigo científico
+SPECULATIVE_OCR_ENABLED = os.environ.get('SPECULATIVE_OCR_ENABLED', '1') == '1'
+SPECULATIVE_OCR_THRESHOLD = float(os.environ.get('SPECULATIVE_OCR_THRESHOLD', '1.0'))
+SPECULATIVE_OCR_WORKERS = int(os.environ.get('SPECULATIVE_OCR_WORKERS', '2'))
+
+# Orçamento de latência (deadline_ms): custo inicial estimado de cada etapa
+# em segundos por megapixel, refinado por média móvel exponencial (EWMA)
+STAGE_COST_DEFAULTS = {'features': 0.05, 'paragraphs': 0.15, 'ocr': 3.0}
+STAGE_COST_EWMA_ALPHA = 0.2
+OCR_TIMEOUT_SECONDS = 30
+
+# Decode reduzido para o layout (1, 2 ou 4): caminho rápido opcional; a
+# requisição pode pedir outra escala com layout_scale
+LAYOUT_DECODE_SCALE = int(os.environ.get('LAYOUT_DECODE_SCALE', '1'))
+
+# Limiares recalibrados por escala de decode (o que não aparece é o nativo).
+# python -m benchmarks.calibrate_scales --pages 120 --seed 100: concordância da
+# classificação de layout com a escala 1 de 98,4% em 1/2 e 98,4% em 1/4 (79,5%
+# sem recalibrar); features + parágrafos 1,85x / 3,07x mais rápidos
+SCALE_THRESHOLDS = {
+    2: {'num_componentes': 336.0},
+    4: {'altura_min': 12.005, 'altura_max': 6.8254},
+}
+
+# Estimativa de palavras pelo layout quando o OCR é pulado
+# (componentes conectados ~ caracteres; ~5 componentes por palavra)
+COMPONENTES_POR_PALAVRA = 5.0
+
+logger = get_logger(__name__)
+
+SPECULATIVE_OCR = metrics.REGISTRY.counter(
+    'speculative_ocr_total', 'OCR especulativo por resultado (started/useful/wasted)', ('outcome',)
+)
+DEGRADATIONS = metrics.REGISTRY.counter(
+    'deadline_degradations_total', 'Etapas degradadas para cumprir deadline_ms', ('degradation',)
+)
 
 # Importar detector de parágrafos
 try:
@@ -26,12 +84,12 @@ TextAnalyzer = None
 try:
     # Tentar versão otimizada primeiro (5-10x mais rápida)
     from text_analyzer_optimized import TextAnalyzerOptimized as TextAnalyzer
-    print("⚡ Usando Text Analyzer OTIMIZADO (5-10x mais rápido)")
+    logger.info("⚡ Usando Text Analyzer OTIMIZADO (5-10x mais rápido)")
 except ImportError:
     try:
         # Fallback para versão original
         from text_analyzer import TextAnalyzer
-        print("⚠️  Usando Text Analyzer ORIGINAL (mais lento)")
+        logger.warning("⚠️  Usando Text Analyzer ORIGINAL (mais lento)")
     except ImportError:
         sys.path.append(os.path.dirname(os.path.abspath(__file__)))
         try:
@@ -71,62 +129,93 @@ class ClassificadorFinal:
         else:
             self.paragraph_detector = None
         
+        # Detector de colunas (calhas no perfil vertical)
+        self.column_detector = ColumnDetector()
+        
+        # Blocos de texto enviados ao OCR (sem fotos, logos e margens)
+        self.text_region_detector = text_regions.TextRegionDetector()
+        
+        # Orientação/inclinação pelos componentes (dispensa o OSD do Tesseract)
+        self.orientation_estimator = page_orientation.OrientationEstimator()
+        
         # Analisador de texto (OCR)
         if TextAnalyzer:
             self.text_analyzer = TextAnalyzer()
         else:
             self.text_analyzer = None
         
+        # Artefatos para re-pontuar sem decodificar (ANALYSIS_ARTIFACTS=1)
+        self.artifact_store = analysis_artifacts.ArtifactStore() if analysis_artifacts.ANALYSIS_ARTIFACTS else None
+        
+        # OCR especulativo (score parcial <= -threshold dispara o OCR antecipado)
+        self.speculative_ocr_enabled = SPECULATIVE_OCR_ENABLED
+        self.speculative_ocr_threshold = SPECULATIVE_OCR_THRESHOLD
+        self.speculative_ocr_stats = {'started': 0, 'useful': 0, 'wasted': 0}
+        self._speculative_lock = threading.Lock()
+        self._ocr_executor = None
+        
+        # Custo estimado por etapa (s/megapixel) para decisões de deadline
+        self.stage_costs = dict(STAGE_COST_DEFAULTS)
+        
         # Estatísticas do modelo
         self.accuracy = 0.9000
         self.advertisement_accuracy = 0.9046
         self.scientific_article_accuracy = 0.8930
         self.total_samples = 5085
     
-    def extract_features(self, image_path):
-        """Extrai features da imagem"""
-        img = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
+    def extract_features(self, image_path, scale=1):
+        """
+        Extrai features da imagem
         
-        # Fallback: tentar com PIL se OpenCV falhar
-        if img is None:
-            print(f"⚠️ OpenCV falhou ao ler {image_path}, tentando PIL...")
-            try:
-                from PIL import Image
-                pil_img = Image.open(image_path)
-                # Converter para grayscale
-                if pil_img.mode != 'L':
-                    pil_img = pil_img.convert('L')
-                img = np.array(pil_img)
-                print(f"✅ PIL conseguiu ler: {img.shape}")
-            except Exception as e:
-                print(f"❌ PIL também falhou: {e}")
-                raise ValueError(f"Não foi possível carregar: {image_path}")
+        scale=2/4: decode reduzido (orçamento de memória); alturas e larguras
+        são reescaladas para a resolução nativa. Imagens de 1 bit vêm já
+        binárias do decode (sem Otsu).
+        """
+        features, extra_features, _ = self.analyze_layout(image_path, scale)
+        return features, extra_features
+    
+    def analyze_layout(self, image_path, scale=1):
+        """
+        Features e perfis de layout (LayoutProfile) da mesma binária; o perfil
+        alimenta a detecção de parágrafos sem decodificar a página de novo
+        """
+        with metrics.stage('decode'):
+            binary = image_io.decode_bilevel_mask(image_path, scale)
+            ink = 1
+            if binary is None:
+                img = image_io.decode_grayscale(image_path, scale)
         
         # Binarização
-        _, binary = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        if binary is None:
+            with metrics.stage('otsu'):
+                _, binary = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+                memory_budget.track(binary)
+                ink = 255
+        metrics.IMAGE_MEGAPIXELS.observe(binary.shape[0] * binary.shape[1] * scale * scale / 1e6)
+        
+        profile = LayoutProfile.from_binary(binary, ink)
         
-        # Componentes conectados
-        num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        # Componentes conectados (estatísticas guardadas para os blocos do OCR)
+        with metrics.stage('connected_components'):
+            num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(binary, connectivity=8)
+            memory_budget.track(labels)
+        profile.components = stats
         
-        # Filtrar ruído
-        min_area = 10
+        with metrics.stage('component_stats'):
+            features, extra_features = self._features_from_stats(binary.shape, profile, num_labels, stats, scale)
+        return features, extra_features, profile
+    
+    def _features_from_stats(self, shape, profile, num_labels, stats, scale=1):
+        """Features a partir das estatísticas dos componentes conectados"""
+        # Filtrar ruído (área mínima equivalente a 10 px na resolução nativa)
+        min_area = max(1, round(10 / (scale * scale)))
         valid_components = []
         for i in range(1, num_labels):
             if stats[i, cv2.CC_STAT_AREA] >= min_area:
                 valid_components.append(i)
         
         if len(valid_components) == 0:
-            return {
-                'text_density': 0,
-                'num_text_components': 0,
-                'layout_transitions': 0
-            }, {
-                'avg_component_height': 0,
-                'height_std': 0,
-                'avg_component_width': 0,
-                'avg_aspect_ratio': 0,
-                'num_columns_detected': 0
-            }
+            return self._empty_features()
         
         # Estatísticas
         heights = [stats[i, cv2.CC_STAT_HEIGHT] for i in valid_components]
@@ -140,15 +229,14 @@ class ClassificadorFinal:
         
         # Densidade
         total_text_area = sum(areas)
-        image_area = img.shape[0] * img.shape[1]
+        image_area = shape[0] * shape[1]
         text_density = total_text_area / image_area if image_area > 0 else 0
         
         num_components = len(valid_components)
         
         # Transições de layout
-        v_projection = np.sum(binary, axis=1)
-        v_projection_norm = v_projection / (np.max(v_projection) + 1e-6)
-        layout_transitions = np.sum(np.abs(np.diff(v_projection_norm)) > 0.1)
+        layout_transitions = profile.layout_transitions
+        columns = self.column_detector.detect(profile.col_counts, scale)
         
         features = {
             'text_density': float(text_density),
@@ -157,21 +245,70 @@ class ClassificadorFinal:
         }
         
         extra_features = {
-            'avg_component_height': float(avg_height),
-            'height_std': float(height_std),
-            'avg_component_width': float(avg_width),
+            'avg_component_height': float(avg_height * scale),
+            'height_std': float(height_std * scale),
+            'avg_component_width': float(avg_width * scale),
             'avg_aspect_ratio': float(avg_aspect_ratio),
-            'num_columns_detected': 0
+            'num_columns_detected': columns['num_columns'],
+            'column_gutters': columns['gutters']
         }
         
         return features, extra_features
     
-    def calculate_score(self, features, extra_features):
+    def extract_features_striped(self, image_path, stripe_rows=None):
+        """Features equivalentes às de extract_features, lendo a página em faixas"""
+        return self._features_from_layout(striped_layout.analyze(image_path, stripe_rows))
+    
+    def _features_from_layout(self, layout):
+        """Features a partir das estatísticas acumuladas em faixas (striped_layout)"""
+        if layout.num_components == 0:
+            return self._empty_features()
+        
+        image_area = layout.width * layout.height
+        columns = self.column_detector.detect(layout.col_counts)
+        features = {
+            'text_density': float(layout.total_area / image_area) if image_area > 0 else 0.0,
+            'num_text_components': int(layout.num_components),
+            'layout_transitions': int(layout.layout_transitions)
+        }
+        extra_features = {
+            'avg_component_height': float(layout.avg_height),
+            'height_std': float(layout.height_std),
+            'avg_component_width': float(layout.width_sum / layout.num_components),
+            'avg_aspect_ratio': float(layout.aspect_sum / layout.num_components),
+            'num_columns_detected': columns['num_columns'],
+            'column_gutters': columns['gutters']
+        }
+        return features, extra_features
+    
+    @staticmethod
+    def _empty_features():
+        return {
+            'text_density': 0,
+            'num_text_components': 0,
+            'layout_transitions': 0
+        }, {
+            'avg_component_height': 0,
+            'height_std': 0,
+            'avg_component_width': 0,
+            'avg_aspect_ratio': 0,
+            'num_columns_detected': 0,
+            'column_gutters': []
+        }
+    
+    def thresholds_for(self, scale):
+        """Limiares para features medidas em decode 1/scale (SCALE_THRESHOLDS)"""
+        return {**self.thresholds, **SCALE_THRESHOLDS.get(scale, {})}
+    
+    def calculate_score(self, features, extra_features, thresholds=None):
         """
         Calcula score otimizado
         Score positivo = Advertisement
         Score negativo = Scientific Article
+        
+        thresholds: limiares da escala de decode (thresholds_for); padrão: nativos
         """
+        thresholds = thresholds or self.thresholds
         score = 0
         
         altura_media = extra_features['avg_component_height']
@@ -180,50 +317,51 @@ class ClassificadorFinal:
         num_componentes = features['num_text_components']
         
         # Regra 1: Altura média
-        if altura_media > self.thresholds['altura_max']:
+        if altura_media > thresholds['altura_max']:
             score += self.pesos['p1']
-        elif altura_media < self.thresholds['altura_min']:
+        elif altura_media < thresholds['altura_min']:
             score -= self.pesos['p1']
         
         # Regra 2: Desvio padrão da altura
-        if desvio_altura > self.thresholds['desvio_altura']:
+        if desvio_altura > thresholds['desvio_altura']:
             score += self.pesos['p2']
         
         # Regra 3: Densidade de texto
-        if densidade > self.thresholds['densidade_texto']:
+        if densidade > thresholds['densidade_texto']:
             score += self.pesos['p3']
         else:
             score -= self.pesos['p3']
         
         # Regra 4: Número de componentes
-        if num_componentes < self.thresholds['num_componentes']:
+        if num_componentes < thresholds['num_componentes']:
             score += self.pesos['p4']
         
         return score
     
-    def generate_explanation(self, classification, features, extra_features, num_lines, num_paragraphs, text_analysis=None, min_words=2000, min_paragraphs=8, language="pt"):
+    def generate_explanation(self, classification, features, extra_features, num_lines, num_paragraphs, text_analysis=None, min_words=2000, min_paragraphs=8, language="pt", thresholds=None):
         """Gera explicação textual sobre a classificação"""
         
+        thresholds = thresholds or self.thresholds
         is_english = language == "en"
         
         if classification == 'advertisement':
             reasons = []
             
-            if extra_features['avg_component_height'] > self.thresholds['altura_max']:
+            if extra_features['avg_component_height'] > thresholds['altura_max']:
                 reasons.append("larger letters than scientific article standard" if is_english else "letras maiores que o padrão de artigos científicos")
-            elif extra_features['avg_component_height'] < self.thresholds['altura_min']:
+            elif extra_features['avg_component_height'] < thresholds['altura_min']:
                 reasons.append("smaller and more varied letters" if is_english else "letras menores e mais variadas")
             
-            if extra_features['height_std'] > self.thresholds['desvio_altura']:
+            if extra_features['height_std'] > thresholds['desvio_altura']:
                 reasons.append("large variation in text element sizes" if is_english else "grande variação no tamanho dos elementos de texto")
             
-            if features['text_density'] < self.thresholds['densidade_texto']:
+            if features['text_density'] < thresholds['densidade_texto']:
                 reasons.append("low text density" if is_english else "baixa densidade de texto")
             
-            if features['num_text_components'] < self.thresholds['num_componentes']:
+            if features['num_text_components'] < thresholds['num_componentes']:
                 reasons.append("few text components" if is_english else "poucos componentes de texto")
             
-            if num_lines < self.thresholds['num_linhas']:
+            if num_lines < thresholds['num_linhas']:
                 reasons.append(f"only {num_lines} lines of text" if is_english else f"apenas {num_lines} linhas de texto")
             
             if len(reasons) == 0:
@@ -241,16 +379,16 @@ class ClassificadorFinal:
             reasons = []
             
             altura = extra_features['avg_component_height']
-            if self.thresholds['altura_min'] <= altura <= self.thresholds['altura_max']:
+            if thresholds['altura_min'] <= altura <= thresholds['altura_max']:
                 reasons.append("uniform and academic text height" if is_english else "altura de texto uniforme e acadêmica")
             
-            if features['text_density'] > self.thresholds['densidade_texto']:
+            if features['text_density'] > thresholds['densidade_texto']:
                 reasons.append("high text density" if is_english else "alta densidade de texto")
             
-            if features['num_text_components'] >= self.thresholds['num_componentes']:
+            if features['num_text_components'] >= thresholds['num_componentes']:
                 reasons.append("large amount of textual components" if is_english else "grande quantidade de componentes textuais")
             
-            if num_lines >= self.thresholds['num_linhas']:
+            if num_lines >= thresholds['num_linhas']:
                 reasons.append(f"{num_lines} lines of continuous text" if is_english else f"{num_lines} linhas de texto contínuo")
             
             if num_paragraphs > 1:
@@ -284,27 +422,505 @@ class ClassificadorFinal:
             
             return explanation
 
-    def classify(self, image_path, min_words=2000, min_paragraphs=8, language="pt"):
-        """Classifica uma imagem"""
-        features, extra_features = self.extract_features(image_path)
-        score = self.calculate_score(features, extra_features)
+    def _get_ocr_executor(self):
+        """Lazy init do pool de threads do OCR especulativo"""
+        with self._speculative_lock:
+            if self._ocr_executor is None:
+                self._ocr_executor = ThreadPoolExecutor(
+                    max_workers=SPECULATIVE_OCR_WORKERS,
+                    thread_name_prefix='speculative-ocr'
+                )
+        return self._ocr_executor
+    
+    def _record_speculation(self, outcome):
+        """Contabiliza OCR especulativo (started / useful / wasted)"""
+        with self._speculative_lock:
+            self.speculative_ocr_stats[outcome] += 1
+        SPECULATIVE_OCR.inc(outcome=outcome)
+    
+    def should_speculate_ocr(self, partial_score):
+        """
+        Decide se o OCR deve começar antes da detecção de parágrafos.
+        partial_score é o score das regras 1-4 (negativo = científico).
+        """
+        if not self.speculative_ocr_enabled or not self.text_analyzer:
+            return False
+        return partial_score <= -self.speculative_ocr_threshold
+    
+    def _run_text_analysis(self, image_path, timeout=OCR_TIMEOUT_SECONDS, layout_hints=None, cancel=None):
+        """Executa o OCR (versão otimizada se disponível); cancel interrompe o OCR especulativo"""
+        # Usar método otimizado se disponível, senão fallback para original
+        if hasattr(self.text_analyzer, 'analyze_fast'):
+            # Versão OTIMIZADA (5-10x mais rápida) com timeout, blocos de texto e orientação
+            return self.text_analyzer.analyze_fast(image_path, timeout=timeout, cancel=cancel,
+                                                   **(layout_hints or {}))
+        # Fallback para versão original
+        return self.text_analyzer.analyze(image_path)
+    
+    def find_text_regions(self, layout, scale=1):
+        """
+        Blocos de texto (coordenadas nativas, ordem de leitura) a partir dos
+        componentes guardados no perfil; None = OCR da página inteira
+        (desligado, modo em faixas ou página sem blocos)
+        """
+        components = getattr(layout, 'components', None)
+        if not text_regions.OCR_TEXT_REGIONS or components is None:
+            return None
+        with metrics.stage('text_regions'):
+            regions = self.text_region_detector.detect(components, (layout.height, layout.width), scale)
+        return regions or None
+    
+    def estimate_orientation(self, layout, scale=1):
+        """Rotação e inclinação da página pelos componentes guardados no perfil (None sem componentes)"""
+        components = getattr(layout, 'components', None)
+        if components is None:
+            return None
+        with metrics.stage('orientation'):
+            return self.orientation_estimator.estimate(components, (layout.height, layout.width), scale)
+    
+    def ocr_layout_hints(self, layout, orientation, scale=1, profile=None, language='pt'):
+        """
+        Argumentos de layout do OCR: a orientação quando a página precisa ser
+        girada/endireitada (os blocos foram medidos na página torta), senão
+        os blocos de texto; mais o perfil de OCR e o idioma
+        """
+        hints = {'profile': profile, 'language': language}
+        if orientation and orientation['needs_correction']:
+            hints['orientation'] = orientation
+        else:
+            hints['regions'] = self.find_text_regions(layout, scale)
+        return hints
+    
+    def _image_megapixels(self, image_path):
+        """Megapixels da imagem lidos apenas do cabeçalho (sem decodificar)"""
+        width, height = image_io.image_size(image_path)
+        return (width * height) / 1e6
+    
+    def _update_stage_cost(self, stage, elapsed, megapixels):
+        """Atualiza o custo estimado (s/megapixel) da etapa via EWMA"""
+        if megapixels <= 0:
+            return
+        observed = elapsed / megapixels
+        self.stage_costs[stage] += STAGE_COST_EWMA_ALPHA * (observed - self.stage_costs[stage])
+    
+    def _fits_deadline(self, deadline, stage, megapixels):
+        """Verifica se a etapa cabe no tempo restante do orçamento"""
+        if deadline is None:
+            return True
+        remaining = deadline - time.monotonic()
+        return remaining >= self.stage_costs[stage] * max(megapixels, 0.1)
+    
+    def estimate_cost(self, megapixels):
+        """Custo estimado de CPU (s) de uma classificação completa"""
+        return sum(self.stage_costs.values()) * max(megapixels, 0.1)
+    
+    def line_rule_score(self, num_lines, thresholds=None):
+        """Regra 5: Número de linhas"""
+        thresholds = thresholds or self.thresholds
+        if num_lines < thresholds['num_linhas']:
+            return self.pesos['p5']  # Advertisement
+        return -self.pesos['p5']  # Scientific Article
+    
+    def estimate_word_count(self, features):
+        """Estimativa de palavras pelo layout (usada quando o OCR é pulado)"""
+        return int(features['num_text_components'] / COMPONENTES_POR_PALAVRA)
+
+    def classify(self, image_path, min_words=2000, min_paragraphs=8, language="pt", deadline_ms=None,
+                 image_info=None, layout_scale=None, ocr_profile=None):
+        """
+        Classifica uma imagem
+        
+        deadline_ms: orçamento de latência opcional. Etapas que não cabem no
+        tempo restante são degradadas (ver result['degradations']).
+        
+        A estratégia de decode vem do orçamento de memória (memory_budget.plan,
+        pelas dimensões do cabeçalho); result['memory'] traz a estratégia e o
+        pico de memória por etapa. Levanta MemoryBudgetExceeded se não couber.
+        
+        image_info: metadados da pré-verificação (tiff_header.TiffInfo); se
+        None, o cabeçalho é lido aqui. result['image'] traz os metadados.
+        
+        layout_scale: decode do layout em 1/2 ou 1/4 (caminho rápido, com os
+        limiares recalibrados da escala); padrão LAYOUT_DECODE_SCALE.
+        
+        ocr_profile: perfil do OCR (speed, balanced, accurate); None/auto =
+        escolhido pelo layout e pelo idioma (ocr_profiles.choose_profile).
+        result['ocr_profile'] traz o perfil usado.
+        
+        TIFFs multipágina são classificados página a página (iter_classify) e
+        o resultado é o do documento, com result['pages'] por página.
+        """
+        for _, result in self.iter_classify(image_path, min_words, min_paragraphs, language, deadline_ms,
+                                            image_info=image_info, layout_scale=layout_scale,
+                                            ocr_profile=ocr_profile):
+            pass
+        return result
+    
+    def iter_classify(self, image_path, min_words=2000, min_paragraphs=8, language="pt", deadline_ms=None,
+                      image_info=None, layout_scale=None, workers=None, ocr_profile=None):
+        """
+        (página, resultado) de cada página de um TIFF multipágina, na ordem em
+        que terminam, e por último (None, resultado do documento). As páginas
+        são extraídas uma a uma e classificadas em paralelo (multipage.map_pages,
+        até `workers` por vez); o deadline vale para o documento inteiro.
+        Documentos de uma página (ou MULTIPAGE_MODE=first) geram só (None, resultado).
+        As páginas em andamento dividem o orçamento de memória da requisição
+        (REQUEST_MEMORY_BUDGET_MB / workers cada); o `memory` do documento traz
+        o pico medido das páginas vivas ao mesmo tempo.
+        As contagens de palavras (TokenStats) das páginas são somadas no
+        documento e retiradas dos resultados. Com o armazenamento de artefatos
+        ativo, cada página grava o seu (chave: hash do documento).
+        """
+        if image_info is None:
+            image_info = tiff_header.inspect_or_none(image_path)
+        page_count = image_info.page_count if image_info is not None else 1
+        if page_count <= 1 or multipage.MULTIPAGE_MODE != 'all':
+            result = self._classify_page(image_path, min_words, min_paragraphs, language, deadline_ms,
+                                         image_info, layout_scale, ocr_profile)
+            result.pop('token_stats', None)
+            if self.artifact_store is not None:
+                self._save_artifact(result, analysis_artifacts.document_hash(image_path))
+            yield None, result
+            return
+        
+        deadline = None
+        if deadline_ms is not None:
+            deadline = time.monotonic() + deadline_ms / 1000.0
+        workers = multipage.worker_count(workers, page_count)
+        budget_bytes = memory_budget.request_budget_bytes()
+        document_memory = memory_budget.MemoryAccount()
+        
+        def classify_page(index, page_path):
+            remaining_ms = None
+            if deadline is not None:
+                remaining_ms = max((deadline - time.monotonic()) * 1000, 1)
+            with metrics.stage('page'):
+                result = self._classify_page(page_path, min_words, min_paragraphs, language, remaining_ms,
+                                             None, layout_scale, ocr_profile, budget_bytes=budget_bytes / workers,
+                                             memory_parent=document_memory)
+            result['page'] = index
+            return result
+        
+        document_hash = None
+        if self.artifact_store is not None:
+            document_hash = analysis_artifacts.document_hash(image_path)
+        pages = {}
+        page_stats = {}
+        for index, result in multipage.map_pages(classify_page, image_path, page_count, workers):
+            pages[index] = result
+            page_stats[index] = result.pop('token_stats', None)
+            if document_hash is not None:
+                self._save_artifact(result, analysis_artifacts.page_key(document_hash, index))
+            yield index, result
+        
+        order = sorted(pages)
+        document = self.aggregate_pages([pages[index] for index in order],
+                                        min_words=min_words, min_paragraphs=min_paragraphs, language=language,
+                                        token_stats=[page_stats[index] for index in order])
+        document['image'] = image_info.to_dict()
+        document['memory'] = {
+            'workers': workers,
+            'budget_bytes': int(budget_bytes),
+            'page_budget_bytes': int(budget_bytes / workers),
+            'peak_bytes': int(document_memory.peak),
+            'page_peak_bytes': max(pages[index]['memory']['peak_bytes'] for index in order),
+        }
+        yield None, document
+    
+    def aggregate_pages(self, pages, min_words=2000, min_paragraphs=8, language="pt", token_stats=None):
+        """
+        Resultado do documento a partir dos resultados por página: classe da
+        maioria das páginas (empate: sinal do score médio), confiança média
+        das páginas da classe vezes a fração delas, contagens somadas
+        (componentes, linhas, parágrafos, palavras) e médias das
+        alturas/larguras ponderadas pelo número de componentes. A conformidade
+        usa as palavras e parágrafos somados; páginas sem OCR (classificadas
+        como anúncio) não contribuem com palavras.
+        
+        token_stats: TokenStats de cada página (None sem OCR); quando todas as
+        páginas com OCR têm, as palavras frequentes saem das contagens somadas
+        (senão, da soma das listas top-10 de cada página).
+        """
+        score = float(np.mean([page['score'] for page in pages]))
+        articles = sum(page['classification'] == 'scientific_article' for page in pages)
+        if articles * 2 == len(pages):
+            classification = 'advertisement' if score > 0 else 'scientific_article'
+        else:
+            classification = 'scientific_article' if articles * 2 > len(pages) else 'advertisement'
+        agreeing = [page['confidence'] for page in pages if page['classification'] == classification]
+        confidence = float(np.mean(agreeing)) * len(agreeing) / len(pages) if agreeing else 0.0
+        
+        components = np.array([page['features']['num_text_components'] for page in pages], dtype=np.float64)
+        weights = components if components.sum() > 0 else None
+        features = {
+            'text_density': float(np.mean([page['features']['text_density'] for page in pages])),
+            'num_text_components': int(components.sum()),
+            'layout_transitions': int(sum(page['features']['layout_transitions'] for page in pages))
+        }
+        extra_features = {
+            key: float(np.average([page['extra_features'][key] for page in pages], weights=weights))
+            for key in ('avg_component_height', 'height_std', 'avg_component_width', 'avg_aspect_ratio')
+        }
+        # Colunas da página com mais colunas (mesmo formato do resultado de uma página)
+        widest = max(pages, key=lambda page: page['extra_features']['num_columns_detected'])
+        extra_features['num_columns_detected'] = widest['extra_features']['num_columns_detected']
+        extra_features['column_gutters'] = widest['extra_features'].get('column_gutters', [])
+        
+        num_lines = sum(page.get('num_lines', 0) for page in pages)
+        num_paragraphs = sum(page.get('num_paragraphs', 0) for page in pages)
+        degradations = []
+        for page in pages:
+            degradations.extend(d for d in page['degradations'] if d not in degradations)
+        
+        result = {
+            'classification': classification,
+            'score': score,
+            'confidence': confidence,
+            'features': features,
+            'extra_features': extra_features,
+            'degradations': degradations,
+            'page_count': len(pages),
+            'pages': [self.page_summary(page) for page in pages]
+        }
+        if num_lines > 0:
+            result['num_lines'] = num_lines
+        if num_paragraphs > 0:
+            result['num_paragraphs'] = num_paragraphs
+        
+        text_analysis = None
+        ocr_pages = [page for page in pages if 'word_count' in page]
+        if classification == 'scientific_article' and self.text_analyzer and ocr_pages:
+            word_count = sum(page['word_count'] for page in ocr_pages)
+            shards = [stats for page, stats in zip(pages, token_stats or [None] * len(pages)) if 'word_count' in page]
+            if all(stats is not None for stats in shards):
+                frequent_words = [{'word': word, 'count': count}
+                                  for word, count in TokenStats.merged(shards).most_common(10)]
+            else:
+                frequent_words = multipage.merge_frequent_words(page.get('frequent_words') for page in ocr_pages)
+            text_analysis = {
+                'text': '',
+                'word_count': word_count,
+                'frequent_words': frequent_words
+            }
+            result['word_count'] = word_count
+            result['frequent_words'] = text_analysis['frequent_words']
+            if any(page.get('word_count_estimated') for page in ocr_pages):
+                result['word_count_estimated'] = True
+            result['is_compliant'], _ = self.text_analyzer.check_compliance(
+                word_count, num_paragraphs, min_words=min_words, min_paragraphs=min_paragraphs
+            )
+        
+        result['explanation'] = self.generate_explanation(
+            classification, features, extra_features, num_lines, num_paragraphs, text_analysis,
+            min_words=min_words, min_paragraphs=min_paragraphs, language=language
+        )
+        return result
+    
+    @staticmethod
+    def page_summary(page):
+        """Campos de uma página repetidos em result['pages']"""
+        summary = {key: page[key] for key in ('page', 'classification', 'score', 'confidence', 'degradations')}
+        for key in ('num_lines', 'num_paragraphs', 'word_count', 'is_compliant', 'orientation', 'ocr_profile'):
+            if key in page:
+                summary[key] = page[key]
+        return summary
+    
+    def _save_artifact(self, result, key):
+        """Grava o artefato da página (result['artifact'], retirado do resultado)"""
+        arrays = result.pop('artifact', None)
+        if arrays is None:
+            return
+        try:
+            with metrics.stage('artifact_save'):
+                self.artifact_store.save(key, arrays)
+        except OSError as e:
+            logger.warning("⚠️ Falha ao gravar artefato de análise %s: %s", key, e)
+    
+    def rescore(self, artifacts, min_words=2000, min_paragraphs=8, language="pt"):
+        """
+        Reclassifica um documento a partir dos artefatos de análise
+        (analysis_artifacts.ArtifactStore.document), sem decodificar a imagem:
+        features recalculadas dos componentes guardados, score com os limiares
+        atuais, parágrafos das linhas guardadas e conformidade pelas contagens
+        de palavras do OCR. Vários artefatos (TIFF multipágina) são agregados
+        como em iter_classify.
+        """
+        if not artifacts:
+            raise ValueError("Nenhum artefato para re-pontuar")
+        pages = [self._rescore_page(artifact, min_words, min_paragraphs, language) for artifact in artifacts]
+        if len(artifacts) == 1 and artifacts[0].page is None:
+            return pages[0]
+        for page, artifact in zip(pages, artifacts):
+            page['page'] = artifact.page
+        return self.aggregate_pages(pages, min_words=min_words, min_paragraphs=min_paragraphs, language=language,
+                                    token_stats=[artifact.token_stats() for artifact in artifacts])
+    
+    def _rescore_page(self, artifact, min_words, min_paragraphs, language):
+        """
+        Uma página re-pontuada. Páginas sem OCR no artefato (anúncio na
+        classificação original) que agora são artigo usam a estimativa de
+        palavras pelo layout (degradação ocr_skipped)
+        """
+        meta = artifact.meta
+        scale = meta['scale']
+        thresholds = self.thresholds_for(scale)
+        layout = artifact.layout_profile()
+        if layout.components is not None:
+            features, extra_features = self._features_from_stats(
+                (layout.height, layout.width), layout, len(layout.components), layout.components, scale)
+        else:
+            # Leitura em faixas: só as estatísticas agregadas foram guardadas
+            features, extra_features = meta['features'], meta['extra_features']
+        score = self.calculate_score(features, extra_features, thresholds)
+        
+        num_lines = 0
+        num_paragraphs = 0
+        if self.paragraph_detector:
+            line_scale = 1 if meta['strategy'] == 'stripes' else scale
+            lines = artifact.lines()
+            if lines is None:
+                lines = self.paragraph_detector.detect_text_lines_from_profile(
+                    layout.row_counts, layout.row_left, line_scale, layout.row_right)
+            num_lines = len(lines)
+            num_paragraphs, _ = self.paragraph_detector.detect_paragraphs(lines, line_scale)
+            score += self.line_rule_score(num_lines, thresholds)
+        
+        classification = 'advertisement' if score > 0 else 'scientific_article'
+        result = {
+            'classification': classification,
+            'score': float(score),
+            'confidence': float(min(abs(score) / 10.0, 1.0)),
+            'features': features,
+            'extra_features': extra_features,
+            'degradations': []
+        }
+        if 'orientation' in meta:
+            result['orientation'] = meta['orientation']
+        if num_lines > 0:
+            result['num_lines'] = num_lines
+        if num_paragraphs > 0:
+            result['num_paragraphs'] = num_paragraphs
+        
+        text_analysis = None
+        if classification == 'scientific_article' and self.text_analyzer:
+            stats = artifact.token_stats()
+            if stats is not None:
+                text_analysis = {'text': '', 'word_count': stats.total, 'frequent_words': stats.most_common(10)}
+                if meta.get('ocr_profile'):
+                    result['ocr_profile'] = meta['ocr_profile']
+            else:
+                result['degradations'].append('ocr_skipped')
+                text_analysis = {'text': '', 'word_count': self.estimate_word_count(features), 'frequent_words': []}
+                result['word_count_estimated'] = True
+            result['word_count'] = text_analysis['word_count']
+            result['frequent_words'] = [{'word': word, 'count': count}
+                                        for word, count in text_analysis['frequent_words']]
+            result['is_compliant'], _ = self.text_analyzer.check_compliance(
+                text_analysis['word_count'], num_paragraphs, min_words=min_words, min_paragraphs=min_paragraphs
+            )
+        
+        result['explanation'] = self.generate_explanation(
+            classification, features, extra_features, num_lines, num_paragraphs, text_analysis,
+            min_words=min_words, min_paragraphs=min_paragraphs, language=language, thresholds=thresholds
+        )
+        return result
+    
+    def _classify_page(self, image_path, min_words, min_paragraphs, language, deadline_ms, image_info, layout_scale,
+                       ocr_profile=None, budget_bytes=None, memory_parent=None):
+        """
+        Uma página: orçamento de memória, pipeline e metadados do cabeçalho.
+        budget_bytes: fatia do orçamento da requisição (páginas em paralelo);
+        memory_parent: conta do documento que soma as páginas vivas.
+        """
+        if image_info is None:
+            image_info = tiff_header.inspect_or_none(image_path)
+        if image_info is not None:
+            width, height = image_info.width, image_info.height
+        else:
+            width, height = image_io.image_size(image_path)
+        plan = memory_budget.plan(width, height, budget_bytes=budget_bytes, ocr=self.text_analyzer is not None,
+                                  stripe_rows=striped_layout.stripe_rows_for(image_info),
+                                  prefer_stripes=striped_layout.STRIPE_MODE == 'always',
+                                  min_scale=layout_scale or LAYOUT_DECODE_SCALE)
+        account = memory_budget.MemoryAccount(plan, parent=memory_parent)
+        tokens = account.activate()
+        try:
+            result = self._classify(image_path, plan, min_words, min_paragraphs, language, deadline_ms, ocr_profile)
+        finally:
+            account.deactivate(tokens)
+        result['memory'] = account.report()
+        if image_info is not None:
+            result['image'] = image_info.to_dict()
+        if plan.scale > 1:
+            result['degradations'].append(f'decode_{plan.strategy}')
+            DEGRADATIONS.inc(degradation=f'decode_{plan.strategy}')
+        return result
+    
+    def _classify(self, image_path, plan, min_words, min_paragraphs, language, deadline_ms, ocr_profile=None):
+        """Pipeline de classificação com a estratégia de decode já escolhida"""
+        deadline = None
+        if deadline_ms is not None:
+            deadline = time.monotonic() + deadline_ms / 1000.0
+        degradations = []
+        megapixels = plan.width * plan.height / 1e6
+        thresholds = self.thresholds_for(plan.scale)
+        # Custos por megapixel só aprendidos na resolução nativa inteira
+        learn_costs = plan.strategy == 'full'
+        
+        start_stage = time.monotonic()
+        if plan.strategy == 'stripes':
+            # Páginas grandes: features e perfil de linhas na mesma leitura em faixas
+            layout = striped_layout.analyze(image_path, plan.stripe_rows)
+            features, extra_features = self._features_from_layout(layout)
+        else:
+            # Perfis da binária das features reaproveitados pelos parágrafos
+            features, extra_features, layout = self.analyze_layout(image_path, scale=plan.scale)
+        if learn_costs:
+            self._update_stage_cost('features', time.monotonic() - start_stage, megapixels)
+        orientation = self.estimate_orientation(layout, plan.scale)
+        ocr_profile = ocr_profiles.choose_profile(features, extra_features, plan.width, language, ocr_profile)
+        score = self.calculate_score(features, extra_features, thresholds)
+        
+        # OCR especulativo: roda em paralelo com a detecção de parágrafos
+        ocr_future = None
+        ocr_cancel = threading.Event()
+        if self.should_speculate_ocr(score) and self._fits_deadline(deadline, 'ocr', megapixels):
+            ocr_timeout = OCR_TIMEOUT_SECONDS
+            if deadline is not None:
+                ocr_timeout = min(ocr_timeout, max(deadline - time.monotonic(), 0.1))
+            # copy_context: a thread do OCR registra seus timings na requisição atual
+            ocr_future = self._get_ocr_executor().submit(
+                contextvars.copy_context().run, self._run_text_analysis, image_path, ocr_timeout,
+                self.ocr_layout_hints(layout, orientation, plan.scale, ocr_profile, language), ocr_cancel
+            )
+            self._record_speculation('started')
         
         # Detectar parágrafos e linhas (nova feature)
         num_lines = 0
         num_paragraphs = 0
+        lines = None
         if self.paragraph_detector:
-            try:
-                para_stats = self.paragraph_detector.analyze(image_path)
-                num_lines = para_stats['num_lines']
-                num_paragraphs = para_stats['num_paragraphs']
-                
-                # Regra 5: Número de linhas
-                if num_lines < self.thresholds['num_linhas']:
-                    score += self.pesos['p5']  # Advertisement
-                else:
-                    score -= self.pesos['p5']  # Scientific Article
-            except:
-                pass
+            if self._fits_deadline(deadline, 'paragraphs', megapixels):
+                try:
+                    start_stage = time.monotonic()
+                    with metrics.stage('paragraph_detection'):
+                        scale = 1 if plan.strategy == 'stripes' else plan.scale
+                        para_stats = self.paragraph_detector.analyze_layout(
+                            layout, scale=scale, with_lines=self.artifact_store is not None)
+                    if learn_costs:
+                        self._update_stage_cost('paragraphs', time.monotonic() - start_stage, megapixels)
+                    num_lines = para_stats['num_lines']
+                    num_paragraphs = para_stats['num_paragraphs']
+                    lines = para_stats.get('lines')
+                    score += self.line_rule_score(num_lines, thresholds)
+                except:
+                    pass
+            else:
+                # Sem tempo: estimar linhas pelas transições do perfil horizontal
+                # (cada linha de texto gera ~2 transições: início e fim)
+                degradations.append('paragraph_detection_skipped')
+                num_lines = features['layout_transitions'] // 2
+                score += self.line_rule_score(num_lines, thresholds)
         
         classification = 'advertisement' if score > 0 else 'scientific_article'
         confidence = min(abs(score) / 10.0, 1.0)
@@ -314,9 +930,14 @@ class ClassificadorFinal:
             'score': float(score),
             'confidence': float(confidence),
             'features': features,
-            'extra_features': extra_features
+            'extra_features': extra_features,
+            'degradations': degradations
         }
         
+        # Rotação/inclinação estimadas (e se o OCR corrigiu a página)
+        if orientation is not None:
+            result['orientation'] = orientation
+        
         # Adicionar número de linhas e parágrafos ao resultado
         if num_lines > 0:
             result['num_lines'] = num_lines
@@ -325,35 +946,57 @@ class ClassificadorFinal:
         
         # Se for artigo científico, fazer análise de texto via OCR
         text_analysis = None
-        print(f"🔍 DEBUG: classification = {classification}, has text_analyzer = {self.text_analyzer is not None}")
+        logger.debug("🔍 classification=%s score=%.3f degradations=%s", classification, score, degradations)
         
         if classification == 'scientific_article' and self.text_analyzer:
-            print("🔍 Iniciando análise de texto para artigo científico...")
             try:
-                import time
                 start_ocr = time.time()
-                print("🔍 Extraindo texto do artigo científico (OCR otimizado)...")
-                
-                # Usar método otimizado se disponível, senão fallback para original
-                has_fast = hasattr(self.text_analyzer, 'analyze_fast')
-                print(f"🔍 DEBUG: text_analyzer tem analyze_fast? {has_fast}")
                 
-                if has_fast:
-                    # Versão OTIMIZADA (5-10x mais rápida) com timeout de 30s
-                    print("⚡ Usando analyze_fast...")
-                    text_analysis = self.text_analyzer.analyze_fast(image_path, timeout=30)
+                if ocr_future is not None:
+                    # OCR já iniciado especulativamente: apenas aguardar
+                    logger.debug("⚡ Usando resultado do OCR especulativo")
+                    wait = None
+                    if deadline is not None:
+                        wait = max(deadline - time.monotonic(), 0)
+                    try:
+                        with metrics.stage('ocr_wait'):
+                            text_analysis = ocr_future.result(timeout=wait)
+                    except FutureTimeoutError:
+                        # Libera a thread do pool: o Tesseract é morto, não roda até o próprio timeout
+                        ocr_cancel.set()
+                        self._record_speculation('wasted')
+                        raise TimeoutError("OCR especulativo excedeu o deadline")
+                    except Exception:
+                        self._record_speculation('wasted')
+                        raise
+                    self._record_speculation('useful')
+                    result['ocr_profile'] = ocr_profile
+                elif self._fits_deadline(deadline, 'ocr', megapixels):
+                    logger.debug("🔍 Extraindo texto do artigo científico (OCR otimizado)")
+                    ocr_timeout = OCR_TIMEOUT_SECONDS
+                    if deadline is not None:
+                        ocr_timeout = min(ocr_timeout, max(deadline - time.monotonic(), 0.1))
+                    with metrics.stage('ocr'):
+                        hints = self.ocr_layout_hints(layout, orientation, plan.scale, ocr_profile, language)
+                        text_analysis = self._run_text_analysis(image_path, ocr_timeout, hints)
+                    result['ocr_profile'] = ocr_profile
+                    self._update_stage_cost('ocr', time.time() - start_ocr, megapixels)
                 else:
-                    # Fallback para versão original
-                    print("⚠️ Usando analyze (versão original)...")
-                    text_analysis = self.text_analyzer.analyze(image_path)
+                    # Sem tempo para OCR: estimar palavras pelo layout
+                    degradations.append('ocr_skipped')
+                    text_analysis = {
+                        'text': '',
+                        'word_count': self.estimate_word_count(features),
+                        'frequent_words': []
+                    }
+                    result['word_count_estimated'] = True
                 
                 elapsed_ocr = time.time() - start_ocr
                 
-                print(f"🔍 DEBUG: text_analysis = {text_analysis is not None}")
-                print(f"🔍 DEBUG: word_count = {text_analysis.get('word_count', 'N/A')}")
-                print(f"🔍 DEBUG: frequent_words length = {len(text_analysis.get('frequent_words', []))}")
-                
                 result['word_count'] = text_analysis['word_count']
+                # Contagens completas das palavras (documento multipágina soma as páginas)
+                if text_analysis.get('token_stats') is not None:
+                    result['token_stats'] = text_analysis['token_stats']
                 
                 # Converter tuplas (palavra, count) para dicionários {word: ..., count: ...}
                 frequent_words_list = text_analysis['frequent_words']
@@ -379,28 +1022,56 @@ class ClassificadorFinal:
                 )
                 result['is_compliant'] = is_compliant
                 
-                print(f"✅ Análise de texto completa: {text_analysis['word_count']} palavras, {len(text_analysis['frequent_words'])} palavras frequentes, conforme={is_compliant} ({elapsed_ocr:.2f}s)")
+                logger.debug("✅ Análise de texto completa: %d palavras, %d palavras frequentes, conforme=%s (%.2fs)",
+                             text_analysis['word_count'], len(text_analysis['frequent_words']), is_compliant, elapsed_ocr)
             except TimeoutError as e:
-                print(f"⚠️ OCR timeout (>30s) - Documento muito grande ou ilegível: {e}")
-                result['word_count'] = 0
+                logger.warning("⚠️ OCR timeout - Documento muito grande ou ilegível: %s", e)
                 result['frequent_words'] = []
-                result['is_compliant'] = False
+                if deadline is not None:
+                    # Com deadline: responder com a estimativa pelo layout
+                    degradations.append('ocr_timeout')
+                    text_analysis = {
+                        'text': '',
+                        'word_count': self.estimate_word_count(features),
+                        'frequent_words': []
+                    }
+                    result['word_count'] = text_analysis['word_count']
+                    result['word_count_estimated'] = True
+                    result['is_compliant'], _ = self.text_analyzer.check_compliance(
+                        text_analysis['word_count'], num_paragraphs,
+                        min_words=min_words, min_paragraphs=min_paragraphs
+                    )
+                else:
+                    result['word_count'] = 0
+                    result['is_compliant'] = False
             except Exception as e:
-                print(f"⚠️ Erro na análise de texto: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("⚠️ Erro na análise de texto: %s", e)
                 result['word_count'] = 0
                 result['frequent_words'] = []
                 result['is_compliant'] = False
         else:
+            if ocr_future is not None:
+                # Especulação errada (advertisement): cancela o OCR ainda na fila
+                # e interrompe o que já está rodando (mata o Tesseract)
+                ocr_future.cancel()
+                ocr_cancel.set()
+                self._record_speculation('wasted')
             if classification == 'scientific_article':
-                print(f"⚠️ Artigo científico MAS sem text_analyzer disponível!")
+                logger.warning("⚠️ Artigo científico MAS sem text_analyzer disponível!")
+        
+        for degradation in degradations:
+            DEGRADATIONS.inc(degradation=degradation)
         
         # Gerar explicação (incluindo conformidade se houver)
         result['explanation'] = self.generate_explanation(
-            classification, features, extra_features, num_lines, num_paragraphs, text_analysis, min_words=min_words, min_paragraphs=min_paragraphs, language=language
+            classification, features, extra_features, num_lines, num_paragraphs, text_analysis, min_words=min_words, min_paragraphs=min_paragraphs, language=language, thresholds=thresholds
         )
         
+        # Artefato de análise (gravado e retirado do resultado por iter_classify)
+        if self.artifact_store is not None:
+            with metrics.stage('artifact_build'):
+                result['artifact'] = analysis_artifacts.build(layout, plan, result, lines, result.get('token_stats'))
+        
         return result
 
 if __name__ == '__main__':
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Detector de Colunas - calhas no perfil vertical de tinta"""
+import numpy as np
+
+
+class ColumnDetector:
+    def __init__(self):
+        # Coluna da imagem é "vazia" com menos tinta que 5% da mediana das
+        # colunas com texto (títulos que atravessam a calha não a escondem)
+        self.gutter_ink_ratio = 0.05
+        self.min_gutter_ratio = 0.01  # largura mínima da calha: 1% da página
+        self.min_column_ratio = 0.1  # coluna de texto com ao menos 10% da página
+
+    def detect(self, column_profile, scale=1):
+        """
+        Colunas a partir do perfil vertical (pixels de texto por coluna da
+        imagem). Calhas são trechos vazios entre a primeira e a última coluna
+        com tinta, largos o bastante e com texto dos dois lados. Posições
+        em pixels da resolução nativa (x scale).
+
+        Retorna {'num_columns', 'gutters': [[x0, x1], ...], 'columns': [[x0, x1], ...]}
+        """
+        column_profile = np.asarray(column_profile)
+        width = len(column_profile)
+        inked = np.flatnonzero(column_profile)
+        if inked.size == 0:
+            return {'num_columns': 0, 'gutters': [], 'columns': []}
+
+        left, right = int(inked[0]), int(inked[-1]) + 1
+        body = column_profile[left:right]
+        threshold = self.gutter_ink_ratio * np.median(body[body > 0])
+        empty = np.concatenate(([0], (body <= threshold).view(np.int8), [0]))
+        edges = np.flatnonzero(np.diff(empty))
+        starts, ends = edges[0::2] + left, edges[1::2] + left
+
+        min_gutter = max(2, self.min_gutter_ratio * width)
+        min_column = self.min_column_ratio * width
+        wide = (ends - starts) >= min_gutter
+        starts, ends = starts[wide], ends[wide]
+
+        # Limites das colunas; calhas que deixariam uma coluna estreita demais
+        # (ex.: numeração de linhas, marcas na margem) são descartadas
+        gutters = []
+        column_start = left
+        for start, end in zip(starts, ends):
+            if start - column_start >= min_column and right - end >= min_column:
+                gutters.append((int(start), int(end)))
+                column_start = int(end)
+
+        bounds = [left] + [x for gutter in gutters for x in gutter] + [right]
+        columns = [[bounds[i] * scale, bounds[i + 1] * scale] for i in range(0, len(bounds), 2)]
+        return {
+            'num_columns': len(columns),
+            'gutters': [[start * scale, end * scale] for start, end in gutters],
+            'columns': columns
+        }
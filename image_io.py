@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Leitura de Imagens - decode em escala de cinza, opcionalmente reduzido
+
+Ponto único de decode do pipeline (features, parágrafos e OCR). Os buffers
+retornados são contabilizados no orçamento de memória da requisição
+(memory_budget.track).
+
+scale=2/4 usa IMREAD_REDUCED_GRAYSCALE_2/4. Para TIFF o OpenCV decodifica a
+página inteira e reduz em seguida, então o buffer completo (1 byte/pixel)
+ainda existe por um instante; o ganho está nas cópias seguintes (binária,
+rótulos int32), que ficam 4x/16x menores.
+
+Imagens de 1 bit (CCITT G4 dos scans tipo RVL-CDIP) já são binárias:
+decode_bilevel_mask() devolve a máscara de tinta direto, sem expandir para
+cinza nem passar pelo Otsu (BILEVEL_FAST_PATH=0 desativa).
+
+iter_grayscale_stripes() lê a página em faixas horizontais: cada strip/tile
+do TIFF é decodificado sozinho (um TIFF mínimo com as tags de compressão da
+página), então a memória fica proporcional à faixa, não à página.
+"""
+
+import os
+import struct
+
+import cv2
+import numpy as np
+
+import memory_budget
+import tiff_header
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+BILEVEL_FAST_PATH = os.environ.get('BILEVEL_FAST_PATH', '1') == '1'
+
+_IMREAD_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+}
+
+
+def image_size(image_path):
+    """(largura, altura) lidos apenas do cabeçalho; (0, 0) se ilegível"""
+    try:
+        from PIL import Image
+        with Image.open(image_path) as pil_img:
+            return pil_img.size
+    except Exception:
+        return 0, 0
+
+
+def decode_grayscale(image_path, scale=1):
+    """
+    Decodifica a imagem em escala de cinza (uint8), reduzida por `scale`
+    (1, 2 ou 4). Usa o PIL como fallback quando o OpenCV não lê o arquivo.
+    """
+    if scale not in _IMREAD_FLAGS:
+        raise ValueError(f"Escala de decode não suportada: {scale}")
+    img = cv2.imread(str(image_path), _IMREAD_FLAGS[scale])
+
+    # Fallback: tentar com PIL se OpenCV falhar
+    if img is None:
+        logger.warning("⚠️ OpenCV falhou ao ler %s, tentando PIL...", image_path)
+        try:
+            from PIL import Image
+            with Image.open(image_path) as pil_img:
+                if pil_img.mode != 'L':
+                    pil_img = pil_img.convert('L')
+                if scale > 1:
+                    pil_img = pil_img.reduce(scale)
+                img = np.array(pil_img)
+            logger.debug("✅ PIL conseguiu ler: %s", img.shape)
+        except Exception as e:
+            logger.warning("❌ PIL também falhou: %s", e)
+            raise ValueError(f"Não foi possível carregar: {image_path}")
+
+    return memory_budget.track(img)
+
+
+def decode_bilevel_mask(image_path, scale=1):
+    """
+    Máscara de tinta (uint8, 1 = preto) de imagens de 1 bit, equivalente à
+    binária invertida do Otsu sobre o cinza 0/255. None para imagens em tons
+    de cinza/cor e para scale > 1 (o decode reduzido mistura os pixels em
+    tons de cinza, que continuam passando pelo Otsu).
+    """
+    if not BILEVEL_FAST_PATH or scale != 1:
+        return None
+    try:
+        from PIL import Image
+        with Image.open(image_path) as pil_img:
+            if pil_img.mode != '1':
+                return None
+            # O PIL já aplica a fotometria (WhiteIsZero/BlackIsZero): True = branco
+            white = np.asarray(pil_img)
+    except Exception as e:
+        logger.debug("Decode de 1 bit indisponível para %s: %s", image_path, e)
+        return None
+    return memory_budget.track(np.logical_not(white).view(np.uint8))
+
+
+def iter_grayscale_stripes(image_path, stripe_rows):
+    """
+    Faixas horizontais (y0, cinza uint8) com pelo menos stripe_rows linhas
+    (a última pode ser menor). Arquivos sem layout de strips/tiles utilizável
+    (não TIFF, planos separados) são decodificados inteiros e fatiados.
+    """
+    try:
+        layout = tiff_header.read_layout(image_path)
+    except (tiff_header.TiffRejected, OSError):
+        layout = None
+    if layout is None or not layout.streamable:
+        img = decode_grayscale(image_path)
+        for y in range(0, img.shape[0], stripe_rows):
+            yield y, img[y:y + stripe_rows]
+        return
+
+    pending, pending_rows, y0 = [], 0, 0
+    for rows in _iter_chunk_rows(image_path, layout, stripe_rows):
+        pending.append(rows)
+        pending_rows += rows.shape[0]
+        if pending_rows >= stripe_rows:
+            yield y0, memory_budget.track(pending[0] if len(pending) == 1 else np.vstack(pending))
+            y0 += pending_rows
+            pending, pending_rows = [], 0
+    if pending:
+        yield y0, memory_budget.track(pending[0] if len(pending) == 1 else np.vstack(pending))
+
+
+def _iter_chunk_rows(image_path, layout, stripe_rows):
+    """Linhas da página, um strip (ou uma fileira de tiles) por vez"""
+    page = layout.page
+    chunk_height = layout.chunk_height
+    with open(image_path, 'rb') as f:
+        for row_index in range(-(-page.height // chunk_height)):
+            rows = min(chunk_height, page.height - row_index * chunk_height)
+            if not page.tiled:
+                offset, byte_count = layout.offsets[row_index], layout.byte_counts[row_index]
+                if page.compression == 1:
+                    # Sem compressão: lê só as linhas de cada faixa
+                    for sub in range(0, rows, stripe_rows):
+                        count = min(stripe_rows, rows - sub)
+                        f.seek(offset + sub * layout.row_bytes)
+                        yield _decode_chunk(layout, f.read(count * layout.row_bytes), page.width, count)
+                    continue
+                f.seek(offset)
+                yield _decode_chunk(layout, f.read(byte_count), page.width, rows)
+                continue
+
+            stripe = np.empty((rows, page.width), np.uint8)
+            for column in range(layout.chunks_across):
+                index = row_index * layout.chunks_across + column
+                f.seek(layout.offsets[index])
+                tile = _decode_chunk(layout, f.read(layout.byte_counts[index]), layout.chunk_width, chunk_height)
+                x0 = column * layout.chunk_width
+                width = min(layout.chunk_width, page.width - x0)
+                stripe[:, x0:x0 + width] = tile[:rows, :width]
+            yield stripe
+
+
+def _decode_chunk(layout, data, width, rows):
+    """Decodifica um strip/tile isolado em cinza (rows x width)"""
+    page = layout.page
+    if page.compression == 1 and page.bits_per_sample == 8 and page.samples_per_pixel == 1 \
+            and page.photometric in (0, 1):
+        img = np.frombuffer(data, np.uint8, count=width * rows).reshape(rows, width)
+        return 255 - img if page.photometric == 0 else img
+
+    buffer = _chunk_tiff(layout, data, width, rows)
+    img = cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        import io
+        from PIL import Image
+        with Image.open(io.BytesIO(buffer)) as pil_img:
+            img = np.array(pil_img.convert('L'))
+    if img.shape != (rows, width):
+        raise ValueError(f"Strip/tile com dimensões inesperadas: {img.shape}")
+    return img
+
+
+def _chunk_tiff(layout, data, width, rows):
+    """TIFF clássico de uma página com um único strip (data), mesmas tags de compressão"""
+    endian = layout.endian
+    entries = [(tag, type_id, count, payload) for tag, type_id, count, payload in layout.chunk_tags]
+    entries += [
+        (256, 4, 1, struct.pack(endian + 'I', width)),
+        (257, 4, 1, struct.pack(endian + 'I', rows)),
+        (273, 4, 1, None),
+        (278, 4, 1, struct.pack(endian + 'I', rows)),
+        (279, 4, 1, struct.pack(endian + 'I', len(data))),
+    ]
+    entries.sort(key=lambda entry: entry[0])
+
+    ifd_size = 2 + 12 * len(entries) + 4
+    extra = bytearray()
+    extra_start = 8 + ifd_size
+    packed = []
+    for tag, type_id, count, payload in entries:
+        if payload is not None and len(payload) > 4:
+            packed.append((tag, type_id, count, struct.pack(endian + 'I', extra_start + len(extra))))
+            extra += payload + b'\0' * (len(payload) % 2)
+        else:
+            packed.append((tag, type_id, count, payload))
+    data_offset = extra_start + len(extra)
+
+    ifd = bytearray(struct.pack(endian + 'H', len(packed)))
+    for tag, type_id, count, field in packed:
+        if field is None:
+            field = struct.pack(endian + 'I', data_offset)
+        ifd += struct.pack(endian + 'HHI', tag, type_id, count) + field.ljust(4, b'\0')
+    ifd += struct.pack(endian + 'I', 0)
+
+    header = (b'II' if endian == '<' else b'MM') + struct.pack(endian + 'HI', 42, 8)
+    return bytes(header + ifd + extra) + data
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Orçamento de Memória por Requisição - estimativa pelo cabeçalho e estratégia de decode
+
+Um TIFF comprimido de 16 MB pode virar centenas de MB decodificado, e o
+pipeline mantém várias cópias do tamanho da página: a imagem em cinza, a
+binária, os rótulos int32 do connectedComponentsWithStats e, em paralelo
+(OCR especulativo), a detecção de parágrafos e o pré-processamento do OCR.
+
+Antes de decodificar, plan() estima o pico a partir das dimensões do
+cabeçalho e escolhe a estratégia que cabe no orçamento:
+
+- full: resolução nativa
+- stripes: resolução nativa lida em faixas (striped_layout), memória
+  proporcional à faixa; só para TIFFs com strips/tiles utilizáveis
+- reduced_2 / reduced_4: decode em 1/2 ou 1/4 da resolução (features
+  reescaladas para a resolução nativa)
+
+Se nem 1/4 cabe, MemoryBudgetExceeded (a API responde 413).
+
+Durante a classificação, MemoryAccount soma os buffers de imagem vivos
+(registrados com track(), liberados pelo coletor via weakref) e informa o pico
+por etapa de metrics.stage. Páginas de um TIFF multipágina processadas em
+paralelo dividem o orçamento da requisição e têm contas filhas de uma conta do
+documento, cujo pico é o das páginas vivas ao mesmo tempo.
+
+Configuração (variáveis de ambiente):
+    REQUEST_MEMORY_BUDGET_MB   pico estimado máximo por requisição (padrão 512)
+    REQUEST_MAX_PIXELS         pixels processados por página (padrão 50M; acima disso reduz)
+"""
+
+import contextvars
+import os
+import threading
+import weakref
+
+import metrics
+
+REQUEST_MEMORY_BUDGET_MB = float(os.environ.get('REQUEST_MEMORY_BUDGET_MB', '512'))
+REQUEST_MAX_PIXELS = int(float(os.environ.get('REQUEST_MAX_PIXELS', '50e6')))
+
+# Bytes por pixel (na escala processada) vivos ao mesmo tempo em cada etapa
+FEATURE_BYTES_PER_PIXEL = 6     # cinza (1) + binária (1) + rótulos int32 (4)
+PARAGRAPH_BYTES_PER_PIXEL = 2   # cinza (1) + binária (1)
+OCR_BUFFERS = 3                 # redimensionada + limiarizada + morfologia (largura <= OCR_MAX_WIDTH)
+OCR_MAX_WIDTH = 1600
+# Faixa: strips pendentes (1) + concatenação (1) + binária (1) + rótulos int32 (4)
+STRIPE_BYTES_PER_PIXEL = 7
+
+DECODE_SCALES = (1, 2, 4)
+STRATEGIES = {1: 'full', 2: 'reduced_2', 4: 'reduced_4'}
+
+STAGE_PEAK_MEMORY = metrics.REGISTRY.histogram(
+    'stage_peak_memory_bytes', 'Pico de memória de imagem contabilizada por etapa',
+    ('stage',), buckets=(1e6, 4e6, 16e6, 64e6, 128e6, 256e6, 512e6, 1e9)
+)
+
+_current_account = contextvars.ContextVar('memory_account', default=None)
+
+
+class MemoryBudgetExceeded(ValueError):
+    """A imagem não cabe no orçamento de memória nem na menor escala"""
+
+    def __init__(self, width, height, estimated_bytes, budget_bytes):
+        super().__init__(
+            f"Imagem {width}x{height} excede o orçamento de memória "
+            f"(~{estimated_bytes / 1e6:.0f} MB estimados, limite {budget_bytes / 1e6:.0f} MB)"
+        )
+        self.width = width
+        self.height = height
+        self.estimated_bytes = estimated_bytes
+        self.budget_bytes = budget_bytes
+
+
+class MemoryPlan:
+    """Estratégia escolhida para a requisição"""
+
+    def __init__(self, width, height, scale, estimated_bytes, budget_bytes, stripe_rows=None):
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.stripe_rows = stripe_rows
+        self.strategy = 'stripes' if stripe_rows else STRATEGIES[scale]
+        self.estimated_bytes = estimated_bytes
+        self.budget_bytes = budget_bytes
+
+    def to_dict(self):
+        report = {
+            'strategy': self.strategy,
+            'scale': self.scale,
+            'estimated_peak_bytes': int(self.estimated_bytes),
+            'budget_bytes': int(self.budget_bytes),
+        }
+        if self.stripe_rows:
+            report['stripe_rows'] = self.stripe_rows
+        return report
+
+
+def estimate_peak_bytes(width, height, scale=1, ocr=True):
+    """
+    Pico estimado (bytes) da classificação de uma página width x height
+    decodificada em 1/scale. O decode reduzido ainda passa pelo buffer
+    completo; o OCR especulativo roda junto com a detecção de parágrafos.
+    """
+    full = width * height
+    pixels = full // (scale * scale)
+    decode = full + pixels if scale > 1 else full
+    features = max(decode, FEATURE_BYTES_PER_PIXEL * pixels)
+    paragraphs = max(decode, PARAGRAPH_BYTES_PER_PIXEL * pixels)
+    if not ocr:
+        return max(features, paragraphs)
+    # OCR: página em cinza + cópias de pré-processamento com largura <= OCR_MAX_WIDTH
+    ocr_width = min(width, OCR_MAX_WIDTH)
+    resized = ocr_width * height * ocr_width // width if width else 0
+    return max(features, paragraphs + full + OCR_BUFFERS * resized)
+
+
+def estimate_stripe_bytes(width, height, stripe_rows, ocr=True):
+    """
+    Pico estimado (bytes) do modo em faixas: faixas de até 2 x stripe_rows
+    linhas (strips acumulados) e o perfil por linha. O OCR, que ainda lê a
+    página inteira, roda depois do layout.
+    """
+    stripe = width * min(2 * stripe_rows, height)
+    layout = STRIPE_BYTES_PER_PIXEL * stripe + 16 * height
+    if not ocr:
+        return layout
+    ocr_width = min(width, OCR_MAX_WIDTH)
+    resized = ocr_width * height * ocr_width // width if width else 0
+    return max(layout, width * height + OCR_BUFFERS * resized)
+
+
+def request_budget_bytes():
+    """Orçamento de memória (bytes) de uma requisição"""
+    return REQUEST_MEMORY_BUDGET_MB * 1024 * 1024
+
+
+def plan(width, height, budget_bytes=None, max_pixels=None, ocr=True, stripe_rows=None, prefer_stripes=False,
+         min_scale=1):
+    """
+    Menor redução que cabe no orçamento de bytes e de pixels. Com stripe_rows
+    (arquivo lido em faixas), tenta o modo em faixas antes de reduzir a
+    resolução; prefer_stripes o coloca antes de full. min_scale > 1 pula as
+    escalas menores (caminho rápido pedido pela requisição).
+    """
+    budget_bytes = request_budget_bytes() if budget_bytes is None else budget_bytes
+    max_pixels = REQUEST_MAX_PIXELS if max_pixels is None else max_pixels
+    candidates = [(scale, None) for scale in DECODE_SCALES if scale >= min_scale]
+    if stripe_rows and min_scale <= 1:
+        candidates.insert(0 if prefer_stripes else 1, (1, stripe_rows))
+    if not candidates:
+        raise ValueError(f"Escala de decode não suportada: {min_scale}")
+    estimated = 0
+    for scale, rows in candidates:
+        if rows:
+            estimated = estimate_stripe_bytes(width, height, rows, ocr)
+        else:
+            estimated = estimate_peak_bytes(width, height, scale, ocr)
+        if width * height // (scale * scale) <= max_pixels and estimated <= budget_bytes:
+            return MemoryPlan(width, height, scale, estimated, budget_bytes, rows)
+    raise MemoryBudgetExceeded(width, height, estimated, budget_bytes)
+
+
+class MemoryAccount:
+    """
+    Buffers de imagem vivos na requisição. Também é observador de
+    metrics.stage: registra o pico de bytes vivos durante cada etapa
+    (pilha por thread, como no profiling). Com `parent`, os bytes também são
+    somados na conta pai (documento com páginas em paralelo).
+    """
+
+    def __init__(self, plan=None, parent=None):
+        self.plan = plan
+        self.parent = parent
+        self.live = 0
+        self.peak = 0
+        self.stages = {}
+        self._stacks = {}
+        self._lock = threading.Lock()
+
+    def add(self, nbytes):
+        with self._lock:
+            self.live += nbytes
+            self.peak = max(self.peak, self.live)
+            for stack in self._stacks.values():
+                for frame in stack:
+                    frame[1] = max(frame[1], self.live)
+        if self.parent is not None:
+            self.parent.add(nbytes)
+
+    def release(self, nbytes):
+        with self._lock:
+            self.live -= nbytes
+        if self.parent is not None:
+            self.parent.release(nbytes)
+
+    def enter(self, name):
+        with self._lock:
+            self._stacks.setdefault(threading.get_ident(), []).append([name, self.live])
+
+    def exit(self, name):
+        with self._lock:
+            stack = self._stacks.get(threading.get_ident())
+            if not stack or stack[-1][0] != name:
+                return
+            _, peak = stack.pop()
+            self.stages[name] = max(self.stages.get(name, 0), peak)
+
+    def activate(self):
+        """Instala a conta no contexto atual; retorna os tokens para deactivate()"""
+        return _current_account.set(self), metrics.set_stage_observer(self)
+
+    def deactivate(self, tokens):
+        account_token, observer_token = tokens
+        metrics.reset_stage_observer(observer_token)
+        _current_account.reset(account_token)
+        for stage, peak in self.stages.items():
+            STAGE_PEAK_MEMORY.observe(peak, stage=stage)
+
+    def report(self):
+        report = self.plan.to_dict() if self.plan is not None else {}
+        report['peak_bytes'] = int(self.peak)
+        report['stages'] = {stage: int(peak) for stage, peak in self.stages.items()}
+        return report
+
+
+def track(array):
+    """Contabiliza o buffer na requisição atual até ele ser coletado; retorna o próprio array"""
+    account = _current_account.get()
+    if account is not None and array is not None:
+        nbytes = int(array.nbytes)
+        account.add(nbytes)
+        weakref.finalize(array, account.release, nbytes)
+    return array
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Métricas de Performance - Histogramas por etapa, contadores e gauges
+
+Camada de instrumentação leve (sem dependências externas):
+- stage(nome): context manager que mede uma etapa do pipeline, alimenta o
+  histograma `stage_duration_seconds{stage=...}` e acumula o tempo nos
+  timings da requisição atual (usados no header Server-Timing)
+- REGISTRY.render_prometheus(): exportação no formato texto do Prometheus
+
+As métricas são por processo (cada worker gunicorn/Celery tem as suas).
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Buckets em segundos (etapas de ~1ms até OCR de dezenas de segundos)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Buckets em megapixels (RVL-CDIP ~0.75 MP; A3 600 dpi ~70 MP)
+MEGAPIXEL_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 128.0)
+# Buckets em bytes (uploads até o limite de 16 MB)
+BYTES_BUCKETS = (64e3, 256e3, 1e6, 2e6, 4e6, 8e6, 16e6)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for k, v in pairs
+    )
+    return '{' + body + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}"
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Contador monotônico (opcionalmente com labels)"""
+    metric_type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Valor instantâneo, definido com set() ou lido de um callback na exportação"""
+    metric_type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _render_samples(self):
+        if self.callback is not None:
+            try:
+                return [f"{self.name} {_format_value(self.callback())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """Histograma cumulativo com buckets fixos (compatível com Prometheus)"""
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self, **labels):
+        """Cópia de {'counts', 'sum', 'count'} de uma série"""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            if series is None:
+                return {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            return {'counts': list(series['counts']), 'sum': series['sum'], 'count': series['count']}
+
+    def _render_samples(self):
+        with self._lock:
+            items = sorted((key, dict(s, counts=list(s['counts']))) for key, s in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registro de métricas do processo (get-or-create por nome)"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        gauge = self._get_or_create(Gauge, name, documentation, labelnames)
+        if callback is not None:
+            gauge.callback = callback
+        return gauge
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render_prometheus(self):
+        """Todas as métricas no formato de exposição texto do Prometheus"""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'stage_duration_seconds', 'Duração de cada etapa do pipeline de classificação', ('stage',)
+)
+IMAGE_MEGAPIXELS = REGISTRY.histogram(
+    'image_megapixels', 'Tamanho das imagens processadas (megapixels)', buckets=MEGAPIXEL_BUCKETS
+)
+UPLOAD_BYTES = REGISTRY.histogram(
+    'upload_bytes', 'Tamanho dos arquivos recebidos (bytes)', buckets=BYTES_BUCKETS
+)
+OCR_CACHE = REGISTRY.counter(
+    'ocr_cache_requests_total', 'Consultas ao cache de OCR', ('result',)
+)
+QUEUE_WAIT = REGISTRY.histogram(
+    'queue_wait_seconds', 'Tempo de espera em fila antes do processamento', ('queue',)
+)
+
+# Timings da requisição/tarefa atual: {etapa: segundos}. O dict é mutável e
+# compartilhado, então threads que rodam com contextvars.copy_context()
+# (ex.: OCR especulativo) também registram nele.
+_current_timings = contextvars.ContextVar('current_timings', default=None)
+
+
+def start_timings():
+    """Inicia a coleta de timings da requisição atual (retorna token)"""
+    return _current_timings.set({})
+
+
+def finish_timings(token):
+    """Encerra a coleta e retorna {etapa: segundos}"""
+    timings = _current_timings.get() or {}
+    _current_timings.reset(token)
+    return timings
+
+
+def current_timings():
+    """Timings da requisição atual (ou None fora de uma requisição)"""
+    return _current_timings.get()
+
+
+def record_stage(name, seconds):
+    """Registra a duração de uma etapa já medida"""
+    STAGE_DURATION.observe(seconds, stage=name)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+# Observadores opcionais das etapas (ex.: profiler por requisição, tracing):
+# objetos com enter(nome) e exit(nome), herdados por threads via copy_context
+_stage_observers = contextvars.ContextVar('stage_observers', default=())
+
+
+def set_stage_observer(observer):
+    """Adiciona um observador de etapas ao contexto atual (retorna token)"""
+    return _stage_observers.set(_stage_observers.get() + (observer,))
+
+
+def reset_stage_observer(token):
+    _stage_observers.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Mede o bloco como a etapa `name`"""
+    observers = _stage_observers.get()
+    for observer in observers:
+        observer.enter(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+        for observer in reversed(observers):
+            observer.exit(name)
+
+
+def server_timing_header(timings):
+    """Formata {etapa: segundos} como valor do header Server-Timing (ms)"""
+    return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+def start_http_server(port, host='0.0.0.0', max_attempts=8):
+    """
+    Serve as métricas em uma thread daemon (workers Celery não têm HTTP).
+    Com vários processos no mesmo host, tenta as portas seguintes.
+    Retorna a porta usada ou None.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = REGISTRY.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    for offset in range(max_attempts):
+        try:
+            server = ThreadingHTTPServer((host, port + offset), MetricsHandler)
+        except OSError:
+            continue
+        thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+        thread.start()
+        return port + offset
+    return None
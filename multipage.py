@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+TIFF Multipágina - páginas extraídas sob demanda e processadas em paralelo
+
+O cv2.imread lê só a primeira página de um TIFF multipágina. Aqui cada
+página é extraída sozinha para um TIFF temporário (o PIL decodifica apenas
+a página pedida) no momento em que vai ser processada, e removida logo
+depois: com N workers, no máximo N páginas existem ao mesmo tempo, em
+memória ou em disco, qualquer que seja o tamanho do documento.
+
+map_pages() entrega os resultados na ordem em que terminam (para o
+streaming por página); o índice da página acompanha cada resultado.
+
+Configuração (variáveis de ambiente):
+    MULTIPAGE_WORKERS   páginas processadas em paralelo (padrão 2; 1 = sequencial)
+    MULTIPAGE_MODE      all (todas as páginas) ou first (só a primeira, comportamento antigo)
+"""
+
+import contextvars
+import os
+import tempfile
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from PIL import Image
+
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+MULTIPAGE_WORKERS = int(os.environ.get('MULTIPAGE_WORKERS', '2'))
+MULTIPAGE_MODE = os.environ.get('MULTIPAGE_MODE', 'all')
+
+# Compressões que o PIL regrava; as demais (ex.: JPEG) viram LZW
+_SAVE_COMPRESSIONS = {'raw', 'group3', 'group4', 'tiff_lzw', 'tiff_adobe_deflate', 'packbits'}
+
+
+def extract_page(image_path, index, directory=None):
+    """Grava a página `index` num TIFF temporário de uma página (mesma compressão) e retorna o caminho"""
+    with Image.open(image_path) as img:
+        img.seek(index)
+        compression = img.info.get('compression', 'raw')
+        if compression not in _SAVE_COMPRESSIONS or (compression in ('group3', 'group4') and img.mode != '1'):
+            compression = 'tiff_lzw'
+        fd, page_path = tempfile.mkstemp(prefix=f'page{index}_', suffix='.tif', dir=directory)
+        os.close(fd)
+        try:
+            img.save(page_path, format='TIFF', compression=compression, dpi=img.info.get('dpi', (72, 72)))
+        except Exception:
+            os.remove(page_path)
+            raise
+    return page_path
+
+
+def iter_pages(image_path, page_count, directory=None):
+    """
+    (índice, caminho) de cada página, extraída só quando o consumidor pede e
+    removida quando ele avança para a próxima
+    """
+    for index in range(page_count):
+        page_path = extract_page(image_path, index, directory)
+        try:
+            yield index, page_path
+        finally:
+            os.remove(page_path)
+
+
+def _run_page(func, image_path, index, directory):
+    page_path = extract_page(image_path, index, directory)
+    try:
+        return func(index, page_path)
+    finally:
+        os.remove(page_path)
+
+
+def worker_count(workers, page_count):
+    """Páginas em andamento ao mesmo tempo (padrão MULTIPAGE_WORKERS, no máximo page_count)"""
+    return max(1, min(workers or MULTIPAGE_WORKERS, page_count))
+
+
+def map_pages(func, image_path, page_count, workers=None, directory=None):
+    """
+    (índice, func(índice, caminho_da_página)) na ordem em que as páginas
+    terminam. No máximo `workers` páginas em andamento; cada uma roda numa
+    cópia do contexto atual (timings, spans e orçamento da requisição).
+    """
+    workers = worker_count(workers, page_count)
+    if workers == 1:
+        for index, page_path in iter_pages(image_path, page_count, directory):
+            yield index, func(index, page_path)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='page') as executor:
+        pending = {}
+        next_index = 0
+        try:
+            while next_index < page_count or pending:
+                while next_index < page_count and len(pending) < workers:
+                    future = executor.submit(contextvars.copy_context().run,
+                                             _run_page, func, image_path, next_index, directory)
+                    pending[future] = next_index
+                    next_index += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            # Consumidor abandonou o gerador (ou erro numa página): não iniciar as restantes
+            for future in pending:
+                future.cancel()
+
+
+def merge_frequent_words(word_lists, top_n=10):
+    """Soma as contagens [{'word', 'count'}] ou [(palavra, contagem)] de várias páginas"""
+    counts = Counter()
+    for words in word_lists:
+        for item in words or []:
+            if isinstance(item, dict):
+                counts[item['word']] += item['count']
+            else:
+                word, count = item
+                counts[word] += count
+    return [{'word': word, 'count': count} for word, count in counts.most_common(top_n)]
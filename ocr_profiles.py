@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Perfis de OCR - configuração do Tesseract escolhida pelo layout e pelo idioma
+
+Três perfis variam motor (--oem), segmentação dos blocos de texto (--psm),
+dicionários, resolução do OCR e modelos de idioma:
+
+- speed:    só LSTM, sem dicionários (load_system_dawg/load_freq_dawg=0),
+            largura máxima 1200 px e bloco uniforme (--psm 6) na montagem
+- balanced: configuração padrão (--oem 3, dicionários, OCR_MAX_WIDTH)
+- accurate: só LSTM com os modelos de TESSDATA_BEST_DIR (se configurado),
+            dicionários e o modelo em inglês junto (artigos em pt citam termos em inglês)
+
+O idioma da requisição (language=pt/en) escolhe o modelo (por/eng); modelos
+não instalados caem para eng.
+
+Escolha automática (choose_profile), pela altura do texto depois da redução
+para o OCR (altura média dos componentes x largura do OCR / largura da página):
+texto pequeno (< SMALL_TEXT_PX) usa accurate; texto grande (>= LARGE_TEXT_PX)
+usa speed em inglês e balanced em português (sem dicionário os acentos
+pioram); o resto usa balanced. A requisição pode forçar o perfil (ocr_profile).
+
+Configuração (variáveis de ambiente):
+    OCR_PROFILE          auto (padrão), speed, balanced ou accurate
+    OCR_PAGE_PSM         segmentação na página inteira (padrão 3, sem OSD)
+    OCR_REGION_PSM       segmentação da montagem de blocos no perfil balanced/accurate (padrão 4)
+    TESSDATA_FAST_DIR    modelos tessdata_fast usados pelo perfil speed (opcional)
+    TESSDATA_BEST_DIR    modelos tessdata_best usados pelo perfil accurate (opcional)
+"""
+
+import os
+
+import memory_budget
+
+OCR_PROFILE = os.environ.get('OCR_PROFILE', 'auto')
+OCR_PAGE_PSM = int(os.environ.get('OCR_PAGE_PSM', '3'))
+OCR_REGION_PSM = int(os.environ.get('OCR_REGION_PSM', '4'))
+TESSDATA_FAST_DIR = os.environ.get('TESSDATA_FAST_DIR')
+TESSDATA_BEST_DIR = os.environ.get('TESSDATA_BEST_DIR')
+
+PROFILE_NAMES = ('speed', 'balanced', 'accurate')
+DEFAULT_PROFILE = 'balanced'
+
+# Idioma da requisição -> modelo do Tesseract
+LANGUAGE_MODELS = {'pt': 'por', 'en': 'eng'}
+FALLBACK_MODEL = 'eng'
+
+# Altura do texto (px) na imagem enviada ao OCR que define a escolha automática
+SMALL_TEXT_PX = 9.0
+LARGE_TEXT_PX = 18.0
+
+PROFILES = {
+    'speed': {
+        'oem': 1, 'page_psm': OCR_PAGE_PSM, 'region_psm': 6, 'dictionary': False,
+        'max_width': min(1200, memory_budget.OCR_MAX_WIDTH), 'extra_models': (),
+        'tessdata_dir': TESSDATA_FAST_DIR,
+    },
+    'balanced': {
+        'oem': 3, 'page_psm': OCR_PAGE_PSM, 'region_psm': OCR_REGION_PSM, 'dictionary': True,
+        'max_width': memory_budget.OCR_MAX_WIDTH, 'extra_models': (),
+        'tessdata_dir': None,
+    },
+    'accurate': {
+        'oem': 1, 'page_psm': OCR_PAGE_PSM, 'region_psm': OCR_REGION_PSM, 'dictionary': True,
+        'max_width': memory_budget.OCR_MAX_WIDTH, 'extra_models': ('eng',),
+        'tessdata_dir': TESSDATA_BEST_DIR,
+    },
+}
+
+
+def resolve(name):
+    """Nome do perfil a usar (None/auto/desconhecido = padrão do ambiente ou balanced)"""
+    if name not in PROFILES:
+        name = OCR_PROFILE if OCR_PROFILE in PROFILES else DEFAULT_PROFILE
+    return name
+
+
+def choose_profile(features, extra_features, page_width, language='pt', requested=None):
+    """
+    Nome do perfil para a página: o pedido (ou OCR_PROFILE) quando não é
+    auto, senão pela altura efetiva do texto no OCR e pelo idioma
+    """
+    if requested in PROFILES:
+        return requested
+    if OCR_PROFILE in PROFILES:
+        return OCR_PROFILE
+    height = extra_features.get('avg_component_height', 0)
+    if not height or not features.get('num_text_components'):
+        return DEFAULT_PROFILE
+    ocr_height = height * min(1.0, PROFILES[DEFAULT_PROFILE]['max_width'] / max(page_width, 1))
+    if ocr_height < SMALL_TEXT_PX:
+        return 'accurate'
+    if ocr_height >= LARGE_TEXT_PX and language == 'en':
+        return 'speed'
+    return DEFAULT_PROFILE
+
+
+def tesseract_config(profile, psm):
+    """String de config do pytesseract para o perfil e a segmentação"""
+    parts = []
+    if profile['tessdata_dir']:
+        parts.append(f'--tessdata-dir {profile["tessdata_dir"]}')
+    parts += [f'--oem {profile["oem"]}', f'--psm {psm}']
+    if not profile['dictionary']:
+        parts += ['-c load_system_dawg=0', '-c load_freq_dawg=0']
+    return ' '.join(parts)
+
+
+def tesseract_lang(profile, language, available=None):
+    """
+    Modelos de idioma ('por', 'por+eng'...) para o perfil; `available`
+    (modelos instalados) descarta os que faltam, com eng como reserva
+    """
+    models = [LANGUAGE_MODELS.get(language, FALLBACK_MODEL)]
+    models += [model for model in profile['extra_models'] if model not in models]
+    if available is not None:
+        models = [model for model in models if model in available] or [FALLBACK_MODEL]
+    return '+'.join(models)
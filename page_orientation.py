@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Orientação e Inclinação da Página - perfis de projeção sobre os componentes
+
+Com --psm 1 o Tesseract roda detecção de orientação e script (OSD) em toda
+página, embora quase todas cheguem na posição certa. Aqui a orientação e a
+inclinação são estimadas a partir dos componentes conectados já calculados
+na binarização (sem nova passada sobre a imagem), no estilo do método de
+Baird: as bases dos caracteres de uma linha ficam alinhadas, então a
+projeção desses pontos na direção certa tem picos estreitos (energia alta).
+
+1. eixo das linhas: energia da projeção dos centros na horizontal x vertical
+   (página deitada: linhas verticais)
+2. sentido: a base das letras (linha de base) é mais alinhada que o topo
+   (ascendentes são mais comuns que descendentes); topo mais alinhado =
+   página de cabeça para baixo
+3. inclinação: ângulo que maximiza a energia das bases, busca grossa e
+   depois fina em torno do melhor ângulo
+
+O OCR só gira/endireita a página quando a rotação não é 0 ou a inclinação
+passa da tolerância; nos demais casos usa uma segmentação sem OSD.
+
+Configuração (variáveis de ambiente):
+    ORIENTATION_CORRECTION   1 (padrão) = girar/endireitar antes do OCR quando necessário; 0 = nunca
+    SKEW_TOLERANCE_DEGREES   inclinação (graus) tolerada sem endireitar (padrão 0.5)
+    SKEW_MAX_DEGREES         maior inclinação procurada (padrão 10)
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+ORIENTATION_CORRECTION = os.environ.get('ORIENTATION_CORRECTION', '1') == '1'
+SKEW_TOLERANCE_DEGREES = float(os.environ.get('SKEW_TOLERANCE_DEGREES', '0.5'))
+SKEW_MAX_DEGREES = float(os.environ.get('SKEW_MAX_DEGREES', '10'))
+
+# Área mínima (px) dos componentes considerados texto (igual a extract_features)
+MIN_COMPONENT_AREA = 10
+
+# Rotação (graus no sentido horário) -> código do cv2.rotate
+ROTATE_CODES = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180, 270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+
+class OrientationEstimator:
+    def __init__(self):
+        self.max_angle = SKEW_MAX_DEGREES
+        self.tolerance = SKEW_TOLERANCE_DEGREES
+        self.coarse_step = 0.5
+        self.fine_step = 0.05
+        self.min_components = 20  # menos que isso: sem texto para estimar
+        self.max_points = 5000  # amostra dos componentes (a energia converge bem antes)
+        self.max_height_ratio = 4.0  # componentes maiores (figuras, fios) não entram
+        self.bin_ratio = 1 / 6  # largura da faixa da projeção: 1/6 da altura de texto
+
+    def estimate(self, stats, shape, scale=1):
+        """
+        Orientação a partir das estatísticas de cv2.connectedComponentsWithStats
+        (linha 0 = fundo) de uma binária com `shape` (altura, largura).
+
+        Retorna {'rotation': 0/90/180/270 (graus no sentido horário para
+        endireitar), 'skew_angle': graus (positivo = linhas descendo para a
+        direita, depois da rotação), 'needs_correction': se o OCR deve corrigir a
+        página} ou None quando há poucos componentes de texto
+        """
+        height, width = shape
+        stats = np.asarray(stats)[1:]
+        stats = stats[stats[:, cv2.CC_STAT_AREA] >= max(1, round(MIN_COMPONENT_AREA / (scale * scale)))]
+        if len(stats) < self.min_components:
+            return None
+        size = np.minimum(stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT])
+        text_size = float(np.median(size))
+        stats = stats[np.maximum(stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT])
+                      <= self.max_height_ratio * max(text_size, 1)]
+        if len(stats) < self.min_components:
+            return None
+        if len(stats) > self.max_points:
+            stats = stats[::-(-len(stats) // self.max_points)]
+
+        boxes = np.stack((
+            stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP],
+            stats[:, cv2.CC_STAT_LEFT] + stats[:, cv2.CC_STAT_WIDTH],
+            stats[:, cv2.CC_STAT_TOP] + stats[:, cv2.CC_STAT_HEIGHT]
+        )).astype(np.float64)
+        bin_size = max(1.0, text_size * self.bin_ratio)
+        coarse = np.arange(-self.max_angle, self.max_angle + 1e-9, self.coarse_step)
+
+        # 1. Eixo das linhas: centros projetados na horizontal (0) ou vertical (90)
+        candidates = []
+        for rotation in (0, 90):
+            x0, y0, x1, y1 = rotate_boxes(boxes, rotation, width, height)
+            angle, energy = _best_angle((x0 + x1) / 2, (y0 + y1) / 2, bin_size, coarse)
+            candidates.append((energy, rotation, angle))
+        _, rotation, angle = max(candidates)
+
+        # 2. Sentido: base mais alinhada que o topo; senão, girar mais 180
+        x0, y0, x1, y1 = rotate_boxes(boxes, rotation, width, height)
+        along = (x0 + x1) / 2
+        tan = np.tan(np.radians(angle))
+        if _energy(y0 - along * tan, bin_size) > _energy(y1 - along * tan, bin_size):
+            rotation = (rotation + 180) % 360
+            x0, y0, x1, y1 = rotate_boxes(boxes, rotation, width, height)
+            along = (x0 + x1) / 2
+
+        # 3. Inclinação: busca fina pela base em torno do ângulo grosso
+        coarse_angle, _ = _best_angle(along, y1, bin_size, coarse)
+        fine = np.arange(coarse_angle - self.coarse_step, coarse_angle + self.coarse_step + 1e-9, self.fine_step)
+        skew_angle, _ = _best_angle(along, y1, bin_size, fine)
+        skew_angle = round(float(skew_angle), 2) + 0.0
+
+        needs_correction = ORIENTATION_CORRECTION and (rotation != 0 or abs(skew_angle) > self.tolerance)
+        return {'rotation': int(rotation), 'skew_angle': skew_angle, 'needs_correction': bool(needs_correction)}
+
+
+def rotate_boxes(boxes, rotation, width, height):
+    """Caixas (x0, y0, x1, y1) da página depois de cv2.rotate(rotation graus no sentido horário)"""
+    x0, y0, x1, y1 = boxes
+    if rotation == 90:
+        return height - y1, x0, height - y0, x1
+    if rotation == 180:
+        return width - x1, height - y1, width - x0, height - y0
+    if rotation == 270:
+        return y0, width - x1, y1, width - x0
+    return x0, y0, x1, y1
+
+
+def _energy(values, bin_size):
+    """Probabilidade de dois pontos caírem na mesma faixa da projeção (picos estreitos = alta)"""
+    counts = np.bincount(((values - values.min()) / bin_size).astype(np.int64))
+    return float(np.dot(counts, counts)) / (len(values) ** 2)
+
+
+def _best_angle(along, base, bin_size, angles):
+    """Ângulo (graus) cuja projeção base - along * tan(ângulo) tem a maior energia"""
+    energies = [_energy(base - along * np.tan(np.radians(angle)), bin_size) for angle in angles]
+    best = int(np.argmax(energies))
+    return float(angles[best]), energies[best]
+
+
+def correct(img, orientation):
+    """
+    Página em cinza girada e endireitada conforme `orientation` (estimate());
+    cantos descobertos pela rotação ficam brancos
+    """
+    if not orientation or not orientation.get('needs_correction'):
+        return img
+    if orientation['rotation']:
+        img = cv2.rotate(img, ROTATE_CODES[orientation['rotation']])
+    angle = orientation['skew_angle']
+    if abs(angle) > 0:
+        height, width = img.shape[:2]
+        # Ângulo positivo no getRotationMatrix2D gira no sentido anti-horário
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        img = cv2.warpAffine(img, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                             borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+    return img
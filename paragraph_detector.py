@@ -3,15 +3,31 @@
 import cv2
 import numpy as np
 
+import image_io
+import memory_budget
+import metrics
+from layout_profile import LayoutProfile
+
 class ParagraphDetector:
     def __init__(self):
         self.min_line_height = 5
         self.indent_threshold_px = 20  # Calibrado: 20px
         self.vertical_space_ratio = 3.0  # Calibrado: 3.0x
         
-    def detect_text_lines_with_margins(self, binary_img):
-        height, width = binary_img.shape
-        h_projection = np.sum(binary_img > 0, axis=1)
+    def detect_text_lines_with_margins(self, binary_img, scale=1):
+        # Só a forma do perfil importa (normalizado pelo máximo): ink=1 serve para 0/1 e 0/255
+        profile = LayoutProfile.from_binary(binary_img, ink=1)
+        return self.detect_text_lines_from_profile(profile.row_counts, profile.row_left, scale, profile.row_right)
+    
+    def detect_text_lines_from_profile(self, h_projection, row_left, scale=1, row_right=None):
+        """
+        Linhas a partir do perfil horizontal: pixels de texto e primeira coluna
+        com texto (width se vazia) de cada linha da imagem. A margem esquerda
+        de uma linha de texto é o menor row_left do intervalo; com row_right
+        (última coluna com texto, -1 se vazia) a linha traz também 'right'.
+        """
+        height = len(h_projection)
+        min_line_height = self.min_line_height / scale
         
         if h_projection.max() > 0:
             h_projection = h_projection / h_projection.max()
@@ -30,40 +46,31 @@ class ParagraphDetector:
                 line_end = y
                 line_height = line_end - line_start
                 
-                if line_height >= self.min_line_height:
-                    line_region = binary_img[line_start:line_end, :]
-                    left_margin = width
-                    for x in range(width):
-                        if np.sum(line_region[:, x]) > 0:
-                            left_margin = x
-                            break
-                    
+                if line_height >= min_line_height:
                     lines.append({
                         'y_start': line_start,
                         'y_end': line_end,
                         'height': line_height,
-                        'left': left_margin
+                        'left': int(row_left[line_start:line_end].min())
                     })
+                    if row_right is not None:
+                        lines[-1]['right'] = int(row_right[line_start:line_end].max())
                 
                 in_line = False
         
-        if in_line and (height - line_start) >= self.min_line_height:
-            line_region = binary_img[line_start:height, :]
-            left_margin = width
-            for x in range(width):
-                if np.sum(line_region[:, x]) > 0:
-                    left_margin = x
-                    break
+        if in_line and (height - line_start) >= min_line_height:
             lines.append({
                 'y_start': line_start,
                 'y_end': height,
                 'height': height - line_start,
-                'left': left_margin
+                'left': int(row_left[line_start:height].min())
             })
+            if row_right is not None:
+                lines[-1]['right'] = int(row_right[line_start:height].max())
         
         return lines
     
-    def detect_paragraphs(self, lines):
+    def detect_paragraphs(self, lines, scale=1):
         if len(lines) <= 1:
             return len(lines), [[l] for l in lines]
         
@@ -83,7 +90,7 @@ class ParagraphDetector:
             v_space = curr['y_start'] - prev['y_end']
             indent_diff = curr['left'] - typical_left
             
-            has_indent = indent_diff > self.indent_threshold_px
+            has_indent = indent_diff > self.indent_threshold_px / scale
             has_large_space = v_space > (avg_height * self.vertical_space_ratio)
             
             if has_indent or has_large_space:
@@ -97,16 +104,42 @@ class ParagraphDetector:
         
         return len(paragraphs), paragraphs
     
-    def analyze(self, image_path):
-        img = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
-        if img is None:
-            raise ValueError(f"Não foi possível carregar: {image_path}")
+    def analyze(self, image_path, scale=1):
+        """
+        scale=2/4: decode reduzido; limiares em pixels ajustados à escala.
+        Imagens de 1 bit vêm já binárias do decode (sem Otsu).
+        """
+        with metrics.stage('paragraph_decode'):
+            binary = image_io.decode_bilevel_mask(image_path, scale)
+            ink = 1
+            if binary is None:
+                img = image_io.decode_grayscale(image_path, scale)
         
-        _, binary = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-        lines = self.detect_text_lines_with_margins(binary)
-        num_paragraphs, paragraphs = self.detect_paragraphs(lines)
+        if binary is None:
+            with metrics.stage('paragraph_otsu'):
+                _, binary = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+                memory_budget.track(binary)
+                ink = 255
+        return self.analyze_layout(LayoutProfile.from_binary(binary, ink), scale)
+    
+    def analyze_layout(self, profile, scale=1, with_lines=False):
+        """Análise a partir dos perfis já calculados (LayoutProfile / StripedLayout)"""
+        return self.analyze_profile(profile.row_counts, profile.row_left, scale, profile.row_right, with_lines)
+    
+    def analyze_profile(self, h_projection, row_left, scale=1, row_right=None, with_lines=False):
+        """
+        Mesma análise a partir do perfil já acumulado (ex.: striped_layout);
+        with_lines inclui as linhas detectadas (artefato de re-pontuação)
+        """
+        with metrics.stage('line_detection'):
+            lines = self.detect_text_lines_from_profile(h_projection, row_left, scale, row_right)
+        with metrics.stage('paragraph_grouping'):
+            num_paragraphs, paragraphs = self.detect_paragraphs(lines, scale)
         
-        return {'num_lines': len(lines), 'num_paragraphs': num_paragraphs}
+        stats = {'num_lines': len(lines), 'num_paragraphs': num_paragraphs}
+        if with_lines:
+            stats['lines'] = lines
+        return stats
 
 
 if __name__ == '__main__':
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Profiling sob Demanda - cProfile + tracemalloc para uma requisição
+
+Ativado por `profile=1` em /classify (ou profile=True na tarefa Celery),
+apenas com o token de administrador (header X-Admin-Token ou
+Authorization: Bearer). A execução roda sob cProfile e tracemalloc e retorna:
+
+- hotspots: funções com maior tempo acumulado/próprio
+- stages: duração e pico de alocação (bytes acima do início da etapa) por etapa
+- id do dump completo (.prof, formato pstats), baixável em GET /profile/<id>
+
+O cProfile mede a thread da requisição (o OCR especulativo aparece como
+espera em `ocr_wait`); o tracemalloc é global ao processo, então requisições
+simultâneas no mesmo worker entram na conta de memória.
+
+Além disso, o SamplingProfiler fica sempre ligado nos processos da API e
+dos workers Celery: uma thread amostra as pilhas das outras threads a uma taxa
+baixa e agrega em pilhas colapsadas (formato do flamegraph.pl / speedscope),
+gravadas em SAMPLING_PROFILER_DIR a cada janela e servidas em
+GET /profile/sampling. O custo de cada amostra é medido e o intervalo aumenta
+sozinho se passar de SAMPLING_PROFILER_MAX_OVERHEAD do tempo de parede.
+
+Configuração (variáveis de ambiente):
+    ADMIN_TOKEN          token exigido (sem ele o profiling fica desativado)
+    PROFILE_DIR          diretório dos dumps (padrão .profiles)
+    PROFILE_MAX_DUMPS    dumps mantidos (os mais antigos são removidos, padrão 50)
+    PROFILE_TOP_N        hotspots retornados (padrão 20)
+    SAMPLING_PROFILER_ENABLED       1 (padrão) ou 0
+    SAMPLING_PROFILER_INTERVAL      segundos entre amostras (padrão 0.05)
+    SAMPLING_PROFILER_MODE          wall (padrão, inclui espera de I/O) ou cpu
+    SAMPLING_PROFILER_DIR           diretório das janelas gravadas (padrão .profiles/sampling)
+    SAMPLING_PROFILER_WINDOW        segundos por janela antes de gravar (padrão 300)
+    SAMPLING_PROFILER_MAX_FILES     janelas mantidas por papel (padrão 48)
+    SAMPLING_PROFILER_MAX_OVERHEAD  fração máxima do tempo gasta amostrando (padrão 0.02)
+"""
+
+import atexit
+import collections
+import cProfile
+import glob
+import hmac
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+import metrics
+
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '.profiles')
+PROFILE_MAX_DUMPS = int(os.environ.get('PROFILE_MAX_DUMPS', '50'))
+PROFILE_TOP_N = int(os.environ.get('PROFILE_TOP_N', '20'))
+
+SAMPLING_PROFILER_ENABLED = os.environ.get('SAMPLING_PROFILER_ENABLED', '1') == '1'
+SAMPLING_PROFILER_INTERVAL = float(os.environ.get('SAMPLING_PROFILER_INTERVAL', '0.05'))
+SAMPLING_PROFILER_MODE = os.environ.get('SAMPLING_PROFILER_MODE', 'wall')
+SAMPLING_PROFILER_DIR = os.environ.get('SAMPLING_PROFILER_DIR', os.path.join(PROFILE_DIR, 'sampling'))
+SAMPLING_PROFILER_WINDOW = float(os.environ.get('SAMPLING_PROFILER_WINDOW', '300'))
+SAMPLING_PROFILER_MAX_FILES = int(os.environ.get('SAMPLING_PROFILER_MAX_FILES', '48'))
+SAMPLING_PROFILER_MAX_OVERHEAD = float(os.environ.get('SAMPLING_PROFILER_MAX_OVERHEAD', '0.02'))
+
+# Intervalo máximo ao qual o controle de overhead pode chegar
+_MAX_SAMPLING_INTERVAL = 1.0
+
+_PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def is_authorized(headers, token=None):
+    """Confere X-Admin-Token / Authorization: Bearer com o ADMIN_TOKEN"""
+    token = ADMIN_TOKEN if token is None else token
+    if not token:
+        return False
+    provided = headers.get('X-Admin-Token')
+    if not provided:
+        authorization = headers.get('Authorization', '')
+        if authorization.startswith('Bearer '):
+            provided = authorization[len('Bearer '):]
+    return bool(provided) and hmac.compare_digest(provided.encode(), token.encode())
+
+
+def is_truthy(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+class StageMemoryTracker:
+    """
+    Observador de metrics.stage: pico de memória alocada (tracemalloc) por etapa.
+    Usa reset_peak() na entrada de cada etapa e propaga o pico das etapas
+    internas para a etapa externa (pilha separada por thread).
+    """
+
+    def __init__(self):
+        self._stacks = {}
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.max_peak = 0
+
+    def _checkpoint(self):
+        """Pico desde o último reset, repassado às etapas abertas em todas as threads"""
+        _, peak = tracemalloc.get_traced_memory()
+        self.max_peak = max(self.max_peak, peak)
+        for stack in self._stacks.values():
+            for frame in stack:
+                frame['peak'] = max(frame['peak'], peak)
+        return peak
+
+    def enter(self, name):
+        with self._lock:
+            self._checkpoint()
+            current, _ = tracemalloc.get_traced_memory()
+            stack = self._stacks.setdefault(threading.get_ident(), [])
+            stack.append({'name': name, 'start': current, 'peak': current})
+            tracemalloc.reset_peak()
+
+    def exit(self, name):
+        with self._lock:
+            stack = self._stacks.get(threading.get_ident())
+            if not stack or stack[-1]['name'] != name:
+                return
+            self._checkpoint()
+            frame = stack.pop()
+            stage_peak = max(0, frame['peak'] - frame['start'])
+            self.stages[name] = max(self.stages.get(name, 0), stage_peak)
+
+
+def _function_label(func):
+    filename, line, name = func
+    return f"{os.path.basename(filename)}:{line}({name})" if line else name
+
+
+def top_hotspots(stats, top_n=PROFILE_TOP_N):
+    """Funções ordenadas por tempo acumulado (pstats.Stats)"""
+    rows = []
+    for func, (cc, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': _function_label(func),
+            'ncalls': ncalls,
+            'primitive_calls': cc,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda row: row['cumtime_ms'], reverse=True)
+    return rows[:top_n]
+
+
+class RequestProfiler:
+    """Executa uma chamada sob cProfile + tracemalloc e guarda o dump"""
+
+    def __init__(self, directory=PROFILE_DIR, max_dumps=PROFILE_MAX_DUMPS, top_n=PROFILE_TOP_N):
+        self.directory = directory
+        self.max_dumps = max_dumps
+        self.top_n = top_n
+        # tracemalloc é global: um profiling por vez em cada processo
+        self._lock = threading.Lock()
+
+    def dump_path(self, profile_id, extension='prof'):
+        if not _PROFILE_ID.match(profile_id or ''):
+            raise ValueError(f"Id de profile inválido: {profile_id}")
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def _prune(self):
+        dumps = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.prof')),
+            key=os.path.getmtime
+        )
+        for path in dumps[:max(0, len(dumps) - self.max_dumps)]:
+            for extension in ('.prof', '.json'):
+                try:
+                    os.remove(os.path.splitext(path)[0] + extension)
+                except OSError:
+                    pass
+
+    def run(self, fn, *args, **kwargs):
+        """Executa fn(*args, **kwargs); retorna (resultado, relatório do profiling)"""
+        with self._lock:
+            profile_id = uuid.uuid4().hex
+            tracker = StageMemoryTracker()
+            profiler = cProfile.Profile()
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+            token = metrics.set_stage_observer(tracker)
+            timings_before = dict(metrics.current_timings() or {})
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - start
+                metrics.reset_stage_observer(token)
+                peak = max(tracker.max_peak, tracemalloc.get_traced_memory()[1])
+                if started_tracing:
+                    tracemalloc.stop()
+
+            timings = metrics.current_timings() or {}
+            stages = {}
+            for name, peak_bytes in tracker.stages.items():
+                seconds = timings.get(name, 0.0) - timings_before.get(name, 0.0)
+                stages[name] = {'seconds': round(seconds, 6), 'peak_alloc_bytes': peak_bytes}
+
+            stats = pstats.Stats(profiler)
+            report = {
+                'id': profile_id,
+                'wall_seconds': round(elapsed, 6),
+                'peak_alloc_bytes': max(0, peak - baseline),
+                'stages': stages,
+                'hotspots': top_hotspots(stats, self.top_n),
+            }
+
+            os.makedirs(self.directory, exist_ok=True)
+            stats.dump_stats(self.dump_path(profile_id))
+            with open(self.dump_path(profile_id, 'json'), 'w') as f:
+                json.dump(report, f, indent=2)
+            self._prune()
+
+        return result, report
+
+    def load_summary(self, profile_id):
+        """Relatório JSON de um profile salvo (ou None)"""
+        path = self.dump_path(profile_id, 'json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+
+# ============================================
+# PROFILER DE AMOSTRAGEM CONTÍNUO
+# ============================================
+
+def collapse_stack(frame):
+    """Pilha da raiz para a folha no formato colapsado: 'api.py:classify;...'"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _thread_cpu_ticks(native_id):
+    """utime + stime (ticks) da thread, via /proc (Linux); None se indisponível"""
+    try:
+        with open(f'/proc/self/task/{native_id}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return int(fields[11]) + int(fields[12])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def format_collapsed(counts):
+    return ''.join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+
+def parse_collapsed(text):
+    counts = collections.Counter()
+    for line in text.splitlines():
+        stack, _, count = line.rpartition(' ')
+        if stack and count.isdigit():
+            counts[stack] += int(count)
+    return counts
+
+
+class SamplingProfiler:
+    """
+    Amostra periodicamente as pilhas de todas as threads do processo
+    (sys._current_frames) e agrega em pilhas colapsadas.
+
+    mode='wall' conta toda thread viva (mostra também espera de I/O, como o
+    subprocesso do Tesseract); mode='cpu' só conta threads que consumiram CPU
+    desde a amostra anterior (/proc no Linux). A cada `window` segundos a
+    janela é gravada em <directory>/<role>-<pid>-<timestamp>.collapsed.
+    """
+
+    def __init__(self, role='api', directory=SAMPLING_PROFILER_DIR, interval=SAMPLING_PROFILER_INTERVAL,
+                 mode=SAMPLING_PROFILER_MODE, window=SAMPLING_PROFILER_WINDOW,
+                 max_files=SAMPLING_PROFILER_MAX_FILES, max_overhead=SAMPLING_PROFILER_MAX_OVERHEAD,
+                 enabled=SAMPLING_PROFILER_ENABLED):
+        self.role = role
+        self.directory = directory
+        self.base_interval = interval
+        self.interval = interval
+        self.mode = mode
+        self.window = window
+        self.max_files = max_files
+        self.max_overhead = max_overhead
+        self.enabled = enabled
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._cpu_ticks = {}
+        self._samples = 0
+        self._sampling_seconds = 0.0
+        self._started_at = None
+        self._window_started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def ensure_started(self):
+        """Inicia a thread neste processo (idempotente; seguro após fork)"""
+        if not self.enabled or self.running:
+            return
+        with self._lock:
+            if self.running:
+                return
+            if self._pid != os.getpid():
+                # Processo filho (fork): descarta as amostras herdadas do pai
+                self._counts.clear()
+                self._cpu_ticks.clear()
+                self._samples = 0
+                self._sampling_seconds = 0.0
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._started_at = self._window_started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Para a amostragem e grava a janela atual"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            self.sample()
+            cost = time.perf_counter() - start
+            self._adjust_interval(cost)
+            if time.time() - self._window_started_at >= self.window:
+                self.flush()
+
+    def _adjust_interval(self, cost):
+        """Aumenta o intervalo se o custo da amostragem passar do limite de overhead"""
+        self._sampling_seconds += cost
+        overhead = cost / max(self.interval, 1e-9)
+        if overhead > self.max_overhead:
+            self.interval = min(self.interval * 1.5, max(_MAX_SAMPLING_INTERVAL, self.base_interval))
+        elif overhead < self.max_overhead / 4 and self.interval > self.base_interval:
+            self.interval = max(self.interval / 1.5, self.base_interval)
+
+    def sample(self):
+        """Uma amostra das pilhas de todas as threads (exceto a do profiler)"""
+        own = threading.get_ident()
+        native_ids = {t.ident: t.native_id for t in threading.enumerate()} if self.mode == 'cpu' else {}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            if self.mode == 'cpu':
+                ticks = _thread_cpu_ticks(native_ids.get(ident))
+                previous = self._cpu_ticks.get(ident)
+                self._cpu_ticks[ident] = ticks
+                if ticks is not None and (previous is None or ticks == previous):
+                    continue
+            stacks.append(collapse_stack(frame))
+        with self._lock:
+            self._counts.update(stacks)
+            self._samples += 1
+
+    def snapshot(self):
+        """Pilhas colapsadas da janela atual (Counter)"""
+        with self._lock:
+            return collections.Counter(self._counts)
+
+    def stats(self):
+        elapsed = time.time() - self._started_at if self._started_at else 0.0
+        return {
+            'role': self.role,
+            'pid': self._pid,
+            'running': self.running,
+            'mode': self.mode,
+            'interval_seconds': round(self.interval, 4),
+            'samples': self._samples,
+            'overhead': round(self._sampling_seconds / elapsed, 5) if elapsed else 0.0,
+        }
+
+    def flush(self):
+        """Grava a janela atual em disco e começa outra; retorna o caminho (ou None)"""
+        with self._lock:
+            counts, self._counts = self._counts, collections.Counter()
+            self._window_started_at = time.time()
+        if not counts:
+            return None
+        path = os.path.join(
+            self.directory,
+            f"{self.role}-{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}.collapsed"
+        )
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(format_collapsed(counts))
+            self._rotate()
+        except OSError:
+            return None
+        return path
+
+    def _rotate(self):
+        files = sorted(glob.glob(os.path.join(self.directory, f"{self.role}-*.collapsed")), key=os.path.getmtime)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def load_collapsed(directory=SAMPLING_PROFILER_DIR, role=None):
+    """Soma as janelas gravadas em disco (todos os processos, ou só um papel)"""
+    counts = collections.Counter()
+    pattern = f"{role}-*.collapsed" if role else '*.collapsed'
+    for path in glob.glob(os.path.join(directory, pattern)):
+        try:
+            with open(path) as f:
+                counts.update(parse_collapsed(f.read()))
+        except OSError:
+            pass
+    return counts
+
+
+def function_summary(counts, top_n=PROFILE_TOP_N):
+    """
+    Fração das amostras em cada função: inclusiva (em qualquer ponto da pilha)
+    e própria (no topo da pilha)
+    """
+    total = sum(counts.values())
+    inclusive, own = collections.Counter(), collections.Counter()
+    for stack, count in counts.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for name in set(frames):
+            inclusive[name] += count
+    rows = [
+        {'function': name, 'inclusive_pct': round(100 * n / total, 2), 'self_pct': round(100 * own[name] / total, 2)}
+        for name, n in inclusive.most_common(top_n)
+    ] if total else []
+    return {'samples': total, 'functions': rows}
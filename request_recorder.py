@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Gravador de Requisições - Metadados do tráfego real para replay
+
+Opcional (REQUEST_RECORDER_ENABLED=1). Para cada POST /classify grava uma
+linha JSON em <dir>/requests.jsonl com hash do conteúdo, dimensões, tamanho,
+parâmetros, classificação, degradações e timings por etapa. Com
+REQUEST_RECORDER_STORE_BYTES=1 o TIFF também é guardado em <dir>/blobs/
+(deduplicado pelo hash), com limite total de bytes: os arquivos mais antigos
+são removidos primeiro. O replay (python -m benchmarks.replay) reenvia a
+mesma mistura contra outra versão e compara os timings por etapa.
+
+Configuração (variáveis de ambiente):
+    REQUEST_RECORDER_ENABLED       0 (padrão) ou 1
+    REQUEST_RECORDER_DIR           diretório do log (padrão .request_log)
+    REQUEST_RECORDER_STORE_BYTES   0 (padrão) ou 1: guardar os TIFFs
+    REQUEST_RECORDER_MAX_BYTES     limite do armazenamento de TIFFs (padrão 512 MB)
+    REQUEST_RECORDER_MAX_LOG_BYTES limite do requests.jsonl antes de rotacionar (padrão 64 MB)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+REQUEST_RECORDER_ENABLED = os.environ.get('REQUEST_RECORDER_ENABLED', '0') == '1'
+REQUEST_RECORDER_DIR = os.environ.get('REQUEST_RECORDER_DIR', '.request_log')
+REQUEST_RECORDER_STORE_BYTES = os.environ.get('REQUEST_RECORDER_STORE_BYTES', '0') == '1'
+REQUEST_RECORDER_MAX_BYTES = int(os.environ.get('REQUEST_RECORDER_MAX_BYTES', str(512 * 1024 * 1024)))
+REQUEST_RECORDER_MAX_LOG_BYTES = int(os.environ.get('REQUEST_RECORDER_MAX_LOG_BYTES', str(64 * 1024 * 1024)))
+
+LOG_FILENAME = 'requests.jsonl'
+BLOB_DIRNAME = 'blobs'
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hash SHA-256 do arquivo (leitura em blocos)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def image_dimensions(path):
+    """(largura, altura) pelo cabeçalho da imagem, sem decodificar os pixels"""
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None, None
+
+
+class RequestRecorder:
+    """Grava metadados (e opcionalmente os bytes) das requisições de classificação"""
+
+    def __init__(self, directory=REQUEST_RECORDER_DIR, enabled=REQUEST_RECORDER_ENABLED,
+                 store_bytes=REQUEST_RECORDER_STORE_BYTES, max_store_bytes=REQUEST_RECORDER_MAX_BYTES,
+                 max_log_bytes=REQUEST_RECORDER_MAX_LOG_BYTES):
+        self.directory = directory
+        self.enabled = enabled
+        self.store_bytes = store_bytes
+        self.max_store_bytes = max_store_bytes
+        self.max_log_bytes = max_log_bytes
+        self.log_path = os.path.join(directory, LOG_FILENAME)
+        self.blob_dir = os.path.join(directory, BLOB_DIRNAME)
+        self._lock = threading.Lock()
+        self._blobs = None  # {hash: (mtime, tamanho)}, carregado sob demanda
+
+    def blob_path(self, content_hash):
+        return os.path.join(self.blob_dir, f"{content_hash}.tif")
+
+    def _load_blobs(self):
+        self._blobs = {}
+        if os.path.isdir(self.blob_dir):
+            for name in os.listdir(self.blob_dir):
+                path = os.path.join(self.blob_dir, name)
+                stat = os.stat(path)
+                self._blobs[os.path.splitext(name)[0]] = (stat.st_mtime, stat.st_size)
+
+    def _store_blob(self, path, content_hash, size):
+        """Copia o TIFF para o armazenamento, removendo os mais antigos acima do limite"""
+        if size > self.max_store_bytes:
+            return False
+        with self._lock:
+            if self._blobs is None:
+                self._load_blobs()
+            if content_hash in self._blobs:
+                return True
+            os.makedirs(self.blob_dir, exist_ok=True)
+            shutil.copyfile(path, self.blob_path(content_hash))
+            self._blobs[content_hash] = (time.time(), size)
+
+            total = sum(s for _, s in self._blobs.values())
+            for old_hash, (_, old_size) in sorted(self._blobs.items(), key=lambda item: item[1][0]):
+                if total <= self.max_store_bytes:
+                    break
+                if old_hash == content_hash:
+                    continue
+                try:
+                    os.remove(self.blob_path(old_hash))
+                except OSError:
+                    pass
+                del self._blobs[old_hash]
+                total -= old_size
+        return True
+
+    def capture(self, path, endpoint, params, filename=None):
+        """
+        Coleta os metadados do arquivo recebido (antes de ser removido).
+        Retorna o registro (dict) a completar com finish(), ou None se desativado.
+        """
+        if not self.enabled:
+            return None
+        try:
+            size = os.path.getsize(path)
+            content_hash = file_sha256(path)
+            width, height = image_dimensions(path)
+            record = {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'endpoint': endpoint,
+                'filename': filename,
+                'content_hash': content_hash,
+                'size_bytes': size,
+                'width': width,
+                'height': height,
+                'megapixels': round(width * height / 1e6, 3) if width and height else None,
+                'params': dict(params),
+                'stored': False,
+            }
+            if self.store_bytes:
+                record['stored'] = self._store_blob(path, content_hash, size)
+            return record
+        except Exception as e:
+            logger.warning("⚠️ Falha ao gravar requisição: %s", e)
+            return None
+
+    def finish(self, record, status, timings, result=None, request_id=None):
+        """Completa o registro com status, timings e resultado e grava no log"""
+        if record is None:
+            return
+        record['status'] = status
+        record['request_id'] = request_id
+        record['timings'] = {stage: round(seconds, 6) for stage, seconds in timings.items()}
+        if result:
+            record['classification'] = result.get('classification')
+            record['degradations'] = list(result.get('degradations', []))
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        try:
+            with self._lock:
+                os.makedirs(self.directory, exist_ok=True)
+                if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.max_log_bytes:
+                    os.replace(self.log_path, self.log_path + '.1')
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+        except OSError as e:
+            logger.warning("⚠️ Falha ao gravar requisição: %s", e)
+
+
+def load_records(directory):
+    """Registros gravados (rotacionado .1 primeiro, depois o atual)"""
+    records = []
+    log_path = os.path.join(directory, LOG_FILENAME)
+    for path in (log_path + '.1', log_path):
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+    return records
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Layout em Faixas - features e perfil de linhas com memória limitada
+
+Para páginas grandes (folhas de engenharia, A3 a 600 dpi) o caminho normal
+decodifica a página inteira e mantém cinza, binária e rótulos int32 do
+tamanho da página. Aqui a página é lida em faixas (image_io.iter_grayscale_stripes),
+em duas passagens:
+
+1. histograma de cinza de todas as faixas -> limiar de Otsu (mesmo cálculo
+   do cv2.THRESH_OTSU)
+2. por faixa: binarização com o limiar global, componentes conectados
+   (8-conectividade) e perfil horizontal (pixels de texto e margem esquerda
+   por linha). Componentes que atravessam a borda entre faixas são unidos
+   (union-find) e só entram nas estatísticas quando não tocam mais a borda.
+
+O resultado equivale ao de ClassificadorFinal.extract_features e do
+ParagraphDetector (que usam o perfil por linha), com pico de memória
+proporcional à faixa.
+
+Configuração (variáveis de ambiente):
+    STRIPE_ROWS   linhas por faixa (padrão 512; no mínimo a altura do strip/tile do arquivo)
+    STRIPE_MODE   auto (quando a página não cabe no orçamento), always ou off
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+import image_io
+import memory_budget
+import metrics
+from layout_profile import LayoutProfile, row_extents
+
+STRIPE_ROWS = int(os.environ.get('STRIPE_ROWS', '512'))
+STRIPE_MODE = os.environ.get('STRIPE_MODE', 'auto')
+
+# Área mínima (px) dos componentes considerados texto (igual a extract_features)
+MIN_COMPONENT_AREA = 10
+
+
+def otsu_threshold(hist):
+    """Limiar de Otsu a partir do histograma de 256 níveis (como no OpenCV)"""
+    hist = np.asarray(hist, dtype=np.float64)
+    total = hist.sum()
+    if total == 0:
+        return 0
+    p = hist / total
+    mu = float(np.dot(np.arange(256), p))
+    eps = np.finfo(np.float32).eps
+    mu1 = q1 = max_sigma = 0.0
+    threshold = 0
+    for i in range(256):
+        p_i = p[i]
+        mu1 *= q1
+        q1 += p_i
+        q2 = 1.0 - q1
+        if min(q1, q2) < eps or max(q1, q2) > 1.0 - eps:
+            continue
+        mu1 = (mu1 + i * p_i) / q1
+        mu2 = (mu - q1 * mu1) / q2
+        sigma = q1 * q2 * (mu1 - mu2) ** 2
+        if sigma > max_sigma:
+            max_sigma = sigma
+            threshold = i
+    return threshold
+
+
+def stripe_rows_for(layout_info):
+    """Linhas por faixa para o arquivo (TiffInfo) ou None se STRIPE_MODE=off / não TIFF"""
+    if STRIPE_MODE == 'off' or layout_info is None:
+        return None
+    page = layout_info.first
+    if page.planar == 2 and page.samples_per_pixel > 1:
+        return None
+    chunk = page.tile_height if page.tiled else (1 if page.compression == 1 else page.rows_per_strip)
+    return max(STRIPE_ROWS, chunk or 1)
+
+
+class StripedLayout(LayoutProfile):
+    """Perfis (LayoutProfile) e estatísticas dos componentes acumulados faixa a faixa"""
+
+    def __init__(self, width, height, threshold):
+        super().__init__(width, height)
+        self.threshold = threshold
+        # Componentes finalizados com área >= MIN_COMPONENT_AREA
+        self.num_components = 0
+        self.total_area = 0
+        self.height_sum = 0.0
+        self.height_sq_sum = 0.0
+        self.width_sum = 0.0
+        self.aspect_sum = 0.0
+        self.stripes = 0
+
+    def add_components(self, areas, widths, heights):
+        """Soma componentes completos (arrays) às estatísticas"""
+        valid = areas >= MIN_COMPONENT_AREA
+        if not valid.any():
+            return
+        heights = heights[valid].astype(np.float64)
+        widths = widths[valid].astype(np.float64)
+        self.num_components += int(valid.sum())
+        self.total_area += int(areas[valid].sum())
+        self.height_sum += heights.sum()
+        self.height_sq_sum += (heights * heights).sum()
+        self.width_sum += widths.sum()
+        self.aspect_sum += (heights / widths).sum()
+
+    @property
+    def avg_height(self):
+        return self.height_sum / self.num_components if self.num_components else 0.0
+
+    @property
+    def height_std(self):
+        if not self.num_components:
+            return 0.0
+        variance = self.height_sq_sum / self.num_components - self.avg_height ** 2
+        return float(np.sqrt(max(variance, 0.0)))
+
+
+class _OpenComponents:
+    """Componentes que tocam a borda inferior da faixa anterior (podem continuar)"""
+
+    def __init__(self, width):
+        # Rótulo (id global) de cada pixel da última linha da faixa anterior, 0 = fundo
+        self.bottom = np.zeros(width, np.int64)
+        # id global -> [área, x0, y0, x1, y1] (x1/y1 exclusivos)
+        self.stats = {}
+        self.next_id = 1
+
+
+def _find(parent, node):
+    root = node
+    while parent[root] != root:
+        root = parent[root]
+    while parent[node] != root:
+        parent[node], node = root, parent[node]
+    return root
+
+
+def _merge_stripe(result, open_components, y0, labels, num_labels, stats):
+    """Une os componentes da faixa aos abertos da faixa anterior e finaliza os completos"""
+    local = np.arange(1, num_labels)
+    areas = stats[1:, cv2.CC_STAT_AREA].astype(np.int64)
+    lefts = stats[1:, cv2.CC_STAT_LEFT].astype(np.int64)
+    tops = stats[1:, cv2.CC_STAT_TOP].astype(np.int64) + y0
+    widths = stats[1:, cv2.CC_STAT_WIDTH].astype(np.int64)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT].astype(np.int64)
+
+    top_row, bottom_row = labels[0], labels[-1]
+    touches = np.zeros(num_labels, bool)
+    touches[top_row] = True
+    touches[bottom_row] = True
+    touches[0] = False
+    border = touches[1:]
+
+    # Componentes inteiros dentro da faixa: estatísticas vetorizadas
+    result.add_components(areas[~border], widths[~border], heights[~border])
+
+    # Pares (rótulo local na 1ª linha, id global na última linha anterior), 8-conectividade
+    width = top_row.shape[0]
+    previous = open_components.bottom
+    pairs = []
+    for dx in (-1, 0, 1):
+        current = top_row[max(0, -dx):width - max(0, dx)]
+        neighbor = previous[max(0, dx):width - max(0, -dx)]
+        mask = (current > 0) & (neighbor > 0)
+        if mask.any():
+            pairs.append(np.stack([current[mask], neighbor[mask]], axis=1))
+
+    base = open_components.next_id
+    open_components.next_id += num_labels
+    parent = {gid: gid for gid in open_components.stats}
+    nodes = dict(open_components.stats)
+    for label in local[border]:
+        gid = base + int(label)
+        parent[gid] = gid
+        i = label - 1
+        nodes[gid] = [int(areas[i]), int(lefts[i]), int(tops[i]),
+                      int(lefts[i] + widths[i]), int(tops[i] + heights[i])]
+    if pairs:
+        for label, gid in np.unique(np.concatenate(pairs), axis=0):
+            a, b = _find(parent, base + int(label)), _find(parent, int(gid))
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+    groups = {}
+    for gid, (area, x0, y_start, x1, y_end) in nodes.items():
+        root = _find(parent, gid)
+        group = groups.get(root)
+        if group is None:
+            groups[root] = [area, x0, y_start, x1, y_end]
+        else:
+            group[0] += area
+            group[1] = min(group[1], x0)
+            group[2] = min(group[2], y_start)
+            group[3] = max(group[3], x1)
+            group[4] = max(group[4], y_end)
+
+    # Grupos que tocam a última linha continuam abertos
+    lookup = np.zeros(num_labels, np.int64)
+    bottom_labels = np.unique(bottom_row)
+    bottom_labels = bottom_labels[bottom_labels > 0]
+    for label in bottom_labels:
+        lookup[label] = _find(parent, base + int(label))
+    still_open = set(lookup[bottom_labels].tolist())
+
+    finished = [group for root, group in groups.items() if root not in still_open]
+    if finished:
+        finished = np.array(finished, np.int64)
+        result.add_components(finished[:, 0], finished[:, 3] - finished[:, 1], finished[:, 4] - finished[:, 2])
+
+    open_components.stats = {root: groups[root] for root in still_open}
+    open_components.bottom = lookup[bottom_row]
+
+
+def analyze(image_path, stripe_rows=None):
+    """Duas passagens em faixas: limiar de Otsu global e depois componentes + perfil"""
+    stripe_rows = stripe_rows or STRIPE_ROWS
+
+    with metrics.stage('stripe_histogram'):
+        hist = np.zeros(256, np.int64)
+        height = width = 0
+        for _, stripe in image_io.iter_grayscale_stripes(image_path, stripe_rows):
+            hist += np.bincount(stripe.ravel(), minlength=256)
+            height += stripe.shape[0]
+            width = stripe.shape[1]
+        threshold = otsu_threshold(hist)
+    metrics.IMAGE_MEGAPIXELS.observe(width * height / 1e6)
+
+    result = StripedLayout(width, height, threshold)
+    open_components = _OpenComponents(width)
+    with metrics.stage('stripe_components'):
+        for y0, stripe in image_io.iter_grayscale_stripes(image_path, stripe_rows):
+            # THRESH_BINARY_INV: texto = cinza <= limiar
+            binary = memory_budget.track((stripe <= threshold).view(np.uint8))
+            rows = slice(y0, y0 + stripe.shape[0])
+            result.row_counts[rows] = cv2.reduce(binary, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+            result.row_left[rows], result.row_right[rows] = row_extents(binary, result.row_counts[rows] > 0)
+            result.col_counts += cv2.reduce(binary, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel()
+
+            num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+            memory_budget.track(labels)
+            _merge_stripe(result, open_components, y0, labels, num_labels, stats)
+            result.stripes += 1
+
+        # Componentes que tocam a última linha da página
+        if open_components.stats:
+            finished = np.array(list(open_components.stats.values()), np.int64)
+            result.add_components(finished[:, 0], finished[:, 3] - finished[:, 1], finished[:, 4] - finished[:, 2])
+    return result
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Logging Estruturado - Níveis, JSON, correlation id e handler não bloqueante
+
+- configure_logging(): instala um QueueHandler no logger raiz; a escrita no
+  stderr acontece numa thread separada (QueueListener), então o caminho da
+  requisição só enfileira o registro
+- Cada requisição/tarefa recebe um correlation id (begin_request), incluído
+  em todos os registros
+- Registros DEBUG por requisição são amostrados (LOG_DEBUG_SAMPLE_RATE):
+  apenas uma fração das requisições emite logs de debug
+
+Configuração (variáveis de ambiente):
+    LOG_LEVEL               INFO (padrão), DEBUG, WARNING...
+    LOG_FORMAT              json (padrão) ou text
+    LOG_DEBUG_SAMPLE_RATE   fração de requisições com logs DEBUG (padrão 0.1)
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '0.1'))
+
+_correlation_id = contextvars.ContextVar('correlation_id', default=None)
+_debug_sampled = contextvars.ContextVar('debug_sampled', default=True)
+
+# Atributos padrão do LogRecord (o resto vem de extra={...})
+_RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'correlation_id'}
+
+_listener = None
+
+
+def begin_request(correlation_id=None, sample_rate=None):
+    """
+    Inicia o contexto de log de uma requisição/tarefa.
+    Retorna o correlation id (gerado se não informado).
+    """
+    if sample_rate is None:
+        sample_rate = LOG_DEBUG_SAMPLE_RATE
+    correlation_id = correlation_id or uuid.uuid4().hex
+    _correlation_id.set(correlation_id)
+    _debug_sampled.set(random.random() < sample_rate)
+    return correlation_id
+
+
+def end_request():
+    """Limpa o contexto de log da requisição"""
+    _correlation_id.set(None)
+    _debug_sampled.set(True)
+
+
+def get_correlation_id():
+    return _correlation_id.get()
+
+
+class ContextFilter(logging.Filter):
+    """Adiciona o correlation id e descarta DEBUG de requisições não amostradas"""
+
+    def filter(self, record):
+        if record.levelno <= logging.DEBUG and not _debug_sampled.get():
+            return False
+        record.correlation_id = _correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha: timestamp, nível, logger, mensagem e campos extras"""
+
+    def format(self, record):
+        payload = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        correlation_id = getattr(record, 'correlation_id', None)
+        if correlation_id:
+            payload['correlation_id'] = correlation_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legível para desenvolvimento local"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'correlation_id'):
+            record.correlation_id = None
+        return super().format(record)
+
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """
+    Configura o logger raiz (idempotente): QueueHandler no caminho da
+    requisição e QueueListener escrevendo no stderr em background.
+    """
+    global _listener
+
+    level = (level or LOG_LEVEL).upper()
+    fmt = (fmt or LOG_FORMAT).lower()
+
+    root = logging.getLogger()
+    root.setLevel(level)
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for handler in list(root.handlers):
+        if getattr(handler, '_structured_logging', False):
+            root.removeHandler(handler)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler._structured_logging = True
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+    return root
+
+
+def shutdown_logging():
+    """Esvazia a fila e para a thread de escrita"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logger(name):
+    return logging.getLogger(name)
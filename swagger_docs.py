@@ -84,6 +84,28 @@ stats_docs = {
     }
 }
 
+# ============================================
+# METRICS
+# ============================================
+metrics_docs = {
+    "tags": ["Statistics"],
+    "summary": "Métricas de performance (Prometheus)",
+    "description": """
+    Exporta as métricas do processo no formato texto do Prometheus:
+    histogramas por etapa (`stage_duration_seconds`), latência HTTP, tamanho das
+    imagens, cache de OCR, OCR especulativo, fila de admissão e espera em fila.
+    
+    As respostas de `/classify` também trazem o header `Server-Timing` com a
+    duração (ms) de cada etapa da requisição.
+    """,
+    "produces": ["text/plain"],
+    "responses": {
+        "200": {
+            "description": "Métricas no formato de exposição do Prometheus"
+        }
+    }
+}
+
 # ============================================
 # CLASSIFY (SÍNCRONO)
 # ============================================
@@ -104,9 +126,13 @@ classify_docs = {
     4. Detecção de parágrafos
     5. Análise de palavras frequentes
     6. Verificação de conformidade com regras acadêmicas
+    
+    **TIFF multipágina:** cada página é classificada (em paralelo) e o resultado é o do documento:
+    classe da maioria das páginas, palavras e parágrafos somados para a conformidade e `pages` com o
+    resumo de cada página. Com `stream=1` as páginas chegam em NDJSON à medida que terminam.
     """,
     "consumes": ["multipart/form-data"],
-    "produces": ["application/json"],
+    "produces": ["application/json", "application/x-ndjson"],
     "parameters": [
         {
             "name": "file",
@@ -139,6 +165,46 @@ classify_docs = {
             "default": "pt",
             "enum": ["pt", "en"],
             "description": "Idioma das mensagens de retorno (pt ou en)"
+        },
+        {
+            "name": "deadline_ms",
+            "in": "formData",
+            "type": "integer",
+            "required": False,
+            "description": "Orçamento de latência em ms. Etapas que não cabem são degradadas (ex.: OCR pulado e palavras estimadas pelo layout) e listadas em `degradations`"
+        },
+        {
+            "name": "layout_scale",
+            "in": "formData",
+            "type": "integer",
+            "required": False,
+            "enum": [1, 2, 4],
+            "description": "Caminho rápido: features de layout em 1/2 ou 1/4 da resolução, com limiares recalibrados por escala (`decode_reduced_N` em `degradations`)"
+        },
+        {
+            "name": "ocr_profile",
+            "in": "formData",
+            "type": "string",
+            "required": False,
+            "enum": ["auto", "speed", "balanced", "accurate"],
+            "default": "auto",
+            "description": "Perfil do OCR (motor, segmentação, dicionários, resolução e modelo de idioma). auto: escolhido pela altura do texto e pelo idioma; o perfil usado volta em `ocr_profile`"
+        },
+        {
+            "name": "stream",
+            "in": "formData",
+            "type": "boolean",
+            "required": False,
+            "default": False,
+            "description": "TIFF multipágina: resposta `application/x-ndjson` com uma linha por página (campo `page`) na ordem em que terminam e a linha final do documento (`pages`)"
+        },
+        {
+            "name": "profile",
+            "in": "formData",
+            "type": "boolean",
+            "required": False,
+            "default": False,
+            "description": "Executar sob cProfile + tracemalloc e retornar `profile` (hotspots e pico de memória por etapa). Exige o header `X-Admin-Token`"
         }
     ],
     "responses": {
@@ -165,6 +231,31 @@ classify_docs = {
                         "layout_transitions": 45
                     },
                     "score": 2.45,
+                    "column_gutters": [[1178, 1286]],
+                    "orientation": {"rotation": 0, "skew_angle": 0.35, "needs_correction": False},
+                    "ocr_profile": "balanced",
+                    "degradations": [],
+                    "memory": {
+                        "strategy": "full",
+                        "scale": 1,
+                        "estimated_peak_bytes": 104857600,
+                        "budget_bytes": 536870912,
+                        "peak_bytes": 52428800,
+                        "stages": {"decode": 8699840, "connected_components": 52199040}
+                    },
+                    "image": {
+                        "width": 2480,
+                        "height": 3508,
+                        "bits_per_sample": 1,
+                        "samples_per_pixel": 1,
+                        "compression": "ccitt_g4",
+                        "photometric": 0,
+                        "layout": "strips",
+                        "rows_per_strip": 3508,
+                        "chunks": 1,
+                        "pages": 1,
+                        "file_size": 48213
+                    },
                     "processing_time": "12.34s"
                 }
             }
@@ -177,6 +268,56 @@ classify_docs = {
                 }
             }
         },
+        "403": {
+            "description": "profile=1 sem o token de administrador",
+            "examples": {
+                "application/json": {
+                    "error": "Acesso negado",
+                    "message": "profile=1 exige o token de administrador (header X-Admin-Token)"
+                }
+            }
+        },
+        "202": {
+            "description": "Worker lotado - requisição desviada para processamento assíncrono",
+            "examples": {
+                "application/json": {
+                    "success": True,
+                    "diverted": True,
+                    "task_id": "a1b2c3d4-e5f6-7890-abcd-ef1234567890",
+                    "check_status_url": "/task/a1b2c3d4-e5f6-7890-abcd-ef1234567890"
+                }
+            }
+        },
+        "413": {
+            "description": "Upload acima de MAX_UPLOAD_MB, TIFF acima dos limites de pixels/páginas/razão de descompressão (reason) ou imagem acima do orçamento de memória (REQUEST_MEMORY_BUDGET_MB) mesmo com decode reduzido",
+            "examples": {
+                "application/json": {
+                    "error": "Imagem grande demais",
+                    "estimated_peak_bytes": 1207959552,
+                    "budget_bytes": 536870912
+                }
+            }
+        },
+        "415": {
+            "description": "Arquivo não é TIFF ou usa compressão/profundidade/fotometria não suportada (lido só do cabeçalho)",
+            "examples": {
+                "application/json": {
+                    "error": "Imagem recusada",
+                    "reason": "unsupported_compression",
+                    "message": "Compressão não suportada: jpeg2000"
+                }
+            }
+        },
+        "503": {
+            "description": "Worker lotado (header Retry-After com segundos sugeridos)",
+            "examples": {
+                "application/json": {
+                    "error": "Servidor sobrecarregado",
+                    "reason": "queue_full",
+                    "retry_after": 4
+                }
+            }
+        },
         "500": {
             "description": "Erro no processamento",
             "examples": {
@@ -246,6 +387,21 @@ classify_async_docs = {
             "default": "pt",
             "enum": ["pt", "en"],
             "description": "Idioma das mensagens"
+        },
+        {
+            "name": "deadline_ms",
+            "in": "formData",
+            "type": "integer",
+            "required": False,
+            "description": "Orçamento de latência em ms. Etapas que não cabem são degradadas (ex.: OCR pulado e palavras estimadas pelo layout) e listadas em `degradations`"
+        },
+        {
+            "name": "profile",
+            "in": "formData",
+            "type": "boolean",
+            "required": False,
+            "default": False,
+            "description": "Executar sob cProfile + tracemalloc e retornar `profile` (hotspots e pico de memória por etapa). Exige o header `X-Admin-Token`"
         }
     ],
     "responses": {
@@ -255,10 +411,26 @@ classify_async_docs = {
                 "application/json": {
                     "task_id": "a1b2c3d4-e5f6-7890-abcd-ef1234567890",
                     "status": "Tarefa submetida para processamento",
+                    "trace_id": "4bf92f3577b34da6a3ce929d0e0e4736",
                     "check_status_url": "/task/a1b2c3d4-e5f6-7890-abcd-ef1234567890"
                 }
             }
         },
+        "403": {
+            "description": "profile=1 sem o token de administrador",
+            "examples": {
+                "application/json": {
+                    "error": "Acesso negado",
+                    "message": "profile=1 exige o token de administrador (header X-Admin-Token)"
+                }
+            }
+        },
+        "413": {
+            "description": "Upload acima de MAX_UPLOAD_MB ou TIFF acima dos limites de pixels/páginas (pré-verificação do cabeçalho)"
+        },
+        "415": {
+            "description": "Arquivo não é TIFF ou formato não suportado (pré-verificação do cabeçalho)"
+        },
         "503": {
             "description": "Processamento assíncrono indisponível",
             "examples": {
@@ -329,6 +501,143 @@ task_status_docs = {
     }
 }
 
+# ============================================
+# TRACE
+# ============================================
+trace_docs = {
+    "tags": ["Statistics"],
+    "summary": "Spans de um trace distribuído",
+    "description": """
+    Todos os spans de um trace (API, espera na fila Redis, worker Celery, etapas
+    do classificador e busca do resultado) gravados pelo exportador JSONL.
+    O `trace_id` vem no header `X-Trace-Id` das respostas e no campo `trace_id`
+    de `/classify/async`. Exige o header `X-Admin-Token`.
+    """,
+    "parameters": [
+        {"name": "trace_id", "in": "path", "type": "string", "required": True,
+         "description": "Id do trace (32 hex)"}
+    ],
+    "responses": {
+        "200": {
+            "description": "Spans em ordem de início",
+            "examples": {
+                "application/json": {
+                    "trace_id": "4bf92f3577b34da6a3ce929d0e0e4736",
+                    "duration_ms": 5321.4,
+                    "spans": [
+                        {"name": "POST /classify/async", "service": "api", "duration_ms": 12.3,
+                         "span_id": "00f067aa0ba902b7", "parent_id": None},
+                        {"name": "queue_wait", "service": "worker", "duration_ms": 2100.0,
+                         "span_id": "a3ce929d0e0e4736", "parent_id": "53995c3f42cd8ad8"}
+                    ]
+                }
+            }
+        },
+        "400": {"description": "Id inválido"},
+        "403": {"description": "Token de administrador ausente ou inválido"},
+        "404": {"description": "Trace não encontrado"}
+    }
+}
+
+# ============================================
+# PROFILE
+# ============================================
+sampling_profile_docs = {
+    "tags": ["Statistics"],
+    "summary": "Profiler de amostragem contínuo",
+    "description": """
+    Pilhas colapsadas (uma por linha: `frame;frame;... contagem`) do profiler de
+    amostragem que roda sempre na API e nos workers. Compatível com
+    `flamegraph.pl` e speedscope.
+    
+    `scope=current` usa a janela em memória deste processo; `scope=all` soma as
+    janelas gravadas em disco por todos os processos (`role=api|worker` filtra).
+    Com `format=json` retorna a fração das amostras por função (inclusiva e própria).
+    Exige o header `X-Admin-Token`.
+    """,
+    "parameters": [
+        {"name": "scope", "in": "query", "type": "string", "required": False,
+         "enum": ["current", "all"], "default": "current", "description": "Janela atual ou todas as gravadas"},
+        {"name": "role", "in": "query", "type": "string", "required": False,
+         "enum": ["api", "worker"], "description": "Filtra as janelas gravadas por papel (scope=all)"},
+        {"name": "format", "in": "query", "type": "string", "required": False,
+         "enum": ["json"], "description": "`json` para o resumo por função"},
+        {"name": "top", "in": "query", "type": "integer", "required": False,
+         "default": 30, "description": "Funções no resumo JSON"}
+    ],
+    "produces": ["text/plain", "application/json"],
+    "responses": {
+        "200": {
+            "description": "Pilhas colapsadas ou resumo JSON",
+            "examples": {
+                "application/json": {
+                    "profiler": {"role": "api", "pid": 12, "running": True, "mode": "wall",
+                                 "interval_seconds": 0.05, "samples": 5400, "overhead": 0.0031},
+                    "scope": "current",
+                    "samples": 9120,
+                    "functions": [
+                        {"function": "paragraph_detector.py:analyze", "inclusive_pct": 21.4, "self_pct": 3.2}
+                    ]
+                }
+            }
+        },
+        "400": {"description": "scope inválido"},
+        "403": {"description": "Token de administrador ausente ou inválido"}
+    }
+}
+
+profile_docs = {
+    "tags": ["Statistics"],
+    "summary": "Baixar dump de profiling",
+    "description": """
+    Retorna o dump completo (formato pstats, abrir com `python -m pstats` ou
+    snakeviz) de uma requisição executada com `profile=1`.
+    
+    Com `?format=json` retorna o resumo: hotspots, duração e pico de alocação
+    por etapa. Exige o header `X-Admin-Token` (ou `Authorization: Bearer`).
+    """,
+    "parameters": [
+        {
+            "name": "profile_id",
+            "in": "path",
+            "type": "string",
+            "required": True,
+            "description": "Id retornado em `profile.id`"
+        },
+        {
+            "name": "format",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "enum": ["json"],
+            "description": "`json` para o resumo em vez do dump .prof"
+        }
+    ],
+    "produces": ["application/octet-stream", "application/json"],
+    "responses": {
+        "200": {
+            "description": "Dump .prof ou resumo JSON",
+            "examples": {
+                "application/json": {
+                    "id": "3f2c9a0e8b7d4c1e9f0a1b2c3d4e5f60",
+                    "wall_seconds": 0.412,
+                    "peak_alloc_bytes": 18874368,
+                    "stages": {
+                        "otsu": {"seconds": 0.021, "peak_alloc_bytes": 4194304}
+                    },
+                    "hotspots": [
+                        {"function": "classificador_final.py:120(extract_features)",
+                         "ncalls": 1, "primitive_calls": 1, "tottime_ms": 12.1, "cumtime_ms": 180.4}
+                    ]
+                }
+            }
+        },
+        "400": {"description": "Id inválido"},
+        "403": {"description": "Token de administrador ausente ou inválido"},
+        "404": {"description": "Profile não encontrado"}
+    }
+}
+
 # ============================================
 # FEEDBACK (POST)
 # ============================================
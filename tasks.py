@@ -5,24 +5,42 @@ Tarefas Assíncronas do Celery para Classificação de Documentos
 
 from celery_config import celery_app
 from classificador_final import ClassificadorFinal
+import metrics
+import tiff_header
+from profiling import RequestProfiler, SamplingProfiler
+from tracing import Tracer, parse_traceparent
+from structured_logging import get_logger, begin_request, end_request
 import os
 import time
 
+logger = get_logger('tasks')
+
 # Instância global do classificador (carregada uma vez por worker)
 classifier = None
 
+# Profiling sob demanda (dumps em PROFILE_DIR, compartilhado com a API no docker-compose)
+request_profiler = RequestProfiler()
+
+# Profiler de amostragem contínuo do worker (iniciado na primeira tarefa do processo)
+sampling_profiler = SamplingProfiler(role='worker')
+
+# Spans do worker (traceparent recebido no header da mensagem)
+tracer = Tracer(service='worker')
+
 def get_classifier():
     """Lazy loading do classificador"""
     global classifier
     if classifier is None:
-        print("🔄 Inicializando classificador no worker...")
+        logger.info("🔄 Inicializando classificador no worker...")
         classifier = ClassificadorFinal()
-        print("✅ Classificador pronto!")
+        logger.info("✅ Classificador pronto!")
     return classifier
 
 
 @celery_app.task(bind=True, name='tasks.classify_document')
-def classify_document(self, file_base64, filename, min_words=2000, min_paragraphs=8, language='pt'):
+def classify_document(self, file_base64, filename, min_words=2000, min_paragraphs=8, language='pt',
+                      deadline_ms=None, enqueued_at=None, profile=False, layout_scale=None,
+                      ocr_profile=None):
     """
     Tarefa assíncrona para classificar documento
     
@@ -33,6 +51,11 @@ def classify_document(self, file_base64, filename, min_words=2000, min_paragraph
         min_words: Mínimo de palavras para conformidade
         min_paragraphs: Mínimo de parágrafos para conformidade
         language: Idioma ('pt' ou 'en')
+        deadline_ms: Orçamento de latência opcional (ms)
+        layout_scale: Decode reduzido do layout (1, 2 ou 4) - caminho rápido
+        ocr_profile: Perfil do OCR (speed, balanced, accurate; None = automático)
+        enqueued_at: Timestamp (epoch) da submissão, para medir a espera na fila
+        profile: Executar sob cProfile + tracemalloc (a API só envia com o token de admin)
     
     Returns:
         dict: Resultado da classificação
@@ -41,6 +64,26 @@ def classify_document(self, file_base64, filename, min_words=2000, min_paragraph
     import tempfile
     
     temp_path = None
+    timings_token = metrics.start_timings()
+    
+    # Correlation id: request_id da API (header da mensagem) ou o id da tarefa
+    headers = getattr(self.request, 'headers', None) or {}
+    begin_request(getattr(self.request, 'request_id', None) or headers.get('request_id') or self.request.id)
+    sampling_profiler.ensure_started()
+    
+    # Trace: continua o contexto do span 'enqueue' da API
+    traceparent = getattr(self.request, 'traceparent', None) or headers.get('traceparent')
+    trace = tracer.begin('tasks.classify_document', traceparent,
+                         {'task_id': self.request.id, 'filename': filename})
+    trace_status = 'error'
+    
+    if enqueued_at is not None:
+        now = time.time()
+        queue_wait = max(now - enqueued_at, 0.0)
+        metrics.QUEUE_WAIT.observe(queue_wait, queue='celery')
+        metrics.record_stage('queue_wait', queue_wait)
+        if trace is not None:
+            tracer.record_span('queue_wait', enqueued_at, now, parent=parse_traceparent(traceparent))
     
     try:
         # Atualizar progresso: Iniciando
@@ -50,15 +93,17 @@ def classify_document(self, file_base64, filename, min_words=2000, min_paragraph
         )
         
         # Decodificar arquivo base64 e salvar temporariamente
-        file_bytes = base64.b64decode(file_base64)
-        
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, f"worker_{os.getpid()}_{int(time.time())}_{filename}")
-        
-        with open(temp_path, 'wb') as f:
-            f.write(file_bytes)
+        with metrics.stage('upload_save'):
+            file_bytes = base64.b64decode(file_base64)
+            
+            temp_dir = tempfile.gettempdir()
+            temp_path = os.path.join(temp_dir, f"worker_{os.getpid()}_{int(time.time())}_{filename}")
+            
+            with open(temp_path, 'wb') as f:
+                f.write(file_bytes)
+        metrics.UPLOAD_BYTES.observe(len(file_bytes))
         
-        print(f"📥 Arquivo recebido e salvo: {temp_path} ({len(file_bytes)} bytes)")
+        logger.debug("📥 Arquivo recebido e salvo: %s (%d bytes)", temp_path, len(file_bytes))
         
         # Obter classificador
         clf = get_classifier()
@@ -70,7 +115,27 @@ def classify_document(self, file_base64, filename, min_words=2000, min_paragraph
         )
         
         # Classificar (método completo que faz tudo)
-        result = clf.classify(temp_path, min_words=min_words, min_paragraphs=min_paragraphs, language=language)
+        classify_kwargs = dict(min_words=min_words, min_paragraphs=min_paragraphs,
+                               language=language, deadline_ms=deadline_ms, layout_scale=layout_scale,
+                               ocr_profile=ocr_profile)
+        profile_report = None
+        with metrics.stage('classify'):
+            if profile:
+                result, profile_report = request_profiler.run(clf.classify, temp_path, **classify_kwargs)
+            else:
+                # TIFF multipágina: progresso e resumo de cada página à medida que terminam
+                image_info = tiff_header.inspect_or_none(temp_path)
+                page_count = image_info.page_count if image_info is not None else 1
+                pages = []
+                for page, result in clf.iter_classify(temp_path, image_info=image_info, **classify_kwargs):
+                    if page is None:
+                        continue
+                    pages.append(clf.page_summary(result))
+                    self.update_state(
+                        state='PROGRESS',
+                        meta={'status': f'Página {len(pages)}/{page_count} classificada...',
+                              'progress': 30 + 60 * len(pages) // page_count, 'pages': pages}
+                    )
         
         # Atualizar progresso: Finalizando
         self.update_state(
@@ -82,17 +147,24 @@ def classify_document(self, file_base64, filename, min_words=2000, min_paragraph
         try:
             if temp_path and os.path.exists(temp_path):
                 os.remove(temp_path)
-                print(f"🗑️  Arquivo temporário removido: {temp_path}")
+                logger.debug("🗑️  Arquivo temporário removido: %s", temp_path)
         except Exception as cleanup_error:
-            print(f"⚠️  Erro ao limpar arquivo: {cleanup_error}")
+            logger.warning("⚠️  Erro ao limpar arquivo: %s", cleanup_error)
         
+        # Duração (s) de cada etapa, equivalente ao Server-Timing do /classify
+        result['timings'] = {name: round(seconds, 4) for name, seconds in metrics.current_timings().items()}
+        if profile_report is not None:
+            result['profile'] = dict(profile_report, download_url=f"/profile/{profile_report['id']}")
+        if trace is not None:
+            # A API registra a busca do resultado (GET /task/<id>) no mesmo trace
+            result['trace_id'] = trace[0].context.trace_id
+            result['traceparent'] = trace[0].context.traceparent
+        trace_status = 'ok'
         return result
         
     except Exception as e:
         # Erro na tarefa
-        print(f"❌ Erro na classificação: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Erro na classificação: %s", e)
         
         # Limpar arquivo temporário em caso de erro
         try:
@@ -102,6 +174,10 @@ def classify_document(self, file_base64, filename, min_words=2000, min_paragraph
             pass
         
         raise
+    finally:
+        metrics.finish_timings(timings_token)
+        tracer.finish(trace, status=trace_status)
+        end_request()
 
 
 @celery_app.task(name='tasks.cleanup_old_files')
@@ -0,0 +1,236 @@
+"""
+Testes unitários para o controle de admissão (backpressure)
+"""
+import io
+import threading
+
+import pytest
+from PIL import Image
+
+from admission import AdmissionController, AdmissionRejected
+
+
+class TestAdmissionController:
+    """Testes para AdmissionController"""
+    
+    # ========== HAPPY PATH ==========
+    
+    def test_admits_up_to_max_in_flight_happy_path(self):
+        """
+        HAPPY PATH: Requisições dentro da capacidade
+        
+        Expected: Vagas concedidas sem espera e contabilizadas
+        """
+        controller = AdmissionController(max_in_flight=2, max_queue=0, queue_timeout=0.1, max_cost=100)
+        
+        first = controller.acquire(cost=1.0)
+        second = controller.acquire(cost=1.0)
+        
+        snapshot = controller.snapshot()
+        assert snapshot['in_flight'] == 2
+        assert snapshot['admitted'] == 2
+        
+        first.release()
+        second.release()
+        assert controller.snapshot()['in_flight'] == 0
+    
+    def test_queued_request_admitted_after_release_happy_path(self):
+        """
+        HAPPY PATH: Requisição na fila recebe a vaga liberada
+        
+        Expected: Segunda requisição admitida após a primeira terminar
+        """
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5, max_cost=100)
+        first = controller.acquire(cost=1.0)
+        admitted = []
+        
+        def waiter():
+            with controller.acquire(cost=1.0) as ticket:
+                admitted.append(ticket.queue_wait)
+        
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        while controller.snapshot()['queue_depth'] == 0:
+            pass
+        first.release()
+        thread.join(timeout=5)
+        
+        assert len(admitted) == 1
+        assert controller.snapshot()['rejected'] == 0
+    
+    # ========== NEGATIVE PATH ==========
+    
+    def test_rejects_when_queue_full_negative(self):
+        """
+        NEGATIVE PATH: Vagas e fila esgotadas
+        
+        Expected: AdmissionRejected imediato com Retry-After >= 1
+        """
+        controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=5, max_cost=100)
+        controller.acquire(cost=1.0)
+        
+        with pytest.raises(AdmissionRejected) as exc_info:
+            controller.acquire(cost=1.0)
+        
+        assert exc_info.value.reason == 'queue_full'
+        assert exc_info.value.retry_after >= 1
+        assert controller.snapshot()['rejected'] == 1
+    
+    def test_rejects_when_cost_exceeded_negative(self):
+        """
+        NEGATIVE PATH: Custo estimado acima do orçamento do worker
+        
+        Expected: Rejeição por cost_limit mesmo com fila livre
+        """
+        controller = AdmissionController(max_in_flight=4, max_queue=4, queue_timeout=5, max_cost=10)
+        controller.acquire(cost=8.0)
+        
+        with pytest.raises(AdmissionRejected) as exc_info:
+            controller.acquire(cost=5.0)
+        
+        assert exc_info.value.reason == 'cost_limit'
+    
+    def test_queue_timeout_negative(self):
+        """
+        NEGATIVE PATH: Espera na fila excede o timeout
+        
+        Expected: Rejeição por queue_timeout
+        """
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.05, max_cost=100)
+        controller.acquire(cost=1.0)
+        
+        with pytest.raises(AdmissionRejected) as exc_info:
+            controller.acquire(cost=1.0)
+        
+        assert exc_info.value.reason == 'queue_timeout'
+        assert controller.snapshot()['queue_timeouts'] == 1
+        assert controller.snapshot()['queue_depth'] == 0
+
+
+class TestClassifyAdmission:
+    """Testes da integração do controle de admissão com /classify"""
+    
+    def test_overloaded_classify_returns_503_with_retry_after_negative(self, monkeypatch):
+        """
+        NEGATIVE PATH: POST /classify com o worker lotado
+        
+        Expected: 503 rápido com header Retry-After
+        """
+        import api
+        controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=0.1, max_cost=100)
+        controller.acquire(cost=1.0)
+        monkeypatch.setattr(api, 'admission_controller', controller)
+        monkeypatch.setattr(api, 'CELERY_AVAILABLE', False)
+        
+        buffer = io.BytesIO()
+        Image.new('L', (200, 200), color=255).save(buffer, format='TIFF')
+        buffer.seek(0)
+        
+        api.app.config['TESTING'] = True
+        with api.app.test_client() as client:
+            response = client.post('/classify',
+                                   data={'image': (buffer, 'doc.tif')},
+                                   content_type='multipart/form-data')
+        
+        assert response.status_code == 503
+        assert int(response.headers['Retry-After']) >= 1
+        assert response.get_json()['reason'] == 'queue_full'
+        assert controller.snapshot()['rejected'] == 1
+        assert controller.snapshot()['diverted'] == 0
+    
+    @pytest.mark.parametrize('max_queue', [0, 1])
+    def test_diverted_classify_not_counted_as_rejected_negative(self, monkeypatch, max_queue):
+        """
+        NEGATIVE PATH: POST /classify com o worker lotado e Celery disponível
+        (fila cheia ou espera na fila esgotada)
+        
+        Expected: 202 (desviado); contado só como diverted, não como rejected
+        nem como queue_timeout
+        """
+        from unittest.mock import MagicMock
+        import api
+        controller = AdmissionController(max_in_flight=1, max_queue=max_queue, queue_timeout=0.05, max_cost=100)
+        controller.acquire(cost=1.0)
+        monkeypatch.setattr(api, 'admission_controller', controller)
+        monkeypatch.setattr(api, 'CELERY_AVAILABLE', True)
+        monkeypatch.setattr(api, 'ADMISSION_DIVERT_ASYNC', True)
+        monkeypatch.setattr(api, 'submit_classification_task', MagicMock(return_value=MagicMock(id='task-1')))
+        
+        buffer = io.BytesIO()
+        Image.new('L', (200, 200), color=255).save(buffer, format='TIFF')
+        buffer.seek(0)
+        
+        api.app.config['TESTING'] = True
+        with api.app.test_client() as client:
+            response = client.post('/classify',
+                                   data={'image': (buffer, 'doc.tif')},
+                                   content_type='multipart/form-data')
+        
+        assert response.status_code == 202
+        assert controller.snapshot()['diverted'] == 1
+        assert controller.snapshot()['rejected'] == 0
+        assert controller.snapshot()['queue_timeouts'] == 0
+    
+    def test_multipage_cost_counts_all_pages_negative(self, monkeypatch):
+        """
+        NEGATIVE PATH: TIFF de 4 páginas cuja primeira página sozinha caberia no orçamento
+
+        Expected: 503 por cost_limit (custo somado das páginas); a primeira
+        página sozinha é admitida; MULTIPAGE_MODE=first cobra só a primeira
+        """
+        import api
+        import multipage
+        import tiff_header
+
+        def tiff(pages):
+            buffer = io.BytesIO()
+            images = [Image.new('L', (1000, 1000), color=255) for _ in range(pages)]
+            images[0].save(buffer, format='TIFF', save_all=True, append_images=images[1:])
+            buffer.seek(0)
+            return buffer
+
+        single = tiff_header.inspect(tiff(1))
+        page_cost = api.estimate_upload_cost(single)
+        assert api.estimate_upload_cost(tiff_header.inspect(tiff(4))) == pytest.approx(4 * page_cost)
+        controller = AdmissionController(max_in_flight=4, max_queue=4, queue_timeout=0.1,
+                                         max_cost=1.0 + 2 * page_cost)
+        controller.acquire(cost=1.0)
+        monkeypatch.setattr(api, 'admission_controller', controller)
+        monkeypatch.setattr(api, 'CELERY_AVAILABLE', False)
+
+        api.app.config['TESTING'] = True
+        with api.app.test_client() as client:
+            response = client.post('/classify',
+                                   data={'image': (tiff(4), 'doc.tif')},
+                                   content_type='multipart/form-data')
+
+        assert response.status_code == 503
+        assert response.get_json()['reason'] == 'cost_limit'
+        controller.acquire(cost=api.estimate_upload_cost(single)).release()
+        monkeypatch.setattr(multipage, 'MULTIPAGE_MODE', 'first')
+        assert api.estimate_upload_cost(tiff_header.inspect(tiff(4))) == pytest.approx(page_cost)
+    
+    def test_classify_releases_slot_happy_path(self, monkeypatch):
+        """
+        HAPPY PATH: POST /classify dentro da capacidade
+        
+        Expected: 200 e vaga liberada ao final da requisição
+        """
+        import api
+        controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=0.1, max_cost=100)
+        monkeypatch.setattr(api, 'admission_controller', controller)
+        
+        buffer = io.BytesIO()
+        Image.new('L', (200, 200), color=255).save(buffer, format='TIFF')
+        buffer.seek(0)
+        
+        api.app.config['TESTING'] = True
+        with api.app.test_client() as client:
+            response = client.post('/classify',
+                                   data={'image': (buffer, 'doc.tif'), 'deadline_ms': '5000'},
+                                   content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        assert 'degradations' in response.get_json()
+        assert controller.snapshot()['in_flight'] == 0
+        assert controller.snapshot()['admitted'] == 1
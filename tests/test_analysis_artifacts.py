@@ -0,0 +1,250 @@
+"""
+Testes unitários para os artefatos de análise (.npz) e a re-pontuação sem decodificar
+"""
+import os
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import analysis_artifacts
+import image_io
+from analysis_artifacts import ArtifactStore
+from benchmarks import synthetic
+from classificador_final import ClassificadorFinal
+from token_stats import TokenStats
+
+COMPARED_KEYS = ('classification', 'score', 'confidence', 'features', 'extra_features', 'num_lines',
+                 'num_paragraphs', 'word_count', 'frequent_words', 'is_compliant', 'explanation')
+
+
+def _save(tmp_path, name, kind, seed=0, dpi=120):
+    image, truth = synthetic.generate_page(kind, dpi=dpi, seed=seed)
+    path = str(tmp_path / name)
+    image.save(path)
+    return path, truth['text']
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path / 'artifacts'))
+
+
+@pytest.fixture
+def classifier(store):
+    """Classificador com artefatos e OCR simulado (texto fixo com contagens)"""
+    from text_analyzer_optimized import TextAnalyzerOptimized
+    clf = ClassificadorFinal()
+    clf.artifact_store = store
+    real = clf.text_analyzer or TextAnalyzerOptimized.__new__(TextAnalyzerOptimized)
+    clf.text_analyzer = MagicMock()
+    stats = TokenStats.from_text('modelo dados rede ' * 700)
+    clf.text_analyzer.analyze_fast.return_value = {
+        'text': '', 'word_count': stats.total, 'frequent_words': stats.most_common(10), 'token_stats': stats}
+    clf.text_analyzer.check_compliance.side_effect = real.check_compliance
+    return clf
+
+
+class TestArtifactStore:
+    """Testes para analysis_artifacts.build / ArtifactStore / load_npz_mmap"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_classify_writes_artifact_by_hash_happy_path(self, tmp_path, classifier, store):
+        """
+        HAPPY PATH: Artigo classificado com ANALYSIS_ARTIFACTS ativo
+
+        Expected: <hash>.npz com componentes, perfis, linhas e palavras do OCR;
+        o artefato não aparece no resultado
+        """
+        path, _ = _save(tmp_path, 'article.tif', 'article')
+
+        result = classifier.classify(path)
+
+        document = analysis_artifacts.document_hash(path)
+        assert os.path.exists(store.path(document))
+        assert 'artifact' not in result and 'token_stats' not in result
+        artifact = store.load(document)
+        assert artifact.arrays['components'].shape[1] == 5
+        assert len(artifact.lines()) == result['num_lines']
+        assert artifact.token_stats().total == result['word_count']
+        assert artifact.meta['classification'] == 'scientific_article'
+
+    def test_arrays_memory_mapped_read_only_happy_path(self, tmp_path, classifier, store):
+        """
+        HAPPY PATH: Carregamento do artefato
+
+        Expected: Arrays como np.memmap somente leitura, iguais ao np.load
+        """
+        path, _ = _save(tmp_path, 'article.tif', 'article')
+        classifier.classify(path)
+        document = analysis_artifacts.document_hash(path)
+
+        artifact = store.load(document)
+
+        components = artifact.arrays['components']
+        assert isinstance(components, np.memmap)
+        assert not components.flags.writeable
+        with np.load(store.path(document)) as loaded:
+            for name in ('components', 'row_counts', 'col_counts', 'lines', 'token_counts'):
+                assert np.array_equal(artifact.arrays[name], loaded[name])
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_disabled_store_writes_nothing_negative(self, tmp_path, store):
+        """
+        NEGATIVE PATH: ANALYSIS_ARTIFACTS=0 (padrão)
+
+        Expected: Nenhum arquivo; documento sem artefatos = []
+        """
+        clf = ClassificadorFinal()
+        clf.text_analyzer = None
+        path, _ = _save(tmp_path, 'ad.tif', 'ad')
+
+        assert clf.artifact_store is None
+        clf.classify(path)
+
+        assert store.documents() == []
+        assert store.document('0' * 64) == []
+
+    def test_unsupported_version_rejected_negative(self, store):
+        """
+        NEGATIVE PATH: Artefato gravado com outra versão do formato
+
+        Expected: ValueError ao carregar
+        """
+        store.save('ab' * 32, {'meta': np.frombuffer(b'{"version": 99}', np.uint8)})
+
+        with pytest.raises(ValueError, match='Versão'):
+            store.load('ab' * 32)
+
+    # ========== EDGE CASE ==========
+
+    def test_multipage_artifacts_per_page_edge(self, tmp_path, classifier, store):
+        """
+        EDGE CASE: TIFF multipágina (artigo + anúncio)
+
+        Expected: Um artefato por página (<hash>_p000, _p001), agrupados pelo documento
+        """
+        first, _ = synthetic.generate_page('article', dpi=100, seed=0)
+        second, _ = synthetic.generate_page('ad', dpi=100, seed=1)
+        path = str(tmp_path / 'doc.tif')
+        first.save(path, save_all=True, append_images=[second])
+
+        classifier.classify(path)
+
+        document = analysis_artifacts.document_hash(path)
+        assert store.documents() == [document]
+        artifacts = store.document(document)
+        assert [artifact.page for artifact in artifacts] == [0, 1]
+        assert artifacts[1].token_stats() is None
+
+
+class TestRescore:
+    """Testes para ClassificadorFinal.rescore (sem decodificar a imagem)"""
+
+    # ========== HAPPY PATH ==========
+
+    @pytest.mark.parametrize('kind,seed', [('article', 0), ('ad', 3)])
+    def test_same_result_as_classify_happy_path(self, tmp_path, classifier, store, kind, seed):
+        """
+        HAPPY PATH: Re-pontuação com os mesmos limiares e regras
+
+        Expected: Mesmo resultado da classificação original, campo a campo
+        """
+        path, _ = _save(tmp_path, f'{kind}.tif', kind, seed)
+        original = classifier.classify(path)
+
+        rescored = classifier.rescore(store.document(analysis_artifacts.document_hash(path)))
+
+        for key in COMPARED_KEYS:
+            assert rescored.get(key) == original.get(key), key
+
+    def test_new_rules_without_decoding_happy_path(self, tmp_path, classifier, store, monkeypatch):
+        """
+        HAPPY PATH: Regra de conformidade e limiar alterados depois da classificação
+
+        Expected: Conformidade e score recalculados sem decodificar a imagem
+        """
+        path, _ = _save(tmp_path, 'article.tif', 'article')
+        original = classifier.classify(path, min_words=100, min_paragraphs=1)
+        artifacts = store.document(analysis_artifacts.document_hash(path))
+        monkeypatch.setattr(image_io, 'decode_grayscale', MagicMock(side_effect=AssertionError('decode')))
+        monkeypatch.setattr(image_io, 'decode_bilevel_mask', MagicMock(side_effect=AssertionError('decode')))
+
+        stricter = classifier.rescore(artifacts, min_words=5000, min_paragraphs=1)
+        classifier.thresholds = dict(classifier.thresholds, num_linhas=10 ** 6)
+        fewer_lines = classifier.rescore(artifacts, min_words=100, min_paragraphs=1)
+
+        assert original['is_compliant'] is True
+        assert stricter['is_compliant'] is False
+        assert fewer_lines['score'] == pytest.approx(original['score'] + 2 * classifier.pesos['p5'])
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_no_artifacts_negative(self, classifier):
+        """
+        NEGATIVE PATH: Documento sem artefatos
+
+        Expected: ValueError
+        """
+        with pytest.raises(ValueError):
+            classifier.rescore([])
+
+    # ========== EDGE CASE ==========
+
+    def test_advertisement_rescored_as_article_estimates_words_edge(self, tmp_path, classifier, store):
+        """
+        EDGE CASE: Anúncio (sem OCR) que vira artigo com novos limiares
+
+        Expected: Palavras estimadas pelo layout (ocr_skipped), sem OCR
+        """
+        path, _ = _save(tmp_path, 'ad.tif', 'ad', seed=3)
+        assert classifier.classify(path)['classification'] == 'advertisement'
+        classifier.pesos = {key: 0.0 for key in classifier.pesos}
+        classifier.pesos['p3'] = 1.0
+        classifier.thresholds = dict(classifier.thresholds, densidade_texto=1.0)
+
+        result = classifier.rescore(store.document(analysis_artifacts.document_hash(path)))
+
+        assert result['classification'] == 'scientific_article'
+        assert result['word_count_estimated'] is True
+        assert 'ocr_skipped' in result['degradations']
+
+    def test_multipage_document_aggregated_edge(self, tmp_path, classifier, store):
+        """
+        EDGE CASE: Re-pontuação de um TIFF multipágina
+
+        Expected: Mesmo documento agregado (classe, páginas, palavras) da classificação
+        """
+        pages = [synthetic.generate_page(kind, dpi=100, seed=seed)[0]
+                 for kind, seed in (('article', 0), ('ad', 1), ('article', 2))]
+        path = str(tmp_path / 'doc.tif')
+        pages[0].save(path, save_all=True, append_images=pages[1:])
+        original = classifier.classify(path)
+
+        rescored = classifier.rescore(store.document(analysis_artifacts.document_hash(path)))
+
+        for key in ('classification', 'score', 'page_count', 'pages', 'word_count', 'frequent_words'):
+            assert rescored[key] == original[key], key
+
+    def test_striped_page_uses_stored_features_edge(self, tmp_path, classifier, store, monkeypatch):
+        """
+        EDGE CASE: Página lida em faixas (sem componentes guardados)
+
+        Expected: Features do meta e linhas/parágrafos dos perfis guardados; mesmo resultado
+        """
+        import striped_layout
+        monkeypatch.setattr(striped_layout, 'STRIPE_MODE', 'always')
+        path, _ = _save(tmp_path, 'article.tif', 'article')
+        Image.open(path).save(path, compression='tiff_lzw')
+        original = classifier.classify(path)
+        assert original['memory']['strategy'] == 'stripes'
+
+        artifacts = store.document(analysis_artifacts.document_hash(path))
+        rescored = classifier.rescore(artifacts)
+
+        assert artifacts[0].layout_profile().components is None
+        for key in ('classification', 'score', 'num_lines', 'num_paragraphs', 'features'):
+            assert rescored[key] == original[key], key
@@ -0,0 +1,520 @@
+"""
+Testes unitários para o pacote de benchmarks (corpus sintético, resumo e comparação)
+"""
+import json
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from benchmarks import (calibrate_scales, layout_passes, loadtest, ocr_orientation, ocr_profiles, rescore, run,
+                        synthetic, token_stats)
+
+
+class TestBenchmarkRunner:
+    """Testes para summarize, compare e run_benchmarks"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_summarize_percentiles_happy_path(self):
+        """
+        HAPPY PATH: Resumo de durações conhecidas
+
+        Expected: p50/p99 em ms e throughput em itens/s
+        """
+        summary = run.summarize([0.01, 0.02, 0.03, 0.04])
+
+        assert summary['n'] == 4
+        assert summary['p50_ms'] == pytest.approx(25.0)
+        assert summary['p99_ms'] <= 40.0
+        assert summary['throughput_per_s'] == pytest.approx(40.0)
+
+    def test_run_benchmarks_report_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Benchmark de uma página sintética pequena
+
+        Expected: Relatório com etapas medidas, megapixels e pico de RSS
+        """
+        images = run.collect_images(None, str(tmp_path), ['100dpi'], ['sparse'])
+        report = run.run_benchmarks(images, repeat=1, warmup=0, stages=('features', 'paragraphs'))
+
+        image = report['images']['synthetic_100dpi_sparse']
+        assert set(image['stages']) == {'features', 'paragraphs'}
+        assert image['megapixels'] > 0.9
+        assert report['peak_rss_mb'] > 0
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_compare_flags_regression_negative(self):
+        """
+        NEGATIVE PATH: Etapa 2x mais lenta que o baseline
+
+        Expected: Regressão reportada apenas para a etapa acima da tolerância
+        """
+        baseline = {'images': {'doc': {'stages': {'features': {'p50_ms': 10.0}, 'paragraphs': {'p50_ms': 10.0}}}}}
+        report = {'images': {'doc': {'stages': {'features': {'p50_ms': 20.0}, 'paragraphs': {'p50_ms': 11.0}}}}}
+
+        regressions = run.compare(report, baseline, tolerance=0.25)
+
+        assert [r['stage'] for r in regressions] == ['features']
+        assert regressions[0]['ratio'] == pytest.approx(2.0)
+
+    def test_uncompared_stages_listed_negative(self):
+        """
+        NEGATIVE PATH: Baseline gravado sem Tesseract, relatório com OCR
+
+        Expected: ocr_cold listado como não comparado; compare não o reporta
+        """
+        baseline = {'images': {'doc': {'stages': {'features': {'p50_ms': 10.0}}}}}
+        report = {'images': {'doc': {'stages': {'features': {'p50_ms': 10.0}, 'ocr_cold': {'p50_ms': 900.0}}}}}
+
+        assert run.compare(report, baseline) == []
+        assert run.uncompared(report, baseline) == [{'image': 'doc', 'stage': 'ocr_cold'}]
+
+    def test_missing_baseline_fails_gate_negative(self, tmp_path):
+        """
+        NEGATIVE PATH: --fail-on-regression sem baseline local gravado
+
+        Expected: Código 2 (nada comparado); depois do --save-baseline, código 0
+        """
+        baseline = str(tmp_path / 'baseline.json')
+        argv = ['--images', str(tmp_path / 'none'), '--resolutions', '100dpi', '--densities', 'sparse',
+                '--stages', 'features', '--repeat', '1', '--warmup', '0', '--baseline', baseline,
+                '--output', str(tmp_path / 'bench.json')]
+
+        assert run.main(argv + ['--fail-on-regression']) == 2
+        assert run.main(argv + ['--save-baseline']) == 0
+        assert run.main(argv + ['--fail-on-regression', '--tolerance', '100']) == 0
+
+    def test_report_includes_ground_truth_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Corpus sintético com manifest.json
+
+        Expected: Ground truth anexado a cada página do relatório
+        """
+        images = run.collect_images(None, str(tmp_path), ['100dpi'], ['dense'])
+        truth = run.load_ground_truth(str(tmp_path))
+        report = run.run_benchmarks(images, repeat=1, warmup=0, stages=('features',), ground_truth=truth)
+
+        page_truth = report['images']['synthetic_100dpi_dense']['ground_truth']
+        assert page_truth['kind'] == 'article'
+        assert page_truth['words'] > 0
+
+
+class TestSyntheticGenerator:
+    """Testes para o gerador de páginas sintéticas"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_article_ground_truth_happy_path(self):
+        """
+        HAPPY PATH: Artigo com parágrafos e palavras fixos
+
+        Expected: Ground truth com exatamente o que foi pedido e linhas com bbox
+        """
+        image, truth = synthetic.generate_page('article', dpi=72, columns=2, paragraphs=6, words=500, seed=3)
+
+        assert image.size == (truth['width'], truth['height'])
+        assert truth['paragraphs'] == 6
+        assert truth['words'] == 500
+        assert sum(line['words'] for line in truth['lines']) == 500
+        assert {line['column'] for line in truth['lines']} == {0, 1}
+        assert len(truth['text'].split()) == 500
+
+    def test_generate_corpus_manifest_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Corpus de anúncio + artigo com compressão group4
+
+        Expected: TIFFs 1-bit e manifest.json com o ground truth de cada página
+        """
+        specs = synthetic.scaling_specs(kinds=('ad', 'article'), dpis=(72,), fills=(0.5,))
+        manifest = synthetic.generate_corpus(str(tmp_path), specs, compression='group4')
+
+        with open(tmp_path / 'manifest.json') as f:
+            assert json.load(f) == manifest
+        assert [page['kind'] for page in manifest] == ['ad', 'article']
+        with Image.open(tmp_path / manifest[0]['file']) as img:
+            assert img.mode == '1'
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_invalid_kind_negative(self):
+        """
+        NEGATIVE PATH: Tipo de página desconhecido
+
+        Expected: ValueError
+        """
+        with pytest.raises(ValueError):
+            synthetic.generate_page('invoice')
+
+    # ========== EDGE CASES ==========
+
+    def test_page_full_truncates_ground_truth_edge(self):
+        """
+        EDGE CASE: Mais palavras do que cabem na página
+
+        Expected: Ground truth conta apenas as palavras desenhadas
+        """
+        _, truth = synthetic.generate_page('article', dpi=72, columns=1, paragraphs=2, words=20000, seed=1)
+
+        assert 0 < truth['words'] < 20000
+        assert sum(line['words'] for line in truth['lines']) == truth['words']
+
+    def test_generate_page_deterministic_edge(self):
+        """
+        EDGE CASE: Mesma seed gera a mesma página
+
+        Expected: Páginas idênticas para a mesma seed, diferentes para outra
+        """
+        page_a, _ = synthetic.generate_page('article', dpi=72, noise=0.001, seed=7)
+        page_b, _ = synthetic.generate_page('article', dpi=72, noise=0.001, seed=7)
+        page_c, _ = synthetic.generate_page('article', dpi=72, noise=0.001, seed=8)
+
+        assert np.array_equal(np.array(page_a), np.array(page_b))
+        assert not np.array_equal(np.array(page_a), np.array(page_c))
+
+
+class TestScaleCalibration:
+    """Testes para a calibração dos limiares por escala de decode"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_run_calibration_report_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Anúncio e artigo em 72 dpi
+
+        Expected: Limiares, concordância e latência para 1/2 e 1/4
+        """
+        from classificador_final import ClassificadorFinal
+        manifest = synthetic.generate_corpus(str(tmp_path), calibrate_scales.corpus_specs(2))
+        pages = [(str(tmp_path / page['file']), page['kind']) for page in manifest]
+
+        report = calibrate_scales.run_calibration(ClassificadorFinal(), pages)
+
+        assert report['pages'] == 2
+        assert set(report['scales']) == {'2', '4'}
+        for scale in report['scales'].values():
+            assert set(calibrate_scales.RULES) <= set(scale['thresholds'])
+            assert scale['agreement'] >= scale['agreement_uncalibrated'] or scale['agreement'] == 1.0
+            assert scale['latency_p50_ms'] > 0
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_calibrate_threshold_without_signal_keeps_native_negative(self):
+        """
+        NEGATIVE PATH: Feature reduzida constante (não separa nada)
+
+        Expected: Limiar nativo mantido (empate resolvido pela proximidade)
+        """
+        threshold, agreement = calibrate_scales.calibrate_threshold([1, 9], 4.0, [3, 3], '>')
+
+        assert threshold == 4.0
+        assert agreement == 0.5
+
+    # ========== EDGE CASES ==========
+
+    def test_calibrate_threshold_follows_shifted_feature_edge(self):
+        """
+        EDGE CASE: Feature reduzida deslocada (alturas infladas pela fusão de letras)
+
+        Expected: Limiar entre os valores reduzidos, concordância total
+        """
+        native = [8, 10, 14, 20]
+        reduced = [11, 13, 17, 23]
+
+        threshold, agreement = calibrate_scales.calibrate_threshold(native, 12.0, reduced, '<')
+
+        assert 13 < threshold < 17
+        assert agreement == 1.0
+
+    def test_thresholds_for_scale_overrides_native_edge(self):
+        """
+        EDGE CASE: Limiares da escala 1/4 sobre os nativos
+
+        Expected: Só os recalibrados mudam; escala 1 igual ao nativo
+        """
+        from classificador_final import SCALE_THRESHOLDS, ClassificadorFinal
+        clf = ClassificadorFinal()
+
+        assert clf.thresholds_for(1) == clf.thresholds
+        reduced = clf.thresholds_for(4)
+        assert all(reduced[key] == value for key, value in SCALE_THRESHOLDS[4].items())
+        assert all(reduced[key] == clf.thresholds[key] for key in clf.thresholds if key not in SCALE_THRESHOLDS[4])
+
+
+class TestLayoutPasses:
+    """Testes para o benchmark de passadas sobre a imagem (anterior x perfis compartilhados)"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_run_comparison_report_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Artigo sintético em 72 dpi
+
+        Expected: Pipeline compartilhado com menos passadas e um tempo por passo
+        """
+        image, _ = synthetic.generate_page('article', dpi=72, seed=0)
+        path = str(tmp_path / 'article.tif')
+        image.save(path)
+
+        report = layout_passes.run_comparison(path, repeat=1)
+
+        assert report['shared']['passes'] < report['legacy']['passes']
+        assert report['passes_saved'] == report['legacy']['passes'] - report['shared']['passes']
+        assert len(report['legacy']['steps_ms']) == report['legacy']['passes']
+        assert sum(name.endswith('decode') for name in report['shared']['steps_ms']) == 1
+        assert report['speedup'] > 0
+
+    # ========== EDGE CASE ==========
+
+    def test_main_writes_report_edge(self, tmp_path, capsys):
+        """
+        EDGE CASE: CLI com --output
+
+        Expected: Mesmo relatório JSON no arquivo e na saída padrão
+        """
+        output = tmp_path / 'passadas.json'
+
+        assert layout_passes.main(['--dpi', '72', '--repeat', '1', '--output', str(output)]) == 0
+
+        report = json.loads(output.read_text())
+        assert report['image'] == 'article_72dpi'
+        assert json.loads(capsys.readouterr().out) == report
+
+
+class TestOcrOrientation:
+    """Testes para o benchmark de orientação pelo layout x OSD do Tesseract"""
+
+    @pytest.fixture
+    def pages(self, tmp_path):
+        specs = [
+            {'name': 'upright', 'dpi': 100, 'seed': 0, 'skew': 0.0, 'rotation': 0},
+            {'name': 'skewed', 'dpi': 100, 'seed': 1, 'skew': 3.0, 'rotation': 0},
+            {'name': 'upside_down', 'dpi': 100, 'seed': 2, 'skew': 0.0, 'rotation': 180},
+        ]
+        return [ocr_orientation.make_page(spec, str(tmp_path)) for spec in specs]
+
+    # ========== HAPPY PATH ==========
+
+    def test_run_estimator_report_happy_path(self, pages):
+        """
+        HAPPY PATH: Páginas em pé, inclinada e de cabeça para baixo
+
+        Expected: Rotação sempre certa, erro de inclinação pequeno, duas páginas corrigidas
+        """
+        from classificador_final import ClassificadorFinal
+
+        report, estimates = ocr_orientation.run_estimator(ClassificadorFinal(), pages)
+
+        assert report['rotation_accuracy'] == 1.0
+        assert report['skew_max_abs_error'] <= 0.1
+        assert report['corrected_pages'] == 2
+        assert len(estimates) == 3
+
+    def test_run_ocr_compares_configs_happy_path(self, tmp_path, pages):
+        """
+        HAPPY PATH: Comparação de OCR com um Tesseract simulado
+
+        Expected: Caminho anterior com --psm 1, caminho atual sem OSD
+        """
+        from classificador_final import ClassificadorFinal
+        from text_analyzer_optimized import TextAnalyzerOptimized
+        classifier = ClassificadorFinal()
+        analyzer = TextAnalyzerOptimized(cache_dir=str(tmp_path / 'cache'))
+        analyzer._pytesseract = MagicMock()
+        analyzer._pytesseract.image_to_string.return_value = ''
+        _, estimates = ocr_orientation.run_estimator(classifier, pages)
+
+        report = ocr_orientation.run_ocr(classifier, analyzer, pages, estimates)
+
+        configs = [call[1]['config'] for call in analyzer._pytesseract.image_to_string.call_args_list]
+        assert configs.count(ocr_orientation.LEGACY_CONFIG) == 3
+        assert len(configs) == 6
+        assert report['legacy_psm1_p50_ms'] > 0 and report['layout_orientation_p50_ms'] > 0
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_main_without_tesseract_skips_ocr_negative(self, monkeypatch, capsys):
+        """
+        NEGATIVE PATH: Tesseract ausente
+
+        Expected: Relatório só do estimador; OCR marcado como pulado
+        """
+        monkeypatch.setattr(ocr_orientation, 'tesseract_version', lambda: None)
+
+        assert ocr_orientation.main(['--pages', '2', '--dpi', '72']) == 0
+
+        report = json.loads(capsys.readouterr().out)
+        assert report['ocr'].startswith('skipped')
+        assert report['estimator']['rotation_accuracy'] is not None
+
+
+class TestOcrProfiles:
+    """Testes para o benchmark dos perfis de OCR (palavras/s e concordância com accurate)"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_run_profiles_agreement_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Tesseract simulado em que speed perde uma palavra de quatro
+
+        Expected: Concordância 1.0 em balanced/accurate e 0.75 em speed; palavras/s > 0
+        """
+        from text_analyzer_optimized import TextAnalyzerOptimized
+        image, _ = synthetic.generate_page('article', dpi=72, seed=0)
+        path = str(tmp_path / 'page.tif')
+        image.save(path)
+        analyzer = TextAnalyzerOptimized(cache_dir=str(tmp_path / 'cache'))
+        analyzer._pytesseract = MagicMock()
+        analyzer._pytesseract.get_languages.return_value = ['eng', 'por']
+        analyzer._pytesseract.image_to_string.side_effect = lambda img, lang, config, timeout: (
+            'artigo sobre redes' if 'load_freq_dawg=0' in config else 'artigo sobre redes neurais')
+
+        report = ocr_profiles.run_profiles(analyzer, [path])
+
+        assert report['accurate']['agreement'] == 1.0
+        assert report['balanced']['agreement'] == 1.0
+        assert report['speed']['agreement'] == 0.75
+        assert all(row['words_per_second'] > 0 for row in report.values())
+        assert '| speed |' in ocr_profiles.format_table(report)
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_main_without_tesseract_skips_ocr_negative(self, monkeypatch, capsys):
+        """
+        NEGATIVE PATH: Tesseract ausente
+
+        Expected: Só a distribuição da escolha automática; OCR marcado como pulado
+        """
+        monkeypatch.setattr(ocr_profiles, 'tesseract_version', lambda: None)
+
+        assert ocr_profiles.main(['--pages', '3', '--language', 'en']) == 0
+
+        report = json.loads(capsys.readouterr().out)
+        assert report['profiles'].startswith('skipped')
+        assert sum(report['auto_choice'].values()) == 3
+
+    # ========== EDGE CASE ==========
+
+    def test_agreement_empty_reference_edge(self):
+        """
+        EDGE CASE: Referência sem palavras; palavras repetidas
+
+        Expected: None sem referência; repetições contadas só até o que a referência tem
+        """
+        assert ocr_profiles.agreement('texto', '') is None
+        assert ocr_profiles.agreement('rede rede rede', 'rede modelo') == 0.5
+
+
+class TestTokenStatsComparison:
+    """Testes para o benchmark re.findall x TokenStats"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_run_comparison_identical_happy_path(self):
+        """
+        HAPPY PATH: Três páginas sintéticas
+
+        Expected: Mesmos resultados nos três caminhos e tempos positivos
+        """
+        report = token_stats.run_comparison(token_stats.page_texts(3), repeat=2)
+
+        assert report['identical'] is True
+        assert report['words'] > 0
+        assert report['legacy_ms'] > 0 and report['token_stats_ms'] > 0 and report['sharded_ms'] > 0
+
+    # ========== EDGE CASE ==========
+
+    def test_main_writes_report_edge(self, tmp_path, capsys):
+        """
+        EDGE CASE: --output com uma página
+
+        Expected: Relatório gravado igual ao impresso
+        """
+        output = tmp_path / 'palavras.json'
+
+        assert token_stats.main(['--pages', '1', '--repeat', '1', '--output', str(output)]) == 0
+
+        assert json.loads(output.read_text()) == json.loads(capsys.readouterr().out)
+
+
+class TestRescoreComparison:
+    """Testes para o benchmark classificação completa x re-pontuação pelos artefatos"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_run_comparison_agrees_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Artigo e anúncio sintéticos
+
+        Expected: Re-pontuação concorda com a classificação e é mais rápida
+        """
+        texts = rescore.make_pages(2, str(tmp_path), dpi=100)
+
+        report = rescore.run_comparison(texts, str(tmp_path))
+
+        assert report['documents'] == 2
+        assert report['agreement'] == 1.0
+        assert report['artifact_kb_mean'] > 0
+        assert report['rescore_docs_per_second'] > report['classify_docs_per_second']
+
+    # ========== EDGE CASE ==========
+
+    def test_main_writes_report_edge(self, tmp_path, capsys):
+        """
+        EDGE CASE: --output com uma página
+
+        Expected: Relatório gravado igual ao impresso
+        """
+        output = tmp_path / 'rescore.json'
+
+        assert rescore.main(['--pages', '1', '--dpi', '72', '--output', str(output)]) == 0
+
+        assert json.loads(output.read_text()) == json.loads(capsys.readouterr().out)
+
+
+class TestLoadTest:
+    """Testes para o gerador de carga HTTP"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_in_process_closed_load_happy_path(self):
+        """
+        HAPPY PATH: Carga fechada curta contra a app no processo
+
+        Expected: Percentis e throughput por endpoint, sem erros
+        """
+        documents = loadtest.load_documents(synthetic_pages=1)
+        with loadtest.InProcessServer() as server:
+            report = loadtest.run_load(server.url, documents, mix={'classify': 1, 'feedback': 1},
+                                       concurrency=2, duration=1.0)
+
+        assert report['meta']['model'] == 'closed'
+        assert report['server']['status'] == 'healthy'
+        for endpoint in ('classify', 'feedback'):
+            stats = report['endpoints'][endpoint]
+            assert stats['requests'] > 0
+            assert stats['error_rate'] == 0
+            assert stats['p50_ms'] <= stats['p99_ms']
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_parse_mix_unknown_endpoint_negative(self):
+        """
+        NEGATIVE PATH: Endpoint fora da lista no --mix
+
+        Expected: ValueError
+        """
+        assert loadtest.parse_mix('classify=0.7,feedback=0.3') == {'classify': 0.7, 'feedback': 0.3}
+        with pytest.raises(ValueError):
+            loadtest.parse_mix('stats=1')
+
+    def test_run_load_requires_single_model_negative(self):
+        """
+        NEGATIVE PATH: concurrency e rate juntos
+
+        Expected: ValueError
+        """
+        with pytest.raises(ValueError):
+            loadtest.run_load('http://localhost:1', [('a.tif', b'')], concurrency=1, rate=1.0)
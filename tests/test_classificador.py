@@ -212,3 +212,215 @@ class TestClassificadorFinal:
         assert 'classification' in result
         assert 'confidence' in result
 
+
+
+def _features_stub(avg_height, text_density, num_components):
+    """Features mínimas para controlar o score parcial (regras 1-4), sem perfil de layout"""
+    return (
+        {
+            'text_density': text_density,
+            'num_text_components': num_components,
+            'layout_transitions': 0
+        },
+        {
+            'avg_component_height': avg_height,
+            'height_std': 0.0,
+            'avg_component_width': 0.0,
+            'avg_aspect_ratio': 0.0,
+            'num_columns_detected': 0
+        },
+        None
+    )
+
+
+class TestSpeculativeOCR:
+    """Testes do OCR especulativo (paralelo à detecção de parágrafos)"""
+    
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Classificador com OCR e detector de parágrafos simulados"""
+        from classificador_final import ClassificadorFinal
+        self.clf = ClassificadorFinal()
+        self.clf.text_analyzer = MagicMock()
+        self.clf.text_analyzer.analyze_fast.return_value = {
+            'text': 'research method',
+            'word_count': 2,
+            'frequent_words': [('research', 1), ('method', 1)]
+        }
+        self.clf.text_analyzer.check_compliance.return_value = (False, [])
+        self.clf.paragraph_detector = MagicMock()
+        self.clf.speculative_ocr_threshold = 1.0
+    
+    # ========== HAPPY PATH ==========
+    
+    def test_speculative_ocr_useful_happy_path(self):
+        """
+        HAPPY PATH: Score parcial científico e classe final científica
+        
+        Expected: OCR iniciado antes dos parágrafos e reaproveitado (useful)
+        """
+        self.clf.analyze_layout = Mock(return_value=_features_stub(10.0, 0.2, 900))
+        self.clf.paragraph_detector.analyze_layout.return_value = {'num_lines': 40, 'num_paragraphs': 9}
+        
+        result = self.clf.classify('doc.tif')
+        
+        assert result['classification'] == 'scientific_article'
+        assert result['word_count'] == 2
+        assert self.clf.text_analyzer.analyze_fast.call_count == 1
+        assert self.clf.speculative_ocr_stats == {'started': 1, 'useful': 1, 'wasted': 0}
+    
+    def test_no_speculation_below_threshold_happy_path(self):
+        """
+        HAPPY PATH: Score parcial pouco científico (acima do threshold)
+        
+        Expected: OCR só roda depois da decisão final, sem especulação
+        """
+        self.clf.speculative_ocr_threshold = 10.0
+        self.clf.analyze_layout = Mock(return_value=_features_stub(10.0, 0.2, 900))
+        self.clf.paragraph_detector.analyze_layout.return_value = {'num_lines': 40, 'num_paragraphs': 9}
+        
+        result = self.clf.classify('doc.tif')
+        
+        assert result['classification'] == 'scientific_article'
+        assert self.clf.speculative_ocr_stats['started'] == 0
+        assert self.clf.text_analyzer.analyze_fast.call_count == 1
+    
+    # ========== NEGATIVE PATH ==========
+    
+    def test_speculative_ocr_wasted_negative(self):
+        """
+        NEGATIVE PATH: Especulação iniciada mas classe final é advertisement
+        
+        Input: score parcial -1.69 (regras 1-4) e poucas linhas (+p5)
+        Expected: OCR descartado e contabilizado como wasted
+        """
+        # -p1 (letras pequenas) +p3 (densidade alta) +p4 (poucos componentes)
+        self.clf.analyze_layout = Mock(return_value=_features_stub(10.0, 0.9, 100))
+        self.clf.paragraph_detector.analyze_layout.return_value = {'num_lines': 3, 'num_paragraphs': 1}
+        
+        result = self.clf.classify('doc.tif')
+        
+        assert result['classification'] == 'advertisement'
+        assert 'word_count' not in result
+        assert self.clf.speculative_ocr_stats == {'started': 1, 'useful': 0, 'wasted': 1}
+    
+    def test_wasted_speculation_interrupts_running_ocr_negative(self):
+        """
+        NEGATIVE PATH: OCR especulativo já rodando quando a página vira anúncio
+        
+        Expected: Evento de cancelamento sinalizado e thread do pool liberada
+        sem esperar o OCR terminar
+        """
+        import threading
+        from text_analyzer_optimized import OCRCancelled
+        running = threading.Event()
+        cancelled = threading.Event()
+        
+        def slow_ocr(image_path, cancel=None, **kwargs):
+            running.set()
+            if cancel.wait(5):
+                cancelled.set()
+                raise OCRCancelled("OCR cancelado")
+            return {'text': '', 'word_count': 0, 'frequent_words': []}
+        
+        self.clf.text_analyzer.analyze_fast.side_effect = slow_ocr
+        self.clf.analyze_layout = Mock(return_value=_features_stub(10.0, 0.9, 100))
+        self.clf.paragraph_detector.analyze_layout.side_effect = lambda *args, **kwargs: (
+            running.wait(5) and {'num_lines': 3, 'num_paragraphs': 1})
+        
+        result = self.clf.classify('doc.tif')
+        
+        assert result['classification'] == 'advertisement'
+        assert cancelled.wait(1)
+        assert self.clf.speculative_ocr_stats == {'started': 1, 'useful': 0, 'wasted': 1}
+    
+    def test_speculative_ocr_timeout_not_useful_negative(self):
+        """
+        NEGATIVE PATH: OCR especulativo não termina dentro do deadline
+        
+        Expected: Contabilizado como wasted (não useful), OCR cancelado e
+        palavras estimadas (ocr_timeout)
+        """
+        import threading
+        cancelled = threading.Event()
+        
+        def slow_ocr(image_path, cancel=None, **kwargs):
+            if cancel.wait(5):
+                cancelled.set()
+            return {'text': '', 'word_count': 0, 'frequent_words': []}
+        
+        self.clf.text_analyzer.analyze_fast.side_effect = slow_ocr
+        self.clf.stage_costs = {'features': 0.0, 'paragraphs': 0.0, 'ocr': 0.0}
+        self.clf.analyze_layout = Mock(return_value=_features_stub(10.0, 0.2, 900))
+        self.clf.paragraph_detector.analyze_layout.return_value = {'num_lines': 40, 'num_paragraphs': 9}
+        
+        result = self.clf.classify('doc.tif', deadline_ms=300)
+        
+        assert 'ocr_timeout' in result['degradations']
+        assert cancelled.wait(1)
+        assert self.clf.speculative_ocr_stats == {'started': 1, 'useful': 0, 'wasted': 1}
+
+
+class TestDeadline:
+    """Testes do orçamento de latência (deadline_ms)"""
+    
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Classificador com OCR e detector de parágrafos simulados"""
+        from classificador_final import ClassificadorFinal
+        self.clf = ClassificadorFinal()
+        self.clf.text_analyzer = MagicMock()
+        self.clf.text_analyzer.analyze_fast.return_value = {
+            'text': 'research', 'word_count': 1, 'frequent_words': []
+        }
+        self.clf.text_analyzer.check_compliance.return_value = (False, [])
+        self.clf.paragraph_detector = MagicMock()
+        self.clf.paragraph_detector.analyze_layout.return_value = {'num_lines': 40, 'num_paragraphs': 9}
+        self.clf.analyze_layout = Mock(return_value=_features_stub(10.0, 0.2, 900))
+    
+    # ========== HAPPY PATH ==========
+    
+    def test_no_deadline_runs_all_stages_happy_path(self):
+        """
+        HAPPY PATH: Sem deadline_ms
+        
+        Expected: Nenhuma degradação, OCR executado
+        """
+        result = self.clf.classify('doc.tif')
+        
+        assert result['degradations'] == []
+        assert result['word_count'] == 1
+        assert 'word_count_estimated' not in result
+    
+    def test_tight_deadline_skips_expensive_stages_happy_path(self):
+        """
+        HAPPY PATH: deadline_ms=1 (não cabe parágrafos nem OCR)
+        
+        Expected: Etapas puladas, palavras estimadas pelo layout
+        """
+        result = self.clf.classify('doc.tif', deadline_ms=1)
+        
+        assert result['classification'] == 'scientific_article'
+        assert 'paragraph_detection_skipped' in result['degradations']
+        assert 'ocr_skipped' in result['degradations']
+        assert result['word_count'] == 180  # 900 componentes / 5
+        assert result['word_count_estimated'] is True
+        self.clf.text_analyzer.analyze_fast.assert_not_called()
+        self.clf.paragraph_detector.analyze_layout.assert_not_called()
+    
+    # ========== NEGATIVE PATH ==========
+    
+    def test_ocr_timeout_with_deadline_falls_back_to_estimate_negative(self):
+        """
+        NEGATIVE PATH: OCR estoura o tempo dentro de um deadline folgado
+        
+        Expected: Resposta com estimativa em vez de word_count=0
+        """
+        self.clf.speculative_ocr_enabled = False
+        self.clf.text_analyzer.analyze_fast.side_effect = TimeoutError("OCR timeout")
+        
+        result = self.clf.classify('doc.tif', deadline_ms=60000)
+        
+        assert 'ocr_timeout' in result['degradations']
+        assert result['word_count'] == 180
+        assert result['word_count_estimated'] is True
@@ -0,0 +1,92 @@
+"""
+Testes unitários para ColumnDetector
+"""
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from column_detector import ColumnDetector
+
+
+def _profile(width, blocks, ink=400):
+    """Perfil vertical com tinta nos intervalos [x0, x1)"""
+    profile = np.zeros(width, np.int64)
+    for x0, x1 in blocks:
+        profile[x0:x1] = ink
+    return profile
+
+
+class TestColumnDetector:
+    """Testes para ColumnDetector.detect e a feature num_columns_detected"""
+
+    @pytest.fixture
+    def detector(self):
+        return ColumnDetector()
+
+    # ========== HAPPY PATH ==========
+
+    def test_two_columns_with_gutter_happy_path(self, detector):
+        """
+        HAPPY PATH: Duas colunas de texto separadas por uma calha de 40 px
+
+        Expected: 2 colunas, calha e limites na resolução nativa (x scale)
+        """
+        profile = _profile(1000, [(100, 480), (520, 900)])
+
+        assert detector.detect(profile) == {
+            'num_columns': 2, 'gutters': [[480, 520]], 'columns': [[100, 480], [520, 900]]}
+        assert detector.detect(profile, scale=2)['gutters'] == [[960, 1040]]
+
+    @pytest.mark.parametrize('columns', [1, 2, 3])
+    def test_synthetic_articles_happy_path(self, columns, tmp_path):
+        """
+        HAPPY PATH: Artigos sintéticos de 1, 2 e 3 colunas
+
+        Expected: num_columns_detected igual ao número de colunas desenhadas
+        """
+        from classificador_final import ClassificadorFinal
+        image, _ = synthetic.generate_page('article', dpi=100, columns=columns, seed=4)
+        path = str(tmp_path / 'page.tif')
+        image.save(path)
+
+        _, extra = ClassificadorFinal().extract_features(path)
+
+        assert extra['num_columns_detected'] == columns
+        assert len(extra['column_gutters']) == columns - 1
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_blank_page_negative(self, detector):
+        """
+        NEGATIVE PATH: Página sem tinta
+
+        Expected: 0 colunas, sem calhas
+        """
+        assert detector.detect(np.zeros(500, np.int64)) == {'num_columns': 0, 'gutters': [], 'columns': []}
+
+    # ========== EDGE CASES ==========
+
+    def test_title_across_gutter_and_narrow_margin_column_edge(self, detector):
+        """
+        EDGE CASE: Título atravessando a calha e numeração de linhas na margem
+
+        Expected: A calha continua detectada; a faixa estreita não vira coluna
+        """
+        profile = _profile(1000, [(20, 35), (100, 480), (520, 900)])
+        profile[100:900] += 6  # título de uma linha sobre as duas colunas
+
+        result = detector.detect(profile)
+
+        assert result['num_columns'] == 2
+        assert result['gutters'] == [[480, 520]]
+        assert result['columns'][0][0] == 20
+
+    def test_word_gaps_are_not_gutters_edge(self, detector):
+        """
+        EDGE CASE: Espaços estreitos (entre palavras / letras) no perfil
+
+        Expected: Coluna única
+        """
+        profile = _profile(1000, [(x, x + 30) for x in range(100, 900, 34)])
+
+        assert detector.detect(profile)['num_columns'] == 1
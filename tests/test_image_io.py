@@ -0,0 +1,135 @@
+"""
+Testes unitários para o decode de imagens (image_io)
+"""
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+import image_io
+import metrics
+from classificador_final import ClassificadorFinal
+from paragraph_detector import ParagraphDetector
+
+
+def _bilevel_page(height=600, width=450, seed=0):
+    """Página 1 bit: blocos de 'palavras' pretos em linhas, com recuos"""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width), 255, np.uint8)
+    y = 30
+    while y < height - 40:
+        x = 40 + (25 if rng.random() < 0.25 else 0)
+        while x < width - 60:
+            w = int(rng.integers(5, 25))
+            img[y:y + int(rng.integers(7, 12)), x:x + w] = 0
+            x += w + int(rng.integers(4, 10))
+        y += int(rng.integers(16, 40))
+    return img
+
+
+def _save(tmp_path, img, name='page.tif', mode='1', **kwargs):
+    path = str(tmp_path / name)
+    Image.fromarray(img).convert(mode).save(path, **kwargs)
+    return path
+
+
+class _StageRecorder:
+    """Observador de etapas (metrics.set_stage_observer)"""
+
+    def __init__(self):
+        self.stages = []
+
+    def enter(self, name):
+        self.stages.append(name)
+
+    def exit(self, name):
+        pass
+
+
+def _stages(func):
+    """Resultado de func() e etapas do metrics.stage executadas"""
+    recorder = _StageRecorder()
+    token = metrics.set_stage_observer(recorder)
+    try:
+        result = func()
+    finally:
+        metrics.reset_stage_observer(token)
+    return result, recorder.stages
+
+
+class TestBilevelDecode:
+    """image_io.decode_bilevel_mask e o caminho sem Otsu"""
+
+    @pytest.fixture
+    def classifier(self):
+        return ClassificadorFinal()
+
+    # ========== HAPPY PATH ==========
+
+    @pytest.mark.parametrize('kwargs', [
+        {'compression': 'group4'},
+        {'compression': 'group4', 'tiffinfo': {262: 0}},  # WhiteIsZero
+        {'compression': 'group3'},
+        {},
+    ])
+    def test_mask_matches_otsu_of_grayscale_happy_path(self, tmp_path, kwargs):
+        """
+        HAPPY PATH: TIFF 1 bit CCITT G4 (as duas fotometrias), G3 e sem compressão
+
+        Expected: Mesma máscara que o Otsu invertido sobre o cinza do OpenCV
+        """
+        path = _save(tmp_path, _bilevel_page(), **kwargs)
+        _, expected = cv2.threshold(cv2.imread(path, cv2.IMREAD_GRAYSCALE), 0, 255,
+                                    cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+        mask = image_io.decode_bilevel_mask(path)
+
+        assert mask.dtype == np.uint8
+        assert np.array_equal(mask * 255, expected)
+
+    def test_features_and_paragraphs_skip_otsu_happy_path(self, tmp_path, monkeypatch, classifier):
+        """
+        HAPPY PATH: Features e parágrafos de uma página G4
+
+        Expected: Mesmo resultado do caminho em cinza, sem as etapas de Otsu
+        """
+        path = _save(tmp_path, _bilevel_page(), compression='group4')
+        (features, paragraphs), stages = _stages(
+            lambda: (classifier.extract_features(path), ParagraphDetector().analyze(path)))
+
+        monkeypatch.setattr(image_io, 'BILEVEL_FAST_PATH', False)
+        expected = classifier.extract_features(path), ParagraphDetector().analyze(path)
+
+        assert (features, paragraphs) == expected
+        assert 'otsu' not in stages and 'paragraph_otsu' not in stages
+        assert 'connected_components' in stages
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_grayscale_image_not_bilevel_negative(self, tmp_path):
+        """
+        NEGATIVE PATH: TIFF em tons de cinza e arquivo ilegível
+
+        Expected: None (segue pelo decode em cinza + Otsu)
+        """
+        gray = _save(tmp_path, _bilevel_page(), mode='L')
+        broken = tmp_path / 'broken.tif'
+        broken.write_bytes(b'II*\x00garbage')
+
+        assert image_io.decode_bilevel_mask(gray) is None
+        assert image_io.decode_bilevel_mask(str(broken)) is None
+
+    # ========== EDGE CASES ==========
+
+    def test_reduced_scale_and_blank_page_edge(self, tmp_path):
+        """
+        EDGE CASE: Decode reduzido e página 1 bit toda branca / toda preta
+
+        Expected: None em scale=2; máscara vazia / cheia como no Otsu
+        """
+        blank = _save(tmp_path, np.full((50, 40), 255, np.uint8), name='blank.tif', compression='group4')
+        black = _save(tmp_path, np.zeros((50, 40), np.uint8), name='black.tif', compression='group4')
+
+        assert image_io.decode_bilevel_mask(blank, scale=2) is None
+        assert not image_io.decode_bilevel_mask(blank).any()
+        assert image_io.decode_bilevel_mask(black).all()
@@ -0,0 +1,151 @@
+"""
+Testes unitários para LayoutProfile (perfis compartilhados de layout)
+"""
+import numpy as np
+import pytest
+
+from layout_profile import LayoutProfile
+
+
+def _page():
+    """Binária 0/255 com duas linhas de texto e uma linha vazia entre elas"""
+    binary = np.zeros((6, 10), np.uint8)
+    binary[1, 2:5] = 255
+    binary[1, 7] = 255
+    binary[4, 0:10] = 255
+    return binary
+
+
+class TestLayoutProfile:
+    """Testes para LayoutProfile.from_binary e o uso compartilhado pelo classificador"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_from_binary_matches_numpy_happy_path(self):
+        """
+        HAPPY PATH: Binária 0/255 do Otsu
+
+        Expected: Perfis iguais a count_nonzero/argmax calculados com numpy
+        """
+        binary = _page()
+        ink = binary > 0
+
+        profile = LayoutProfile.from_binary(binary)
+
+        np.testing.assert_array_equal(profile.row_counts, np.count_nonzero(ink, axis=1))
+        np.testing.assert_array_equal(profile.col_counts, np.count_nonzero(ink, axis=0))
+        assert profile.row_left.tolist() == [10, 2, 10, 10, 0, 10]
+        assert profile.row_right.tolist() == [-1, 7, -1, -1, 9, -1]
+        assert (profile.width, profile.height) == (10, 6)
+
+    def test_mask_and_otsu_binary_agree_happy_path(self):
+        """
+        HAPPY PATH: Mesma página como máscara 0/1 (TIFF de 1 bit) e binária 0/255
+
+        Expected: Perfis e transições de layout idênticos
+        """
+        binary = _page()
+
+        otsu = LayoutProfile.from_binary(binary)
+        mask = LayoutProfile.from_binary((binary > 0).astype(np.uint8), ink=1)
+
+        for name in ('row_counts', 'col_counts', 'row_left', 'row_right'):
+            np.testing.assert_array_equal(getattr(otsu, name), getattr(mask, name))
+        assert otsu.layout_transitions == mask.layout_transitions
+
+    def test_classify_decodes_page_once_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Classificação de uma página com o perfil compartilhado
+
+        Expected: Uma única etapa decode/otsu; parágrafos sem paragraph_decode
+        """
+        import metrics
+        from benchmarks import synthetic
+        from classificador_final import ClassificadorFinal
+
+        image, _ = synthetic.generate_page('article', dpi=72, seed=1)
+        path = str(tmp_path / 'article.tif')
+        image.save(path)
+
+        calls = []
+
+        class Recorder:
+            def enter(self, name):
+                calls.append(name)
+
+            def exit(self, name):
+                pass
+
+        token = metrics.set_stage_observer(Recorder())
+        try:
+            result = ClassificadorFinal().classify(path)
+        finally:
+            metrics.reset_stage_observer(token)
+
+        assert result['classification'] == 'scientific_article'
+        assert calls.count('decode') == 1
+        assert calls.count('otsu') == 1
+        assert calls.count('layout_profile') == 1
+        assert 'paragraph_decode' not in calls
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_blank_page_has_no_ink_negative(self):
+        """
+        NEGATIVE PATH: Página em branco
+
+        Expected: Perfis zerados, margens sentinela e nenhuma transição
+        """
+        profile = LayoutProfile.from_binary(np.zeros((4, 5), np.uint8))
+
+        assert profile.row_counts.tolist() == [0, 0, 0, 0]
+        assert profile.col_counts.tolist() == [0] * 5
+        assert profile.row_left.tolist() == [5] * 4
+        assert profile.row_right.tolist() == [-1] * 4
+        assert profile.layout_transitions == 0
+
+    # ========== EDGE CASE ==========
+
+    def test_empty_profile_defaults_edge(self):
+        """
+        EDGE CASE: LayoutProfile sem perfis (acumulado depois, ex.: em faixas)
+
+        Expected: Contagens zeradas e margens sentinela no tamanho da página
+        """
+        profile = LayoutProfile(width=8, height=3)
+
+        assert profile.row_counts.tolist() == [0, 0, 0]
+        assert profile.col_counts.shape == (8,)
+        assert profile.row_left.tolist() == [8, 8, 8]
+        assert profile.row_right.tolist() == [-1, -1, -1]
+
+    def test_right_margin_across_bands_edge(self):
+        """
+        EDGE CASE: Página com mais linhas que um bloco espelhado (ROW_EXTENT_BAND)
+
+        Expected: Margem direita igual à da página inteira espelhada, inclusive
+        nas linhas da fronteira entre blocos
+        """
+        from layout_profile import ROW_EXTENT_BAND, last_ink_column
+        rng = np.random.default_rng(3)
+        binary = ((rng.random((ROW_EXTENT_BAND * 2 + 5, 300)) < 0.01) * 255).astype(np.uint8)
+
+        expected = binary.shape[1] - 1 - np.argmax(binary[:, ::-1], axis=1)
+
+        assert np.array_equal(last_ink_column(binary), expected)
+        assert np.array_equal(last_ink_column(binary, band=7), expected)
+
+    @pytest.mark.parametrize('width', [1, 4096])
+    def test_full_width_row_extents_edge(self, width):
+        """
+        EDGE CASE: Linha com tinta de borda a borda (inclusive largura 1)
+
+        Expected: Margem esquerda 0 e direita width - 1
+        """
+        binary = np.full((2, width), 255, np.uint8)
+
+        profile = LayoutProfile.from_binary(binary)
+
+        assert profile.row_left.tolist() == [0, 0]
+        assert profile.row_right.tolist() == [width - 1, width - 1]
+        assert profile.row_counts.tolist() == [width, width]
@@ -0,0 +1,178 @@
+"""
+Testes unitários para o orçamento de memória por requisição
+"""
+import gc
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import memory_budget
+import metrics
+from memory_budget import MemoryAccount, MemoryBudgetExceeded, estimate_peak_bytes, plan
+
+
+class TestMemoryPlan:
+    """Estimativa pelo cabeçalho e escolha da estratégia de decode"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_small_page_uses_full_resolution_happy_path(self):
+        """
+        HAPPY PATH: Página A4 a 300 dpi com o orçamento padrão
+
+        Expected: Estratégia full, estimativa abaixo do orçamento
+        """
+        chosen = plan(2480, 3508, budget_bytes=512 * 1024 * 1024, max_pixels=50e6)
+
+        assert chosen.strategy == 'full'
+        assert chosen.scale == 1
+        assert chosen.estimated_bytes <= chosen.budget_bytes
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_page_too_large_for_any_scale_negative(self):
+        """
+        NEGATIVE PATH: Orçamento menor que o buffer de decode da página
+
+        Expected: MemoryBudgetExceeded com a estimativa e o limite
+        """
+        with pytest.raises(MemoryBudgetExceeded) as error:
+            plan(10000, 10000, budget_bytes=50 * 1024 * 1024)
+
+        assert error.value.estimated_bytes > error.value.budget_bytes
+
+    # ========== EDGE CASES ==========
+
+    def test_budget_and_pixel_limit_select_reduced_decode_edge(self):
+        """
+        EDGE CASE: Página de 600 dpi acima do orçamento de bytes ou de pixels
+
+        Expected: Menor redução que cabe (reduced_2 / reduced_4)
+        """
+        width, height = 7016, 9921  # A3 a 600 dpi
+        full = estimate_peak_bytes(width, height, 1)
+        halved = estimate_peak_bytes(width, height, 2)
+
+        assert halved < full
+        assert plan(width, height, budget_bytes=halved, max_pixels=1e9).strategy == 'reduced_2'
+        assert plan(width, height, budget_bytes=full, max_pixels=width * height / 16).strategy == 'reduced_4'
+
+    def test_min_scale_skips_full_and_stripes_edge(self):
+        """
+        EDGE CASE: Caminho rápido pedido (min_scale=4) numa página que caberia inteira
+
+        Expected: reduced_4 mesmo com stripe_rows; escala inválida -> ValueError
+        """
+        chosen = plan(2480, 3508, budget_bytes=512 * 1024 * 1024, stripe_rows=256, prefer_stripes=True, min_scale=4)
+
+        assert chosen.strategy == 'reduced_4'
+        with pytest.raises(ValueError):
+            plan(2480, 3508, min_scale=8)
+
+
+class TestMemoryAccount:
+    """Contabilidade dos buffers vivos e pico por etapa"""
+
+    def test_stage_peaks_and_release_happy_path(self):
+        """
+        HAPPY PATH: Buffers registrados em etapas aninhadas
+
+        Expected: Pico por etapa, total liberado quando os arrays são coletados
+        """
+        account = MemoryAccount()
+        tokens = account.activate()
+        try:
+            with metrics.stage('decode'):
+                img = memory_budget.track(np.zeros((100, 100), np.uint8))
+            with metrics.stage('connected_components'):
+                labels = memory_budget.track(np.zeros((100, 100), np.int32))
+            del img, labels
+            gc.collect()
+        finally:
+            account.deactivate(tokens)
+
+        assert account.stages == {'decode': 10000, 'connected_components': 50000}
+        assert account.peak == 50000
+        assert account.live == 0
+
+    def test_track_without_account_edge(self):
+        """
+        EDGE CASE: track() fora de uma requisição
+
+        Expected: Array retornado sem contabilização
+        """
+        array = np.zeros(10)
+        assert memory_budget.track(array) is array
+
+
+class TestMemoryBudgetApi:
+    """Resposta de /classify com o orçamento de memória"""
+
+    @pytest.fixture
+    def client(self):
+        import api
+        api.app.config['TESTING'] = True
+        with api.app.test_client() as client:
+            yield client
+
+    @staticmethod
+    def _post(client, size):
+        buffer = io.BytesIO()
+        Image.new('L', size, color=255).save(buffer, format='TIFF')
+        buffer.seek(0)
+        return client.post('/classify', data={'image': (buffer, 'doc.tif')}, content_type='multipart/form-data')
+
+    def test_classify_reports_memory_happy_path(self, client):
+        """
+        HAPPY PATH: Imagem pequena
+
+        Expected: Estratégia full e pico por etapa na resposta
+        """
+        response = self._post(client, (400, 300))
+
+        memory = response.get_json()['memory']
+        assert memory['strategy'] == 'full'
+        assert memory['stages']['connected_components'] >= 400 * 300 * 6
+
+    def test_classify_over_budget_returns_413_negative(self, client, monkeypatch):
+        """
+        NEGATIVE PATH: Orçamento menor que a imagem
+
+        Expected: 413 antes do decode, com a estimativa
+        """
+        monkeypatch.setattr(memory_budget, 'REQUEST_MEMORY_BUDGET_MB', 0.1)
+
+        response = self._post(client, (800, 600))
+
+        assert response.status_code == 413
+        assert response.get_json()['estimated_peak_bytes'] > response.get_json()['budget_bytes']
+
+    def test_classify_reduced_decode_edge(self, client, monkeypatch):
+        """
+        EDGE CASE: Limite de pixels abaixo do tamanho da página
+
+        Expected: Decode reduzido registrado em memory e degradations
+        """
+        monkeypatch.setattr(memory_budget, 'REQUEST_MAX_PIXELS', 400 * 300 // 4)
+
+        data = self._post(client, (400, 300)).get_json()
+
+        assert data['memory']['strategy'] == 'reduced_2'
+        assert 'decode_reduced_2' in data['degradations']
+
+    def test_classify_layout_scale_fast_path_edge(self, client):
+        """
+        EDGE CASE: layout_scale=4 pedido; valor fora de 1/2/4 ignorado
+
+        Expected: reduced_4 com o caminho rápido, full com o valor inválido
+        """
+        buffer = io.BytesIO()
+        Image.new('L', (400, 300), color=255).save(buffer, format='TIFF')
+        for scale, strategy in (('4', 'reduced_4'), ('3', 'full')):
+            buffer.seek(0)
+            data = client.post('/classify', data={'image': (io.BytesIO(buffer.getvalue()), 'doc.tif'),
+                                                  'layout_scale': scale},
+                               content_type='multipart/form-data').get_json()
+            assert data['memory']['strategy'] == strategy
@@ -0,0 +1,128 @@
+"""
+Testes unitários para a camada de métricas (histogramas, Prometheus, Server-Timing)
+"""
+import io
+
+import pytest
+from PIL import Image
+
+import metrics
+
+
+class TestMetricsRegistry:
+    """Testes para MetricsRegistry e tipos de métrica"""
+    
+    # ========== HAPPY PATH ==========
+    
+    def test_histogram_renders_cumulative_buckets_happy_path(self):
+        """
+        HAPPY PATH: Histograma com observações em buckets distintos
+        
+        Expected: Buckets cumulativos, _sum e _count no formato Prometheus
+        """
+        registry = metrics.MetricsRegistry()
+        histogram = registry.histogram('test_seconds', 'Teste', ('stage',), buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage='decode')
+        histogram.observe(0.5, stage='decode')
+        histogram.observe(5.0, stage='decode')
+        
+        text = registry.render_prometheus()
+        
+        assert '# TYPE test_seconds histogram' in text
+        assert 'test_seconds_bucket{stage="decode",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{stage="decode",le="1.0"} 2' in text
+        assert 'test_seconds_bucket{stage="decode",le="+Inf"} 3' in text
+        assert 'test_seconds_count{stage="decode"} 3' in text
+    
+    def test_counter_and_gauge_callback_happy_path(self):
+        """
+        HAPPY PATH: Contador com labels e gauge lido de callback
+        
+        Expected: Valores atuais na exportação
+        """
+        registry = metrics.MetricsRegistry()
+        counter = registry.counter('hits_total', 'Teste', ('result',))
+        counter.inc(result='hit')
+        counter.inc(2, result='miss')
+        registry.gauge('queue_depth', 'Teste', callback=lambda: 7)
+        
+        text = registry.render_prometheus()
+        
+        assert 'hits_total{result="hit"} 1' in text
+        assert 'hits_total{result="miss"} 2' in text
+        assert 'queue_depth 7' in text
+    
+    def test_stage_accumulates_request_timings_happy_path(self):
+        """
+        HAPPY PATH: metrics.stage dentro de uma coleta de timings
+        
+        Expected: Etapas somadas no dict e formatadas no Server-Timing
+        """
+        token = metrics.start_timings()
+        with metrics.stage('otsu'):
+            pass
+        metrics.record_stage('otsu', 0.5)
+        timings = metrics.finish_timings(token)
+        
+        assert timings['otsu'] >= 0.5
+        assert metrics.server_timing_header({'otsu': 0.0125}) == 'otsu;dur=12.5'
+    
+    # ========== NEGATIVE PATH ==========
+    
+    def test_stage_outside_request_does_not_fail_negative(self):
+        """
+        NEGATIVE PATH: Etapa medida fora de uma requisição
+        
+        Expected: Apenas o histograma global é atualizado
+        """
+        before = metrics.STAGE_DURATION.snapshot(stage='unit_test_stage')['count']
+        with metrics.stage('unit_test_stage'):
+            pass
+        
+        assert metrics.current_timings() is None
+        assert metrics.STAGE_DURATION.snapshot(stage='unit_test_stage')['count'] == before + 1
+
+
+class TestMetricsEndpoint:
+    """Testes para GET /metrics e o header Server-Timing"""
+    
+    @pytest.fixture
+    def client(self):
+        from api import app
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+    
+    def test_metrics_endpoint_prometheus_format_happy_path(self, client):
+        """
+        HAPPY PATH: GET /metrics
+        
+        Expected: text/plain com histogramas de etapas e gauges de admissão
+        """
+        client.get('/health')
+        response = client.get('/metrics')
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+        assert '# TYPE http_request_duration_seconds histogram' in text
+        assert 'admission_queue_depth' in text
+    
+    def test_classify_returns_server_timing_happy_path(self, client):
+        """
+        HAPPY PATH: POST /classify com TIFF válido
+        
+        Expected: Header Server-Timing com as etapas do pipeline
+        """
+        buffer = io.BytesIO()
+        Image.new('L', (300, 300), color=255).save(buffer, format='TIFF')
+        buffer.seek(0)
+        
+        response = client.post('/classify',
+                               data={'image': (buffer, 'doc.tif')},
+                               content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        server_timing = response.headers['Server-Timing']
+        for stage_name in ('decode', 'otsu', 'connected_components', 'serialization', 'total'):
+            assert f'{stage_name};dur=' in server_timing
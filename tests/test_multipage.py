@@ -0,0 +1,372 @@
+"""
+Testes unitários para TIFFs multipágina (multipage / ClassificadorFinal.iter_classify)
+"""
+import io
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import multipage
+from classificador_final import ClassificadorFinal
+
+
+def _page(kind, height=500, width=400, seed=0):
+    """Página 1 bit: 'article' com muitas linhas de palavras, 'ad' com poucos blocos grandes"""
+    rng = np.random.default_rng(seed)
+    img = np.full((height, width), 255, np.uint8)
+    if kind == 'ad':
+        for i in range(3):
+            img[60 + i * 140:120 + i * 140, 50:350] = 0
+        return img
+    y = 20
+    while y < height - 30:
+        x = 30
+        while x < width - 40:
+            w = int(rng.integers(4, 16))
+            img[y:y + 7, x:x + w] = 0
+            x += w + int(rng.integers(3, 7))
+        y += 14
+    return img
+
+
+def _multipage_tiff(path, kinds, compression='group4'):
+    pages = [Image.fromarray(_page(kind, seed=i)).convert('1') for i, kind in enumerate(kinds)]
+    pages[0].save(path, save_all=True, append_images=pages[1:], compression=compression)
+    return str(path)
+
+
+class TestPageIterator:
+    """multipage.extract_page / iter_pages / map_pages"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_extract_each_page_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: TIFF G4 de 3 páginas
+
+        Expected: Cada página extraída idêntica, com a mesma compressão
+        """
+        path = _multipage_tiff(tmp_path / 'doc.tif', ['article', 'ad', 'article'])
+
+        for index, page_path in multipage.iter_pages(path, 3, directory=str(tmp_path)):
+            with Image.open(path) as source, Image.open(page_path) as page:
+                source.seek(index)
+                assert np.array_equal(np.asarray(page), np.asarray(source))
+                assert page.info['compression'] == 'group4'
+                assert getattr(page, 'n_frames', 1) == 1
+
+    def test_map_pages_bounded_and_cleaned_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: 5 páginas com 2 workers
+
+        Expected: Todas as páginas, no máximo 2 em andamento, temporários removidos
+        """
+        path = _multipage_tiff(tmp_path / 'doc.tif', ['article'] * 5)
+        pages_dir = tmp_path / 'pages'
+        pages_dir.mkdir()
+        lock = threading.Lock()
+        peak = []
+
+        def work(index, page_path):
+            with lock:
+                peak.append(len(os.listdir(pages_dir)))
+            return index * 10
+
+        results = dict(multipage.map_pages(work, path, 5, workers=2, directory=str(pages_dir)))
+
+        assert results == {i: i * 10 for i in range(5)}
+        assert max(peak) <= 2
+        assert os.listdir(pages_dir) == []
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_page_error_propagates_and_cleans_negative(self, tmp_path):
+        """
+        NEGATIVE PATH: Erro ao processar uma página
+
+        Expected: Exceção propagada; nenhum temporário deixado para trás
+        """
+        path = _multipage_tiff(tmp_path / 'doc.tif', ['article'] * 4)
+        pages_dir = tmp_path / 'pages'
+        pages_dir.mkdir()
+
+        def work(index, page_path):
+            if index == 1:
+                raise ValueError('página ruim')
+            return index
+
+        with pytest.raises(ValueError):
+            list(multipage.map_pages(work, path, 4, workers=2, directory=str(pages_dir)))
+        assert os.listdir(pages_dir) == []
+
+    # ========== EDGE CASES ==========
+
+    def test_merge_frequent_words_edge(self):
+        """
+        EDGE CASE: Listas em dicts e em tuplas, página sem palavras
+
+        Expected: Contagens somadas, ordenadas e limitadas a top_n
+        """
+        merged = multipage.merge_frequent_words(
+            [[{'word': 'dados', 'count': 3}, {'word': 'rede', 'count': 1}], None, [('dados', 2), ('modelo', 4)]],
+            top_n=2)
+
+        assert merged == [{'word': 'dados', 'count': 5}, {'word': 'modelo', 'count': 4}]
+
+
+class TestMultipageClassification:
+    """ClassificadorFinal.iter_classify / classify / aggregate_pages"""
+
+    @pytest.fixture
+    def classifier(self):
+        clf = ClassificadorFinal()
+        clf.text_analyzer = None
+        return clf
+
+    # ========== HAPPY PATH ==========
+
+    def test_pages_then_document_happy_path(self, tmp_path, classifier):
+        """
+        HAPPY PATH: 3 páginas (2 artigo, 1 anúncio)
+
+        Expected: Uma entrada por página e por último o documento, com parágrafos somados
+        """
+        path = _multipage_tiff(tmp_path / 'doc.tif', ['article', 'ad', 'article'])
+
+        results = list(classifier.iter_classify(path))
+
+        assert sorted(page for page, _ in results[:-1]) == [0, 1, 2]
+        page, document = results[-1]
+        assert page is None
+        assert document['page_count'] == 3
+        assert [p['page'] for p in document['pages']] == [0, 1, 2]
+        assert document['num_paragraphs'] == sum(r.get('num_paragraphs', 0) for _, r in results[:-1])
+        assert document['image']['pages'] == 3
+        assert classifier.classify(path)['pages'] == document['pages']
+
+    def test_document_extra_features_match_single_page_shape_happy_path(self, tmp_path, classifier):
+        """
+        HAPPY PATH: Documento multipágina e uma página sozinha
+
+        Expected: Mesmas chaves em extra_features; calhas da página com mais colunas
+        """
+        path = _multipage_tiff(tmp_path / 'doc.tif', ['article', 'ad'])
+        single = classifier.classify(_multipage_tiff(tmp_path / 'single.tif', ['article']))
+
+        results = list(classifier.iter_classify(path))
+
+        document = results[-1][1]
+        widest = max((result for page, result in results[:-1]),
+                     key=lambda result: result['extra_features']['num_columns_detected'])
+        assert set(document['extra_features']) == set(single['extra_features'])
+        assert document['extra_features']['column_gutters'] == widest['extra_features']['column_gutters']
+
+    def test_pages_share_request_memory_budget_happy_path(self, tmp_path, classifier, monkeypatch):
+        """
+        HAPPY PATH: 3 páginas com 2 workers
+
+        Expected: Cada página planejada com metade do orçamento da requisição;
+        memory do documento com o pico medido das páginas vivas ao mesmo tempo
+        """
+        import memory_budget
+        path = _multipage_tiff(tmp_path / 'doc.tif', ['article', 'ad', 'article'])
+        budgets = []
+        real_plan = memory_budget.plan
+
+        def recording_plan(*args, **kwargs):
+            budgets.append(kwargs['budget_bytes'])
+            return real_plan(*args, **kwargs)
+        monkeypatch.setattr(memory_budget, 'plan', recording_plan)
+
+        results = list(classifier.iter_classify(path, workers=2))
+
+        request_budget = memory_budget.request_budget_bytes()
+        assert budgets == [request_budget / 2] * 3
+        memory = results[-1][1]['memory']
+        page_peaks = [result['memory']['peak_bytes'] for _, result in results[:-1]]
+        assert memory['workers'] == 2
+        assert memory['budget_bytes'] == int(request_budget)
+        assert memory['page_budget_bytes'] == int(request_budget / 2)
+        assert memory['page_peak_bytes'] == max(page_peaks)
+        assert max(page_peaks) <= memory['peak_bytes'] <= sum(page_peaks)
+
+    def test_compliance_uses_summed_words_and_paragraphs_happy_path(self):
+        """
+        HAPPY PATH: Páginas de artigo com palavras abaixo do mínimo cada uma
+
+        Expected: Documento conforme pela soma; palavras frequentes somadas
+        """
+        clf = ClassificadorFinal()
+        from text_analyzer import TextAnalyzer
+        clf.text_analyzer = TextAnalyzer.__new__(TextAnalyzer)
+        page = {
+            'classification': 'scientific_article', 'score': -3.0, 'confidence': 0.3, 'degradations': [],
+            'features': {'text_density': 0.2, 'num_text_components': 1000, 'layout_transitions': 80},
+            'extra_features': {'avg_component_height': 9.0, 'height_std': 2.0, 'avg_component_width': 7.0,
+                               'avg_aspect_ratio': 1.2, 'num_columns_detected': 0},
+            'num_lines': 40, 'num_paragraphs': 5, 'word_count': 1200,
+            'frequent_words': [{'word': 'dados', 'count': 7}], 'memory': {'peak_bytes': 10},
+        }
+        pages = [dict(page, page=0), dict(page, page=1, memory={'peak_bytes': 20})]
+
+        document = clf.aggregate_pages(pages, min_words=2000, min_paragraphs=8)
+
+        assert document['word_count'] == 2400
+        assert document['num_paragraphs'] == 10
+        assert document['is_compliant'] is True
+        assert document['frequent_words'] == [{'word': 'dados', 'count': 14}]
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_first_mode_keeps_single_page_behavior_negative(self, tmp_path, monkeypatch, classifier):
+        """
+        NEGATIVE PATH: MULTIPAGE_MODE=first
+
+        Expected: Só a primeira página, sem `pages`
+        """
+        path = _multipage_tiff(tmp_path / 'doc.tif', ['article', 'ad'])
+        monkeypatch.setattr(multipage, 'MULTIPAGE_MODE', 'first')
+
+        result = classifier.classify(path)
+
+        assert 'pages' not in result
+
+    # ========== EDGE CASES ==========
+
+    def test_parallel_pages_reduce_decode_to_fit_budget_edge(self, tmp_path, classifier, monkeypatch):
+        """
+        EDGE CASE: Orçamento da requisição que cabe uma página inteira, mas não duas
+
+        Expected: Sequencial em resolução nativa; com 2 workers, decode reduzido
+        """
+        import memory_budget
+        path = _multipage_tiff(tmp_path / 'doc.tif', ['article', 'article'])
+        full = memory_budget.estimate_peak_bytes(400, 500, ocr=False)
+        monkeypatch.setattr(memory_budget, 'REQUEST_MEMORY_BUDGET_MB', full / (1024 * 1024))
+
+        sequential = list(classifier.iter_classify(path, workers=1))
+        parallel = list(classifier.iter_classify(path, workers=2))
+
+        assert {result['memory']['strategy'] for _, result in sequential[:-1]} == {'full'}
+        assert 'full' not in {result['memory']['strategy'] for _, result in parallel[:-1]}
+        assert parallel[-1][1]['memory']['peak_bytes'] <= full
+
+    def test_majority_vote_edge(self, classifier):
+        """
+        EDGE CASE: Um anúncio com score alto contra dois artigos com score baixo
+
+        Expected: Maioria (artigo), confiança reduzida pela fração que concorda
+        """
+        def page(index, classification, score):
+            return {
+                'page': index, 'classification': classification, 'score': score,
+                'confidence': min(abs(score) / 10, 1), 'degradations': [],
+                'features': {'text_density': 0.1, 'num_text_components': 0, 'layout_transitions': 0},
+                'extra_features': {'avg_component_height': 0, 'height_std': 0, 'avg_component_width': 0,
+                                   'avg_aspect_ratio': 0, 'num_columns_detected': 0},
+                'memory': {'peak_bytes': 0},
+            }
+        pages = [page(0, 'scientific_article', -1.0), page(1, 'advertisement', 9.0),
+                 page(2, 'scientific_article', -1.0)]
+
+        document = classifier.aggregate_pages(pages)
+
+        assert document['classification'] == 'scientific_article'
+        assert document['score'] > 0
+        assert document['confidence'] == pytest.approx(0.1 * 2 / 3)
+
+
+class TestMultipageApi:
+    """/classify com TIFF multipágina"""
+
+    @pytest.fixture
+    def client(self):
+        import api
+        api.app.config['TESTING'] = True
+        with api.app.test_client() as client:
+            yield client
+
+    @staticmethod
+    def _upload(tmp_path, kinds):
+        path = _multipage_tiff(tmp_path / 'doc.tif', kinds)
+        with open(path, 'rb') as f:
+            return io.BytesIO(f.read())
+
+    # ========== HAPPY PATH ==========
+
+    def test_stream_pages_as_ndjson_happy_path(self, client, tmp_path):
+        """
+        HAPPY PATH: stream=1 com 3 páginas
+
+        Expected: NDJSON com 3 linhas de página e a linha final do documento
+        """
+        response = client.post('/classify', data={'image': (self._upload(tmp_path, ['article', 'ad', 'article']),
+                                                            'doc.tif'), 'stream': '1'},
+                               content_type='multipart/form-data')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert sorted(line['page'] for line in lines[:-1]) == [0, 1, 2]
+        assert lines[-1]['page_count'] == 3
+        assert all(line['success'] for line in lines)
+
+    def test_stream_closes_request_after_last_page_happy_path(self, client, tmp_path, monkeypatch):
+        """
+        HAPPY PATH: stream=1 com tracing
+
+        Expected: Span raiz fechado só depois das páginas (etapas no mesmo trace),
+        latência medida até o fim do corpo e correlation id nos headers
+        """
+        import api
+        import metrics
+        from tracing import Tracer
+
+        class ListExporter:
+            def __init__(self):
+                self.spans = []
+
+            def export(self, span):
+                self.spans.append(span)
+
+        exporter = ListExporter()
+        monkeypatch.setattr(api, 'tracer', Tracer(exporter=exporter, enabled=True))
+        observed = []
+        monkeypatch.setattr(api.HTTP_DURATION, 'observe', lambda value, **labels: observed.append(value))
+
+        response = client.post('/classify', data={'image': (self._upload(tmp_path, ['article', 'ad']),
+                                                            'doc.tif'), 'stream': '1'},
+                               content_type='multipart/form-data')
+        lines = response.get_data(as_text=True).splitlines()
+
+        assert len(lines) == 3
+        assert response.headers['X-Request-ID']
+        assert 'Server-Timing' not in response.headers
+        names = [span['name'] for span in exporter.spans]
+        assert names.count('page') == 2 and 'classify' in names
+        root = next(span for span in exporter.spans if span['parent_id'] is None)
+        assert root['name'] == 'POST /classify'
+        assert root['end'] >= max(span['end'] for span in exporter.spans if span['name'] == 'page')
+        assert {span['trace_id'] for span in exporter.spans} == {root['trace_id']}
+        assert len(observed) == 1 and observed[0] >= root['duration_ms'] / 1000 * 0.5
+        assert metrics.current_timings() is None
+
+    # ========== EDGE CASES ==========
+
+    def test_without_stream_returns_document_edge(self, client, tmp_path):
+        """
+        EDGE CASE: Multipágina sem stream
+
+        Expected: JSON único com o documento e o resumo das páginas
+        """
+        response = client.post('/classify', data={'image': (self._upload(tmp_path, ['article', 'article']),
+                                                            'doc.tif')},
+                               content_type='multipart/form-data')
+
+        data = response.get_json()
+        assert data['page_count'] == 2
+        assert [page['page'] for page in data['pages']] == [0, 1]
@@ -0,0 +1,231 @@
+"""
+Testes unitários para os perfis de OCR (speed, balanced, accurate)
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+import ocr_profiles
+from benchmarks import synthetic
+
+
+def _layout(height, components=900):
+    """Features mínimas usadas por choose_profile"""
+    return {'num_text_components': components}, {'avg_component_height': height}
+
+
+class TestChooseProfile:
+    """Testes para ocr_profiles.choose_profile, tesseract_config e tesseract_lang"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_text_height_selects_profile_happy_path(self):
+        """
+        HAPPY PATH: Texto pequeno, médio e grande numa página de 1600 px
+
+        Expected: accurate, balanced e speed (em inglês)
+        """
+        assert ocr_profiles.choose_profile(*_layout(6.0), 1600, 'en') == 'accurate'
+        assert ocr_profiles.choose_profile(*_layout(12.0), 1600, 'en') == 'balanced'
+        assert ocr_profiles.choose_profile(*_layout(24.0), 1600, 'en') == 'speed'
+
+    def test_text_height_after_ocr_reduction_happy_path(self):
+        """
+        HAPPY PATH: Mesma altura de texto numa página de 3200 px
+
+        Expected: Altura efetiva cai à metade na redução do OCR -> accurate
+        """
+        assert ocr_profiles.choose_profile(*_layout(12.0), 1600) == 'balanced'
+        assert ocr_profiles.choose_profile(*_layout(12.0), 3200) == 'accurate'
+
+    def test_requested_profile_wins_happy_path(self, monkeypatch):
+        """
+        HAPPY PATH: Perfil pedido na requisição e OCR_PROFILE no ambiente
+
+        Expected: Pedido > ambiente > escolha pelo layout
+        """
+        monkeypatch.setattr(ocr_profiles, 'OCR_PROFILE', 'speed')
+
+        assert ocr_profiles.choose_profile(*_layout(6.0), 1600, requested='accurate') == 'accurate'
+        assert ocr_profiles.choose_profile(*_layout(6.0), 1600, requested='auto') == 'speed'
+        assert ocr_profiles.resolve(None) == 'speed'
+
+    def test_config_and_language_models_happy_path(self):
+        """
+        HAPPY PATH: Config e idiomas de cada perfil
+
+        Expected: speed sem dicionários e LSTM; balanced padrão; accurate com por+eng
+        """
+        speed = ocr_profiles.tesseract_config(ocr_profiles.PROFILES['speed'], 6)
+        balanced = ocr_profiles.tesseract_config(ocr_profiles.PROFILES['balanced'], 3)
+
+        assert '--oem 1' in speed and 'load_system_dawg=0' in speed and 'load_freq_dawg=0' in speed
+        assert balanced == '--oem 3 --psm 3'
+        assert ocr_profiles.tesseract_lang(ocr_profiles.PROFILES['balanced'], 'pt') == 'por'
+        assert ocr_profiles.tesseract_lang(ocr_profiles.PROFILES['accurate'], 'pt') == 'por+eng'
+        assert ocr_profiles.tesseract_lang(ocr_profiles.PROFILES['accurate'], 'en') == 'eng'
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_missing_models_fall_back_to_eng_negative(self):
+        """
+        NEGATIVE PATH: Modelo 'por' não instalado
+
+        Expected: eng (o OCR não falha por falta do modelo)
+        """
+        lang = ocr_profiles.tesseract_lang(ocr_profiles.PROFILES['balanced'], 'pt', available={'eng', 'osd'})
+
+        assert lang == 'eng'
+
+    def test_unknown_profile_and_empty_page_negative(self):
+        """
+        NEGATIVE PATH: Perfil desconhecido e página sem componentes de texto
+
+        Expected: balanced (padrão)
+        """
+        assert ocr_profiles.resolve('turbo') == 'balanced'
+        assert ocr_profiles.choose_profile(*_layout(0, components=0), 1600) == 'balanced'
+
+    # ========== EDGE CASE ==========
+
+    def test_large_text_in_portuguese_keeps_dictionary_edge(self):
+        """
+        EDGE CASE: Texto grande em português
+
+        Expected: balanced (sem dicionário os acentos pioram; speed só em inglês)
+        """
+        assert ocr_profiles.choose_profile(*_layout(24.0), 1600, 'pt') == 'balanced'
+
+    def test_tessdata_dir_in_config_edge(self, monkeypatch):
+        """
+        EDGE CASE: Perfil com diretório de modelos próprio (tessdata_fast/best)
+
+        Expected: --tessdata-dir antes das demais opções
+        """
+        profile = {**ocr_profiles.PROFILES['accurate'], 'tessdata_dir': '/models/best'}
+
+        assert ocr_profiles.tesseract_config(profile, 4).startswith('--tessdata-dir /models/best --oem 1')
+
+
+class TestProfileOCR:
+    """Testes do OCR com perfis (TextAnalyzerOptimized, classificador e API)"""
+
+    @pytest.fixture
+    def article_page(self, tmp_path):
+        image, _ = synthetic.generate_page('article', dpi=200, seed=4)
+        path = str(tmp_path / 'article.tif')
+        image.save(path)
+        return path
+
+    @pytest.fixture
+    def analyzer(self, tmp_path):
+        from text_analyzer_optimized import TextAnalyzerOptimized
+        analyzer = TextAnalyzerOptimized(cache_dir=str(tmp_path / 'cache'))
+        analyzer._pytesseract = MagicMock()
+        analyzer._pytesseract.image_to_string.return_value = 'texto'
+        analyzer._pytesseract.get_languages.return_value = ['eng', 'por', 'osd']
+        return analyzer
+
+    # ========== HAPPY PATH ==========
+
+    def test_profile_sets_config_lang_and_width_happy_path(self, analyzer, article_page):
+        """
+        HAPPY PATH: Mesma página com os perfis speed e accurate
+
+        Expected: speed reduz a página para 1200 px, sem dicionários; accurate
+        usa por+eng; idiomas instalados consultados uma vez
+        """
+        analyzer.extract_text_fast(article_page, profile='speed', language='en')
+        speed_call = analyzer._pytesseract.image_to_string.call_args
+        analyzer.extract_text_fast(article_page, profile='accurate', language='pt')
+        accurate_call = analyzer._pytesseract.image_to_string.call_args
+
+        assert speed_call[0][0].shape[1] == 1200
+        assert speed_call[1]['lang'] == 'eng' and 'load_system_dawg=0' in speed_call[1]['config']
+        assert accurate_call[1]['lang'] == 'por+eng' and '--oem 1' in accurate_call[1]['config']
+        assert analyzer._pytesseract.get_languages.call_count == 1
+
+    def test_classify_reports_chosen_profile_happy_path(self, article_page):
+        """
+        HAPPY PATH: Artigo classificado com OCR, perfil automático e forçado
+
+        Expected: analyze_fast recebe perfil e idioma; result['ocr_profile'] traz o perfil usado
+        """
+        from classificador_final import ClassificadorFinal
+        clf = ClassificadorFinal()
+        clf.text_analyzer = MagicMock()
+        clf.text_analyzer.analyze_fast.return_value = {'text': '', 'word_count': 0, 'frequent_words': []}
+        clf.text_analyzer.check_compliance.return_value = (False, [])
+
+        auto = clf.classify(article_page, language='en')
+        forced = clf.classify(article_page, language='en', ocr_profile='speed')
+
+        assert auto['ocr_profile'] in ocr_profiles.PROFILE_NAMES
+        assert forced['ocr_profile'] == 'speed'
+        assert clf.text_analyzer.analyze_fast.call_args[1]['profile'] == 'speed'
+        assert clf.text_analyzer.analyze_fast.call_args[1]['language'] == 'en'
+
+    def test_api_parses_and_reports_profile_happy_path(self):
+        """
+        HAPPY PATH: ocr_profile no formulário e na resposta do /classify
+
+        Expected: Perfis válidos repassados; auto/inválido = None; resposta com o perfil usado
+        """
+        from api import build_classification_response, parse_ocr_profile
+        result = {
+            'classification': 'scientific_article', 'score': -3.0, 'confidence': 0.3,
+            'features': {'text_density': 0.2, 'num_text_components': 900, 'layout_transitions': 40},
+            'extra_features': {'avg_component_height': 10.0, 'avg_component_width': 8.0, 'height_std': 2.0,
+                               'avg_aspect_ratio': 1.2, 'num_columns_detected': 1},
+            'ocr_profile': 'accurate',
+        }
+
+        assert parse_ocr_profile('speed') == 'speed'
+        assert parse_ocr_profile('auto') is None and parse_ocr_profile('turbo') is None
+        assert build_classification_response(result, 'doc.tif')['ocr_profile'] == 'accurate'
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_languages_query_failure_negative(self, analyzer, article_page):
+        """
+        NEGATIVE PATH: get_languages falha (Tesseract antigo ou sem permissão)
+
+        Expected: OCR segue com o modelo do idioma pedido
+        """
+        analyzer._pytesseract.get_languages.side_effect = RuntimeError('tesseract')
+
+        assert analyzer.extract_text_fast(article_page, language='pt') == 'texto'
+        assert analyzer._pytesseract.image_to_string.call_args[1]['lang'] == 'por'
+
+    def test_advertisement_without_profile_negative(self, tmp_path):
+        """
+        NEGATIVE PATH: Anúncio (sem OCR)
+
+        Expected: Sem ocr_profile no resultado
+        """
+        from classificador_final import ClassificadorFinal
+        image, _ = synthetic.generate_page('ad', dpi=100, seed=3)
+        path = str(tmp_path / 'ad.tif')
+        image.save(path)
+        clf = ClassificadorFinal()
+        clf.text_analyzer = MagicMock()
+
+        result = clf.classify(path)
+
+        assert result['classification'] == 'advertisement'
+        assert 'ocr_profile' not in result
+
+    # ========== EDGE CASE ==========
+
+    def test_cache_separate_per_profile_edge(self, analyzer, article_page):
+        """
+        EDGE CASE: Mesma página com perfis diferentes
+
+        Expected: Entradas de cache distintas; repetir o perfil usa o cache
+        """
+        analyzer._pytesseract.image_to_string.side_effect = ['rapido', 'preciso']
+
+        assert analyzer.extract_text_fast(article_page, profile='speed') == 'rapido'
+        assert analyzer.extract_text_fast(article_page, profile='accurate') == 'preciso'
+        assert analyzer.extract_text_fast(article_page, profile='speed') == 'rapido'
+        assert analyzer._pytesseract.image_to_string.call_count == 2
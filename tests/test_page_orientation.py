@@ -0,0 +1,212 @@
+"""
+Testes unitários para OrientationEstimator (rotação/inclinação sem o OSD do Tesseract)
+"""
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+import page_orientation
+from benchmarks import synthetic
+from page_orientation import OrientationEstimator
+
+
+def _components(pixels):
+    """Estatísticas dos componentes da página como em analyze_layout"""
+    _, binary = cv2.threshold(pixels, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    return stats, binary.shape
+
+
+def _page(skew=0.0, rotation=0, kind='article', dpi=150, seed=0):
+    """Página sintética inclinada (PIL: positivo = anti-horário) e girada com np.rot90"""
+    image, _ = synthetic.generate_page(kind, dpi=dpi, seed=seed)
+    image = image.rotate(skew, resample=Image.BILINEAR, fillcolor=255)
+    return np.ascontiguousarray(np.rot90(np.array(image), k=rotation // 90))
+
+
+class TestOrientationEstimator:
+    """Testes para OrientationEstimator.estimate e page_orientation.correct"""
+
+    @pytest.fixture
+    def estimator(self):
+        return OrientationEstimator()
+
+    # ========== HAPPY PATH ==========
+
+    def test_upright_page_not_corrected_happy_path(self, estimator):
+        """
+        HAPPY PATH: Artigo em pé e reto
+
+        Expected: Rotação 0, inclinação ~0 e sem correção (OCR direto, sem OSD)
+        """
+        orientation = estimator.estimate(*_components(_page()))
+
+        assert orientation == {'rotation': 0, 'skew_angle': 0.0, 'needs_correction': False}
+
+    @pytest.mark.parametrize('skew,rotation', [(2.5, 0), (-4.0, 90), (0.0, 180), (1.0, 270)])
+    def test_rotated_skewed_page_happy_path(self, estimator, skew, rotation):
+        """
+        HAPPY PATH: Página inclinada e/ou girada com valores conhecidos
+
+        Expected: Rotação exata, inclinação com erro <= 0.1 grau; depois de
+        correct() a página é estimada em pé e reta
+        """
+        pixels = _page(skew, rotation)
+
+        orientation = estimator.estimate(*_components(pixels))
+
+        assert orientation['rotation'] == rotation
+        assert abs(orientation['skew_angle'] + skew) <= 0.1
+        assert orientation['needs_correction'] is True
+        fixed = estimator.estimate(*_components(page_orientation.correct(pixels, orientation)))
+        assert fixed['rotation'] == 0 and abs(fixed['skew_angle']) <= 0.1
+
+    def test_reduced_scale_same_estimate_happy_path(self, estimator):
+        """
+        HAPPY PATH: Componentes de um decode em 1/2 (layout_scale=2)
+
+        Expected: Mesma rotação e inclinação próxima da escala 1
+        """
+        pixels = _page(-3.0, 180, dpi=200)
+        half = cv2.resize(pixels, (pixels.shape[1] // 2, pixels.shape[0] // 2), interpolation=cv2.INTER_AREA)
+
+        orientation = estimator.estimate(*_components(half), scale=2)
+
+        assert orientation['rotation'] == 180
+        assert abs(orientation['skew_angle'] - 3.0) <= 0.2
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_blank_page_without_estimate_negative(self, estimator):
+        """
+        NEGATIVE PATH: Página sem texto (só o fundo)
+
+        Expected: None (nada a reportar nem corrigir)
+        """
+        stats = np.array([[0, 0, 200, 200, 40000]], np.int32)
+
+        assert estimator.estimate(stats, (200, 200)) is None
+        assert page_orientation.correct(np.zeros((4, 4), np.uint8), None).shape == (4, 4)
+
+    def test_correction_disabled_negative(self, estimator, monkeypatch):
+        """
+        NEGATIVE PATH: ORIENTATION_CORRECTION=0
+
+        Expected: Ângulo e rotação reportados, mas a página não é corrigida
+        """
+        monkeypatch.setattr(page_orientation, 'ORIENTATION_CORRECTION', False)
+        pixels = _page(3.0, 90)
+
+        orientation = estimator.estimate(*_components(pixels))
+
+        assert orientation['rotation'] == 90
+        assert orientation['needs_correction'] is False
+        assert page_orientation.correct(pixels, orientation) is pixels
+
+    # ========== EDGE CASE ==========
+
+    def test_skew_within_tolerance_edge(self, estimator):
+        """
+        EDGE CASE: Inclinação pequena (0.3 grau, abaixo da tolerância de 0.5)
+
+        Expected: Ângulo reportado sem correção
+        """
+        orientation = estimator.estimate(*_components(_page(0.3)))
+
+        assert orientation['rotation'] == 0
+        assert abs(orientation['skew_angle'] + 0.3) <= 0.1
+        assert orientation['needs_correction'] is False
+
+    def test_rotate_boxes_roundtrip_edge(self):
+        """
+        EDGE CASE: Caixas transformadas para as quatro rotações
+
+        Expected: Iguais às caixas medidas na imagem girada com cv2.rotate
+        """
+        image = np.zeros((60, 100), np.uint8)
+        image[10:20, 30:70] = 255
+        boxes = np.array([[30], [10], [70], [20]], np.float64)
+
+        for rotation, code in page_orientation.ROTATE_CODES.items():
+            rotated = cv2.rotate(image, code)
+            ys, xs = np.nonzero(rotated)
+            expected = (xs.min(), ys.min(), xs.max() + 1, ys.max() + 1)
+            got = tuple(int(v[0]) for v in page_orientation.rotate_boxes(boxes, rotation, 100, 60))
+            assert got == expected
+
+
+class TestOrientationOCR:
+    """Testes do OCR com a orientação do layout (sem --psm 1)"""
+
+    @pytest.fixture
+    def analyzer(self, tmp_path):
+        from text_analyzer_optimized import TextAnalyzerOptimized
+        analyzer = TextAnalyzerOptimized(cache_dir=str(tmp_path / 'cache'))
+        analyzer._pytesseract = MagicMock()
+        analyzer._pytesseract.image_to_string.return_value = 'texto'
+        return analyzer
+
+    # ========== HAPPY PATH ==========
+
+    def test_rotated_page_corrected_before_ocr_happy_path(self, tmp_path, analyzer):
+        """
+        HAPPY PATH: Página deitada (90 graus) classificada como artigo
+
+        Expected: OCR recebe a página em pé (dimensões trocadas), sem OSD, e a
+        resposta reporta a orientação
+        """
+        from classificador_final import ClassificadorFinal
+        from ocr_profiles import OCR_PAGE_PSM
+        path = str(tmp_path / 'rotated.tif')
+        Image.fromarray(_page(0.0, 90, dpi=100, seed=2)).save(path)
+        clf = ClassificadorFinal()
+        clf.text_analyzer = analyzer
+        # OCR na thread da requisição (o especulativo acompanha o processo do Tesseract direto)
+        clf.speculative_ocr_enabled = False
+
+        result = clf.classify(path)
+
+        assert result['orientation']['rotation'] == 90
+        page = analyzer._pytesseract.image_to_string.call_args[0][0]
+        assert page.shape[0] > page.shape[1]
+        config = analyzer._pytesseract.image_to_string.call_args[1]['config']
+        assert f'--psm {OCR_PAGE_PSM}' in config and '--psm 1' not in config
+
+    def test_api_reports_orientation_happy_path(self):
+        """
+        HAPPY PATH: Resposta do /classify com a orientação estimada
+
+        Expected: Campo orientation repassado como veio do classificador
+        """
+        from api import build_classification_response
+        orientation = {'rotation': 0, 'skew_angle': 1.25, 'needs_correction': True}
+        result = {
+            'classification': 'scientific_article', 'score': -3.0, 'confidence': 0.3,
+            'features': {'text_density': 0.2, 'num_text_components': 900, 'layout_transitions': 40},
+            'extra_features': {'avg_component_height': 10.0, 'avg_component_width': 8.0, 'height_std': 2.0,
+                               'avg_aspect_ratio': 1.2, 'num_columns_detected': 1},
+            'orientation': orientation,
+        }
+
+        assert build_classification_response(result, 'doc.tif')['orientation'] == orientation
+
+    # ========== EDGE CASE ==========
+
+    def test_correction_ignores_regions_edge(self, tmp_path, analyzer):
+        """
+        EDGE CASE: Blocos de texto junto com uma página que precisa de correção
+
+        Expected: Blocos ignorados (medidos na página torta); página inteira endireitada
+        """
+        path = str(tmp_path / 'page.tif')
+        pixels = _page(0.0, 180, dpi=100)
+        Image.fromarray(pixels).save(path)
+        orientation = {'rotation': 180, 'skew_angle': 0.0, 'needs_correction': True}
+
+        analyzer.extract_text_fast(path, regions=[(0, 0, 50, 50)], orientation=orientation)
+
+        page = analyzer._pytesseract.image_to_string.call_args[0][0]
+        assert page.shape[1] > 50
@@ -0,0 +1,241 @@
+"""
+Testes unitários para o profiling sob demanda (cProfile + tracemalloc)
+"""
+import io
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+import metrics
+import profiling
+from profiling import RequestProfiler, SamplingProfiler, function_summary, is_authorized, load_collapsed
+
+
+def _allocating_pipeline():
+    with metrics.stage('small'):
+        small = bytearray(64 * 1024)
+    with metrics.stage('large'):
+        large = bytearray(4 * 1024 * 1024)
+    return len(small) + len(large)
+
+
+class TestRequestProfiler:
+    """Testes para RequestProfiler.run e a autorização por token"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_run_reports_stages_and_hotspots_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Chamada com duas etapas alocando memórias diferentes
+
+        Expected: Pico por etapa proporcional à alocação, hotspots e dump salvos
+        """
+        profiler = RequestProfiler(directory=str(tmp_path))
+        token = metrics.start_timings()
+        try:
+            result, report = profiler.run(_allocating_pipeline)
+        finally:
+            metrics.finish_timings(token)
+
+        assert result == 64 * 1024 + 4 * 1024 * 1024
+        assert report['stages']['large']['peak_alloc_bytes'] >= 4 * 1024 * 1024
+        assert report['stages']['small']['peak_alloc_bytes'] < 1024 * 1024
+        assert report['peak_alloc_bytes'] >= 4 * 1024 * 1024
+        assert any('_allocating_pipeline' in row['function'] for row in report['hotspots'])
+        assert profiler.load_summary(report['id'])['stages'] == report['stages']
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_is_authorized_rejects_wrong_or_missing_token_negative(self):
+        """
+        NEGATIVE PATH: Token errado, ausente ou ADMIN_TOKEN não configurado
+
+        Expected: Apenas o token correto (X-Admin-Token ou Bearer) é aceito
+        """
+        assert is_authorized({'X-Admin-Token': 'secret'}, token='secret')
+        assert is_authorized({'Authorization': 'Bearer secret'}, token='secret')
+        assert not is_authorized({'X-Admin-Token': 'wrong'}, token='secret')
+        assert not is_authorized({}, token='secret')
+        assert not is_authorized({'X-Admin-Token': ''}, token='')
+
+    # ========== EDGE CASES ==========
+
+    def test_invalid_id_and_pruning_edge(self, tmp_path):
+        """
+        EDGE CASE: Id fora do formato e limite de dumps
+
+        Expected: ValueError para ids inválidos; só os dumps mais recentes mantidos
+        """
+        profiler = RequestProfiler(directory=str(tmp_path), max_dumps=2)
+        with pytest.raises(ValueError):
+            profiler.dump_path('../etc/passwd')
+
+        reports = [profiler.run(sum, [1, 2])[1] for _ in range(3)]
+
+        assert len(list(tmp_path.glob('*.prof'))) == 2
+        assert profiler.load_summary(reports[-1]['id']) is not None
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSamplingProfiler:
+    """Amostragem contínua, gravação das janelas e controle de overhead"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_samples_busy_thread_and_flushes_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Thread ocupada durante a amostragem
+
+        Expected: Pilha da função ocupada no resumo e janela gravada em disco
+        """
+        profiler = SamplingProfiler(role='api', directory=str(tmp_path), interval=0.005, enabled=True)
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_loop, args=(stop,))
+        worker.start()
+        try:
+            for _ in range(20):
+                profiler.sample()
+                time.sleep(0.002)
+        finally:
+            stop.set()
+            worker.join()
+
+        summary = function_summary(profiler.snapshot())
+        assert profiler.stats()['samples'] == 20
+        assert any(row['function'].endswith(':_busy_loop') for row in summary['functions'])
+
+        path = profiler.flush()
+        assert path.endswith('.collapsed')
+        assert profiler.snapshot() == {}
+        assert sum(load_collapsed(str(tmp_path), role='api').values()) == summary['samples']
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_disabled_profiler_does_not_start_negative(self, tmp_path):
+        """
+        NEGATIVE PATH: SAMPLING_PROFILER_ENABLED=0
+
+        Expected: Nenhuma thread iniciada e nada gravado
+        """
+        profiler = SamplingProfiler(directory=str(tmp_path), enabled=False)
+        profiler.ensure_started()
+
+        assert not profiler.running
+        assert profiler.flush() is None
+        assert list(tmp_path.iterdir()) == []
+
+    # ========== EDGE CASES ==========
+
+    def test_interval_backs_off_when_over_budget_edge(self, tmp_path):
+        """
+        EDGE CASE: Custo da amostra acima do overhead máximo
+
+        Expected: Intervalo aumenta e volta ao configurado quando o custo cai
+        """
+        profiler = SamplingProfiler(directory=str(tmp_path), interval=0.01, max_overhead=0.02)
+        profiler._adjust_interval(0.001)  # 10% do intervalo
+        assert profiler.interval > 0.01
+
+        for _ in range(10):
+            profiler._adjust_interval(0.0)
+        assert profiler.interval == pytest.approx(0.01)
+
+    def test_rotation_keeps_latest_windows_edge(self, tmp_path):
+        """
+        EDGE CASE: Mais janelas que SAMPLING_PROFILER_MAX_FILES
+
+        Expected: Apenas as mais recentes mantidas
+        """
+        profiler = SamplingProfiler(role='worker', directory=str(tmp_path), max_files=2)
+        stop = threading.Event()
+        waiting = threading.Thread(target=stop.wait)
+        waiting.start()
+        try:
+            for _ in range(3):
+                profiler.sample()
+                profiler.flush()
+        finally:
+            stop.set()
+            waiting.join()
+
+        assert len(list(tmp_path.glob('worker-*.collapsed'))) == 2
+
+
+class TestProfilingApi:
+    """profile=1 em /classify e GET /profile/<id>"""
+
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch):
+        import api
+        monkeypatch.setattr(profiling, 'ADMIN_TOKEN', 'secret')
+        monkeypatch.setattr(api, 'request_profiler', RequestProfiler(directory=str(tmp_path)))
+        api.app.config['TESTING'] = True
+        with api.app.test_client() as client:
+            yield client
+
+    @staticmethod
+    def _post(client, headers=None):
+        buffer = io.BytesIO()
+        Image.new('L', (300, 300), color=255).save(buffer, format='TIFF')
+        buffer.seek(0)
+        return client.post('/classify', data={'image': (buffer, 'doc.tif'), 'profile': '1'},
+                           content_type='multipart/form-data', headers=headers or {})
+
+    def test_classify_with_profile_happy_path(self, client):
+        """
+        HAPPY PATH: profile=1 com o token de administrador
+
+        Expected: Campo profile na resposta e dump baixável por id
+        """
+        response = self._post(client, {'X-Admin-Token': 'secret'})
+
+        assert response.status_code == 200
+        profile = response.get_json()['profile']
+        assert profile['hotspots']
+        assert profile['download_url'] == f"/profile/{profile['id']}"
+
+        dump = client.get(profile['download_url'], headers={'X-Admin-Token': 'secret'})
+        summary = client.get(profile['download_url'] + '?format=json', headers={'X-Admin-Token': 'secret'})
+        assert dump.status_code == 200 and dump.data
+        assert summary.get_json()['id'] == profile['id']
+
+    def test_classify_profile_without_token_negative(self, client):
+        """
+        NEGATIVE PATH: profile=1 sem token
+
+        Expected: 403 e nenhum dump acessível sem o token
+        """
+        assert self._post(client).status_code == 403
+        assert client.get('/profile/' + '0' * 32).status_code == 403
+
+    def test_unknown_profile_id_edge(self, client):
+        """
+        EDGE CASE: Id inexistente ou inválido
+
+        Expected: 404 para id bem formado, 400 para id inválido
+        """
+        headers = {'X-Admin-Token': 'secret'}
+        assert client.get('/profile/' + '0' * 32, headers=headers).status_code == 404
+        assert client.get('/profile/not-an-id', headers=headers).status_code == 400
+
+    def test_sampling_endpoint_edge(self, client):
+        """
+        EDGE CASE: GET /profile/sampling com e sem token
+
+        Expected: 403 sem token; pilhas colapsadas e resumo JSON com token
+        """
+        headers = {'X-Admin-Token': 'secret'}
+        assert client.get('/profile/sampling').status_code == 403
+
+        collapsed = client.get('/profile/sampling', headers=headers)
+        summary = client.get('/profile/sampling?format=json', headers=headers).get_json()
+        assert collapsed.status_code == 200
+        assert collapsed.mimetype == 'text/plain'
+        assert summary['profiler']['role'] == 'api'
+        assert client.get('/profile/sampling?scope=bogus', headers=headers).status_code == 400
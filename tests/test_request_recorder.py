@@ -0,0 +1,132 @@
+"""
+Testes unitários para o RequestRecorder e o replay de requisições
+"""
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from request_recorder import RequestRecorder, load_records
+
+
+def _make_tiff(path, size=(120, 80), color=255):
+    Image.new('L', size, color=color).save(path, format='TIFF')
+    return str(path)
+
+
+class TestRequestRecorder:
+    """Testes para capture/finish e o armazenamento limitado de TIFFs"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_capture_and_finish_writes_record_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Requisição gravada com bytes
+
+        Expected: Linha JSON com hash, dimensões, parâmetros, timings e TIFF guardado
+        """
+        recorder = RequestRecorder(directory=str(tmp_path / 'log'), enabled=True, store_bytes=True)
+        image_path = _make_tiff(tmp_path / 'doc.tif')
+
+        record = recorder.capture(image_path, 'classify', {'min_words': 100}, filename='doc.tif')
+        recorder.finish(record, 200, {'otsu': 0.01, 'total': 0.05},
+                        result={'classification': 'advertisement', 'degradations': []}, request_id='abc')
+
+        [saved] = load_records(str(tmp_path / 'log'))
+        assert (saved['width'], saved['height']) == (120, 80)
+        assert saved['params'] == {'min_words': 100}
+        assert saved['timings']['otsu'] == pytest.approx(0.01)
+        assert saved['classification'] == 'advertisement'
+        assert saved['request_id'] == 'abc'
+        assert saved['stored'] is True
+        assert os.path.exists(recorder.blob_path(saved['content_hash']))
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_disabled_recorder_records_nothing_negative(self, tmp_path):
+        """
+        NEGATIVE PATH: Gravador desativado (padrão)
+
+        Expected: capture retorna None e nenhum arquivo é criado
+        """
+        recorder = RequestRecorder(directory=str(tmp_path / 'log'), enabled=False)
+        record = recorder.capture(_make_tiff(tmp_path / 'doc.tif'), 'classify', {})
+        recorder.finish(record, 200, {})
+
+        assert record is None
+        assert not (tmp_path / 'log').exists()
+
+    # ========== EDGE CASES ==========
+
+    def test_blob_store_evicts_oldest_edge(self, tmp_path):
+        """
+        EDGE CASE: Armazenamento acima do limite de bytes
+
+        Expected: TIFFs mais antigos removidos, o mais recente mantido
+        """
+        first = _make_tiff(tmp_path / 'a.tif', color=0)
+        second = _make_tiff(tmp_path / 'b.tif', color=128)
+        recorder = RequestRecorder(directory=str(tmp_path / 'log'), enabled=True, store_bytes=True,
+                                   max_store_bytes=os.path.getsize(first) + 10)
+
+        old = recorder.capture(first, 'classify', {})
+        new = recorder.capture(second, 'classify', {})
+
+        assert not os.path.exists(recorder.blob_path(old['content_hash']))
+        assert os.path.exists(recorder.blob_path(new['content_hash']))
+
+
+class TestRecorderApiAndReplay:
+    """Gravação via POST /classify e replay em processo"""
+
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch):
+        import api
+        monkeypatch.setattr(api, 'request_recorder',
+                            RequestRecorder(directory=str(tmp_path / 'log'), enabled=True, store_bytes=True))
+        api.app.config['TESTING'] = True
+        with api.app.test_client() as client:
+            yield client
+
+    def test_classify_recorded_and_replayed_happy_path(self, client, tmp_path):
+        """
+        HAPPY PATH: /classify com gravador ativo e replay do log
+
+        Expected: Registro com timings do pipeline e diff por etapa no replay
+        """
+        from benchmarks import replay
+
+        buffer = io.BytesIO()
+        Image.new('L', (300, 300), color=255).save(buffer, format='TIFF')
+        buffer.seek(0)
+        response = client.post('/classify', data={'image': (buffer, 'doc.tif'), 'min_words': '50'},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+
+        log_dir = str(tmp_path / 'log')
+        [record] = load_records(log_dir)
+        assert record['params']['min_words'] == 50
+        assert 'classify' in record['timings']
+
+        class StubTarget:
+            def replay(self, path, params, filename):
+                return 200, {'classify': 0.5, 'decode': 0.1}, record['classification']
+
+        report = replay.replay_records(load_records(log_dir), RequestRecorder(directory=log_dir), StubTarget())
+
+        assert report['replayed'] == 1
+        assert report['classification_changes'] == []
+        assert set(report['stages']) == {'classify', 'decode'}
+
+    def test_parse_server_timing_edge(self):
+        """
+        EDGE CASE: Header Server-Timing com entradas sem duração
+
+        Expected: Apenas etapas com dur, convertidas para segundos
+        """
+        from benchmarks import replay
+
+        timings = replay.parse_server_timing('otsu;dur=12.5, cache;desc="hit", total;dur=40')
+
+        assert timings == {'otsu': pytest.approx(0.0125), 'total': pytest.approx(0.04)}
@@ -0,0 +1,100 @@
+"""
+Testes unitários para o logging estruturado (JSON, correlation id, amostragem)
+"""
+import json
+import logging
+
+import pytest
+
+import structured_logging
+
+
+def _make_record(level=logging.INFO, msg='mensagem %s', args=('ok',), **extra):
+    record = logging.LogRecord('test', level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class TestStructuredLogging:
+    """Testes para ContextFilter e JsonFormatter"""
+
+    @pytest.fixture(autouse=True)
+    def reset_context(self):
+        yield
+        structured_logging.end_request()
+
+    # ========== HAPPY PATH ==========
+
+    def test_json_formatter_includes_correlation_id_happy_path(self):
+        """
+        HAPPY PATH: Registro dentro de uma requisição com campos extras
+
+        Expected: Uma linha JSON com mensagem, nível, correlation id e extras
+        """
+        structured_logging.begin_request('req-123', sample_rate=1.0)
+        record = _make_record(classification='texto')
+
+        assert structured_logging.ContextFilter().filter(record)
+        payload = json.loads(structured_logging.JsonFormatter().format(record))
+
+        assert payload['message'] == 'mensagem ok'
+        assert payload['level'] == 'INFO'
+        assert payload['correlation_id'] == 'req-123'
+        assert payload['classification'] == 'texto'
+
+    def test_begin_request_generates_id_happy_path(self):
+        """
+        HAPPY PATH: begin_request sem id informado
+
+        Expected: Id gerado e disponível via get_correlation_id
+        """
+        correlation_id = structured_logging.begin_request()
+
+        assert correlation_id
+        assert structured_logging.get_correlation_id() == correlation_id
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_debug_dropped_when_request_not_sampled_negative(self):
+        """
+        NEGATIVE PATH: Requisição fora da amostra de debug
+
+        Expected: DEBUG descartado, INFO mantido
+        """
+        structured_logging.begin_request('req-456', sample_rate=0.0)
+        log_filter = structured_logging.ContextFilter()
+
+        assert not log_filter.filter(_make_record(level=logging.DEBUG))
+        assert log_filter.filter(_make_record(level=logging.INFO))
+
+
+class TestRequestIdHeader:
+    """Testes para o header X-Request-ID na API"""
+
+    @pytest.fixture
+    def client(self):
+        from api import app
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            yield client
+
+    def test_request_id_echoed_happy_path(self, client):
+        """
+        HAPPY PATH: Requisição com X-Request-ID
+
+        Expected: Mesmo id devolvido na resposta
+        """
+        response = client.get('/health', headers={'X-Request-ID': 'abc-123'})
+
+        assert response.headers['X-Request-ID'] == 'abc-123'
+
+    def test_request_id_generated_edge(self, client):
+        """
+        EDGE CASE: Requisição sem X-Request-ID
+
+        Expected: Id gerado pela API
+        """
+        response = client.get('/health')
+
+        assert response.headers['X-Request-ID']
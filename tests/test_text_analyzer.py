@@ -215,3 +215,36 @@ class TestOptimizedTextAnalyzer:
         except ImportError:
             pytest.skip("text_analyzer_optimized não disponível")
 
+    
+    # ========== EDGE CASE ==========
+    
+    def test_cancel_kills_running_tesseract_edge(self, mock_image_with_text, tmp_path):
+        """
+        EDGE CASE: OCR especulativo descartado com o Tesseract já rodando
+        
+        Input: "tesseract" que dorme 30 s; cancel sinalizado após 0,2 s
+        Expected: OCRCancelled em menos de 5 s, processo morto e nada no cache
+        """
+        import threading
+        import time
+        from text_analyzer_optimized import OCRCancelled, TextAnalyzerOptimized
+        pytesseract = pytest.importorskip('pytesseract')
+        script = tmp_path / 'tesseract'
+        script.write_text('#!/bin/sh\nexec sleep 30\n')
+        script.chmod(0o755)
+        analyzer = TextAnalyzerOptimized(cache_dir=str(tmp_path / 'cache'))
+        analyzer._available_models = lambda tessdata_dir: None
+        cancel = threading.Event()
+        original_cmd = pytesseract.pytesseract.tesseract_cmd
+        pytesseract.pytesseract.tesseract_cmd = str(script)
+        try:
+            threading.Timer(0.2, cancel.set).start()
+            start = time.monotonic()
+            with pytest.raises(OCRCancelled):
+                analyzer.analyze_fast(mock_image_with_text, timeout=30, cancel=cancel)
+            elapsed = time.monotonic() - start
+        finally:
+            pytesseract.pytesseract.tesseract_cmd = original_cmd
+        
+        assert elapsed < 5
+        assert os.listdir(tmp_path / 'cache') == []
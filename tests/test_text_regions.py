@@ -0,0 +1,234 @@
+"""
+Testes unitários para TextRegionDetector (blocos de texto enviados ao OCR)
+"""
+from unittest.mock import MagicMock
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from text_regions import TextRegionDetector, reading_order
+
+
+def _components(image):
+    """Estatísticas dos componentes da página como em analyze_layout"""
+    gray = np.array(image)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    return stats, binary.shape
+
+
+def _inside(inner, outer):
+    return inner[0] >= outer[0] and inner[1] >= outer[1] and inner[2] <= outer[2] and inner[3] <= outer[3]
+
+
+class TestTextRegionDetector:
+    """Testes para TextRegionDetector.detect e a ordem de leitura"""
+
+    @pytest.fixture
+    def detector(self):
+        return TextRegionDetector()
+
+    # ========== HAPPY PATH ==========
+
+    def test_two_column_article_happy_path(self, detector):
+        """
+        HAPPY PATH: Artigo sintético em duas colunas (150 dpi)
+
+        Expected: Um bloco por coluna, esquerda antes da direita, cobrindo todas as linhas
+        """
+        image, truth = synthetic.generate_page('article', dpi=150, columns=2, seed=0)
+        stats, shape = _components(image)
+
+        regions = detector.detect(stats, shape)
+
+        assert len(regions) == 2
+        left, right = regions
+        assert left[2] < right[0]
+        for line in truth['lines']:
+            assert any(_inside(line['bbox'], region) for region in regions) or line['bbox'][2] - line['bbox'][0] < 20
+
+    def test_ad_figure_excluded_happy_path(self, detector):
+        """
+        HAPPY PATH: Anúncio com título, bloco de imagem e texto
+
+        Expected: Título e texto como blocos (nessa ordem); a área da imagem fica fora do OCR
+        """
+        image, truth = synthetic.generate_page('ad', dpi=150, seed=3)
+        stats, shape = _components(image)
+        headline = truth['lines'][0]['bbox']
+
+        regions = detector.detect(stats, shape)
+
+        assert len(regions) == 2
+        x0, y0, x1, y1 = regions[0]
+        assert headline[0] <= (x0 + x1) / 2 <= headline[2] and headline[1] <= (y0 + y1) / 2 <= headline[3]
+        covered = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions)
+        assert covered < 0.25 * shape[0] * shape[1]
+
+    def test_reading_order_header_then_columns_happy_path(self):
+        """
+        HAPPY PATH: Título na largura da página sobre duas colunas
+
+        Expected: Título, coluna esquerda inteira, coluna direita
+        """
+        header = (10, 10, 500, 40)
+        left_top, left_bottom = (10, 60, 240, 300), (10, 320, 240, 600)
+        right = (260, 60, 500, 600)
+
+        assert reading_order([right, left_bottom, header, left_top]) == [header, left_top, left_bottom, right]
+
+    def test_reduced_scale_coordinates_happy_path(self, detector):
+        """
+        HAPPY PATH: Componentes de um decode em 1/2 (layout_scale=2)
+
+        Expected: Blocos em coordenadas nativas, próximos aos da escala 1
+        """
+        image, _ = synthetic.generate_page('article', dpi=150, columns=1, seed=1)
+        native = detector.detect(*_components(image))
+        half = image.resize((image.width // 2, image.height // 2))
+
+        reduced = detector.detect(*_components(half), scale=2)
+
+        assert len(reduced) == len(native) == 1
+        assert np.allclose(reduced[0], native[0], atol=12)
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_blank_page_no_regions_negative(self, detector):
+        """
+        NEGATIVE PATH: Página em branco (só o componente de fundo)
+
+        Expected: Nenhum bloco (OCR da página inteira)
+        """
+        stats = np.array([[0, 0, 100, 100, 10000]], np.int32)
+
+        assert detector.detect(stats, (100, 100)) == []
+
+    def test_isolated_specks_dropped_negative(self, detector):
+        """
+        NEGATIVE PATH: Dois pontos de ruído distantes
+
+        Expected: Blocos com menos de 3 componentes descartados
+        """
+        binary = np.zeros((400, 400), np.uint8)
+        binary[20:25, 20:25] = 255
+        binary[300:305, 300:305] = 255
+        _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+
+        assert detector.detect(stats, binary.shape) == []
+
+    # ========== EDGE CASE ==========
+
+    def test_interleaved_blocks_fallback_order_edge(self):
+        """
+        EDGE CASE: Blocos entrelaçados (sem corte horizontal ou vertical)
+
+        Expected: Ordem de cima para baixo
+        """
+        a = (0, 0, 60, 20)
+        b = (70, 10, 100, 60)
+        c = (0, 30, 60, 100)
+        d = (40, 70, 100, 100)
+
+        assert reading_order([d, c, b, a]) == [a, b, c, d]
+
+
+class TestRegionOCR:
+    """Testes do OCR por regiões (montagem dos blocos e integração com o classificador)"""
+
+    @pytest.fixture
+    def ad_page(self, tmp_path):
+        image, _ = synthetic.generate_page('ad', dpi=100, seed=3)
+        path = str(tmp_path / 'page.tif')
+        image.save(path)
+        return path
+
+    # ========== HAPPY PATH ==========
+
+    def test_montage_sent_to_tesseract_happy_path(self, tmp_path, ad_page):
+        """
+        HAPPY PATH: extract_text_fast com blocos de texto
+
+        Expected: Uma chamada do Tesseract com a montagem (menor que a página) e --psm de blocos
+        """
+        from classificador_final import ClassificadorFinal
+        from ocr_profiles import OCR_REGION_PSM
+        from text_analyzer_optimized import TextAnalyzerOptimized
+        analyzer = TextAnalyzerOptimized(cache_dir=str(tmp_path / 'cache'))
+        analyzer._pytesseract = MagicMock()
+        analyzer._pytesseract.image_to_string.return_value = 'texto'
+        clf = ClassificadorFinal()
+        _, _, layout = clf.analyze_layout(ad_page)
+        regions = clf.find_text_regions(layout)
+
+        analyzer.extract_text_fast(ad_page)
+        page = analyzer._pytesseract.image_to_string.call_args[0][0]
+        analyzer.extract_text_fast(ad_page, regions=regions)
+        montage = analyzer._pytesseract.image_to_string.call_args[0][0]
+
+        assert analyzer._pytesseract.image_to_string.call_count == 2
+        assert montage.size < 0.5 * page.size
+        assert f'--psm {OCR_REGION_PSM}' in analyzer._pytesseract.image_to_string.call_args[1]['config']
+
+    def test_classify_passes_regions_to_ocr_happy_path(self, tmp_path):
+        """
+        HAPPY PATH: Artigo científico classificado com OCR
+
+        Expected: analyze_fast recebe os blocos em coordenadas nativas
+        """
+        from classificador_final import ClassificadorFinal
+        image, _ = synthetic.generate_page('article', dpi=100, columns=2, seed=2)
+        path = str(tmp_path / 'article.tif')
+        image.save(path)
+        clf = ClassificadorFinal()
+        clf.text_analyzer = MagicMock()
+        clf.text_analyzer.analyze_fast.return_value = {'text': '', 'word_count': 0, 'frequent_words': []}
+        clf.text_analyzer.check_compliance.return_value = (False, [])
+
+        result = clf.classify(path)
+
+        assert result['classification'] == 'scientific_article'
+        regions = clf.text_analyzer.analyze_fast.call_args[1]['regions']
+        assert len(regions) == 2
+        assert all(0 <= x0 < x1 <= image.width and 0 <= y0 < y1 <= image.height for x0, y0, x1, y1 in regions)
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_regions_disabled_full_page_negative(self, monkeypatch):
+        """
+        NEGATIVE PATH: OCR_TEXT_REGIONS=0 ou perfil sem componentes (modo em faixas)
+
+        Expected: None (OCR da página inteira)
+        """
+        import text_regions
+        from classificador_final import ClassificadorFinal
+        from layout_profile import LayoutProfile
+        clf = ClassificadorFinal()
+        layout = LayoutProfile(100, 100)
+
+        assert clf.find_text_regions(layout) is None
+        layout.components = np.array([[0, 0, 100, 100, 10000]], np.int32)
+        assert clf.find_text_regions(layout) is None
+        monkeypatch.setattr(text_regions, 'OCR_TEXT_REGIONS', False)
+        assert clf.find_text_regions(None) is None
+
+    # ========== EDGE CASE ==========
+
+    def test_region_cache_separate_from_page_edge(self, tmp_path, ad_page):
+        """
+        EDGE CASE: Mesma imagem com OCR da página e por blocos
+
+        Expected: Entradas de cache distintas (textos diferentes não se misturam)
+        """
+        from text_analyzer_optimized import TextAnalyzerOptimized
+        analyzer = TextAnalyzerOptimized(cache_dir=str(tmp_path / 'cache'))
+        analyzer._pytesseract = MagicMock()
+        analyzer._pytesseract.image_to_string.side_effect = ['pagina inteira', 'blocos']
+        regions = [(0, 0, 200, 100)]
+
+        assert analyzer.extract_text_fast(ad_page) == 'pagina inteira'
+        assert analyzer.extract_text_fast(ad_page, regions=regions) == 'blocos'
+        assert analyzer.extract_text_fast(ad_page, regions=regions) == 'blocos'
+        assert analyzer._pytesseract.image_to_string.call_count == 2
@@ -0,0 +1,186 @@
+"""
+Testes unitários para a pré-verificação do cabeçalho TIFF
+"""
+import io
+import struct
+
+import pytest
+from PIL import Image
+
+from tiff_header import TiffRejected, inspect, validate
+
+
+def _tiff_bytes(size=(300, 200), mode='L', pages=1, **save_kwargs):
+    buffer = io.BytesIO()
+    frames = [Image.new(mode, size, color=255) for _ in range(pages)]
+    frames[0].save(buffer, format='TIFF', save_all=pages > 1, append_images=frames[1:], **save_kwargs)
+    return buffer.getvalue()
+
+
+def _minimal_tiff(width, height, compression=1, bits=8, endian='<'):
+    """TIFF clássico com um IFD e strip fictício (só o cabeçalho importa)"""
+    entries = [(256, 4, 1, width), (257, 4, 1, height), (258, 3, 1, bits),
+               (259, 3, 1, compression), (262, 3, 1, 1), (273, 4, 1, 8), (277, 3, 1, 1)]
+    order = b'II' if endian == '<' else b'MM'
+    ifd = struct.pack(endian + 'H', len(entries))
+    for tag, type_id, count, value in entries:
+        packed = struct.pack(endian + ('HH' if type_id == 3 else 'I'), *((value, 0) if type_id == 3 else (value,)))
+        ifd += struct.pack(endian + 'HHI', tag, type_id, count) + packed
+    ifd += struct.pack(endian + 'I', 0)
+    return order + struct.pack(endian + 'HI', 42, 16) + b'\0' * 8 + ifd
+
+
+class TestTiffHeader:
+    """Leitura dos IFDs e limites da pré-verificação"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_inspect_reads_pages_without_decoding_happy_path(self):
+        """
+        HAPPY PATH: TIFF bilevel G4 com 3 páginas
+
+        Expected: Dimensões, profundidade, compressão e número de páginas
+        """
+        data = _tiff_bytes((640, 480), mode='1', pages=3, compression='group4')
+        stream = io.BytesIO(data)
+        stream.seek(5)
+
+        info = validate(inspect(stream))
+
+        assert (info.width, info.height, info.page_count) == (640, 480, 3)
+        assert info.bilevel
+        assert info.first.compression_name == 'ccitt_g4'
+        assert info.to_dict()['file_size'] == len(data)
+        assert stream.tell() == 5
+
+    def test_big_endian_and_rgb_happy_path(self):
+        """
+        HAPPY PATH: TIFF big endian e TIFF RGB com LZW
+
+        Expected: Ambos lidos com os metadados corretos
+        """
+        assert inspect(io.BytesIO(_minimal_tiff(1000, 2000, endian='>'))).height == 2000
+
+        info = inspect(io.BytesIO(_tiff_bytes(mode='RGB', compression='tiff_lzw')))
+        assert (info.first.samples_per_pixel, info.first.compression_name) == (3, 'lzw')
+        assert not info.bilevel
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_rejects_non_tiff_and_corrupt_negative(self):
+        """
+        NEGATIVE PATH: PNG com extensão .tif e TIFF truncado
+
+        Expected: 415 not_tiff; 400 corrupt
+        """
+        png = io.BytesIO()
+        Image.new('L', (10, 10)).save(png, format='PNG')
+        with pytest.raises(TiffRejected) as error:
+            inspect(io.BytesIO(png.getvalue()))
+        assert (error.value.reason, error.value.status) == ('not_tiff', 415)
+
+        with pytest.raises(TiffRejected) as error:
+            inspect(io.BytesIO(_minimal_tiff(10, 10)[:20]))
+        assert (error.value.reason, error.value.status) == ('corrupt', 400)
+
+    def test_rejects_decompression_bomb_and_unsupported_negative(self):
+        """
+        NEGATIVE PATH: Cabeçalho declarando 100k x 100k pixels, razão de
+        descompressão absurda e compressão JPEG 2000
+
+        Expected: 413 para os limites, 415 para a compressão
+        """
+        with pytest.raises(TiffRejected) as error:
+            validate(inspect(io.BytesIO(_minimal_tiff(100000, 100000))))
+        assert (error.value.reason, error.value.status) == ('too_many_pixels', 413)
+
+        with pytest.raises(TiffRejected) as error:
+            validate(inspect(io.BytesIO(_minimal_tiff(10000, 10000))), max_ratio=1000)
+        assert error.value.reason == 'decompression_bomb'
+
+        with pytest.raises(TiffRejected) as error:
+            validate(inspect(io.BytesIO(_minimal_tiff(100, 100, compression=34712))))
+        assert (error.value.reason, error.value.status) == ('unsupported_compression', 415)
+
+    # ========== EDGE CASES ==========
+
+    def test_page_limit_and_ifd_cycle_edge(self):
+        """
+        EDGE CASE: Mais páginas que o limite e IFD apontando para si mesmo
+
+        Expected: Leitura para no limite (413); ciclo recusado como corrupto
+        """
+        info = inspect(io.BytesIO(_tiff_bytes(pages=4)), max_pages=2)
+        assert info.truncated
+        with pytest.raises(TiffRejected) as error:
+            validate(info, max_pages=2)
+        assert error.value.reason == 'too_many_pages'
+
+        data = bytearray(_minimal_tiff(10, 10))
+        struct.pack_into('<I', data, len(data) - 4, 16)
+        with pytest.raises(TiffRejected) as error:
+            inspect(io.BytesIO(bytes(data)))
+        assert error.value.reason == 'corrupt'
+
+
+class TestPreflightApi:
+    """Pré-verificação e limite de upload em /classify"""
+
+    @pytest.fixture
+    def client(self):
+        import api
+        api.app.config['TESTING'] = True
+        with api.app.test_client() as client:
+            yield client
+
+    def test_classify_reports_image_metadata_happy_path(self, client):
+        """
+        HAPPY PATH: TIFF válido
+
+        Expected: Metadados do cabeçalho no campo image
+        """
+        response = client.post('/classify', data={'image': (io.BytesIO(_tiff_bytes((400, 300))), 'doc.tif')},
+                               content_type='multipart/form-data')
+
+        assert response.status_code == 200
+        image = response.get_json()['image']
+        assert (image['width'], image['height'], image['pages']) == (400, 300, 1)
+        assert 'preflight' in response.headers['Server-Timing']
+
+    def test_classify_rejects_before_decode_negative(self, client, monkeypatch):
+        """
+        NEGATIVE PATH: Bomba de descompressão e PNG renomeado para .tif
+
+        Expected: 413/415 sem chamar o classificador
+        """
+        import api
+
+        def fail(*args, **kwargs):
+            raise AssertionError('classificador não deveria rodar')
+
+        monkeypatch.setattr(api.classifier, 'classify', fail)
+        bomb = client.post('/classify', data={'image': (io.BytesIO(_minimal_tiff(100000, 100000)), 'bomb.tif')},
+                           content_type='multipart/form-data')
+        assert bomb.status_code == 413
+        assert bomb.get_json()['reason'] == 'too_many_pixels'
+
+        png = io.BytesIO()
+        Image.new('L', (10, 10)).save(png, format='PNG')
+        png.seek(0)
+        response = client.post('/classify', data={'image': (png, 'doc.tif')}, content_type='multipart/form-data')
+        assert response.status_code == 415
+
+    def test_upload_limit_enforced_while_reading_body_edge(self, client, monkeypatch):
+        """
+        EDGE CASE: Corpo maior que o limite de upload
+
+        Expected: 413 JSON (upload_too_large)
+        """
+        import api
+        monkeypatch.setitem(api.app.config, 'MAX_CONTENT_LENGTH', 1024)
+
+        response = client.post('/classify', data={'image': (io.BytesIO(b'\0' * 4096), 'big.tif')},
+                               content_type='multipart/form-data')
+
+        assert response.status_code == 413
+        assert response.get_json()['reason'] == 'upload_too_large'
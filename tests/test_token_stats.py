@@ -0,0 +1,172 @@
+"""
+Testes unitários para TokenStats (contagem de palavras em uma passada, incremental e mesclável)
+"""
+import pytest
+
+from benchmarks import synthetic
+from benchmarks.token_stats import legacy_stats
+from classificador_final import ClassificadorFinal
+from token_stats import STOPWORDS, TokenStats
+
+
+@pytest.fixture(scope='module')
+def pages_text():
+    return [synthetic.generate_page('article', dpi=72, seed=seed)[1]['text'] for seed in range(3)]
+
+
+class TestTokenStats:
+    """Testes para TokenStats.update / merge / most_common"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_same_result_as_two_pass_findall_happy_path(self, pages_text):
+        """
+        HAPPY PATH: Texto de três páginas
+
+        Expected: Total e top-10 idênticos ao caminho anterior (dois re.findall + Counter)
+        """
+        text = '\n'.join(pages_text)
+
+        stats = TokenStats.from_text(text)
+
+        assert (stats.total, stats.most_common(10)) == legacy_stats(text)
+
+    def test_merged_shards_equal_concatenated_text_happy_path(self, pages_text):
+        """
+        HAPPY PATH: Páginas contadas separadamente (shards paralelos do OCR)
+
+        Expected: merge() igual à contagem do texto concatenado, inclusive a ordem dos empates
+        """
+        merged = TokenStats.merged(TokenStats.from_text(text) for text in pages_text)
+        whole = TokenStats.from_text('\n'.join(pages_text))
+
+        assert merged == whole
+        assert merged.most_common(20) == whole.most_common(20)
+
+    def test_incremental_bands_happy_path(self):
+        """
+        HAPPY PATH: Texto chegando em faixas do OCR
+
+        Expected: update() acumula total e contagens
+        """
+        stats = TokenStats().update('Redes neurais e dados.').update('Dados de redes; REDES!')
+
+        assert stats.total == 8
+        assert stats.most_common(2) == [('redes', 3), ('dados', 2)]
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_empty_text_negative(self):
+        """
+        NEGATIVE PATH: OCR sem texto (vazio ou só números/pontuação)
+
+        Expected: Total 0 e nenhuma palavra frequente
+        """
+        stats = TokenStats.from_text('').update('123 -- 4.5 %')
+
+        assert stats.total == 0
+        assert stats.most_common() == []
+
+    def test_stopwords_and_short_words_not_frequent_negative(self):
+        """
+        NEGATIVE PATH: Texto só com stopwords e palavras curtas
+
+        Expected: Contam no total, mas não entram nas frequentes
+        """
+        stats = TokenStats.from_text('the and of de da em ia ml ia')
+
+        assert stats.total == 9
+        assert stats.most_common() == []
+        assert isinstance(STOPWORDS, frozenset)
+
+    # ========== EDGE CASE ==========
+
+    def test_accents_and_dict_roundtrip_edge(self):
+        """
+        EDGE CASE: Palavras acentuadas e maiúsculas; serialização para JSON
+
+        Expected: Acentos preservados em minúsculas; from_dict(to_dict()) igual ao original
+        """
+        stats = TokenStats.from_text('Classificação CLASSIFICAÇÃO análise')
+
+        assert stats.most_common() == [('classificação', 2), ('análise', 1)]
+        assert TokenStats.from_dict(stats.to_dict()) == stats
+
+
+class TestTokenStatsAggregation:
+    """Testes da soma das contagens de palavras no documento multipágina"""
+
+    @staticmethod
+    def _page(index, text):
+        stats = TokenStats.from_text(text)
+        return {
+            'page': index, 'classification': 'scientific_article', 'score': -3.0, 'confidence': 0.3,
+            'degradations': [],
+            'features': {'text_density': 0.2, 'num_text_components': 1000, 'layout_transitions': 80},
+            'extra_features': {'avg_component_height': 9.0, 'height_std': 2.0, 'avg_component_width': 7.0,
+                               'avg_aspect_ratio': 1.2, 'num_columns_detected': 0},
+            'word_count': stats.total, 'frequent_words': stats.most_common(1), 'memory': {'peak_bytes': 10},
+        }, stats
+
+    @pytest.fixture
+    def classifier(self):
+        from text_analyzer import TextAnalyzer
+        clf = ClassificadorFinal()
+        clf.text_analyzer = TextAnalyzer.__new__(TextAnalyzer)
+        return clf
+
+    # ========== HAPPY PATH ==========
+
+    def test_document_top_words_from_full_counts_happy_path(self, classifier):
+        """
+        HAPPY PATH: Palavra em 2º lugar nas duas páginas (fora do top-1 de cada uma)
+
+        Expected: Com as contagens completas ela é a mais frequente do documento
+        """
+        first, first_stats = self._page(0, 'modelo modelo modelo dados dados')
+        second, second_stats = self._page(1, 'rede rede rede dados dados')
+
+        document = classifier.aggregate_pages([first, second], token_stats=[first_stats, second_stats])
+
+        assert document['frequent_words'][0] == {'word': 'dados', 'count': 4}
+        assert document['word_count'] == 10
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_missing_page_stats_falls_back_negative(self, classifier):
+        """
+        NEGATIVE PATH: Página sem contagens (analisador que não retorna token_stats)
+
+        Expected: Soma das listas de palavras frequentes de cada página
+        """
+        first, first_stats = self._page(0, 'modelo modelo modelo dados dados')
+        second, _ = self._page(1, 'rede rede rede dados dados')
+
+        document = classifier.aggregate_pages([first, second], token_stats=[first_stats, None])
+
+        assert document['frequent_words'][0]['word'] in ('modelo', 'rede')
+        assert {'word': 'dados', 'count': 4} not in document['frequent_words']
+
+    # ========== EDGE CASE ==========
+
+    def test_token_stats_not_in_response_edge(self, tmp_path):
+        """
+        EDGE CASE: classify com o analisador retornando token_stats
+
+        Expected: Contagens usadas internamente e retiradas do resultado (JSON do Celery/API)
+        """
+        from unittest.mock import MagicMock
+        image, _ = synthetic.generate_page('article', dpi=100, columns=2, seed=2)
+        path = str(tmp_path / 'article.tif')
+        image.save(path)
+        clf = ClassificadorFinal()
+        clf.text_analyzer = MagicMock()
+        stats = TokenStats.from_text('dados dados modelo')
+        clf.text_analyzer.analyze_fast.return_value = {
+            'text': '', 'word_count': stats.total, 'frequent_words': stats.most_common(10), 'token_stats': stats}
+        clf.text_analyzer.check_compliance.return_value = (False, [])
+
+        result = clf.classify(path)
+
+        assert result['word_count'] == 3
+        assert 'token_stats' not in result
@@ -0,0 +1,227 @@
+"""
+Testes unitários para o tracing distribuído (API → Celery → etapas)
+"""
+import io
+
+from PIL import Image
+
+import metrics
+import profiling
+from tracing import JsonlExporter, Tracer, load_exporter, load_trace, parse_traceparent
+
+TRACEPARENT = '00-' + 'a' * 32 + '-' + 'b' * 16 + '-01'
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def by_name(self):
+        return {span['name']: span for span in self.spans}
+
+
+def _tiff_bytes():
+    buffer = io.BytesIO()
+    Image.new('L', (300, 300), color=255).save(buffer, format='TIFF')
+    return buffer.getvalue()
+
+
+class TestTracer:
+    """Spans, propagação do traceparent e exportadores"""
+
+    # ========== HAPPY PATH ==========
+
+    def test_stages_become_child_spans_happy_path(self):
+        """
+        HAPPY PATH: Requisição com etapas aninhadas continuando um traceparent
+
+        Expected: Mesmo trace_id, raiz filha do span remoto e etapas aninhadas
+        """
+        exporter = ListExporter()
+        tracer = Tracer(exporter=exporter, enabled=True)
+
+        scope = tracer.begin('POST /classify', TRACEPARENT)
+        with metrics.stage('classify'):
+            with metrics.stage('otsu'):
+                injected = tracer.inject()
+        tracer.finish(scope, attributes={'http.status_code': 200})
+
+        spans = exporter.by_name()
+        assert {span['trace_id'] for span in exporter.spans} == {'a' * 32}
+        assert spans['POST /classify']['parent_id'] == 'b' * 16
+        assert spans['classify']['parent_id'] == spans['POST /classify']['span_id']
+        assert spans['otsu']['parent_id'] == spans['classify']['span_id']
+        assert spans['POST /classify']['attributes']['http.status_code'] == 200
+        assert parse_traceparent(injected['traceparent']).span_id == spans['otsu']['span_id']
+        assert tracer.current_span() is None
+
+    def test_spans_delivered_once_at_root_finish_happy_path(self):
+        """
+        HAPPY PATH: Requisição com várias etapas e exportador com export_batch
+
+        Expected: Nada exportado durante a requisição; um único lote com a raiz
+        e todas as etapas no finish
+        """
+        class BatchExporter(ListExporter):
+            def __init__(self):
+                super().__init__()
+                self.batches = []
+
+            def export_batch(self, spans):
+                self.batches.append(list(spans))
+
+        exporter = BatchExporter()
+        tracer = Tracer(exporter=exporter, enabled=True)
+
+        scope = tracer.begin('POST /classify', TRACEPARENT)
+        for name in ('decode', 'otsu', 'connected_components'):
+            with metrics.stage(name):
+                pass
+        assert exporter.batches == []
+        tracer.finish(scope)
+
+        [batch] = exporter.batches
+        assert {span['name'] for span in batch} == {'POST /classify', 'decode', 'otsu', 'connected_components'}
+        assert exporter.spans == []
+
+    # ========== NEGATIVE PATH ==========
+
+    def test_invalid_traceparent_and_disabled_tracer_negative(self):
+        """
+        NEGATIVE PATH: traceparent malformado e tracing desativado
+
+        Expected: Novo trace para o header inválido; nenhum span sem tracing
+        """
+        assert parse_traceparent('garbage') is None
+        assert parse_traceparent('00-' + '0' * 32 + '-' + 'b' * 16 + '-01') is None
+
+        exporter = ListExporter()
+        tracer = Tracer(exporter=exporter, enabled=True)
+        tracer.finish(tracer.begin('GET /health', 'garbage'))
+        assert exporter.spans[0]['parent_id'] is None
+        assert exporter.spans[0]['trace_id'] != 'a' * 32
+
+        disabled = Tracer(exporter=exporter, enabled=False)
+        assert disabled.begin('GET /health', TRACEPARENT) is None
+        assert disabled.inject() == {}
+
+    # ========== EDGE CASES ==========
+
+    def test_unsampled_trace_propagates_without_export_edge(self):
+        """
+        EDGE CASE: traceparent com flag de amostragem desligada
+
+        Expected: Contexto propagado (flags 00), nenhum span exportado
+        """
+        exporter = ListExporter()
+        tracer = Tracer(exporter=exporter, enabled=True)
+
+        scope = tracer.begin('POST /classify/async', TRACEPARENT[:-2] + '00')
+        injected = tracer.inject()
+        tracer.finish(scope)
+
+        assert injected['traceparent'].endswith('-00')
+        assert exporter.spans == []
+
+    def test_span_ending_after_root_exported_directly_edge(self):
+        """
+        EDGE CASE: Etapa de outra thread (OCR especulativo descartado) que
+        termina depois do span raiz
+
+        Expected: Exportada sozinha quando termina, no mesmo trace
+        """
+        import contextvars
+        exporter = ListExporter()
+        tracer = Tracer(exporter=exporter, enabled=True)
+
+        scope = tracer.begin('POST /classify', TRACEPARENT)
+        context = contextvars.copy_context()
+        straggler = context.run(tracer.start_span, 'ocr', activate=False)
+        tracer.finish(scope)
+        assert [span['name'] for span in exporter.spans] == ['POST /classify']
+        context.run(straggler.end)
+
+        assert [span['name'] for span in exporter.spans] == ['POST /classify', 'ocr']
+        assert exporter.spans[1]['trace_id'] == 'a' * 32
+
+    def test_jsonl_exporter_and_plugin_spec_edge(self, tmp_path):
+        """
+        EDGE CASE: Exportador padrão em arquivo e exportador por 'modulo:atributo'
+
+        Expected: load_trace lê os spans gravados; a spec resolve a classe
+        """
+        path = str(tmp_path / 'spans.jsonl')
+        tracer = Tracer(exporter=JsonlExporter(path), enabled=True)
+        tracer.finish(tracer.begin('GET /stats', TRACEPARENT))
+
+        [span] = load_trace('a' * 32, path)
+        assert span['name'] == 'GET /stats'
+        assert isinstance(load_exporter('tracing:NullExporter'), load_exporter('none').__class__)
+
+
+class TestTracePropagation:
+    """Trace único de /classify/async até as etapas do worker"""
+
+    def test_async_request_traced_through_worker_happy_path(self, tmp_path, monkeypatch):
+        """
+        HAPPY PATH: /classify/async → headers da mensagem → tasks.classify_document
+
+        Expected: Spans da API e do worker no mesmo trace, com queue_wait,
+        classify e a busca do resultado, consultáveis em GET /trace/<id>
+        """
+        import api
+        import tasks
+
+        path = str(tmp_path / 'spans.jsonl')
+        monkeypatch.setattr(api, 'tracer', Tracer(service='api', exporter=JsonlExporter(path)))
+        monkeypatch.setattr(tasks, 'tracer', Tracer(service='worker', exporter=JsonlExporter(path)))
+        monkeypatch.setattr(tasks.classify_document, 'update_state', lambda *args, **kwargs: None)
+        monkeypatch.setattr(profiling, 'ADMIN_TOKEN', 'secret')
+        monkeypatch.setattr(api, 'CELERY_AVAILABLE', True)
+
+        class EagerTask:
+            """Executa a tarefa no processo com os mesmos headers da mensagem"""
+            results = {}
+
+            def apply_async(self, args, kwargs, headers):
+                result = tasks.classify_document.apply(args=args, kwargs=kwargs, headers=headers)
+                self.results[result.id] = result
+                return result
+
+            def AsyncResult(self, task_id):
+                return self.results[task_id]
+
+        monkeypatch.setattr(api, 'classify_document', EagerTask())
+        api.app.config['TESTING'] = True
+
+        with api.app.test_client() as client:
+            response = client.post('/classify/async', data={'image': (io.BytesIO(_tiff_bytes()), 'doc.tif')},
+                                   content_type='multipart/form-data')
+            assert response.status_code == 202
+            body = response.get_json()
+            assert client.get(f"/task/{body['task_id']}").get_json()['state'] == 'SUCCESS'
+            trace = client.get(f"/trace/{body['trace_id']}", headers={'X-Admin-Token': 'secret'}).get_json()
+
+        spans = {span['name']: span for span in trace['spans']}
+        assert {'POST /classify/async', 'enqueue', 'tasks.classify_document', 'queue_wait',
+                'classify', 'decode', 'result_fetch'} <= set(spans)
+        assert spans['tasks.classify_document']['parent_id'] == spans['enqueue']['span_id']
+        assert spans['queue_wait']['service'] == 'worker'
+        assert spans['result_fetch']['parent_id'] == spans['tasks.classify_document']['span_id']
+
+    def test_trace_endpoint_requires_token_negative(self, monkeypatch):
+        """
+        NEGATIVE PATH: GET /trace/<id> sem token ou com id inválido
+
+        Expected: 403 sem token, 400 para id fora do formato
+        """
+        import api
+        api.app.config['TESTING'] = True
+        with api.app.test_client() as client:
+            assert client.get('/trace/' + 'a' * 32).status_code == 403
+            monkeypatch.setattr(profiling, 'ADMIN_TOKEN', 'secret')
+            response = client.get('/trace/not-a-trace', headers={'X-Admin-Token': 'secret'})
+            assert response.status_code == 400
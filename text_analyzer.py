@@ -5,18 +5,12 @@ Extrai texto via OCR e analisa palavras frequentes
 """
 
 import cv2
-from collections import Counter
-import re
+
+import token_stats
 
 class TextAnalyzer:
     def __init__(self):
-        self.stopwords = set([
-            'o', 'a', 'os', 'as', 'um', 'uma', 'de', 'do', 'da', 'dos', 'das',
-            'em', 'no', 'na', 'nos', 'nas', 'por', 'para', 'com', 'sem', 'sob',
-            'e', 'ou', 'mas', 'se', 'que', 'qual', 'quando', 'onde', 'como',
-            'the', 'a', 'an', 'and', 'or', 'but', 'if', 'of', 'at', 'by', 'for',
-            'with', 'about', 'as', 'into', 'through', 'to', 'from', 'in', 'on'
-        ])
+        self.stopwords = token_stats.STOPWORDS
         self._pytesseract = None
         
     def _get_pytesseract(self):
@@ -52,34 +46,23 @@ class TextAnalyzer:
             return ""
     
     def count_words(self, text):
-        """Conta total de palavras no texto"""
-        # Remover pontuação e números
-        words = re.findall(r'\b[a-zA-ZáéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ]+\b', text.lower())
-        return len(words)
+        """Conta total de palavras no texto (sem pontuação e números)"""
+        return token_stats.TokenStats.from_text(text).total
     
     def get_most_frequent_words(self, text, top_n=10):
-        """Retorna as palavras mais frequentes"""
-        # Extrair palavras
-        words = re.findall(r'\b[a-zA-ZáéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ]{3,}\b', text.lower())
-        
-        # Filtrar stopwords
-        filtered_words = [w for w in words if w not in self.stopwords]
-        
-        # Contar frequências
-        word_counts = Counter(filtered_words)
-        
-        return word_counts.most_common(top_n)
+        """Retorna as palavras mais frequentes (mínimo 3 letras, sem stopwords)"""
+        return token_stats.TokenStats.from_text(text).most_common(top_n)
     
     def analyze(self, image_path):
         """Análise completa do texto"""
         text = self.extract_text(image_path)
-        word_count = self.count_words(text)
-        frequent_words = self.get_most_frequent_words(text, top_n=10)
+        stats = token_stats.TokenStats.from_text(text)
         
         return {
             'text': text,
-            'word_count': word_count,
-            'frequent_words': frequent_words
+            'word_count': stats.total,
+            'frequent_words': stats.most_common(10),
+            'token_stats': stats
         }
     
     def check_compliance(self, word_count, num_paragraphs, min_words=2000, min_paragraphs=8, language="pt"):
@@ -6,22 +6,44 @@ Performance: 5-10x mais rápido que versão anterior
 
 import cv2
 import numpy as np
-from collections import Counter
-import re
 import hashlib
 import os
 import json
+import shlex
+import subprocess
+import time
+
+import image_io
+import memory_budget
+import metrics
+import ocr_profiles
+import page_orientation
+import token_stats
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Faixa branca (px) entre os blocos da montagem
+REGION_GAP = 24
+
+# Intervalo (s) entre as verificações de cancelamento enquanto o Tesseract roda
+OCR_CANCEL_POLL_SECONDS = 0.05
+
+
+class OCRCancelled(Exception):
+    """OCR interrompido pelo chamador (OCR especulativo descartado)"""
+
+
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise OCRCancelled("OCR cancelado")
+
 
 class TextAnalyzerOptimized:
     def __init__(self, cache_dir=".cache_ocr"):
-        self.stopwords = set([
-            'o', 'a', 'os', 'as', 'um', 'uma', 'de', 'do', 'da', 'dos', 'das',
-            'em', 'no', 'na', 'nos', 'nas', 'por', 'para', 'com', 'sem', 'sob',
-            'e', 'ou', 'mas', 'se', 'que', 'qual', 'quando', 'onde', 'como',
-            'the', 'a', 'an', 'and', 'or', 'but', 'if', 'of', 'at', 'by', 'for',
-            'with', 'about', 'as', 'into', 'through', 'to', 'from', 'in', 'on'
-        ])
+        self.stopwords = token_stats.STOPWORDS
         self._pytesseract = None
+        self._installed_models = {}  # tessdata_dir -> modelos de idioma instalados
         self.cache_dir = cache_dir
         
         # Criar diretório de cache (exist_ok para evitar race condition com múltiplos workers)
@@ -37,20 +59,36 @@ class TextAnalyzerOptimized:
                 raise ImportError("pytesseract not installed")
         return self._pytesseract
     
+    def _available_models(self, tessdata_dir):
+        """Modelos de idioma instalados (consultados uma vez por diretório; None se a consulta falhar)"""
+        if tessdata_dir not in self._installed_models:
+            try:
+                config = f'--tessdata-dir {tessdata_dir}' if tessdata_dir else ''
+                self._installed_models[tessdata_dir] = set(self._get_pytesseract().get_languages(config=config))
+            except Exception as e:
+                logger.warning("Não foi possível listar os idiomas do Tesseract: %s", e)
+                self._installed_models[tessdata_dir] = None
+        return self._installed_models[tessdata_dir]
+    
     def _get_image_hash(self, image_path):
         """Gera hash da imagem para cache"""
         with open(image_path, 'rb') as f:
             return hashlib.md5(f.read()).hexdigest()
     
-    def _get_cache_path(self, image_hash):
-        """Retorna caminho do arquivo de cache"""
+    def _get_cache_path(self, image_hash, variant=None):
+        """
+        Retorna caminho do arquivo de cache (a chave inclui perfil e idioma do
+        OCR, os blocos de texto ou a correção da página)
+        """
+        if variant:
+            image_hash += '_' + hashlib.md5(repr(variant).encode()).hexdigest()[:12]
         return os.path.join(self.cache_dir, f"{image_hash}.json")
     
-    def _load_from_cache(self, image_path):
+    def _load_from_cache(self, image_path, variant=None):
         """Carrega resultado do cache se disponível"""
         try:
             image_hash = self._get_image_hash(image_path)
-            cache_path = self._get_cache_path(image_hash)
+            cache_path = self._get_cache_path(image_hash, variant)
             
             if os.path.exists(cache_path):
                 with open(cache_path, 'r') as f:
@@ -59,18 +97,18 @@ class TextAnalyzerOptimized:
             pass
         return None
     
-    def _save_to_cache(self, image_path, result):
+    def _save_to_cache(self, image_path, result, variant=None):
         """Salva resultado no cache"""
         try:
             image_hash = self._get_image_hash(image_path)
-            cache_path = self._get_cache_path(image_hash)
+            cache_path = self._get_cache_path(image_hash, variant)
             
             with open(cache_path, 'w') as f:
                 json.dump(result, f)
         except:
             pass
     
-    def _resize_image(self, img, max_width=1600):
+    def _resize_image(self, img, max_width=memory_budget.OCR_MAX_WIDTH):
         """
         Reduz resolução da imagem para acelerar OCR
         Performance gain: 3-5x mais rápido
@@ -85,15 +123,15 @@ class TextAnalyzerOptimized:
         
         return img
     
-    def _preprocess_image(self, img):
+    def _preprocess_image(self, img, max_width=memory_budget.OCR_MAX_WIDTH):
         """
         Pré-processa imagem para melhorar OCR
-        - Redimensiona (3-5x mais rápido)
+        - Redimensiona (3-5x mais rápido; largura máxima do perfil de OCR)
         - Binariza (melhora qualidade)
         - Remove ruído (melhora acurácia)
         """
         # Redimensionar para acelerar
-        img = self._resize_image(img, max_width=1600)
+        img = self._resize_image(img, max_width)
         
         # Converter para escala de cinza
         if len(img.shape) == 3:
@@ -115,120 +153,185 @@ class TextAnalyzerOptimized:
         
         return thresh
     
-    def extract_text_fast(self, image_path, timeout=30):
+    def _region_montage(self, processed, regions, ratio):
+        """
+        Recortes dos blocos de texto (coordenadas da página nativa) empilhados
+        em ordem de leitura numa única imagem, separados por faixas brancas:
+        uma chamada do Tesseract para todos os blocos
+        """
+        crops = []
+        for x0, y0, x1, y1 in regions:
+            crop = processed[int(y0 * ratio):int(np.ceil(y1 * ratio)), int(x0 * ratio):int(np.ceil(x1 * ratio))]
+            if crop.size:
+                crops.append(crop)
+        if not crops:
+            return None
+        width = max(crop.shape[1] for crop in crops) + 2 * REGION_GAP
+        height = sum(crop.shape[0] for crop in crops) + REGION_GAP * (len(crops) + 1)
+        montage = np.full((height, width), 255, np.uint8)
+        y = REGION_GAP
+        for crop in crops:
+            montage[y:y + crop.shape[0], REGION_GAP:REGION_GAP + crop.shape[1]] = crop
+            y += crop.shape[0] + REGION_GAP
+        return montage
+    
+    def _image_to_string(self, image, lang, config, timeout, cancel=None):
+        """
+        Texto do Tesseract. Com cancel (threading.Event) o processo é
+        acompanhado aqui e morto assim que o evento é sinalizado, sem esperar
+        o timeout (o image_to_string do pytesseract não expõe o processo)
+        """
+        pytesseract = self._get_pytesseract()
+        if cancel is None:
+            return pytesseract.image_to_string(image, lang=lang, config=config, timeout=timeout)
+        tesseract = pytesseract.pytesseract
+        with tesseract.save(image) as (temp_name, input_filename):
+            args = [tesseract.tesseract_cmd, input_filename, temp_name, '-l', lang, *shlex.split(config)]
+            proc = subprocess.Popen(args, **tesseract.subprocess_args())
+            deadline = time.monotonic() + timeout
+            try:
+                while True:
+                    try:
+                        _, errors = proc.communicate(timeout=OCR_CANCEL_POLL_SECONDS)
+                        break
+                    except subprocess.TimeoutExpired:
+                        _check_cancel(cancel)
+                        if time.monotonic() >= deadline:
+                            raise RuntimeError('Tesseract process timeout')
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.communicate()
+            if proc.returncode:
+                raise RuntimeError(f"Tesseract falhou ({proc.returncode}): {errors.decode(errors='ignore').strip()}")
+            with open(f"{temp_name}.txt", encoding='utf-8') as f:
+                return f.read()
+    
+    def extract_text_fast(self, image_path, timeout=30, regions=None, orientation=None,
+                          profile=None, language='pt', cancel=None):
         """
         Extrai texto com OTIMIZAÇÕES:
         1. Cache de resultados (instant se já processado)
         2. Redução de resolução (3-5x mais rápido)
-        3. Configuração otimizada do Tesseract
+        3. Configuração otimizada do Tesseract (sem OSD)
         4. Timeout para evitar travamentos
+        5. regions (text_regions): OCR só dos blocos de texto, sem fotos,
+           logos e margens (página inteira quando vazio)
+        6. orientation (page_orientation): página girada/endireitada antes do
+           OCR quando needs_correction (os blocos são ignorados nesse caso)
+        7. profile (ocr_profiles): motor, segmentação, dicionários e resolução;
+           language escolhe o modelo de idioma (por/eng)
+        8. cancel (threading.Event): verificado entre decode, pré-processamento
+           e Tesseract; o processo do Tesseract é morto ao ser sinalizado
+           (OCRCancelled)
         """
-        # DEBUG: Verificar se arquivo existe
-        import os
         if not os.path.exists(image_path):
-            print(f"❌ Arquivo não existe: {image_path}")
+            logger.warning("❌ Arquivo não existe: %s", image_path)
             return ""
         
-        file_size = os.path.getsize(image_path)
-        print(f"📄 Arquivo existe: {image_path} ({file_size} bytes)")
+        correction = orientation if orientation and orientation.get('needs_correction') else None
+        if correction:
+            regions = None
+        profile_name = ocr_profiles.resolve(profile)
+        settings = ocr_profiles.PROFILES[profile_name]
+        lang = ocr_profiles.tesseract_lang(settings, language, self._available_models(settings['tessdata_dir']))
+        cache_variant = (profile_name, lang, list(regions) if regions else correction)
         
         # Verificar cache primeiro
-        cached = self._load_from_cache(image_path)
+        with metrics.stage('ocr_cache_lookup'):
+            cached = self._load_from_cache(image_path, cache_variant)
         if cached:
-            print(f"✅ Cache hit! Texto recuperado do cache")
+            metrics.OCR_CACHE.inc(result='hit')
+            logger.debug("✅ Cache hit! Texto recuperado do cache")
             return cached['text']
+        metrics.OCR_CACHE.inc(result='miss')
         
         try:
-            pytesseract = self._get_pytesseract()
-            
-            print(f"🔍 Tentando ler imagem com OpenCV...")
-            img = cv2.imread(str(image_path))
+            self._get_pytesseract()  # ImportError antes de decodificar a página
             
-            if img is None:
-                print(f"❌ OpenCV não conseguiu ler a imagem!")
-                print(f"🔄 Tentando com PIL/Pillow...")
-                
-                # Fallback: tentar com PIL
+            # Decode direto em cinza: o pré-processamento descarta a cor, então
+            # a cópia BGR (3 bytes/pixel da página inteira) não é necessária
+            with metrics.stage('ocr_decode'):
                 try:
-                    from PIL import Image
-                    pil_img = Image.open(image_path)
-                    print(f"✅ PIL conseguiu abrir: {pil_img.size}, modo: {pil_img.mode}")
-                    
-                    # Converter PIL para OpenCV
-                    img = np.array(pil_img.convert('RGB'))
-                    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-                    print(f"✅ Convertido para OpenCV: {img.shape}")
-                except Exception as e:
-                    print(f"❌ PIL também falhou: {e}")
+                    img = image_io.decode_grayscale(image_path)
+                except ValueError as e:
+                    logger.warning("❌ Não foi possível ler a imagem para OCR: %s", e)
                     return ""
-            else:
-                print(f"✅ OpenCV leu a imagem: {img.shape}")
+            _check_cancel(cancel)
+            
+            # Rotação/inclinação estimadas no layout (substitui o OSD do --psm 1)
+            if correction:
+                with metrics.stage('ocr_deskew'):
+                    img = memory_budget.track(page_orientation.correct(img, correction))
             
             # Pré-processar imagem (reduz resolução + melhora qualidade)
-            processed = self._preprocess_image(img)
+            with metrics.stage('ocr_preprocess'):
+                processed = memory_budget.track(self._preprocess_image(img, settings['max_width']))
+            _check_cancel(cancel)
             
-            # Configuração otimizada do Tesseract
-            # PSM 1 = Automatic page segmentation with OSD (melhor para páginas completas)
-            # OEM 3 = Default (LSTM + legado, mais rápido que LSTM puro)
-            custom_config = r'--oem 3 --psm 1'
+            # Configuração do Tesseract pelo perfil
+            # PSM 3 = Automatic page segmentation, sem OSD (a página já chega endireitada)
+            # OEM 3 = Default (LSTM + legado); OEM 1 = só LSTM
+            custom_config = ocr_profiles.tesseract_config(settings, settings['page_psm'])
+            
+            # Blocos de texto: a segmentação da página já foi feita pelo layout
+            if regions:
+                with metrics.stage('ocr_regions'):
+                    montage = self._region_montage(processed, regions, processed.shape[1] / img.shape[1])
+                if montage is not None:
+                    processed = memory_budget.track(montage)
+                    custom_config = ocr_profiles.tesseract_config(settings, settings['region_psm'])
             
             # Extrair texto com timeout
+            # (timeout do próprio pytesseract: funciona fora da main thread,
+            # ao contrário do SIGALRM, e mata o processo do Tesseract)
             try:
-                import signal
-                
-                def timeout_handler(signum, frame):
-                    raise TimeoutError("OCR timeout")
-                
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(timeout)
-                
-                text = pytesseract.image_to_string(processed, lang='eng', config=custom_config)
-                
-                signal.alarm(0)  # Cancelar alarme
-            except:
-                # Fallback sem timeout (Windows não suporta SIGALRM)
-                text = pytesseract.image_to_string(processed, lang='eng', config=custom_config)
+                with metrics.stage('tesseract'):
+                    text = self._image_to_string(processed, lang, custom_config, timeout, cancel)
+            except RuntimeError as e:
+                if 'timeout' in str(e).lower():
+                    raise TimeoutError(f"OCR timeout (>{timeout}s)")
+                raise
             
             # Salvar no cache
-            self._save_to_cache(image_path, {'text': text})
+            self._save_to_cache(image_path, {'text': text}, cache_variant)
             
             return text
             
+        except (TimeoutError, OCRCancelled):
+            raise
         except Exception as e:
-            print(f"Erro ao extrair texto: {e}")
+            logger.warning("Erro ao extrair texto: %s", e)
             return ""
     
     def count_words(self, text):
         """Conta total de palavras no texto"""
-        words = re.findall(r'\b[a-zA-ZáéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ]+\b', text.lower())
-        return len(words)
+        return token_stats.TokenStats.from_text(text).total
     
     def get_most_frequent_words(self, text, top_n=10):
-        """Retorna as palavras mais frequentes"""
-        # Extrair palavras (mínimo 3 letras)
-        words = re.findall(r'\b[a-zA-ZáéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ]{3,}\b', text.lower())
-        
-        # Filtrar stopwords
-        filtered_words = [w for w in words if w not in self.stopwords]
-        
-        # Contar frequências
-        word_counts = Counter(filtered_words)
-        
-        return word_counts.most_common(top_n)
+        """Retorna as palavras mais frequentes (mínimo 3 letras, sem stopwords)"""
+        return token_stats.TokenStats.from_text(text).most_common(top_n)
     
-    def analyze_fast(self, image_path, timeout=30):
+    def analyze_fast(self, image_path, timeout=30, regions=None, orientation=None, profile=None, language='pt',
+                     cancel=None):
         """
         Análise completa OTIMIZADA
         Performance: 5-10x mais rápida
+        
+        token_stats: contagens de palavras (TokenStats) para somar páginas
+        sem concatenar os textos
         """
-        text = self.extract_text_fast(image_path, timeout=timeout)
-        word_count = self.count_words(text)
-        frequent_words = self.get_most_frequent_words(text, top_n=10)
+        text = self.extract_text_fast(image_path, timeout=timeout, regions=regions, orientation=orientation,
+                                      profile=profile, language=language, cancel=cancel)
+        # Uma tokenização para o total e as mais frequentes
+        with metrics.stage('word_stats'):
+            stats = token_stats.TokenStats.from_text(text)
         
         return {
             'text': text,
-            'word_count': word_count,
-            'frequent_words': frequent_words
+            'word_count': stats.total,
+            'frequent_words': stats.most_common(10),
+            'token_stats': stats
         }
     
     def get_word_count_and_frequent_words(self, image_path, timeout=30):
@@ -264,12 +367,11 @@ class TextAnalyzerOptimized:
         if os.path.exists(self.cache_dir):
             shutil.rmtree(self.cache_dir)
             os.makedirs(self.cache_dir)
-            print(f"✅ Cache limpo: {self.cache_dir}")
+            logger.info("✅ Cache limpo: %s", self.cache_dir)
 
 
 if __name__ == '__main__':
     import sys
-    import time
     
     if len(sys.argv) < 2:
         print("Uso: python3 text_analyzer_optimized.py <imagem>")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Regiões de Texto - blocos de texto para o OCR a partir dos componentes conectados
+
+O OCR da página inteira (--psm 1) também lê fotos, logos e margens: o
+Tesseract gasta tempo segmentando essas áreas e devolve tokens lixo. Aqui os
+componentes conectados já calculados pela extração de features viram
+retângulos de blocos de texto, sem nova passada sobre a imagem:
+
+1. componentes com altura/largura de caractere (até N x a altura mediana)
+   são texto; componentes grandes são figuras (fotos, logos, fios)
+2. as caixas dos componentes de texto são pintadas numa grade com células
+   de meia altura de texto; a dilatação une letras, palavras e linhas
+   vizinhas, mas não atravessa calhas de coluna
+3. cada grupo da grade é um bloco (caixa envolvente dos seus componentes);
+   blocos com poucos componentes ou cobertos por uma figura são descartados
+
+Os blocos saem em ordem de leitura (corte recursivo XY: faixas de cima para
+baixo, colunas da esquerda para a direita).
+
+Configuração (variáveis de ambiente):
+    OCR_TEXT_REGIONS   1 (padrão) = OCR só nos blocos de texto; 0 = página inteira
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+OCR_TEXT_REGIONS = os.environ.get('OCR_TEXT_REGIONS', '1') == '1'
+
+# Área mínima (px) dos componentes considerados texto (igual a extract_features)
+MIN_COMPONENT_AREA = 10
+
+
+class TextRegionDetector:
+    def __init__(self):
+        # Componente de texto: até 4x a altura mediana e 20x em largura
+        # (acima disso: fotos, logos, fios e tabelas desenhadas)
+        self.max_height_ratio = 4.0
+        self.max_width_ratio = 20.0
+        self.cell_ratio = 0.5  # célula da grade: meia altura de texto
+        # Distâncias (em alturas de texto) unidas no mesmo bloco
+        self.join_x = 1.0  # espaço entre palavras, menor que uma calha de coluna
+        self.join_y = 3.0  # entrelinha e espaço entre parágrafos
+        self.min_components = 3  # blocos menores são ruído
+        self.max_figure_overlap = 0.5
+
+    def detect(self, stats, shape, scale=1):
+        """
+        Blocos de texto a partir das estatísticas de cv2.connectedComponentsWithStats
+        (linha 0 = fundo) de uma binária com `shape` (altura, largura).
+        Coordenadas em pixels da resolução nativa (x scale).
+
+        Retorna [(x0, y0, x1, y1), ...] em ordem de leitura ([] sem texto)
+        """
+        height, width = shape
+        stats = np.asarray(stats)[1:]
+        stats = stats[stats[:, cv2.CC_STAT_AREA] >= max(1, round(MIN_COMPONENT_AREA / (scale * scale)))]
+        if len(stats) == 0:
+            return []
+
+        x = stats[:, cv2.CC_STAT_LEFT]
+        y = stats[:, cv2.CC_STAT_TOP]
+        w = stats[:, cv2.CC_STAT_WIDTH]
+        h = stats[:, cv2.CC_STAT_HEIGHT]
+        text_height = float(np.median(h))
+        is_text = (h <= self.max_height_ratio * text_height) & (w <= self.max_width_ratio * text_height)
+        figures = stats[~is_text & (h > self.max_height_ratio * text_height)]
+        x, y, w, h = x[is_text], y[is_text], w[is_text], h[is_text]
+        if len(x) == 0:
+            return []
+
+        # Caixas dos componentes numa grade grossa; a dilatação une vizinhos
+        cell = max(1, int(round(text_height * self.cell_ratio)))
+        gx0, gy0 = x // cell, y // cell
+        gx1, gy1 = (x + w - 1) // cell + 1, (y + h - 1) // cell + 1
+        grid = _paint_boxes((height // cell + 2, width // cell + 2), gx0, gy0, gx1, gy1)
+        kernel = np.ones((int(np.ceil(self.join_y * text_height / cell)) + 1,
+                          int(np.ceil(self.join_x * text_height / cell)) + 1), np.uint8)
+        num_blocks, labels = cv2.connectedComponents(cv2.dilate(grid, kernel), connectivity=8)
+
+        # Caixa envolvente dos componentes de cada bloco
+        block = labels[gy0, gx0]
+        counts = np.bincount(block, minlength=num_blocks)
+        x0 = np.full(num_blocks, width, np.int64)
+        y0 = np.full(num_blocks, height, np.int64)
+        x1 = np.zeros(num_blocks, np.int64)
+        y1 = np.zeros(num_blocks, np.int64)
+        np.minimum.at(x0, block, x)
+        np.minimum.at(y0, block, y)
+        np.maximum.at(x1, block, x + w)
+        np.maximum.at(y1, block, y + h)
+
+        pad = cell
+        regions = []
+        for label in np.flatnonzero(counts >= self.min_components):
+            box = (int(x0[label]), int(y0[label]), int(x1[label]), int(y1[label]))
+            if self._figure_overlap(box, figures) > self.max_figure_overlap:
+                continue
+            regions.append((
+                max(0, box[0] - pad) * scale, max(0, box[1] - pad) * scale,
+                min(width, box[2] + pad) * scale, min(height, box[3] + pad) * scale
+            ))
+        return reading_order(regions)
+
+    @staticmethod
+    def _figure_overlap(box, figures):
+        """Maior fração da área do bloco coberta por uma figura"""
+        if len(figures) == 0:
+            return 0.0
+        fx0 = figures[:, cv2.CC_STAT_LEFT]
+        fy0 = figures[:, cv2.CC_STAT_TOP]
+        fx1 = fx0 + figures[:, cv2.CC_STAT_WIDTH]
+        fy1 = fy0 + figures[:, cv2.CC_STAT_HEIGHT]
+        overlap_w = np.clip(np.minimum(fx1, box[2]) - np.maximum(fx0, box[0]), 0, None)
+        overlap_h = np.clip(np.minimum(fy1, box[3]) - np.maximum(fy0, box[1]), 0, None)
+        area = max(1, (box[2] - box[0]) * (box[3] - box[1]))
+        return float(np.max(overlap_w * overlap_h)) / area
+
+
+def _paint_boxes(shape, x0, y0, x1, y1):
+    """Grade uint8 com 255 nas caixas [x0, x1) x [y0, y1) (soma de diferenças 2D, sem laço)"""
+    diff = np.zeros((shape[0] + 1, shape[1] + 1), np.int32)
+    np.add.at(diff, (y0, x0), 1)
+    np.add.at(diff, (y0, x1), -1)
+    np.add.at(diff, (y1, x0), -1)
+    np.add.at(diff, (y1, x1), 1)
+    coverage = np.cumsum(np.cumsum(diff, axis=0), axis=1)[:-1, :-1]
+    return np.where(coverage > 0, 255, 0).astype(np.uint8)
+
+
+def reading_order(regions):
+    """
+    Ordena blocos (x0, y0, x1, y1) por corte recursivo XY: primeiro em faixas
+    horizontais sem sobreposição vertical (de cima para baixo), depois cada
+    faixa em colunas (da esquerda para a direita)
+    """
+    if len(regions) <= 1:
+        return list(regions)
+    for axis in (1, 0):
+        groups = _cut(regions, axis)
+        if len(groups) > 1:
+            return [region for group in groups for region in reading_order(group)]
+    # Sem corte possível (blocos entrelaçados): de cima para baixo
+    return sorted(regions, key=lambda r: (r[1], r[0]))
+
+
+def _cut(regions, axis):
+    """Grupos de blocos separados por um vão no eixo (1 = vertical, 0 = horizontal)"""
+    ordered = sorted(regions, key=lambda r: r[axis])
+    groups = [[ordered[0]]]
+    end = ordered[0][axis + 2]
+    for region in ordered[1:]:
+        if region[axis] >= end:
+            groups.append([])
+        groups[-1].append(region)
+        end = max(end, region[axis + 2])
+    return groups
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Inspeção de Cabeçalho TIFF - metadados sem decodificar pixels
+
+Lê apenas o cabeçalho e os IFDs (TIFF clássico e BigTIFF, little/big endian)
+para obter, de cada página: dimensões, bits por amostra, amostras por pixel,
+compressão, fotometria e organização em strips/tiles. Com isso a API recusa
+barato, antes de qualquer decode:
+
+- arquivos que não são TIFF ou com IFDs corrompidos (400)
+- bombas de descompressão: páginas com pixels demais ou razão
+  pixels/bytes do arquivo absurda (413)
+- páginas demais (413)
+- compressão, profundidade ou fotometria não suportadas (415)
+
+Os metadados (TiffInfo) seguem para o classificador e orientam as escolhas de
+estratégia (orçamento de memória, caminho bilevel, páginas).
+
+Configuração (variáveis de ambiente):
+    TIFF_MAX_PIXELS                pixels por página (padrão 150M)
+    TIFF_MAX_PAGES                 páginas por arquivo (padrão 50)
+    TIFF_MAX_DECOMPRESSION_RATIO   bytes decodificados (cinza, 1 byte/pixel) por byte do arquivo (padrão 10000)
+"""
+
+import os
+import struct
+
+TIFF_MAX_PIXELS = int(float(os.environ.get('TIFF_MAX_PIXELS', '150e6')))
+TIFF_MAX_PAGES = int(os.environ.get('TIFF_MAX_PAGES', '50'))
+TIFF_MAX_DECOMPRESSION_RATIO = float(os.environ.get('TIFF_MAX_DECOMPRESSION_RATIO', '10000'))
+
+# Limite de entradas por IFD (arquivos legítimos têm algumas dezenas)
+MAX_IFD_ENTRIES = 4096
+
+COMPRESSIONS = {
+    1: 'none', 2: 'ccitt_rle', 3: 'ccitt_g3', 4: 'ccitt_g4', 5: 'lzw',
+    6: 'ojpeg', 7: 'jpeg', 8: 'deflate', 32946: 'deflate', 32773: 'packbits',
+    34712: 'jpeg2000', 50000: 'zstd', 50001: 'webp',
+}
+SUPPORTED_COMPRESSIONS = {1, 2, 3, 4, 5, 7, 8, 32946, 32773}
+SUPPORTED_BITS = {1, 2, 4, 8, 16}
+# WhiteIsZero, BlackIsZero, RGB, Paleta, CMYK, YCbCr
+SUPPORTED_PHOTOMETRIC = {0, 1, 2, 3, 5, 6}
+
+# Tags usadas
+_TAG_WIDTH = 256
+_TAG_HEIGHT = 257
+_TAG_BITS = 258
+_TAG_COMPRESSION = 259
+_TAG_PHOTOMETRIC = 262
+_TAG_STRIP_OFFSETS = 273
+_TAG_SAMPLES = 277
+_TAG_ROWS_PER_STRIP = 278
+_TAG_PLANAR = 284
+_TAG_TILE_WIDTH = 322
+_TAG_TILE_LENGTH = 323
+_TAG_TILE_OFFSETS = 324
+
+# tipo TIFF -> (formato struct, tamanho)
+_TYPES = {
+    1: ('B', 1), 2: ('B', 1), 3: ('H', 2), 4: ('I', 4), 5: ('II', 8), 6: ('b', 1), 7: ('B', 1),
+    8: ('h', 2), 9: ('i', 4), 10: ('ii', 8), 11: ('f', 4), 12: ('d', 8), 16: ('Q', 8), 17: ('q', 8), 18: ('Q', 8),
+}
+
+
+class TiffRejected(ValueError):
+    """Arquivo recusado na pré-verificação (status HTTP sugerido em `status`)"""
+
+    def __init__(self, reason, message, status=400):
+        super().__init__(message)
+        self.reason = reason
+        self.status = status
+
+
+class TiffPage:
+    """Metadados de uma página (IFD)"""
+
+    def __init__(self, tags):
+        self.width = _first(tags.get(_TAG_WIDTH), 0)
+        self.height = _first(tags.get(_TAG_HEIGHT), 0)
+        self.bits_per_sample = _first(tags.get(_TAG_BITS), 1)
+        self.samples_per_pixel = _first(tags.get(_TAG_SAMPLES), 1)
+        self.compression = _first(tags.get(_TAG_COMPRESSION), 1)
+        self.photometric = _first(tags.get(_TAG_PHOTOMETRIC), 1)
+        self.planar = _first(tags.get(_TAG_PLANAR), 1)
+        self.tile_width = _first(tags.get(_TAG_TILE_WIDTH), None)
+        self.tile_height = _first(tags.get(_TAG_TILE_LENGTH), None)
+        self.rows_per_strip = min(_first(tags.get(_TAG_ROWS_PER_STRIP), self.height) or self.height, self.height)
+        offsets = tags.get(_TAG_TILE_OFFSETS) or tags.get(_TAG_STRIP_OFFSETS) or ()
+        self.chunk_count = len(offsets)
+
+    @property
+    def pixels(self):
+        return self.width * self.height
+
+    @property
+    def bilevel(self):
+        return self.bits_per_sample == 1 and self.samples_per_pixel == 1
+
+    @property
+    def tiled(self):
+        return self.tile_width is not None
+
+    @property
+    def compression_name(self):
+        return COMPRESSIONS.get(self.compression, f'unknown_{self.compression}')
+
+    def to_dict(self):
+        return {
+            'width': self.width,
+            'height': self.height,
+            'bits_per_sample': self.bits_per_sample,
+            'samples_per_pixel': self.samples_per_pixel,
+            'compression': self.compression_name,
+            'photometric': self.photometric,
+            'layout': 'tiles' if self.tiled else 'strips',
+            'rows_per_strip': None if self.tiled else self.rows_per_strip,
+            'chunks': self.chunk_count,
+        }
+
+
+class TiffInfo:
+    """Metadados do arquivo: páginas na ordem dos IFDs"""
+
+    def __init__(self, pages, file_size, bigtiff=False, truncated=False):
+        self.pages = pages
+        self.file_size = file_size
+        self.bigtiff = bigtiff
+        # True quando a leitura parou no limite de páginas
+        self.truncated = truncated
+
+    @property
+    def first(self):
+        return self.pages[0]
+
+    @property
+    def width(self):
+        return self.first.width
+
+    @property
+    def height(self):
+        return self.first.height
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    @property
+    def bilevel(self):
+        return self.first.bilevel
+
+    @property
+    def megapixels(self):
+        return self.first.pixels / 1e6
+
+    @property
+    def total_megapixels(self):
+        """Megapixels somados de todas as páginas"""
+        return sum(page.pixels for page in self.pages) / 1e6
+
+    def to_dict(self):
+        first = self.first.to_dict()
+        first['pages'] = self.page_count
+        first['file_size'] = self.file_size
+        return first
+
+
+def _first(values, default):
+    return values[0] if values else default
+
+
+class _Reader:
+    def __init__(self, stream, size):
+        self.stream = stream
+        self.size = size
+
+    def read(self, offset, length):
+        if offset < 0 or offset + length > self.size:
+            raise TiffRejected('corrupt', 'TIFF corrompido: offset fora do arquivo')
+        self.stream.seek(offset)
+        data = self.stream.read(length)
+        if len(data) != length:
+            raise TiffRejected('corrupt', 'TIFF corrompido: leitura incompleta')
+        return data
+
+
+class _TiffFile:
+    """Cabeçalho e IFDs de um TIFF aberto (entradas brutas: {tag: (tipo, quantidade, campo)})"""
+
+    def __init__(self, stream, size):
+        self.reader = _Reader(stream, size)
+        header = self.reader.read(0, 8) if size >= 8 else b''
+        if header[:2] == b'II':
+            self.endian = '<'
+        elif header[:2] == b'MM':
+            self.endian = '>'
+        else:
+            raise TiffRejected('not_tiff', 'Arquivo não é um TIFF', status=415)
+
+        (magic,) = struct.unpack(self.endian + 'H', header[2:4])
+        if magic == 42:
+            self.bigtiff = False
+            (self.first_offset,) = struct.unpack(self.endian + 'I', header[4:8])
+        elif magic == 43:
+            self.bigtiff = True
+            (self.first_offset,) = struct.unpack(self.endian + 'Q', self.reader.read(8, 8))
+        else:
+            raise TiffRejected('not_tiff', 'Arquivo não é um TIFF', status=415)
+        self.truncated = False
+
+    def entries(self, offset):
+        """Entradas do IFD em `offset` -> (entradas, offset do próximo IFD)"""
+        endian, bigtiff = self.endian, self.bigtiff
+        count_format, count_size = ('Q', 8) if bigtiff else ('H', 2)
+        entry_size = 20 if bigtiff else 12
+        inline_size = 8 if bigtiff else 4
+        offset_format = 'Q' if bigtiff else 'I'
+
+        (count,) = struct.unpack(endian + count_format, self.reader.read(offset, count_size))
+        if count == 0 or count > MAX_IFD_ENTRIES:
+            raise TiffRejected('corrupt', f'TIFF corrompido: IFD com {count} entradas')
+        table = self.reader.read(offset + count_size, count * entry_size + inline_size)
+
+        entries = {}
+        for i in range(count):
+            entry = table[i * entry_size:(i + 1) * entry_size]
+            tag, type_id = struct.unpack(endian + 'HH', entry[:4])
+            (values,) = struct.unpack(endian + offset_format, entry[4:4 + inline_size])
+            if type_id in _TYPES:
+                entries[tag] = (type_id, values, entry[-inline_size:])
+
+        (next_offset,) = struct.unpack(endian + offset_format, table[-inline_size:])
+        return entries, next_offset
+
+    def payload(self, entry, max_count=None):
+        """Bytes do valor (no campo ou no offset apontado), até max_count valores"""
+        type_id, count, field = entry
+        if max_count is not None:
+            count = min(count, max_count)
+        size = _TYPES[type_id][1] * count
+        if size <= len(field):
+            return field[:size]
+        (value_offset,) = struct.unpack(self.endian + ('Q' if self.bigtiff else 'I'), field)
+        return self.reader.read(value_offset, size)
+
+    def values(self, entry, max_count=None):
+        type_id = entry[0]
+        fmt, size = _TYPES[type_id]
+        payload = self.payload(entry, max_count)
+        values = struct.unpack(self.endian + fmt * (len(payload) // size), payload)
+        return values[::2] if type_id in (5, 10) else values
+
+    def tags(self, entries):
+        """Valores das tags usadas em TiffPage (offsets: só a quantidade)"""
+        tags = {}
+        for tag in _WANTED_TAGS & entries.keys():
+            if tag in (_TAG_STRIP_OFFSETS, _TAG_TILE_OFFSETS):
+                tags[tag] = range(entries[tag][1])
+            else:
+                tags[tag] = self.values(entries[tag], max_count=4)
+        return tags
+
+    def walk(self, max_pages):
+        """Entradas de cada IFD, na ordem; para após max_pages + 1 (truncated)"""
+        offset, seen = self.first_offset, set()
+        while offset:
+            if offset in seen:
+                raise TiffRejected('corrupt', 'TIFF corrompido: IFDs em ciclo')
+            if len(seen) > max_pages:
+                self.truncated = True
+                return
+            seen.add(offset)
+            entries, offset = self.entries(offset)
+            yield entries
+
+
+_WANTED_TAGS = {
+    _TAG_WIDTH, _TAG_HEIGHT, _TAG_BITS, _TAG_COMPRESSION, _TAG_PHOTOMETRIC, _TAG_STRIP_OFFSETS,
+    _TAG_SAMPLES, _TAG_ROWS_PER_STRIP, _TAG_PLANAR, _TAG_TILE_WIDTH, _TAG_TILE_LENGTH, _TAG_TILE_OFFSETS,
+}
+
+
+def _open_source(source):
+    start = source.tell()
+    return start, source.seek(0, os.SEEK_END)
+
+
+def inspect(source, max_pages=None):
+    """
+    Lê os metadados de um TIFF (caminho ou arquivo binário com seek).
+    Para após max_pages + 1 páginas (TiffInfo.truncated). Não valida limites:
+    use validate(). Levanta TiffRejected se não for TIFF ou estiver corrompido.
+    """
+    max_pages = TIFF_MAX_PAGES if max_pages is None else max_pages
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return inspect(f, max_pages)
+
+    start, size = _open_source(source)
+    try:
+        tiff = _TiffFile(source, size)
+        pages = [TiffPage(tiff.tags(entries)) for entries in tiff.walk(max_pages)]
+        if not pages:
+            raise TiffRejected('corrupt', 'TIFF sem páginas')
+        return TiffInfo(pages, size, tiff.bigtiff, tiff.truncated)
+    finally:
+        source.seek(start)
+
+
+# Tags copiadas para o TIFF mínimo de cada strip/tile (decode independente)
+CHUNK_TAGS = (258, 259, 262, 266, 277, 284, 292, 293, 317, 320, 338, 339, 347, 530, 531, 532)
+_TAG_STRIP_BYTE_COUNTS = 279
+_TAG_TILE_BYTE_COUNTS = 325
+
+
+class TiffLayout:
+    """Posição dos strips/tiles de uma página, para ler a imagem em faixas"""
+
+    def __init__(self, page, endian, offsets, byte_counts, chunk_tags):
+        self.page = page
+        self.endian = endian
+        self.offsets = offsets
+        self.byte_counts = byte_counts
+        # [(tag, tipo, quantidade, bytes do valor)] na ordem do arquivo de origem
+        self.chunk_tags = chunk_tags
+
+    @property
+    def chunk_width(self):
+        return self.page.tile_width if self.page.tiled else self.page.width
+
+    @property
+    def chunk_height(self):
+        return self.page.tile_height if self.page.tiled else self.page.rows_per_strip
+
+    @property
+    def chunks_across(self):
+        return -(-self.page.width // self.chunk_width)
+
+    @property
+    def row_bytes(self):
+        """Bytes de uma linha de um strip/tile sem compressão"""
+        page = self.page
+        return -(-self.chunk_width * page.samples_per_pixel * page.bits_per_sample // 8)
+
+    @property
+    def streamable(self):
+        page = self.page
+        return (page.compression in SUPPORTED_COMPRESSIONS
+                and (page.planar == 1 or page.samples_per_pixel == 1)
+                and self.chunk_width > 0 and self.chunk_height > 0)
+
+
+def read_layout(path, page=0):
+    """Layout dos strips/tiles da página `page` (levanta TiffRejected)"""
+    with open(path, 'rb') as f:
+        _, size = _open_source(f)
+        tiff = _TiffFile(f, size)
+        for index, entries in enumerate(tiff.walk(page)):
+            if index == page:
+                break
+        else:
+            raise TiffRejected('corrupt', f'TIFF sem a página {page}')
+
+        info = TiffPage(tiff.tags(entries))
+        tiled = info.tiled
+        offsets_tag = _TAG_TILE_OFFSETS if tiled else _TAG_STRIP_OFFSETS
+        counts_tag = _TAG_TILE_BYTE_COUNTS if tiled else _TAG_STRIP_BYTE_COUNTS
+        if offsets_tag not in entries or counts_tag not in entries or not info.width or not info.height:
+            raise TiffRejected('corrupt', 'TIFF sem offsets de strips/tiles')
+
+        chunk_height = info.tile_height if tiled else info.rows_per_strip
+        chunk_width = info.tile_width if tiled else info.width
+        if not chunk_height or not chunk_width:
+            raise TiffRejected('corrupt', 'TIFF com strips/tiles vazios')
+        expected = -(-info.height // chunk_height) * -(-info.width // chunk_width)
+        if info.planar == 2:
+            expected *= info.samples_per_pixel
+        offsets = tiff.values(entries[offsets_tag], max_count=expected)
+        byte_counts = tiff.values(entries[counts_tag], max_count=expected)
+        if len(offsets) != expected or len(byte_counts) != expected:
+            raise TiffRejected('corrupt', 'TIFF com número de strips/tiles inconsistente')
+
+        chunk_tags = [(tag, entries[tag][0], entries[tag][1], tiff.payload(entries[tag]))
+                      for tag in CHUNK_TAGS if tag in entries and entries[tag][0] < 16]
+        return TiffLayout(info, tiff.endian, offsets, byte_counts, chunk_tags)
+
+
+def validate(info, max_pixels=None, max_pages=None, max_ratio=None):
+    """Recusa bombas de descompressão, excesso de páginas e formatos não suportados"""
+    max_pixels = TIFF_MAX_PIXELS if max_pixels is None else max_pixels
+    max_pages = TIFF_MAX_PAGES if max_pages is None else max_pages
+    max_ratio = TIFF_MAX_DECOMPRESSION_RATIO if max_ratio is None else max_ratio
+
+    if info.truncated or info.page_count > max_pages:
+        raise TiffRejected('too_many_pages', f'TIFF com mais de {max_pages} páginas', status=413)
+
+    decoded_bytes = 0
+    for number, page in enumerate(info.pages, start=1):
+        if page.width <= 0 or page.height <= 0:
+            raise TiffRejected('corrupt', f'Página {number} sem dimensões')
+        if page.pixels > max_pixels:
+            raise TiffRejected(
+                'too_many_pixels',
+                f'Página {number} com {page.width}x{page.height} pixels (limite {max_pixels / 1e6:.0f} MP)',
+                status=413
+            )
+        if page.compression not in SUPPORTED_COMPRESSIONS:
+            raise TiffRejected('unsupported_compression', f'Compressão não suportada: {page.compression_name}',
+                               status=415)
+        if page.bits_per_sample not in SUPPORTED_BITS or not 1 <= page.samples_per_pixel <= 4:
+            raise TiffRejected(
+                'unsupported_depth',
+                f'Profundidade não suportada: {page.bits_per_sample} bits x {page.samples_per_pixel} amostras',
+                status=415
+            )
+        if page.photometric not in SUPPORTED_PHOTOMETRIC:
+            raise TiffRejected('unsupported_photometric', f'Fotometria não suportada: {page.photometric}',
+                               status=415)
+        decoded_bytes += page.pixels
+
+    if max_ratio and info.file_size and decoded_bytes / info.file_size > max_ratio:
+        raise TiffRejected(
+            'decompression_bomb',
+            f'Razão de descompressão suspeita ({decoded_bytes / info.file_size:.0f}x)',
+            status=413
+        )
+    return info
+
+
+def inspect_or_none(path):
+    """Metadados do TIFF ou None (arquivo não TIFF/corrompido: quem chama decide)"""
+    try:
+        return inspect(path)
+    except (TiffRejected, OSError):
+        return None
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Estatísticas de Palavras do OCR - uma passada, incrementais e mescláveis
+
+count_words e get_most_frequent_words rodavam cada um um re.findall (padrão
+não compilado) sobre o texto inteiro e materializavam a lista filtrada antes
+do Counter. Aqui o texto é tokenizado uma vez com o padrão pré-compilado e as
+contagens de todas as palavras ficam num Counter (contagem em C); o total de
+palavras e as mais frequentes (heap top-k, sem stopwords e com >= 3 letras)
+saem dessas contagens.
+
+TokenStats.update() aceita o texto em partes (faixas do OCR, páginas) e
+merge() soma estatísticas de shards processados em paralelo, sem
+concatenar os textos: o top-k do documento sai das contagens completas,
+e não das listas top-k de cada página.
+"""
+
+import heapq
+import re
+from collections import Counter
+from operator import itemgetter
+
+# Palavras (letras, inclusive acentuadas do português) no texto em minúsculas
+WORD_PATTERN = re.compile(r'\b[a-zA-ZáéíóúâêôãõçÁÉÍÓÚÂÊÔÃÕÇ]+\b')
+
+# Palavras frequentes: mínimo de letras e stopwords (pt + en) descartadas
+MIN_FREQUENT_LENGTH = 3
+STOPWORDS = frozenset([
+    'o', 'a', 'os', 'as', 'um', 'uma', 'de', 'do', 'da', 'dos', 'das',
+    'em', 'no', 'na', 'nos', 'nas', 'por', 'para', 'com', 'sem', 'sob',
+    'e', 'ou', 'mas', 'se', 'que', 'qual', 'quando', 'onde', 'como',
+    'the', 'a', 'an', 'and', 'or', 'but', 'if', 'of', 'at', 'by', 'for',
+    'with', 'about', 'as', 'into', 'through', 'to', 'from', 'in', 'on'
+])
+
+
+class TokenStats:
+    def __init__(self, total=0, counts=None):
+        self.total = total  # palavras (todas, inclusive stopwords e curtas)
+        self.counts = Counter(counts or {})
+
+    @classmethod
+    def from_text(cls, text):
+        """Estatísticas de um texto"""
+        return cls().update(text)
+
+    @classmethod
+    def merged(cls, shards):
+        """Soma de várias estatísticas (páginas, faixas ou shards do OCR)"""
+        stats = cls()
+        for shard in shards:
+            stats.merge(shard)
+        return stats
+
+    def update(self, text):
+        """Acrescenta as palavras de mais um trecho do texto"""
+        if text:
+            tokens = WORD_PATTERN.findall(text.lower())
+            self.total += len(tokens)
+            self.counts.update(tokens)
+        return self
+
+    def merge(self, other):
+        """Acrescenta as contagens de outra TokenStats"""
+        self.total += other.total
+        self.counts.update(other.counts)
+        return self
+
+    def most_common(self, top_n=10):
+        """[(palavra, contagem)] mais frequentes, sem stopwords e palavras curtas"""
+        candidates = ((word, count) for word, count in self.counts.items()
+                      if len(word) >= MIN_FREQUENT_LENGTH and word not in STOPWORDS)
+        return heapq.nlargest(top_n, candidates, key=itemgetter(1))
+
+    def to_dict(self):
+        """Forma serializável (JSON) das estatísticas"""
+        return {'total': self.total, 'counts': dict(self.counts)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['total'], data['counts'])
+
+    def __eq__(self, other):
+        return isinstance(other, TokenStats) and self.total == other.total and self.counts == other.counts
+
+    def __repr__(self):
+        return f"TokenStats(total={self.total}, unique={len(self.counts)})"
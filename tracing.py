@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Tracing Distribuído - API → fila Redis → worker Celery → etapas do classificador
+
+Cada requisição HTTP e cada tarefa Celery abre um span raiz; as etapas
+medidas com metrics.stage viram spans filhos (via observador de etapas), então
+o mesmo trace cobre upload, enfileiramento, espera na fila, decode,
+classificação, OCR e a busca do resultado em GET /task/<id>.
+
+O contexto é propagado no formato W3C `traceparent`
+(00-<trace_id>-<span_id>-<flags>): header HTTP de entrada e header da
+mensagem Celery. Os spans de uma requisição/tarefa ficam em memória e são
+entregues juntos quando o span raiz fecha (finish), fora das etapas medidas;
+spans que terminam depois da raiz são exportados na hora. Exportadores:
+
+- jsonl (padrão): uma linha JSON por span em TRACE_FILE, com rotação (um
+  append por trace)
+- none: descarta
+- modulo:atributo: fábrica/classe com export(span_dict) e, opcionalmente,
+  export_batch(span_dicts)
+
+Configuração (variáveis de ambiente):
+    TRACING_ENABLED     1 (padrão) ou 0
+    TRACE_EXPORTER      jsonl (padrão), none ou modulo:atributo
+    TRACE_FILE          arquivo do exportador jsonl (padrão .traces/spans.jsonl)
+    TRACE_MAX_BYTES     tamanho do arquivo antes de rotacionar (padrão 64 MB)
+    TRACE_SAMPLE_RATE   fração dos traces iniciados aqui que são exportados (padrão 1.0)
+"""
+
+import contextvars
+import importlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+import metrics
+from structured_logging import get_logger
+
+logger = get_logger(__name__)
+
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', '1') == '1'
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'jsonl')
+TRACE_FILE = os.environ.get('TRACE_FILE', os.path.join('.traces', 'spans.jsonl'))
+TRACE_MAX_BYTES = int(os.environ.get('TRACE_MAX_BYTES', str(64 * 1024 * 1024)))
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '1.0'))
+
+_TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+# Spans da requisição/tarefa atual aguardando o fim do span raiz
+_current_batch = contextvars.ContextVar('current_batch', default=None)
+
+
+class SpanContext:
+    """Identificação de um span (local ou remoto)"""
+
+    __slots__ = ('trace_id', 'span_id', 'sampled')
+
+    def __init__(self, trace_id, span_id, sampled=True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value):
+    """'00-<trace>-<span>-<flags>' -> SpanContext (None se ausente ou inválido)"""
+    match = _TRACEPARENT.match((value or '').strip().lower())
+    if not match or set(match.group(1)) == {'0'} or set(match.group(2)) == {'0'}:
+        return None
+    trace_id, span_id, flags = match.groups()
+    return SpanContext(trace_id, span_id, sampled=bool(int(flags, 16) & 1))
+
+
+class Span:
+    """Operação com início, fim, atributos e status"""
+
+    def __init__(self, tracer, name, context, parent_id, attributes=None, start_time=None):
+        self.tracer = tracer
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time() if start_time is None else start_time
+        self.end_time = None
+        self.status = 'ok'
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, end_time=None, status=None):
+        if self.end_time is not None:
+            return
+        self.end_time = time.time() if end_time is None else end_time
+        if status is not None:
+            self.status = status
+        self.tracer.export(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.context.trace_id,
+            'span_id': self.context.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'service': self.tracer.service,
+            'start': round(self.start_time, 6),
+            'end': round(self.end_time, 6),
+            'duration_ms': round((self.end_time - self.start_time) * 1000, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+class _SpanBatch:
+    """Spans de um trace local (a thread do OCR especulativo compartilha o lote via contexto)"""
+
+    __slots__ = ('spans', 'closed', 'lock')
+
+    def __init__(self):
+        self.spans = []
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def add(self, span_dict):
+        """False se o lote já foi entregue (span terminou depois da raiz)"""
+        with self.lock:
+            if self.closed:
+                return False
+            self.spans.append(span_dict)
+            return True
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            return self.spans
+
+
+class JsonlExporter:
+    """Uma linha JSON por span; rotaciona para .1 acima de max_bytes"""
+
+    def __init__(self, path=TRACE_FILE, max_bytes=TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._directory_ready = False
+
+    def export(self, span):
+        self.export_batch([span])
+
+    def export_batch(self, spans):
+        """Spans de um trace num único append"""
+        lines = ''.join(json.dumps(span, ensure_ascii=False, default=str) + '\n' for span in spans)
+        try:
+            with self._lock:
+                if not self._directory_ready:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                    self._directory_ready = True
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+                    size = f.tell()
+                if size > self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+        except OSError as e:
+            logger.warning("⚠️ Falha ao exportar span: %s", e)
+
+
+class NullExporter:
+    def export(self, span):
+        pass
+
+
+def load_exporter(spec=TRACE_EXPORTER):
+    """'jsonl', 'none' ou 'modulo:atributo' (classe/fábrica sem argumentos)"""
+    if spec == 'jsonl':
+        return JsonlExporter()
+    if spec in ('none', ''):
+        return NullExporter()
+    module_name, _, attribute = spec.partition(':')
+    factory = getattr(importlib.import_module(module_name), attribute)
+    return factory()
+
+
+class _StageSpans:
+    """Observador de metrics.stage: cada etapa vira um span filho do atual"""
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def enter(self, name):
+        self.tracer.start_span(name)
+
+    def exit(self, name):
+        span = _current_span.get()
+        if span is not None and span.name == name and span._token is not None:
+            _current_span.reset(span._token)
+            span.end()
+
+
+class Tracer:
+    """Cria spans no contexto atual e os entrega ao exportador"""
+
+    def __init__(self, service='api', exporter=None, enabled=TRACING_ENABLED, sample_rate=TRACE_SAMPLE_RATE):
+        self.service = service
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self._exporter = exporter
+        self._stage_spans = _StageSpans(self)
+
+    @property
+    def exporter(self):
+        if self._exporter is None:
+            self._exporter = load_exporter()
+        return self._exporter
+
+    def export(self, span):
+        if not span.context.sampled:
+            return
+        batch = _current_batch.get()
+        if batch is not None and batch.add(span.to_dict()):
+            return
+        self._deliver([span.to_dict()])
+
+    def _deliver(self, spans):
+        if not spans:
+            return
+        try:
+            exporter = self.exporter
+            if hasattr(exporter, 'export_batch'):
+                exporter.export_batch(spans)
+            else:
+                for span in spans:
+                    exporter.export(span)
+        except Exception as e:
+            logger.warning("⚠️ Falha ao exportar span: %s", e)
+
+    def current_span(self):
+        return _current_span.get()
+
+    def start_span(self, name, parent=None, attributes=None, start_time=None, activate=True):
+        """
+        Span filho de `parent` (SpanContext) ou do span atual; sem nenhum dos
+        dois, inicia um novo trace. activate=True o torna o span atual.
+        """
+        if parent is None:
+            current = _current_span.get()
+            parent = current.context if current is not None else None
+        if parent is None:
+            context = SpanContext(uuid.uuid4().hex, uuid.uuid4().hex[:16], random.random() < self.sample_rate)
+            parent_id = None
+        else:
+            context = SpanContext(parent.trace_id, uuid.uuid4().hex[:16], parent.sampled)
+            parent_id = parent.span_id
+        span = Span(self, name, context, parent_id, attributes, start_time)
+        if activate:
+            span._token = _current_span.set(span)
+        return span
+
+    def record_span(self, name, start_time, end_time, parent=None, attributes=None):
+        """Span já concluído (ex.: espera na fila, medida por timestamps)"""
+        span = self.start_span(name, parent=parent, attributes=attributes, start_time=start_time, activate=False)
+        span.end(end_time=end_time)
+        return span
+
+    def begin(self, name, traceparent=None, attributes=None):
+        """
+        Abre o span raiz de uma requisição/tarefa (continuando `traceparent`,
+        se houver) e passa a registrar as etapas de metrics.stage como spans.
+        Retorna o escopo a passar para finish() (None se desativado).
+        """
+        if not self.enabled:
+            return None
+        batch = _SpanBatch()
+        batch_token = _current_batch.set(batch)
+        span = self.start_span(name, parent=parse_traceparent(traceparent), attributes=attributes)
+        return span, metrics.set_stage_observer(self._stage_spans), batch, batch_token
+
+    def finish(self, scope, status=None, attributes=None):
+        """Fecha o span raiz aberto por begin() e entrega os spans do trace de uma vez"""
+        if scope is None:
+            return
+        span, observer_token, batch, batch_token = scope
+        metrics.reset_stage_observer(observer_token)
+        for key, value in (attributes or {}).items():
+            span.set_attribute(key, value)
+        # Etapas ainda abertas (exceção no meio de um stage) são descartadas do contexto
+        try:
+            _current_span.reset(span._token)
+        except ValueError:
+            _current_span.set(None)
+        span.end(status=status)
+        try:
+            _current_batch.reset(batch_token)
+        except ValueError:
+            _current_batch.set(None)
+        self._deliver(batch.close())
+
+    def current_trace_id(self):
+        span = _current_span.get()
+        return span.context.trace_id if self.enabled and span is not None else None
+
+    def inject(self, carrier=None):
+        """Adiciona o traceparent do span atual a um dict de headers"""
+        carrier = {} if carrier is None else carrier
+        span = _current_span.get()
+        if self.enabled and span is not None:
+            carrier['traceparent'] = span.context.traceparent
+        return carrier
+
+
+def load_trace(trace_id, path=TRACE_FILE):
+    """Spans de um trace gravados pelo JsonlExporter, em ordem de início"""
+    spans = []
+    for candidate in (path + '.1', path):
+        if not os.path.exists(candidate):
+            continue
+        with open(candidate, encoding='utf-8') as f:
+            for line in f:
+                if trace_id in line:
+                    span = json.loads(line)
+                    if span.get('trace_id') == trace_id:
+                        spans.append(span)
+    return sorted(spans, key=lambda span: span['start'])